@@ -18,7 +18,9 @@ Principales entidades:
 """
 
 import uuid
+from datetime import timedelta
 from django.db import models
+from django.db.models import F
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -301,7 +303,9 @@ class ApiCallLog(models.Model):
         help_text="Solicitud masiva a la que pertenece esta llamada",
     )
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default (no auto_now_add) para conservar la hora real de la llamada
+    # cuando el registro se escribe después en lote (ver base/log_sink.py)
+    created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -590,11 +594,16 @@ class ApiRateLimit(models.Model):
         Incrementa el contador de peticiones.
 
         Este método debe llamarse después de cada petición exitosa.
+        Usa expresiones F() para no perder incrementos entre workers.
         """
-        self.current_count += 1
-        self.total_requests += 1
-        self.last_request_at = timezone.now()
-        self.save()
+        now = timezone.now()
+        ApiRateLimit.objects.filter(pk=self.pk).update(
+            current_count=F("current_count") + 1,
+            total_requests=F("total_requests") + 1,
+            last_request_at=now,
+        )
+        self.refresh_from_db(fields=["current_count", "total_requests"])
+        self.last_request_at = now
 
     def get_wait_time(self):
         """
@@ -616,6 +625,64 @@ class ApiRateLimit(models.Model):
         self.minute_window_start = timezone.now()
         self.save()
 
+    @classmethod
+    def acquire_slot(cls, service_id, endpoint_id=None, limit=None, window_seconds=60):
+        """
+        Reserva de forma atómica un cupo en la ventana actual.
+
+        En régimen estable ejecuta un único UPDATE condicional; solo al
+        abrir una ventana nueva o al crear el registro hace consultas extra.
+
+        Args:
+            service_id: ID del ApiService
+            endpoint_id: ID del ApiEndpoint (None para límite general)
+            limit: Límite por ventana (por defecto el del servicio/endpoint)
+            window_seconds: Duración de la ventana en segundos
+
+        Returns:
+            Tuple[bool, float]: (puede_proceder, tiempo_espera_segundos)
+        """
+        now = timezone.now()
+        window_start = now - timedelta(seconds=window_seconds)
+        base = cls.objects.filter(service_id=service_id, endpoint_id=endpoint_id)
+
+        if limit is None:
+            rate_limit = base.select_related("service", "endpoint").first()
+            limit = rate_limit.get_limit() if rate_limit else None
+            if limit is None:
+                return True, 0.0
+
+        increments = {
+            "total_requests": F("total_requests") + 1,
+            "last_request_at": now,
+        }
+
+        # 1. Ventana vigente con cupo disponible
+        if base.filter(
+            minute_window_start__gt=window_start, current_count__lt=limit
+        ).update(current_count=F("current_count") + 1, **increments):
+            return True, 0.0
+
+        # 2. Ventana vencida: abrir una nueva
+        if base.filter(minute_window_start__lte=window_start).update(
+            current_count=1, minute_window_start=now, **increments
+        ):
+            return True, 0.0
+
+        # 3. Sin registro todavía: crearlo con la primera petición
+        rate_limit = base.only("minute_window_start").first()
+        if rate_limit is None:
+            cls.objects.get_or_create(
+                service_id=service_id,
+                endpoint_id=endpoint_id,
+                defaults={"current_count": 0, "total_requests": 0},
+            )
+            return cls.acquire_slot(service_id, endpoint_id, limit, window_seconds)
+
+        # 4. Ventana vigente y sin cupo
+        elapsed = (now - rate_limit.minute_window_start).total_seconds()
+        return False, max(window_seconds - elapsed, 0.0)
+
     @classmethod
     def get_for_service_endpoint(cls, service, endpoint=None):
         """
@@ -1,12 +1,9 @@
 # En api_service/pipeline.py (archivo nuevo)
-from celery import chain
-from .tasks import procesar_validacion_masiva_ruc, iniciar_proceso_facturacion
-from billing.tasks import (
-    generar_facturas_mensuales,
-    generar_reportes_facturacion,
-    enviar_notificaciones,
-)
-from logging import _logger
+import logging
+
+from .tasks import procesar_validacion_masiva_ruc
+
+_logger = logging.getLogger(__name__)
 
 
 def crear_pipeline_facturacion_mensual(fecha_corte=None, user_id=None):
@@ -15,36 +12,41 @@ def crear_pipeline_facturacion_mensual(fecha_corte=None, user_id=None):
 
     1. Obtener suscripciones a facturar
     2. Validar RUCs masivamente con APIMIGO
-    3. Generar facturas para clientes válidos
-    4. Generar reportes
-    5. Enviar notificaciones
+    3. Generar facturas para clientes válidos: al terminar la validación,
+       iniciar_proceso_facturacion lanza billing.tasks.generar_facturas_mensuales
+       (shards + consolidación en la BillingRun)
     """
-    from billing.utils import obtener_suscripciones_a_facturar
+    from billing.services.batch_invoice_service import BatchInvoiceService
 
     # 1. Obtener suscripciones
-    suscripciones = obtener_suscripciones_a_facturar(fecha_corte)
-    rucs_a_validar = list({s.cliente.ruc for s in suscripciones if s.cliente.ruc})
+    service = BatchInvoiceService()
+    suscripciones = list(
+        service._get_eligible_subscriptions(
+            fecha_corte or service.today
+        ).select_related("partner")
+    )
+    rucs_a_validar = list(
+        {
+            s.partner.num_document
+            for s in suscripciones
+            if s.partner.document_type == "ruc" and s.partner.num_document
+        }
+    )
 
     _logger.info(
         f"Iniciando pipeline para {len(rucs_a_validar)} RUCs, {len(suscripciones)} suscripciones"
     )
 
-    # 2. Crear pipeline Celery con todas las etapas
-    pipeline = chain(
-        # Etapa 1: Validación masiva de RUCs
-        procesar_validacion_masiva_ruc.s(
-            ruc_list=rucs_a_validar, user_id=user_id, prioridad="facturacion_mensual"
-        ),
-        # Etapa 2: Generar facturas (se dispara automáticamente desde la etapa 1)
-        # La función iniciar_proceso_facturacion se llama desde procesar_validacion_masiva_ruc
-        # Etapa 3: Reportes y notificaciones
-        generar_reportes_facturacion.s(user_id=user_id),
-        enviar_notificaciones.s(tipo="facturacion_mensual"),
+    # 2. Validación masiva de RUCs; la generación de facturas se dispara
+    # desde procesar_validacion_masiva_ruc (prioridad facturacion_mensual)
+    result = procesar_validacion_masiva_ruc.apply_async(
+        kwargs={
+            "ruc_list": rucs_a_validar,
+            "user_id": user_id,
+            "prioridad": "facturacion_mensual",
+        }
     )
 
-    # Ejecutar pipeline
-    result = pipeline.apply_async()
-
     return {
         "pipeline_id": result.id,
         "estadisticas_iniciales": {
@@ -55,7 +57,5 @@ def crear_pipeline_facturacion_mensual(fecha_corte=None, user_id=None):
         "tasks": [
             "validacion_masiva_ruc",
             "generacion_facturas",
-            "reportes",
-            "notificaciones",
         ],
     }
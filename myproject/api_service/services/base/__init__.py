@@ -5,6 +5,24 @@ Módulo base con utilidades compartidas para todos los servicios.
 
 from .timeout_config import TimeoutConfig
 from .rate_limit import RateLimitManager
+from .rate_limit_backends import (
+    RateLimitScope,
+    MemoryTokenBucketBackend,
+    CacheSlidingWindowBackend,
+    DatabaseRateLimitBackend,
+    get_rate_limit_backend,
+)
+from .registry import ServiceRegistry, get_service_registry
+from .log_sink import ApiCallLogSink, get_log_sink, shutdown_log_sink
+from .io_executor import run_io, get_io_executor, shutdown_io_executor
+from .http_pool import (
+    HttpClientPool,
+    HttpPoolLifespan,
+    get_http_pool,
+    close_http_pool,
+    aclose_http_pool,
+)
+from .scheduler import AdaptiveConcurrencyLimiter, BatchProgressTracker, stream_bounded
 from .token_utils import validate_and_format_token, sanitize_token
 # from .exceptions import BaseAPIError
 # from .base_service import BaseAPIService
@@ -12,6 +30,27 @@ from .token_utils import validate_and_format_token, sanitize_token
 __all__ = [
     'TimeoutConfig',
     'RateLimitManager',
+    'RateLimitScope',
+    'MemoryTokenBucketBackend',
+    'CacheSlidingWindowBackend',
+    'DatabaseRateLimitBackend',
+    'get_rate_limit_backend',
+    'ServiceRegistry',
+    'get_service_registry',
+    'ApiCallLogSink',
+    'get_log_sink',
+    'shutdown_log_sink',
+    'run_io',
+    'get_io_executor',
+    'shutdown_io_executor',
+    'HttpClientPool',
+    'HttpPoolLifespan',
+    'get_http_pool',
+    'close_http_pool',
+    'aclose_http_pool',
+    'AdaptiveConcurrencyLimiter',
+    'BatchProgressTracker',
+    'stream_bounded',
     'validate_and_format_token',
     'sanitize_token',
     # 'BaseAPIError',
@@ -0,0 +1,313 @@
+# api_service/services/base/http_pool.py
+"""
+Pool de clientes HTTP de larga vida, compartido por el proceso.
+
+Crear un `httpx.AsyncClient` (o usar `requests.post` suelto) por petición
+obliga a repetir el handshake TCP+TLS en cada llamada. Aquí se mantiene un
+cliente por servicio ("MIGO", "NUBEFACT", ...) con keep-alive, límites de
+conexiones tomados de `TimeoutConfig` (`<SERVICIO>_MAX_CONNECTIONS`, ...) y
+HTTP/2 cuando el paquete `h2` está instalado (`pip install "httpx[http2]"`).
+
+- Async: un `httpx.AsyncClient` por servicio y por event loop (un cliente
+  async no puede usarse desde otro loop).
+- Sync: un `requests.Session` por servicio (pool de urllib3) y, para quien
+  use httpx síncrono, un `httpx.Client`.
+- Los clientes httpx llevan fijos los timeouts y límites de su
+  `TimeoutConfig`, así que cada configuración distinta de un servicio tiene
+  su propio cliente. Una `requests.Session` no guarda timeouts: se pasan en
+  cada petición.
+
+Ciclo de vida:
+- Los clientes se crean al primer uso; tras un fork se descartan los
+  heredados del proceso padre.
+- `close_http_pool` se conecta a atexit y al apagado de workers Celery.
+- `HttpPoolLifespan` envuelve la aplicación ASGI y cierra los clientes async
+  en el evento `lifespan.shutdown`.
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .timeout_config import TimeoutConfig
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Union[str, Tuple]
+
+
+def http2_available() -> bool:
+    """True si httpx puede negociar HTTP/2 (requiere el paquete `h2`)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_fields(config: TimeoutConfig) -> tuple:
+    """Valores de la configuración que quedan fijos en un cliente httpx."""
+    return (
+        config.connect_timeout,
+        config.read_timeout,
+        config.write_timeout,
+        config.pool_timeout,
+        config.max_connections,
+        config.max_keepalive_connections,
+        config.keepalive_expiry,
+    )
+
+
+def _session_fields(config: TimeoutConfig) -> tuple:
+    """En una `requests.Session` solo queda fijo el tamaño del pool."""
+    return (config.max_connections,)
+
+
+def _new_session(config: TimeoutConfig) -> requests.Session:
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.max_connections)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _is_closed(client) -> bool:
+    return getattr(client, "is_closed", False)
+
+
+def _unique(clients):
+    """Clientes sin repetir (el de por defecto también está bajo su config)."""
+    return list({id(client): client for client in clients}.values())
+
+
+class HttpClientPool:
+    """Clientes HTTP compartidos, uno por servicio."""
+
+    def __init__(self, http2: Optional[bool] = None):
+        enabled = (
+            getattr(settings, "API_HTTP2_ENABLED", True) if http2 is None else http2
+        )
+        self.http2 = bool(enabled) and http2_available()
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        # Claves: servicio (cliente por defecto) o (servicio, *valores de config)
+        # event loop -> {clave: AsyncClient}
+        self._async: Dict[
+            asyncio.AbstractEventLoop, Dict[ClientKey, httpx.AsyncClient]
+        ] = {}
+        self._sync: Dict[ClientKey, httpx.Client] = {}
+        self._sessions: Dict[ClientKey, requests.Session] = {}
+        self.stats = {"created": 0, "reused": 0}
+
+    # ===== ACCESO A CLIENTES =====
+
+    def get_async_client(
+        self, service_key: str, timeout_config: Optional[TimeoutConfig] = None
+    ) -> httpx.AsyncClient:
+        """Cliente async del servicio para el event loop en curso."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._check_fork()
+            clients = self._async.get(loop)
+            if clients is None:
+                self._forget_closed_loops()
+                clients = self._async[loop] = {}
+            return self._get(
+                clients,
+                service_key,
+                timeout_config,
+                _client_fields,
+                lambda config: httpx.AsyncClient(
+                    timeout=config.httpx_timeout,
+                    limits=config.httpx_limits,
+                    http2=self.http2,
+                ),
+                "async",
+            )
+
+    def get_sync_client(
+        self, service_key: str, timeout_config: Optional[TimeoutConfig] = None
+    ) -> httpx.Client:
+        """Cliente httpx síncrono del servicio."""
+        with self._lock:
+            self._check_fork()
+            return self._get(
+                self._sync,
+                service_key,
+                timeout_config,
+                _client_fields,
+                lambda config: httpx.Client(
+                    timeout=config.httpx_timeout,
+                    limits=config.httpx_limits,
+                    http2=self.http2,
+                ),
+                "sync",
+            )
+
+    def get_session(
+        self, service_key: str, timeout_config: Optional[TimeoutConfig] = None
+    ) -> requests.Session:
+        """
+        `requests.Session` del servicio (keep-alive vía urllib3).
+
+        requests no guarda timeouts en la sesión: quien la usa debe pasar
+        `timeout=` en cada petición (como NubefactService con
+        `timeout_config.as_tuple`). De `timeout_config` solo cuenta
+        `max_connections`, que define el tamaño del pool.
+        """
+        with self._lock:
+            self._check_fork()
+            return self._get(
+                self._sessions,
+                service_key,
+                timeout_config,
+                _session_fields,
+                _new_session,
+                "session",
+            )
+
+    def _get(self, clients, service_key, config, fields, factory, kind):
+        """
+        Cliente de `clients` para el servicio y la configuración.
+
+        Cada combinación distinta de timeouts/límites tiene su propio
+        cliente: un `timeout_config` diferente al del primer llamador no se
+        ignora. Sin `timeout_config` se devuelve el cliente que ya tenga el
+        servicio o uno nuevo con los valores de settings.
+        """
+        key = service_key if config is None else (service_key, *fields(config))
+        client = clients.get(key)
+        if client is not None and not _is_closed(client):
+            self.stats["reused"] += 1
+            return client
+
+        config = config or TimeoutConfig.from_settings(service_key)
+        config_key = (service_key, *fields(config))
+        client = clients.get(config_key)
+        if client is None or _is_closed(client):
+            client = factory(config)
+            clients[config_key] = client
+            self._created(service_key, kind)
+        else:
+            self.stats["reused"] += 1
+
+        # Cliente por defecto del servicio (llamadas sin timeout_config)
+        default = clients.get(service_key)
+        if default is None or _is_closed(default):
+            clients[service_key] = client
+        return client
+
+    # ===== CICLO DE VIDA =====
+
+    async def aclose(self) -> None:
+        """Cierra los clientes async del loop en curso y todos los síncronos."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async.pop(loop, {})
+        for client in _unique(clients.values()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error cerrando cliente HTTP async: {e}")
+        self.close()
+
+    def close(self) -> None:
+        """Cierra los clientes síncronos y suelta los async (sin loop no se pueden esperar)."""
+        with self._lock:
+            sync_clients, self._sync = self._sync, {}
+            sessions, self._sessions = self._sessions, {}
+            self._async = {}
+        for closeable in _unique([*sync_clients.values(), *sessions.values()]):
+            try:
+                closeable.close()
+            except Exception as e:
+                logger.error(f"Error cerrando cliente HTTP: {e}")
+
+    def _created(self, service_key: str, kind: str) -> None:
+        self.stats["created"] += 1
+        logger.debug(
+            f"Cliente HTTP {kind} creado para {service_key} (http2={self.http2})"
+        )
+
+    def _forget_closed_loops(self) -> None:
+        # Loops ya cerrados (p. ej. async_to_sync en Celery): sus sockets se
+        # liberan con el recolector, no se pueden cerrar con await
+        for loop in [loop for loop in self._async if loop.is_closed()]:
+            del self._async[loop]
+
+    def _check_fork(self) -> None:
+        if os.getpid() != self._pid:
+            # Las conexiones heredadas del padre no deben compartirse
+            self._pid = os.getpid()
+            self._async = {}
+            self._sync = {}
+            self._sessions = {}
+
+
+_pool: Optional[HttpClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpClientPool:
+    """Pool compartido por el proceso."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HttpClientPool()
+                atexit.register(close_http_pool)
+    return _pool
+
+
+def close_http_pool(**kwargs) -> None:
+    """Cierra los clientes del proceso. Conectado a atexit y al shutdown de Celery."""
+    if _pool is not None:
+        _pool.close()
+
+
+async def aclose_http_pool() -> None:
+    """Cierra los clientes del proceso desde código async (shutdown ASGI)."""
+    if _pool is not None:
+        await _pool.aclose()
+
+
+class HttpPoolLifespan:
+    """
+    Envuelve la aplicación ASGI para atender el protocolo `lifespan`
+    (Django no lo implementa): crea el pool al arrancar y lo cierra al apagar.
+
+    Uso (asgi.py):
+        application = HttpPoolLifespan(get_asgi_application())
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                get_http_pool()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await aclose_http_pool()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+try:
+    from celery.signals import worker_process_shutdown, worker_shutdown
+
+    worker_process_shutdown.connect(close_http_pool, weak=False)
+    worker_shutdown.connect(close_http_pool, weak=False)
+except ImportError:  # pragma: no cover - Celery es opcional para este módulo
+    pass
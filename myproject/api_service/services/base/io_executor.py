@@ -0,0 +1,73 @@
+# api_service/services/base/io_executor.py
+"""
+Executor acotado para efectos secundarios bloqueantes desde código async.
+
+Las operaciones de BD (ORM) y de cache (Redis/Memcached) son síncronas; si
+se ejecutan dentro de una coroutine bloquean el event loop y `asyncio.gather`
+termina serializando las peticiones HTTP. `run_io` las ejecuta en un pool de
+hilos dedicado y de tamaño fijo (`API_ASYNC_IO_WORKERS`), de modo que:
+
+- el event loop queda libre para solapar las llamadas HTTP,
+- la cantidad de conexiones a BD/cache abiertas por estos hilos está acotada,
+- no compite con el executor por defecto de asyncio ni con `sync_to_async`.
+"""
+
+import asyncio
+import atexit
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido por el proceso (se crea al primer uso)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, "API_ASYNC_IO_WORKERS", DEFAULT_WORKERS)
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="api-io"
+                )
+                atexit.register(shutdown_io_executor)
+    return _executor
+
+
+def _call_in_worker(fn: Callable, args: tuple, kwargs: dict) -> Any:
+    # Los hilos del pool son de larga vida: descartar conexiones caducadas
+    close_old_connections()
+    return fn(*args, **kwargs)
+
+
+async def run_io(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Ejecuta `fn(*args, **kwargs)` en el executor de I/O y espera el resultado.
+
+    Uso:
+        cached = await run_io(self.cache_service.get, cache_key)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_io_executor(), functools.partial(_call_in_worker, fn, args, kwargs)
+    )
+
+
+def shutdown_io_executor() -> None:
+    """Espera a que terminen las tareas pendientes y libera el pool."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,280 @@
+# api_service/services/base/log_sink.py
+"""
+Sink de escritura para ApiCallLog compartido por todos los servicios.
+
+Las llamadas a APIs externas se registran en un buffer en memoria (anillo
+acotado) que un hilo de fondo vacía con `bulk_create` cuando se alcanza
+`batch_size` registros o pasa `flush_interval` segundos. Así el log deja de
+estar en la ruta crítica de la petición: encolar no toca la BD y puede
+hacerse desde código async sin `sync_to_async`.
+
+- Si el buffer se llena se descarta el registro más antiguo (contador `dropped`).
+- Los IDs de ApiService/ApiEndpoint salen del registro en memoria (registry.py).
+- Al terminar el proceso (atexit / señales de shutdown de Celery) se vacía el buffer.
+
+Con `API_CALL_LOG_BUFFERED = False` cada registro se escribe en el momento
+(comportamiento anterior), útil en tests que cuentan filas inmediatamente.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from api_service.models import ApiCallLog
+from .registry import get_service_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ApiCallLogSink:
+    """
+    Buffer de ApiCallLog con vaciado por tamaño o por tiempo.
+
+    Uso:
+        sink = get_log_sink()
+        sink.enqueue(service_id=..., endpoint_id=..., status="SUCCESS", ...)
+    """
+
+    DEFAULT_MAX_SIZE = 10000
+    DEFAULT_BATCH_SIZE = 200
+    DEFAULT_FLUSH_INTERVAL = 2.0
+
+    def __init__(
+        self,
+        buffered: Optional[bool] = None,
+        max_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        self.buffered = (
+            getattr(settings, "API_CALL_LOG_BUFFERED", True)
+            if buffered is None
+            else buffered
+        )
+        self.max_size = max_size or getattr(
+            settings, "API_CALL_LOG_BUFFER_SIZE", self.DEFAULT_MAX_SIZE
+        )
+        self.batch_size = batch_size or getattr(
+            settings, "API_CALL_LOG_BATCH_SIZE", self.DEFAULT_BATCH_SIZE
+        )
+        self.flush_interval = flush_interval or getattr(
+            settings, "API_CALL_LOG_FLUSH_INTERVAL", self.DEFAULT_FLUSH_INTERVAL
+        )
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._buffer: deque = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._closed = False
+
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "flushes": 0,
+        }
+
+    # ===== RESOLUCIÓN DE IDS (vía registro de servicios) =====
+
+    def service_id(self, name: str) -> Optional[int]:
+        """ID de ApiService por nombre."""
+        service = get_service_registry().get_service(name=name)
+        return service.pk if service else None
+
+    def endpoint_id(self, service_id: int, name: str) -> Optional[int]:
+        """ID de ApiEndpoint por servicio y nombre."""
+        endpoint = get_service_registry().get_endpoint(service_id, name)
+        return endpoint.pk if endpoint else None
+
+    def cached_ids(
+        self, service_name: str, endpoint_name: str
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """(service_id, endpoint_id) ya memorizados, sin consultar la BD."""
+        registry = get_service_registry()
+        service = registry.get_service(name=service_name, cached_only=True)
+        if service is None:
+            return None, None
+        endpoint = registry.get_endpoint(service, endpoint_name, cached_only=True)
+        return service.pk, endpoint.pk if endpoint else None
+
+    # ===== ENCOLADO =====
+
+    def enqueue(self, **fields: Any) -> bool:
+        """
+        Registra una llamada API.
+
+        Acepta los mismos campos que ApiCallLog (service_id/endpoint_id o
+        instancias). No realiza I/O en modo buffer, por lo que es seguro
+        llamarlo desde el event loop.
+
+        Returns:
+            True si el registro se encoló/escribió sin descartar otro
+        """
+        fields.setdefault("created_at", timezone.now())
+        # El llamador puede seguir modificando sus dicts tras encolar
+        for key in ("request_data", "response_data"):
+            if isinstance(fields.get(key), dict):
+                fields[key] = dict(fields[key])
+
+        if not self.buffered or self._closed:
+            return self._write_now(fields)
+
+        self._check_fork()
+        dropped = False
+        with self._lock:
+            if len(self._buffer) >= self.max_size:
+                self._buffer.popleft()
+                self.stats["dropped"] += 1
+                dropped = True
+            self._buffer.append(fields)
+            self.stats["enqueued"] += 1
+            pending = len(self._buffer)
+
+        if dropped and self.stats["dropped"] % 1000 == 1:
+            logger.warning(
+                f"Buffer de ApiCallLog lleno ({self.max_size}); "
+                f"{self.stats['dropped']} registros descartados"
+            )
+
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return not dropped
+
+    def _write_now(self, fields: Dict[str, Any]) -> bool:
+        try:
+            ApiCallLog.objects.create(**fields)
+            self.stats["written"] += 1
+            return True
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Error guardando ApiCallLog: {e}")
+            return False
+
+    # ===== VACIADO =====
+
+    def flush(self) -> int:
+        """
+        Escribe todo lo pendiente en la BD.
+
+        Returns:
+            Número de registros escritos
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                written += self._write_batch(batch)
+        return written
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            count = min(limit, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            ApiCallLog.objects.bulk_create(
+                [ApiCallLog(**fields) for fields in batch], batch_size=self.batch_size
+            )
+            self.stats["written"] += len(batch)
+            self.stats["flushes"] += 1
+            return len(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.error(f"Error escribiendo lote de {len(batch)} ApiCallLog: {e}")
+            return 0
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    # ===== HILO DE FONDO =====
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="api-call-log-sink", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._closed:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                if self._buffer:
+                    close_old_connections()
+                    self.flush()
+        finally:
+            connection.close()
+
+    def _check_fork(self) -> None:
+        """Tras un fork (workers prefork) el hilo no existe en el hijo."""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._thread = None
+            self._lock = threading.Lock()
+            self._flush_lock = threading.Lock()
+            self._wakeup = threading.Event()
+            self._buffer = deque()
+
+    def close(self) -> None:
+        """Detiene el hilo y vacía el buffer (llamado al apagar el proceso)."""
+        self._closed = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 5)
+        if self._buffer:
+            written = self.flush()
+            logger.info(f"ApiCallLog: {written} registros escritos al cerrar")
+
+
+_sink: Optional[ApiCallLogSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_log_sink() -> ApiCallLogSink:
+    """Sink compartido por el proceso."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = ApiCallLogSink()
+                atexit.register(shutdown_log_sink)
+    return _sink
+
+
+def shutdown_log_sink(**kwargs) -> None:
+    """Vacía el sink del proceso. Conectado a atexit y al shutdown de Celery."""
+    if _sink is not None:
+        try:
+            _sink.close()
+        except Exception as e:
+            logger.error(f"Error vaciando ApiCallLog al cerrar: {e}")
+
+
+try:
+    from celery.signals import worker_process_shutdown, worker_shutdown
+
+    worker_process_shutdown.connect(shutdown_log_sink, weak=False)
+    worker_shutdown.connect(shutdown_log_sink, weak=False)
+except ImportError:  # pragma: no cover - Celery es opcional para este módulo
+    pass
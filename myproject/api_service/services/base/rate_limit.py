@@ -2,13 +2,22 @@
 """
 Módulo compartido para rate limiting.
 Puede ser usado por NubeFact, Migo y cualquier otro servicio.
+
+El conteo se delega a un backend intercambiable (ver rate_limit_backends.py):
+memoria del proceso (por defecto), cache compartido o BD (ApiRateLimit).
 """
 
 import logging
-from typing import Tuple, Optional
-from asgiref.sync import sync_to_async
+from typing import Dict, Optional, Tuple
 
-from api_service.models import ApiService, ApiEndpoint, ApiRateLimit
+from api_service.models import ApiService, ApiEndpoint
+from .io_executor import run_io
+from .registry import get_service_registry
+from .rate_limit_backends import (
+    BaseRateLimitBackend,
+    RateLimitScope,
+    get_rate_limit_backend,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,74 +26,109 @@ class RateLimitManager:
     """
     Manejador de rate limiting que soporta operaciones sync y async.
     Totalmente agnóstico al servicio (NubeFact, Migo, etc.)
+
+    `check_rate_limit_sync` reserva el cupo de forma atómica, por lo que
+    no hay ventana de carrera entre verificar y actualizar el contador.
     """
-    
-    def __init__(self, service: Optional[ApiService] = None):
+
+    WINDOW_SECONDS = 60
+
+    def __init__(
+        self,
+        service: Optional[ApiService] = None,
+        backend: Optional[BaseRateLimitBackend] = None,
+    ):
         self.service = service
-    
+        self.backend = backend or get_rate_limit_backend()
+        # endpoint_name -> RateLimitScope (None si el endpoint no existe)
+        self._scopes: Dict[str, Optional[RateLimitScope]] = {}
+
     def set_service(self, service: ApiService):
         """Establece el servicio para operaciones."""
         self.service = service
-    
+        self._scopes.clear()
+
+    def _build_scope(
+        self, endpoint_name: str, endpoint: Optional[ApiEndpoint] = None
+    ) -> Optional[RateLimitScope]:
+        """Resuelve (una vez por endpoint) la clave y el límite aplicable."""
+        if endpoint_name in self._scopes:
+            return self._scopes[endpoint_name]
+
+        if endpoint is None:
+            endpoint = get_service_registry().get_endpoint(self.service, endpoint_name)
+
+        scope = None
+        if endpoint is not None:
+            limit = (
+                getattr(endpoint, "custom_rate_limit", None)
+                or self.service.requests_per_minute
+            )
+            scope = RateLimitScope(
+                key=f"{self.service.pk}:{endpoint_name}",
+                limit=limit,
+                window_seconds=self.WINDOW_SECONDS,
+                service_id=self.service.pk,
+                endpoint_id=getattr(endpoint, "pk", None),
+            )
+
+        self._scopes[endpoint_name] = scope
+        return scope
+
     # ===== VERSIÓN SÍNCRONA =====
-    
-    def check_rate_limit_sync(self, endpoint_name: str) -> Tuple[bool, float]:
-        """Verifica rate limit (síncrono)."""
+
+    def check_rate_limit_sync(
+        self, endpoint_name: str, endpoint: Optional[ApiEndpoint] = None
+    ) -> Tuple[bool, float]:
+        """
+        Verifica rate limit y reserva el cupo (síncrono).
+
+        Args:
+            endpoint_name: Nombre del endpoint
+            endpoint: ApiEndpoint ya resuelto (evita la consulta a BD)
+        """
         if not self.service:
             return True, 0.0
-            
+
         try:
-            endpoint = ApiEndpoint.objects.filter(
-                service=self.service, name=endpoint_name
-            ).first()
-            
-            if not endpoint:
+            scope = self._build_scope(endpoint_name, endpoint)
+            if scope is None:
                 return True, 0.0
-            
-            rate_limit = ApiRateLimit.objects.filter(endpoint=endpoint).first()
-            if not rate_limit:
-                return True, 0.0
-            
-            if rate_limit.can_make_request():
-                return True, 0.0
-            else:
-                wait_seconds = rate_limit.get_wait_time()
+
+            allowed, wait_seconds = self.backend.acquire(scope)
+            if not allowed:
                 logger.warning(
                     f"Rate limit excedido para {endpoint_name}. "
                     f"Esperar {wait_seconds:.1f}s"
                 )
-                return False, wait_seconds
-                
+            return allowed, wait_seconds
+
         except Exception as e:
             logger.error(f"Error checking rate limit: {e}")
             return True, 0.0
-    
+
     def update_rate_limit_sync(self, endpoint_name: str) -> None:
-        """Actualiza rate limit (síncrono)."""
-        if not self.service:
-            return
-            
-        try:
-            endpoint = ApiEndpoint.objects.filter(
-                service=self.service, name=endpoint_name
-            ).first()
-            
-            if endpoint:
-                rate_limit, created = ApiRateLimit.objects.get_or_create(
-                    endpoint=endpoint,
-                    defaults={"service": self.service}
-                )
-                rate_limit.increment_count()
-                
-        except Exception as e:
-            logger.error(f"Error updating rate limit: {e}")
-    
+        """
+        Actualiza rate limit (síncrono).
+
+        Se mantiene por compatibilidad: el cupo ya se consumió en
+        check_rate_limit_sync, así que no realiza ninguna operación de I/O.
+        """
+        return None
+
     # ===== VERSIÓN ASÍNCRONA =====
-    
-    async def check_rate_limit_async(self, endpoint_name: str) -> Tuple[bool, float]:
+
+    async def check_rate_limit_async(
+        self, endpoint_name: str, endpoint: Optional[ApiEndpoint] = None
+    ) -> Tuple[bool, float]:
         """Verifica rate limit (asíncrono)."""
-        return await sync_to_async(self.check_rate_limit_sync)(endpoint_name)
-    
+        if self.backend.name == "memory" and (
+            endpoint_name in self._scopes or endpoint is not None
+        ):
+            # Sin I/O: evitar el salto al thread pool
+            return self.check_rate_limit_sync(endpoint_name, endpoint)
+        return await run_io(self.check_rate_limit_sync, endpoint_name, endpoint)
+
     async def update_rate_limit_async(self, endpoint_name: str) -> None:
         """Actualiza rate limit (asíncrono)."""
-        await sync_to_async(self.update_rate_limit_sync)(endpoint_name)
\ No newline at end of file
+        return None
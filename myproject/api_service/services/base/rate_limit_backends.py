@@ -0,0 +1,251 @@
+# api_service/services/base/rate_limit_backends.py
+"""
+Backends intercambiables para rate limiting.
+
+Cada backend implementa `acquire(scope)`, que reserva de forma atómica un
+cupo para una petición y devuelve (permitido, segundos_de_espera):
+
+- MemoryTokenBucketBackend: token bucket en memoria del proceso (sin I/O).
+- CacheSlidingWindowBackend: ventana deslizante sobre el cache de Django
+  usando `incr` atómico (compartido entre workers con Memcached/Redis).
+- DatabaseRateLimitBackend: modelo ApiRateLimit con UPDATE condicional
+  (respaldo durable, mantiene las estadísticas históricas).
+
+El backend por defecto se configura en settings:
+
+    API_RATE_LIMIT_BACKEND = "memory"  # "memory" | "cache" | "database"
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitScope:
+    """
+    Identifica el cupo a consumir y su límite.
+
+    Attributes:
+        key: Clave única del cupo (ej: "migo:consultar_ruc")
+        limit: Peticiones permitidas por ventana
+        window_seconds: Duración de la ventana (segundos)
+        service_id: ID de ApiService (requerido por el backend de BD)
+        endpoint_id: ID de ApiEndpoint (opcional)
+    """
+
+    key: str
+    limit: int
+    window_seconds: int = 60
+    service_id: Optional[int] = None
+    endpoint_id: Optional[int] = None
+
+
+class BaseRateLimitBackend:
+    """Interfaz común de los backends de rate limiting."""
+
+    name = "base"
+
+    def acquire(self, scope: RateLimitScope) -> Tuple[bool, float]:
+        """
+        Reserva un cupo para una petición.
+
+        Returns:
+            Tuple[bool, float]: (puede_proceder, tiempo_espera_segundos)
+        """
+        raise NotImplementedError
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """Reinicia el estado de un cupo (o de todos si key es None)."""
+        pass
+
+
+class MemoryTokenBucketBackend(BaseRateLimitBackend):
+    """
+    Token bucket en memoria del proceso.
+
+    La capacidad es `limit` y se recarga a razón de limit/window tokens por
+    segundo, por lo que permite ráfagas cortas sin superar el promedio.
+    No realiza ninguna consulta a BD ni al cache.
+
+    NOTA: El límite aplica por proceso. Con varios workers usar "cache".
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scope: RateLimitScope) -> Tuple[bool, float]:
+        capacity = float(max(scope.limit, 1))
+        rate = capacity / scope.window_seconds
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated_at = self._buckets.get(scope.key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+            if tokens >= 1.0:
+                self._buckets[scope.key] = (tokens - 1.0, now)
+                return True, 0.0
+
+            self._buckets[scope.key] = (tokens, now)
+            return False, (1.0 - tokens) / rate
+
+    def reset(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class CacheSlidingWindowBackend(BaseRateLimitBackend):
+    """
+    Ventana deslizante aproximada sobre el cache compartido.
+
+    Mantiene un contador por ventana fija (`incr` atómico) y estima el uso
+    de la ventana deslizante ponderando el contador de la ventana anterior:
+
+        uso = actual + anterior * (1 - fracción_transcurrida)
+
+    Si el uso estimado supera el límite, se revierte el incremento.
+    """
+
+    name = "cache"
+    KEY_PREFIX = "rl"
+    DEFAULT_WINDOW = 60
+
+    def __init__(self, cache_backend=None):
+        self.cache = cache_backend or cache
+
+    def _bucket_key(self, key: str, window_index: int) -> str:
+        return f"{self.KEY_PREFIX}:{key}:{window_index}".replace(" ", "_")
+
+    def _incr(self, bucket_key: str, ttl: int) -> int:
+        # add() es atómico: solo crea la clave si no existe
+        self.cache.add(bucket_key, 0, ttl)
+        try:
+            return self.cache.incr(bucket_key)
+        except ValueError:
+            # La clave expiró entre add() e incr()
+            self.cache.add(bucket_key, 0, ttl)
+            return self.cache.incr(bucket_key)
+
+    def acquire(self, scope: RateLimitScope) -> Tuple[bool, float]:
+        window = scope.window_seconds
+        now = time.time()
+        window_index = int(now // window)
+        elapsed_fraction = (now % window) / window
+
+        current_key = self._bucket_key(scope.key, window_index)
+        previous_key = self._bucket_key(scope.key, window_index - 1)
+
+        try:
+            current = self._incr(current_key, window * 2)
+            previous = self.cache.get(previous_key) or 0
+        except Exception as e:
+            logger.error(f"Error en rate limit por cache ({scope.key}): {e}")
+            return True, 0.0
+
+        estimated = current + previous * (1.0 - elapsed_fraction)
+        if estimated <= scope.limit:
+            return True, 0.0
+
+        try:
+            self.cache.decr(current_key)
+        except Exception:
+            pass
+
+        # Tiempo hasta que el peso de la ventana anterior libere un cupo
+        if previous:
+            overflow = estimated - scope.limit
+            wait = min(window * overflow / previous, window * (1 - elapsed_fraction))
+        else:
+            wait = window * (1 - elapsed_fraction)
+        return False, max(wait, 0.0)
+
+    def reset(self, key: Optional[str] = None) -> None:
+        if key is None:
+            return
+        window_index = int(time.time() // self.DEFAULT_WINDOW)
+        self.cache.delete_many(
+            [
+                self._bucket_key(key, window_index),
+                self._bucket_key(key, window_index - 1),
+            ]
+        )
+
+
+class DatabaseRateLimitBackend(BaseRateLimitBackend):
+    """
+    Respaldo durable sobre ApiRateLimit.
+
+    Usa un UPDATE condicional con expresiones F() (ver
+    ApiRateLimit.acquire_slot), de modo que workers concurrentes no pierden
+    incrementos. Es una consulta por petición en régimen estable.
+    """
+
+    name = "database"
+
+    def acquire(self, scope: RateLimitScope) -> Tuple[bool, float]:
+        from api_service.models import ApiRateLimit
+
+        if scope.service_id is None:
+            return True, 0.0
+
+        try:
+            return ApiRateLimit.acquire_slot(
+                service_id=scope.service_id,
+                endpoint_id=scope.endpoint_id,
+                limit=scope.limit,
+                window_seconds=scope.window_seconds,
+            )
+        except Exception as e:
+            logger.error(f"Error en rate limit por BD ({scope.key}): {e}")
+            return True, 0.0
+
+    def reset(self, key: Optional[str] = None) -> None:
+        from api_service.models import ApiRateLimit
+
+        if key is None:
+            ApiRateLimit.objects.update(current_count=0)
+
+
+RATE_LIMIT_BACKENDS = {
+    MemoryTokenBucketBackend.name: MemoryTokenBucketBackend,
+    CacheSlidingWindowBackend.name: CacheSlidingWindowBackend,
+    DatabaseRateLimitBackend.name: DatabaseRateLimitBackend,
+}
+
+_backend_instances: Dict[str, BaseRateLimitBackend] = {}
+_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend(name: Optional[str] = None) -> BaseRateLimitBackend:
+    """
+    Devuelve la instancia compartida (por proceso) del backend solicitado.
+
+    Args:
+        name: "memory", "cache" o "database". Por defecto usa
+              settings.API_RATE_LIMIT_BACKEND (o "memory").
+    """
+    name = (name or getattr(settings, "API_RATE_LIMIT_BACKEND", "memory")).lower()
+    if name not in RATE_LIMIT_BACKENDS:
+        raise ValueError(
+            f"Backend de rate limit no soportado: {name}. "
+            f"Opciones: {', '.join(RATE_LIMIT_BACKENDS)}"
+        )
+
+    with _backend_lock:
+        if name not in _backend_instances:
+            _backend_instances[name] = RATE_LIMIT_BACKENDS[name]()
+        return _backend_instances[name]
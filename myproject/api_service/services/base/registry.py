@@ -0,0 +1,183 @@
+# api_service/services/base/registry.py
+"""
+Registro en memoria de ApiService y ApiEndpoint compartido por el proceso.
+
+La configuración de servicios cambia muy poco pero se leía de la BD en cada
+instancia y en cada llamada (`_get_endpoint`, `_load_config`, ...). El
+registro memoriza las búsquedas (incluidas las que no encuentran nada) y:
+
+- las refresca tras `API_SERVICE_REGISTRY_TTL` segundos (0 = sin cache),
+- se invalida completo al guardar/borrar un ApiService o ApiEndpoint en este
+  proceso (señales post_save/post_delete); en otros procesos el cambio se
+  ve como máximo tras el TTL.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from api_service.models import ApiEndpoint, ApiService
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class ServiceRegistry:
+    """
+    Cache por proceso de servicios y endpoints con expiración por TTL.
+
+    Uso:
+        registry = get_service_registry()
+        service = registry.get_service("MIGO")
+        endpoint = registry.get_endpoint(service, "consultar_ruc")
+    """
+
+    DEFAULT_TTL = 300
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = (
+            getattr(settings, "API_SERVICE_REGISTRY_TTL", self.DEFAULT_TTL)
+            if ttl is None
+            else ttl
+        )
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    # ===== NÚCLEO =====
+
+    def _lookup(self, key: Hashable, loader: Callable[[], Any], cached_only=False):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self.stats["hits"] += 1
+            return entry[0]
+        if cached_only:
+            return _MISSING
+
+        self.stats["misses"] += 1
+        value = loader()
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+    def invalidate(self) -> None:
+        """Descarta todo lo memorizado."""
+        with self._lock:
+            self._entries.clear()
+        self.stats["invalidations"] += 1
+
+    # ===== SERVICIOS =====
+
+    def get_service(
+        self,
+        service_type: Optional[str] = None,
+        *,
+        name: Optional[str] = None,
+        active_only: bool = False,
+        cached_only: bool = False,
+    ) -> Optional[ApiService]:
+        """
+        Obtiene un ApiService por tipo (el primero) o por nombre.
+
+        Args:
+            service_type: Tipo de servicio ("MIGO", "NUBEFACT", ...)
+            name: Nombre exacto del servicio (alternativa a service_type)
+            active_only: Solo servicios con is_active=True
+            cached_only: No consultar la BD; None si no está memorizado
+        """
+        if name is not None:
+            key = ("service_name", name, active_only)
+            filters = {"name": name}
+        else:
+            key = ("service_type", service_type, active_only)
+            filters = {"service_type": service_type}
+        if active_only:
+            filters["is_active"] = True
+
+        value = self._lookup(
+            key, lambda: ApiService.objects.filter(**filters).first(), cached_only
+        )
+        return None if value is _MISSING else value
+
+    async def aget_service(self, *args, **kwargs) -> Optional[ApiService]:
+        """Versión async: sin salto a thread si ya está memorizado."""
+        value = self.get_service(*args, cached_only=True, **kwargs)
+        if value is not None:
+            return value
+        return await sync_to_async(self.get_service)(*args, **kwargs)
+
+    # ===== ENDPOINTS =====
+
+    def get_endpoint(
+        self,
+        service: Union[ApiService, int, None],
+        endpoint_name: str,
+        cached_only: bool = False,
+    ) -> Optional[ApiEndpoint]:
+        """
+        Obtiene el ApiEndpoint `endpoint_name` de un servicio (instancia o pk).
+        """
+        if service is None:
+            return None
+        service_id = service if isinstance(service, int) else service.pk
+        value = self._lookup(
+            ("endpoint", service_id, endpoint_name),
+            lambda: ApiEndpoint.objects.filter(
+                service_id=service_id, name=endpoint_name
+            )
+            .select_related("service")
+            .first(),
+            cached_only,
+        )
+        return None if value is _MISSING else value
+
+    async def aget_endpoint(
+        self, service: Union[ApiService, int, None], endpoint_name: str
+    ) -> Optional[ApiEndpoint]:
+        """Versión async: sin salto a thread si ya está memorizado."""
+        value = self.get_endpoint(service, endpoint_name, cached_only=True)
+        if value is not None:
+            return value
+        return await sync_to_async(self.get_endpoint)(service, endpoint_name)
+
+
+_registry: Optional[ServiceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_service_registry() -> ServiceRegistry:
+    """Registro compartido por el proceso."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
+
+
+def _invalidate_registry(sender, **kwargs) -> None:
+    if _registry is not None:
+        _registry.invalidate()
+        logger.debug(
+            f"Registro de servicios invalidado por cambio en {sender.__name__}"
+        )
+
+
+for _model in (ApiService, ApiEndpoint):
+    post_save.connect(
+        _invalidate_registry,
+        sender=_model,
+        dispatch_uid=f"registry_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        _invalidate_registry,
+        sender=_model,
+        dispatch_uid=f"registry_delete_{_model.__name__}",
+    )
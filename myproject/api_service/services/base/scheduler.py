@@ -0,0 +1,264 @@
+# api_service/services/base/scheduler.py
+"""
+Planificador de concurrencia acotada para llamadas async masivas.
+
+En lugar de dividir los items en lotes fijos y esperar cada lote completo
+(`asyncio.gather` por lote), `stream_bounded` mantiene una cola de trabajo
+con un máximo de tareas en vuelo y entrega cada resultado apenas termina:
+un item lento ya no detiene a los demás.
+
+El máximo de tareas en vuelo lo decide `AdaptiveConcurrencyLimiter` (AIMD):
+
+- cada respuesta sana con latencia normal sube el límite (+1 por ventana),
+- una respuesta de sobrecarga (429/5xx o rate limit local) lo reduce a la
+  mitad, como mucho una vez por ventana de peticiones en vuelo,
+- una latencia muy por encima de la mejor observada lo reduce un 10%.
+
+`BatchProgressTracker` persiste el avance en `ApiBatchRequest` cada cierto
+tiempo, no por lote.
+"""
+
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Optional,
+    Tuple,
+)
+
+from django.conf import settings
+from django.utils import timezone
+
+from api_service.models import ApiBatchRequest
+from .io_executor import run_io
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Límite de concurrencia adaptativo (additive increase / multiplicative decrease).
+
+    Con `min_limit == max_limit` se comporta como un semáforo fijo.
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 3.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self.best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self.stats = {"increases": 0, "decreases": 0, "overloaded": 0, "peak": 0}
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> float:
+        """Espera un cupo libre; devuelve el instante de inicio (monotonic)."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.current)
+            self.in_flight += 1
+            self.stats["peak"] = max(self.stats["peak"], self.in_flight)
+        return time.monotonic()
+
+    async def release(self, started_at: float, overloaded: bool = False) -> None:
+        """Libera el cupo y ajusta el límite según el resultado."""
+        async with self._cond:
+            self.in_flight -= 1
+            self._record(started_at, time.monotonic() - started_at, overloaded)
+            self._cond.notify_all()
+
+    def _record(self, started_at: float, latency: float, overloaded: bool) -> None:
+        if overloaded:
+            self.stats["overloaded"] += 1
+            # Las peticiones enviadas antes del último recorte ya contaban
+            # con el límite anterior: no volver a recortar por ellas
+            if started_at >= self._last_decrease:
+                self._decrease(self.backoff)
+            return
+
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+
+        if latency > self.best_latency * self.latency_tolerance:
+            if started_at >= self._last_decrease:
+                self._decrease(0.9)
+        elif self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.stats["increases"] += 1
+
+    def _decrease(self, factor: float) -> None:
+        new_limit = max(self.min_limit, self.limit * factor)
+        if new_limit < self.limit:
+            logger.info(
+                f"Concurrencia reducida {self.current} -> {max(self.min_limit, int(new_limit))}"
+            )
+            self.limit = new_limit
+            self.stats["decreases"] += 1
+        self._last_decrease = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.current,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            **self.stats,
+        }
+
+
+async def stream_bounded(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    concurrency: int = 10,
+    limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    is_overloaded: Optional[Callable[[Any], bool]] = None,
+) -> AsyncIterator[Tuple[int, Any, Any]]:
+    """
+    Ejecuta la coroutine `func(item)` para cada item con concurrencia acotada
+    y entrega `(indice, item, resultado)` en orden de finalización.
+
+    Args:
+        func: Coroutine function que recibe un item
+        items: Items a procesar
+        concurrency: Límite fijo si no se pasa `limiter`
+        limiter: Límite adaptativo compartido (opcional)
+        is_overloaded: Indica si un resultado señala sobrecarga del servidor
+
+    Si `func` lanza una excepción se cancela el resto y se propaga, igual que
+    `asyncio.gather`. Cerrar el generador antes de tiempo cancela lo pendiente.
+
+    Uso:
+        async for i, ruc, respuesta in stream_bounded(consultar, rucs, 20):
+            ...
+    """
+    items = list(items)
+    if limiter is None:
+        limiter = AdaptiveConcurrencyLimiter(
+            initial=concurrency, min_limit=concurrency, max_limit=concurrency
+        )
+
+    done: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+
+    async def run(index, item, started_at):
+        overloaded = False
+        try:
+            result = await func(item)
+            overloaded = bool(is_overloaded and is_overloaded(result))
+            done.put_nowait((index, item, result, None))
+        except Exception as e:
+            done.put_nowait((index, item, None, e))
+        finally:
+            await limiter.release(started_at, overloaded)
+
+    async def feed():
+        for index, item in enumerate(items):
+            # Crear la tarea solo cuando hay cupo: no se acumulan miles de
+            # tareas esperando
+            started_at = await limiter.acquire()
+            task = asyncio.create_task(run(index, item, started_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        for _ in range(len(items)):
+            index, item, result, error = await done.get()
+            if error is not None:
+                raise error
+            yield index, item, result
+    finally:
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+class BatchProgressTracker:
+    """
+    Persiste el avance de un ApiBatchRequest como mucho cada `interval`
+    segundos (UPDATE de columnas, fuera del event loop).
+    """
+
+    def __init__(self, batch_request=None, total: int = 0, interval: float = None):
+        self.batch_request = batch_request
+        self.total = total
+        self.interval = (
+            interval
+            if interval is not None
+            else getattr(settings, "API_BATCH_PROGRESS_INTERVAL", 2.0)
+        )
+        self.processed = 0
+        self.successful = 0
+        self.failed = 0
+        self._last_save = 0.0
+
+    def record(self, success: bool, count: int = 1) -> None:
+        self.processed += count
+        if success:
+            self.successful += count
+        else:
+            self.failed += count
+
+    async def start(self) -> None:
+        if self.batch_request is None:
+            return
+        self._last_save = time.monotonic()
+        await run_io(
+            self._save,
+            status="PROCESSING",
+            total_items=self.total,
+            started_at=timezone.now(),
+        )
+
+    async def maybe_save(self) -> None:
+        """Guarda el avance si pasó el intervalo desde el último guardado."""
+        if self.batch_request is None:
+            return
+        if time.monotonic() - self._last_save < self.interval:
+            return
+        self._last_save = time.monotonic()
+        await run_io(self._save)
+
+    async def finish(self, results: Optional[dict] = None) -> None:
+        if self.batch_request is None:
+            return
+        status = "COMPLETED" if not self.failed else "PARTIAL"
+        if self.processed and self.failed == self.processed:
+            status = "FAILED"
+        fields = {"status": status, "completed_at": timezone.now()}
+        if results is not None:
+            fields["results"] = results
+        await run_io(self._save, **fields)
+
+    def _save(self, **fields) -> None:
+        fields.update(
+            processed_items=self.processed,
+            successful_items=self.successful,
+            failed_items=self.failed,
+        )
+        try:
+            ApiBatchRequest.objects.filter(pk=self.batch_request.pk).update(**fields)
+        except Exception as e:
+            logger.error(
+                f"Error guardando avance del batch {self.batch_request.pk}: {e}"
+            )
+            return
+        for name, value in fields.items():
+            setattr(self.batch_request, name, value)
@@ -28,6 +28,9 @@ class TimeoutConfig:
         pool_timeout: Tiempo máximo para esperar conexión del pool (segundos)
         max_retries: Número máximo de reintentos en caso de timeout/error
         retry_on_timeout: Si se deben reintentar errores de timeout
+        max_connections: Conexiones simultáneas máximas del pool HTTP
+        max_keepalive_connections: Conexiones ociosas que se mantienen abiertas
+        keepalive_expiry: Segundos que una conexión ociosa sigue abierta
 
     Example:
         >>> # Para NubeFact
@@ -43,6 +46,9 @@ class TimeoutConfig:
     pool_timeout: float = 5.0
     max_retries: int = 3
     retry_on_timeout: bool = True
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
 
     @classmethod
     def from_settings(cls, service_prefix: str) -> "TimeoutConfig":
@@ -74,6 +80,13 @@ class TimeoutConfig:
             retry_on_timeout=getattr(
                 settings, f"{service_prefix}_RETRY_ON_TIMEOUT", True
             ),
+            max_connections=getattr(settings, f"{service_prefix}_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=getattr(
+                settings, f"{service_prefix}_MAX_KEEPALIVE_CONNECTIONS", 20
+            ),
+            keepalive_expiry=getattr(
+                settings, f"{service_prefix}_KEEPALIVE_EXPIRY", 30.0
+            ),
         )
 
     @property
@@ -86,6 +99,15 @@ class TimeoutConfig:
             pool=self.pool_timeout,
         )
 
+    @property
+    def httpx_limits(self) -> httpx.Limits:
+        """Límites del pool de conexiones en formato httpx."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
     @property
     def as_tuple(self) -> Tuple[float, float]:
         """Timeouts como tupla (connect, read) para compatibilidad."""
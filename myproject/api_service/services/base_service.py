@@ -8,9 +8,10 @@ from abc import ABC, abstractmethod
 from api_service.models import (
     ApiEndpoint,
     ApiService,
-    ApiCallLog,
     ApiBatchRequest,
 )
+from api_service.services.base.log_sink import get_log_sink
+from api_service.services.base.registry import get_service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -28,11 +29,11 @@ class BaseAPIService(ABC):
         self._load_config()
 
     def _load_config(self):
-        """Carga la configuración del servicio desde la base de datos."""
+        """Carga la configuración del servicio (registro en memoria)."""
         try:
-            self.service = ApiService.objects.filter(
-                service_type=self.service_type, is_active=True
-            ).first()
+            self.service = get_service_registry().get_service(
+                self.service_type, active_only=True
+            )
 
             if not self.service:
                 raise ValueError(
@@ -64,12 +65,10 @@ class BaseAPIService(ABC):
         return "unknown"
 
     def _get_endpoint(self, endpoint_name: str) -> Optional[ApiEndpoint]:
-        """Obtiene un endpoint de la base de datos."""
+        """Obtiene un endpoint (registro en memoria)."""
         if not self.service:
             return None
-        return ApiEndpoint.objects.filter(
-            service=self.service, name=endpoint_name
-        ).first()
+        return get_service_registry().get_endpoint(self.service, endpoint_name)
 
     def _log_api_call(
         self,
@@ -95,16 +94,16 @@ class BaseAPIService(ABC):
             return
 
         try:
-            endpoint = self._get_endpoint(endpoint_name)
+            sink = get_log_sink()
             logger.debug(f"Registrando llamada API: {endpoint_name}")
 
             if status == "FAILED" and "404" in error_message:
                 response_data["invalid_ruc"] = True
                 response_data["invalid_reason"] = "RUC_NO_EXISTE_SUNAT"
 
-            ApiCallLog.objects.create(
-                service=self.service,
-                endpoint=endpoint,
+            sink.enqueue(
+                service_id=self.service.pk,
+                endpoint_id=sink.endpoint_id(self.service.pk, endpoint_name),
                 batch_request=batch_request,
                 status=status,
                 request_data=request_data,
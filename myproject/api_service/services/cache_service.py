@@ -1,6 +1,8 @@
 from django.core.cache import cache
 from datetime import datetime, timedelta
 import logging
+import time
+import zlib
 from typing import Any, Optional, Dict, List, Union
 
 from django.conf import settings
@@ -37,10 +39,19 @@ class APICacheService:
     CACHE_KEY_API_RATE_LIMIT = "api_rate_limit_{service}_{endpoint}"
     CACHE_KEY_BATCH_RESULTS = "batch_results_{batch_id}"
 
+    # Operaciones masivas
+    BULK_CHUNK_SIZE = 1000  # Claves por get_many/set_many/delete_many
+
     # Prefijos para diferentes tipos de datos
     TC_PREFIX = "tc_"  # Tipo de cambio
     RUC_PREFIX = "ruc_"  # RUCs válidos
-    INVALID_RUCS_KEY = "migo_invalid_rucs"  # RUCs inválidos
+    INVALID_RUCS_KEY = "migo_invalid_rucs"  # Formato legado (dict único)
+    INVALID_RUC_PREFIX = "migo_invalid_ruc_"  # Una clave por RUC inválido
+    INVALID_RUCS_INDEX_PREFIX = "migo_invalid_rucs_idx_"  # Shards del índice
+    INVALID_RUCS_INDEX_SHARDS = 128
+
+    # La migración del formato legado se intenta una vez por proceso
+    _legacy_invalid_rucs_checked = False
 
     def __init__(self):
         """
@@ -52,6 +63,10 @@ class APICacheService:
         self.backend = self._get_cache_backend()
         self._verify_cache_connection()
 
+        if not APICacheService._legacy_invalid_rucs_checked:
+            APICacheService._legacy_invalid_rucs_checked = True
+            self.migrate_legacy_invalid_rucs()
+
     def _get_cache_backend(self) -> str:
         """Obtiene el nombre del backend de cache configurado"""
 
@@ -537,6 +552,135 @@ class APICacheService:
     # ============================================================================
     # MÉTODOS PARA RUCS INVÁLIDOS (NUEVOS - COORDINADOS CON MIGO_SERVICE)
     # ============================================================================
+    #
+    # Almacenamiento:
+    #   - Una clave por RUC inválido (INVALID_RUC_PREFIX + ruc) con TTL nativo.
+    #     Es la fuente de verdad para is_ruc_invalid/get_invalid_ruc_info.
+    #   - Índice secundario compacto repartido en INVALID_RUCS_INDEX_SHARDS
+    #     claves {ruc: (expires_ts, reason)}. Solo lo usan get_all_invalid_rucs
+    #     y las estadísticas; una escritura perdida en el índice no afecta la
+    #     verificación de un RUC.
+
+    def get_invalid_ruc_key(self, ruc: str) -> str:
+        """
+        Genera la clave de cache (ya normalizada) de un RUC inválido.
+
+        Example:
+            >>> cache_service.get_invalid_ruc_key('20999999999')
+            'migo_invalid_ruc_20999999999'
+        """
+        return f"{self.INVALID_RUC_PREFIX}{ruc}"
+
+    def _invalid_index_key(self, shard: int) -> str:
+        """Clave (ya normalizada) de un shard del índice de inválidos."""
+        return f"{self.INVALID_RUCS_INDEX_PREFIX}{shard}"
+
+    def _invalid_index_shard(self, ruc: str) -> int:
+        """Shard del índice al que pertenece un RUC (estable entre procesos)."""
+        return zlib.crc32(str(ruc).encode()) % self.INVALID_RUCS_INDEX_SHARDS
+
+    def _build_invalid_ruc_info(
+        self,
+        reason: str,
+        ttl_hours: Optional[int],
+        ttl_seconds: int,
+        added_at: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Construye el registro almacenado para un RUC inválido."""
+        now = datetime.now()
+        return {
+            "reason": reason,
+            "added_at": added_at or now.isoformat(),
+            "ttl_hours": ttl_hours if ttl_hours is not None else 24,
+            "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat(),
+        }
+
+    def _read_invalid_index(self) -> Dict[int, Dict[str, tuple]]:
+        """Lee todos los shards del índice en una sola operación get_many."""
+        keys = [
+            self._invalid_index_key(shard)
+            for shard in range(self.INVALID_RUCS_INDEX_SHARDS)
+        ]
+        raw = self.cache.get_many(keys)
+        return {
+            shard: raw.get(key) or {} for shard, key in enumerate(keys) if raw.get(key)
+        }
+
+    def _update_invalid_index(
+        self,
+        added: Optional[Dict[str, tuple]] = None,
+        removed: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Aplica altas/bajas al índice, tocando solo los shards afectados.
+
+        Args:
+            added: {ruc: (expires_ts, reason)}
+            removed: RUCs a quitar del índice
+        """
+        changes: Dict[int, Dict[str, Optional[tuple]]] = {}
+        for ruc, entry in (added or {}).items():
+            changes.setdefault(self._invalid_index_shard(ruc), {})[ruc] = entry
+        for ruc in removed or []:
+            changes.setdefault(self._invalid_index_shard(ruc), {})[ruc] = None
+        if not changes:
+            return
+
+        keys = {shard: self._invalid_index_key(shard) for shard in changes}
+        current = self.cache.get_many(list(keys.values()))
+        now_ts = int(time.time())
+
+        to_set = {}
+        to_delete = []
+        for shard, shard_changes in changes.items():
+            key = keys[shard]
+            # Descartar entradas expiradas al reescribir el shard
+            index = {
+                ruc: entry
+                for ruc, entry in (current.get(key) or {}).items()
+                if entry[0] > now_ts
+            }
+            for ruc, entry in shard_changes.items():
+                if entry is None:
+                    index.pop(ruc, None)
+                else:
+                    index[ruc] = entry
+
+            if index:
+                to_set[key] = index
+            else:
+                to_delete.append(key)
+
+        if to_set:
+            # El shard vive lo mismo que su entrada más lejana
+            ttl = (
+                max(
+                    max(entry[0] for entry in index.values())
+                    for index in to_set.values()
+                )
+                - now_ts
+            )
+            self.cache.set_many(to_set, max(ttl, 1))
+        if to_delete:
+            self.cache.delete_many(to_delete)
+
+    def _write_invalid_rucs(self, entries: Dict[str, tuple]) -> None:
+        """
+        Escribe RUCs inválidos (clave por RUC + índice).
+
+        Args:
+            entries: {ruc: (info, ttl_seconds)}
+        """
+        by_ttl: Dict[int, Dict[str, Dict]] = {}
+        index_entries = {}
+        now_ts = int(time.time())
+        for ruc, (info, ttl_seconds) in entries.items():
+            by_ttl.setdefault(ttl_seconds, {})[self.get_invalid_ruc_key(ruc)] = info
+            index_entries[ruc] = (now_ts + ttl_seconds, info.get("reason"))
+
+        for ttl_seconds, values in by_ttl.items():
+            self.cache.set_many(values, ttl_seconds)
+        self._update_invalid_index(added=index_entries)
 
     def add_invalid_ruc(
         self, ruc: str, reason: str = "INVALIDO", ttl_hours: Optional[int] = None
@@ -564,36 +708,19 @@ class APICacheService:
             ttl_seconds = self.RUC_INVALID_TTL
 
         try:
-            # Obtener cache actual de inválidos
-            invalid_rucs = self.get(self.INVALID_RUCS_KEY, {})
+            # Conservar el timestamp original si ya estaba marcado
+            previous = self.cache.get(self.get_invalid_ruc_key(ruc))
+            added_at = previous.get("added_at") if previous else None
 
-            # Verificar si ya existe (para no sobrescribir timestamp original)
-            if ruc not in invalid_rucs:
-                added_at = datetime.now().isoformat()
-            else:
-                added_at = invalid_rucs[ruc].get("added_at", datetime.now().isoformat())
-
-            # Actualizar/agregar RUC inválido
-            invalid_rucs[ruc] = {
-                "reason": reason,
-                "added_at": added_at,
-                "ttl_hours": ttl_hours if ttl_hours is not None else 24,
-                "expires_at": (
-                    datetime.now() + timedelta(seconds=ttl_seconds)
-                ).isoformat(),
-            }
-
-            # Guardar en cache
-            result = self.set(self.INVALID_RUCS_KEY, invalid_rucs, ttl_seconds)
-
-            if result:
-                logger.info(
-                    f"RUC {ruc} agregado al cache de inválidos: {reason} (ttl: {ttl_seconds}s)"
-                )
-            else:
-                logger.warning(f"No se pudo agregar RUC {ruc} al cache de inválidos")
+            info = self._build_invalid_ruc_info(
+                reason, ttl_hours, ttl_seconds, added_at
+            )
+            self._write_invalid_rucs({ruc: (info, ttl_seconds)})
 
-            return result
+            logger.info(
+                f"RUC {ruc} agregado al cache de inválidos: {reason} (ttl: {ttl_seconds}s)"
+            )
+            return True
 
         except Exception as e:
             logger.error(f"Error agregando RUC {ruc} al cache de inválidos: {str(e)}")
@@ -614,28 +741,11 @@ class APICacheService:
             return False
 
         try:
-            invalid_rucs = self.get(self.INVALID_RUCS_KEY, {})
-
-            if ruc in invalid_rucs:
-                # Verificar si ha expirado
-                ruc_info = invalid_rucs[ruc]
-                expires_at = ruc_info.get("expires_at")
-
-                if expires_at:
-                    try:
-                        expires_dt = datetime.fromisoformat(expires_at)
-                        if datetime.now() > expires_dt:
-                            # Eliminar RUC expirado
-                            self.remove_invalid_ruc(ruc)
-                            return False
-                    except (ValueError, TypeError):
-                        # Si no se puede parsear la fecha, asumir válido
-                        pass
-
+            # La expiración la resuelve el TTL nativo de la clave
+            if self.cache.get(self.get_invalid_ruc_key(ruc)) is not None:
                 logger.debug(f"RUC {ruc} encontrado en cache de inválidos")
                 return True
-            else:
-                return False
+            return False
 
         except Exception as e:
             logger.error(f"Error verificando RUC {ruc} en cache de inválidos: {str(e)}")
@@ -656,24 +766,7 @@ class APICacheService:
             return None
 
         try:
-            invalid_rucs = self.get(self.INVALID_RUCS_KEY, {})
-            ruc_info = invalid_rucs.get(ruc)
-
-            if ruc_info:
-                # Verificar si ha expirado
-                expires_at = ruc_info.get("expires_at")
-                if expires_at:
-                    try:
-                        expires_dt = datetime.fromisoformat(expires_at)
-                        if datetime.now() > expires_dt:
-                            self.remove_invalid_ruc(ruc)
-                            return None
-                    except (ValueError, TypeError):
-                        pass
-
-                return ruc_info
-            else:
-                return None
+            return self.cache.get(self.get_invalid_ruc_key(ruc))
 
         except Exception as e:
             logger.error(f"Error obteniendo información de RUC {ruc}: {str(e)}")
@@ -694,50 +787,10 @@ class APICacheService:
             return False
 
         try:
-            invalid_rucs = self.get(self.INVALID_RUCS_KEY, {})
-
-            if ruc in invalid_rucs:
-                del invalid_rucs[ruc]
-
-                # Si quedan RUCs, actualizar cache con nuevo TTL
-                if invalid_rucs:
-                    # Calcular nuevo TTL basado en el RUC más antiguo
-                    oldest_entry = min(
-                        invalid_rucs.values(),
-                        key=lambda x: datetime.fromisoformat(
-                            x.get("added_at", datetime.now().isoformat())
-                        ),
-                    )
-
-                    expires_at = oldest_entry.get("expires_at")
-                    if expires_at:
-                        try:
-                            expires_dt = datetime.fromisoformat(expires_at)
-                            remaining_ttl = (
-                                expires_dt - datetime.now()
-                            ).total_seconds()
-                            ttl = max(300, int(remaining_ttl))  # Mínimo 5 minutos
-                        except (ValueError, TypeError):
-                            ttl = 3600  # 1 hora si no se puede calcular
-                    else:
-                        ttl = 3600  # 1 hora por defecto
-
-                    result = self.set(self.INVALID_RUCS_KEY, invalid_rucs, ttl)
-                else:
-                    # Si no quedan RUCs, eliminar la clave
-                    result = self.delete(self.INVALID_RUCS_KEY)
-
-                if result:
-                    logger.info(f"RUC {ruc} removido del cache de inválidos")
-                else:
-                    logger.warning(
-                        f"No se pudo remover RUC {ruc} del cache de inválidos"
-                    )
-
-                return result
-            else:
-                logger.debug(f"RUC {ruc} no encontrado en cache de inválidos")
-                return True  # Si no existe, se considera éxito
+            self.cache.delete(self.get_invalid_ruc_key(ruc))
+            self._update_invalid_index(removed=[ruc])
+            logger.info(f"RUC {ruc} removido del cache de inválidos")
+            return True
 
         except Exception as e:
             logger.error(f"Error removiendo RUC {ruc} del cache de inválidos: {str(e)}")
@@ -752,37 +805,48 @@ class APICacheService:
             Dict con todos los RUCs inválidos y su información
         """
         try:
-            invalid_rucs = self.get(self.INVALID_RUCS_KEY, {})
-
-            # Filtrar RUCs expirados
-            valid_invalid_rucs = {}
-            for ruc, info in invalid_rucs.items():
-                expires_at = info.get("expires_at")
-                if expires_at:
-                    try:
-                        expires_dt = datetime.fromisoformat(expires_at)
-                        if datetime.now() <= expires_dt:
-                            valid_invalid_rucs[ruc] = info
-                        else:
-                            # RUC expirado, será removido en la próxima verificación
-                            pass
-                    except (ValueError, TypeError):
-                        valid_invalid_rucs[ruc] = info
-                else:
-                    valid_invalid_rucs[ruc] = info
-
-            # Si se filtraron algunos, actualizar cache
-            if len(valid_invalid_rucs) != len(invalid_rucs):
-                self.set(
-                    self.INVALID_RUCS_KEY, valid_invalid_rucs, self.RUC_INVALID_TTL
+            now_ts = int(time.time())
+            rucs = [
+                ruc
+                for index in self._read_invalid_index().values()
+                for ruc, entry in index.items()
+                if entry[0] > now_ts
+            ]
+
+            # Confirmar contra las claves por RUC (fuente de verdad)
+            result = {}
+            for start in range(0, len(rucs), self.BULK_CHUNK_SIZE):
+                chunk = rucs[start : start + self.BULK_CHUNK_SIZE]
+                found = self.cache.get_many(
+                    [self.get_invalid_ruc_key(r) for r in chunk]
                 )
+                for ruc in chunk:
+                    info = found.get(self.get_invalid_ruc_key(ruc))
+                    if info is not None:
+                        result[ruc] = info
 
-            return valid_invalid_rucs
+            return result
 
         except Exception as e:
             logger.error(f"Error obteniendo todos los RUCs inválidos: {str(e)}")
             return {}
 
+    def count_invalid_rucs_by_reason(self) -> Dict[str, int]:
+        """
+        Cuenta RUCs inválidos vigentes por razón usando solo el índice.
+
+        Returns:
+            Dict con conteo de RUCs por razón
+        """
+        breakdown = {}
+        now_ts = int(time.time())
+        for index in self._read_invalid_index().values():
+            for expires_ts, reason in index.values():
+                if expires_ts > now_ts:
+                    reason = reason or "DESCONOCIDA"
+                    breakdown[reason] = breakdown.get(reason, 0) + 1
+        return breakdown
+
     def clear_invalid_rucs(self) -> bool:
         """
         Limpia todos los RUCs inválidos del cache.
@@ -792,19 +856,336 @@ class APICacheService:
             True si se limpió exitosamente, False en caso de error
         """
         try:
-            result = self.delete(self.INVALID_RUCS_KEY)
+            keys = [self._normalize_key(self.INVALID_RUCS_KEY)]
+            for shard, index in self._read_invalid_index().items():
+                keys.append(self._invalid_index_key(shard))
+                keys.extend(self.get_invalid_ruc_key(ruc) for ruc in index)
 
-            if result:
-                logger.info("Cache de RUCs inválidos limpiado completamente")
-            else:
-                logger.warning("No se pudo limpiar el cache de RUCs inválidos")
+            for start in range(0, len(keys), self.BULK_CHUNK_SIZE):
+                self.cache.delete_many(keys[start : start + self.BULK_CHUNK_SIZE])
 
-            return result
+            logger.info("Cache de RUCs inválidos limpiado completamente")
+            return True
 
         except Exception as e:
             logger.error(f"Error limpiando cache de RUCs inválidos: {str(e)}")
             return False
 
+    def migrate_legacy_invalid_rucs(self) -> int:
+        """
+        Migra el formato legado (un único dict en INVALID_RUCS_KEY) al
+        almacenamiento por RUC. Respeta el tiempo de vida restante de cada
+        entrada y elimina la clave legada al terminar.
+
+        Returns:
+            int: Cantidad de RUCs migrados
+        """
+        legacy_key = self._normalize_key(self.INVALID_RUCS_KEY)
+        try:
+            legacy = self.cache.get(legacy_key)
+            if not legacy or not isinstance(legacy, dict):
+                return 0
+
+            now = datetime.now()
+            entries = {}
+            for ruc, info in legacy.items():
+                info = dict(info or {})
+                ttl_hours = info.get("ttl_hours") or 24
+                expires_at = info.get("expires_at")
+                try:
+                    if expires_at:
+                        expires_dt = datetime.fromisoformat(expires_at)
+                    else:
+                        # Formato de migo_service: {"timestamp", "ttl_hours"}
+                        started = datetime.fromisoformat(
+                            info.get("added_at") or info["timestamp"]
+                        )
+                        expires_dt = started + timedelta(hours=ttl_hours)
+                except (KeyError, ValueError, TypeError):
+                    expires_dt = now + timedelta(seconds=self.RUC_INVALID_TTL)
+
+                if expires_dt.tzinfo is not None:
+                    # timezone.now() (aware) -> hora local naive, como el resto
+                    expires_dt = expires_dt.astimezone().replace(tzinfo=None)
+
+                ttl_seconds = int((expires_dt - now).total_seconds())
+                if ttl_seconds <= 0:
+                    continue
+
+                info.setdefault("added_at", info.get("timestamp") or now.isoformat())
+                info.setdefault("reason", "DESCONOCIDA")
+                info["ttl_hours"] = ttl_hours
+                info["expires_at"] = expires_dt.isoformat()
+                entries[ruc] = (info, ttl_seconds)
+
+            if entries:
+                self._write_invalid_rucs(entries)
+            self.cache.delete(legacy_key)
+
+            logger.info(
+                f"Migrados {len(entries)} RUCs inválidos desde '{self.INVALID_RUCS_KEY}' "
+                f"({len(legacy) - len(entries)} expirados descartados)"
+            )
+            return len(entries)
+
+        except Exception as e:
+            logger.error(f"Error migrando RUCs inválidos legados: {str(e)}")
+            return 0
+
+    # ============================================================================
+    # MÉTODOS MASIVOS PARA RUCS (UNA IDA AL CACHE POR LOTE)
+    # ============================================================================
+
+    def _ruc_cache_keys(self, rucs, service_name: str) -> Dict[str, str]:
+        """
+        Mapea cada RUC a su clave normalizada del cache de válidos
+        (la misma que usa consultar_ruc: '<servicio>:ruc_<ruc>').
+        """
+        return {
+            ruc: self._normalize_key(
+                self.get_service_cache_key(service_name, f"ruc_{ruc}")
+            )
+            for ruc in rucs
+        }
+
+    def _get_many_chunked(self, keys: List[str]) -> Dict[str, Any]:
+        """get_many en bloques de BULK_CHUNK_SIZE claves."""
+        found = {}
+        for start in range(0, len(keys), self.BULK_CHUNK_SIZE):
+            found.update(
+                self.cache.get_many(keys[start : start + self.BULK_CHUNK_SIZE])
+            )
+        return found
+
+    def get_many_rucs(
+        self, rucs: List[str], service_name: str = "migo"
+    ) -> Dict[str, Dict]:
+        """
+        Obtiene los datos cacheados de varios RUCs válidos en una sola operación.
+
+        Args:
+            rucs: Lista de RUCs
+            service_name: Servicio dueño de la clave (por defecto 'migo')
+
+        Returns:
+            Dict {ruc: datos} solo con los RUCs encontrados
+
+        Example:
+            >>> cache_service.get_many_rucs(['20100038146', '20999999999'])
+            {'20100038146': {'success': True, 'nombre_o_razon_social': ...}}
+        """
+        if not rucs:
+            return {}
+
+        try:
+            keys = self._ruc_cache_keys(rucs, service_name)
+            found = self._get_many_chunked(list(keys.values()))
+            logger.debug(f"Cache GET_MANY RUCs: {len(found)}/{len(keys)} hits")
+            return {ruc: found[key] for ruc, key in keys.items() if found.get(key)}
+
+        except Exception as e:
+            logger.error(f"Error obteniendo RUCs en bloque del cache: {str(e)}")
+            return {}
+
+    def set_many_rucs(
+        self,
+        data: Dict[str, Dict],
+        ttl: Optional[int] = None,
+        service_name: str = "migo",
+    ) -> bool:
+        """
+        Guarda datos de varios RUCs válidos en una sola operación.
+
+        Args:
+            data: Dict {ruc: datos}
+            ttl: TTL en segundos (opcional, usa RUC_VALID_TTL por defecto)
+            service_name: Servicio dueño de la clave (por defecto 'migo')
+
+        Returns:
+            True si se guardaron todos, False en caso de error
+        """
+        if not data:
+            return True
+
+        timeout = ttl if ttl is not None else self.RUC_VALID_TTL
+        try:
+            keys = self._ruc_cache_keys(data, service_name)
+            values = {keys[ruc]: value for ruc, value in data.items()}
+            failed = self.cache.set_many(values, timeout) or []
+            if failed:
+                logger.warning(
+                    f"Cache SET_MANY RUCs: {len(failed)} claves no guardadas"
+                )
+            logger.debug(f"Cache SET_MANY RUCs: {len(values)} (ttl: {timeout}s)")
+            return not failed
+
+        except Exception as e:
+            logger.error(f"Error guardando RUCs en bloque en cache: {str(e)}")
+            return False
+
+    def delete_many_rucs(self, rucs: List[str], service_name: str = "migo") -> bool:
+        """
+        Elimina varios RUCs del cache de válidos en una sola operación.
+
+        Args:
+            rucs: Lista de RUCs
+            service_name: Servicio dueño de la clave (por defecto 'migo')
+
+        Returns:
+            True si se eliminaron exitosamente, False en caso de error
+        """
+        if not rucs:
+            return True
+
+        try:
+            self.cache.delete_many(
+                list(self._ruc_cache_keys(rucs, service_name).values())
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error eliminando RUCs en bloque del cache: {str(e)}")
+            return False
+
+    def get_many_invalid_rucs(self, rucs: List[str]) -> Dict[str, Dict]:
+        """
+        Obtiene la información de inválidos de varios RUCs en una sola operación.
+
+        Returns:
+            Dict {ruc: info} solo con los RUCs marcados como inválidos
+        """
+        if not rucs:
+            return {}
+
+        try:
+            keys = {ruc: self.get_invalid_ruc_key(ruc) for ruc in rucs}
+            found = self._get_many_chunked(list(keys.values()))
+            return {ruc: found[key] for ruc, key in keys.items() if key in found}
+
+        except Exception as e:
+            logger.error(f"Error obteniendo RUCs inválidos en bloque: {str(e)}")
+            return {}
+
+    def mark_many_invalid(
+        self,
+        rucs: Union[List[str], Dict[str, str]],
+        reason: str = "INVALIDO",
+        ttl_hours: Optional[int] = None,
+    ) -> int:
+        """
+        Marca varios RUCs como inválidos con un set_many y una actualización
+        por shard del índice.
+
+        Args:
+            rucs: Lista de RUCs (misma razón) o Dict {ruc: razón}
+            reason: Razón por defecto cuando se pasa una lista
+            ttl_hours: TTL en horas (opcional, usa RUC_INVALID_TTL por defecto)
+
+        Returns:
+            int: Cantidad de RUCs marcados
+        """
+        reasons = rucs if isinstance(rucs, dict) else {ruc: reason for ruc in rucs}
+        reasons = {ruc: r for ruc, r in reasons.items() if ruc}
+        if not reasons:
+            return 0
+
+        ttl_seconds = (
+            ttl_hours * 3600 if ttl_hours is not None else self.RUC_INVALID_TTL
+        )
+
+        try:
+            # Conservar el timestamp original de los ya marcados
+            previous = self.get_many_invalid_rucs(list(reasons))
+            entries = {
+                ruc: (
+                    self._build_invalid_ruc_info(
+                        ruc_reason,
+                        ttl_hours,
+                        ttl_seconds,
+                        (previous.get(ruc) or {}).get("added_at"),
+                    ),
+                    ttl_seconds,
+                )
+                for ruc, ruc_reason in reasons.items()
+            }
+            self._write_invalid_rucs(entries)
+
+            logger.info(
+                f"{len(entries)} RUCs agregados al cache de inválidos (ttl: {ttl_seconds}s)"
+            )
+            return len(entries)
+
+        except Exception as e:
+            logger.error(f"Error marcando RUCs inválidos en bloque: {str(e)}")
+            return 0
+
+    def remove_many_invalid(self, rucs: List[str]) -> bool:
+        """
+        Remueve varios RUCs del cache de inválidos en una sola operación.
+
+        Returns:
+            True si se removieron exitosamente, False en caso de error
+        """
+        rucs = [ruc for ruc in rucs if ruc]
+        if not rucs:
+            return True
+
+        try:
+            self.cache.delete_many([self.get_invalid_ruc_key(ruc) for ruc in rucs])
+            self._update_invalid_index(removed=rucs)
+            logger.info(f"{len(rucs)} RUCs removidos del cache de inválidos")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error removiendo RUCs inválidos en bloque: {str(e)}")
+            return False
+
+    def partition_rucs(
+        self, rucs: List[str], service_name: str = "migo"
+    ) -> Dict[str, Any]:
+        """
+        Clasifica RUCs según el cache con un único get_many:
+        inválidos conocidos, válidos cacheados y pendientes de consultar.
+
+        Un RUC marcado como inválido tiene prioridad sobre su dato válido
+        (mismo orden que consultar_ruc).
+
+        Args:
+            rucs: Lista de RUCs (se preserva el orden en 'missing')
+            service_name: Servicio dueño de la clave de válidos
+
+        Returns:
+            Dict con:
+                - cached: {ruc: datos} de RUCs válidos en cache
+                - invalid: {ruc: info} de RUCs marcados como inválidos
+                - missing: [rucs] sin información en cache
+        """
+        valid_keys = self._ruc_cache_keys(rucs, service_name)
+        invalid_keys = {ruc: self.get_invalid_ruc_key(ruc) for ruc in rucs}
+
+        try:
+            found = self._get_many_chunked(
+                list(valid_keys.values()) + list(invalid_keys.values())
+            )
+        except Exception as e:
+            logger.error(f"Error particionando RUCs por cache: {str(e)}")
+            found = {}
+
+        cached, invalid, missing = {}, {}, []
+        for ruc in rucs:
+            if invalid_keys[ruc] in found:
+                invalid[ruc] = found[invalid_keys[ruc]]
+            elif found.get(valid_keys[ruc]):
+                cached[ruc] = found[valid_keys[ruc]]
+            else:
+                missing.append(ruc)
+
+        logger.debug(
+            f"Partición de {len(rucs)} RUCs: {len(cached)} en cache, "
+            f"{len(invalid)} inválidos, {len(missing)} por consultar"
+        )
+        return {"cached": cached, "invalid": invalid, "missing": missing}
+
     # ============================================================================
     # MÉTODOS UTILITARIOS Y DE MONITOREO (NUEVOS)
     # ============================================================================
@@ -822,8 +1203,11 @@ class APICacheService:
             RUCs inválidos: 5
         """
         try:
-            # Obtener información del cache
-            invalid_rucs = self.get_all_invalid_rucs()
+            # Obtener información del cache (solo índice, sin leer cada RUC)
+            breakdown = self.count_invalid_rucs_by_reason()
+            sample = [
+                ruc for index in self._read_invalid_index().values() for ruc in index
+            ][:10]
             connection_ok = self._verify_cache_connection()
 
             stats = {
@@ -832,11 +1216,10 @@ class APICacheService:
                 "backend": self.backend,
                 # Estadísticas de RUCs
                 "invalid_rucs": {
-                    "total_count": len(invalid_rucs),
-                    "sample": list(invalid_rucs.keys())[:10] if invalid_rucs else [],
-                    "breakdown_by_reason": self._breakdown_invalid_rucs_by_reason(
-                        invalid_rucs
-                    ),
+                    "total_count": sum(breakdown.values()),
+                    "sample": sample,
+                    "breakdown_by_reason": breakdown,
+                    "index_shards": self.INVALID_RUCS_INDEX_SHARDS,
                 },
                 # Configuración de timeouts
                 "timeouts": {
@@ -849,7 +1232,8 @@ class APICacheService:
                 "key_prefixes": {
                     "tipo_cambio": self.TC_PREFIX,
                     "ruc_valid": self.RUC_PREFIX,
-                    "invalid_rucs": self.INVALID_RUCS_KEY,
+                    "invalid_rucs": self.INVALID_RUC_PREFIX,
+                    "invalid_rucs_index": self.INVALID_RUCS_INDEX_PREFIX,
                 },
             }
 
@@ -892,9 +1276,16 @@ class APICacheService:
         cleaned = {"invalid_rucs": 0, "valid_rucs": 0, "tipo_cambio": 0}
 
         try:
-            # Refrescar RUCs inválidos (elimina los expirados automáticamente)
-            current_invalid = self.get_all_invalid_rucs()
-            cleaned["invalid_rucs"] = 0  # El cleanup ya ocurrió en get_all_invalid_rucs
+            # Las claves por RUC expiran solas; aquí se compacta el índice
+            now_ts = int(time.time())
+            expired = [
+                ruc
+                for index in self._read_invalid_index().values()
+                for ruc, entry in index.items()
+                if entry[0] <= now_ts
+            ]
+            self._update_invalid_index(removed=expired)
+            cleaned["invalid_rucs"] = len(expired)
 
             logger.info(f"Cache cleanup completado: {cleaned}")
             return cleaned
@@ -959,7 +1350,7 @@ class APICacheService:
 
             # Check 3: Información de RUCs inválidos
             try:
-                invalid_count = len(self.get_all_invalid_rucs())
+                invalid_count = sum(self.count_invalid_rucs_by_reason().values())
                 health["checks"]["invalid_rucs"] = f"✅ {invalid_count} RUCs"
             except Exception as e:
                 health["checks"]["invalid_rucs"] = f"⚠️  {str(e)}"
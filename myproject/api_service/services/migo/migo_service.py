@@ -1,17 +1,20 @@
-import requests
 import time
 from requests.exceptions import RequestException
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 
-from django.db import transaction
 from django.conf import settings
 from django.utils import timezone
 
 from ..cache_service import APICacheService
+from ..base.http_pool import get_http_pool
+from ..base.rate_limit import RateLimitManager
+from ..base.log_sink import get_log_sink
+from ..base.registry import get_service_registry
+from .partner_updater import PartnerSunatBulkUpdater, compute_sunat_fields
 from billing.models import Partner
-from ...models import ApiService, ApiEndpoint, ApiCallLog, ApiRateLimit, ApiBatchRequest
+from ...models import ApiService, ApiEndpoint, ApiCallLog, ApiBatchRequest
 from ...exceptions import (
     APIError,
     RateLimitExceededError,
@@ -40,18 +43,22 @@ class MigoAPIService:
     """
 
     # Constantes para cache de RUCs inválidos
+    # (clave del formato legado; ver APICacheService.migrate_legacy_invalid_rucs)
     INVALID_RUCS_CACHE_KEY = "migo_invalid_rucs"
     INVALID_RUC_TTL_HOURS = 24  # RUCs inválidos se cachean por 24 horas
 
     def __init__(self, token=None):
-        self.service = ApiService.objects.filter(service_type="MIGO").first()
+        self.service = get_service_registry().get_service("MIGO")
         if not self.service:
             raise ValueError("Servicio APIMIGO no configurado")
 
         self.token = token or self.service.auth_token
         self.base_url = self.service.base_url
         self.cache_service = APICacheService()
+        self.rate_limiter = RateLimitManager(self.service)
         self.invalid_rucs_cache_key = "invalid_rucs_cache"
+        # Sesión compartida por el proceso: reutiliza conexiones (keep-alive)
+        self.session = get_http_pool().get_session("MIGO")
 
         # Mapeo de endpoints MIGO
         # self.endpoints = {
@@ -83,7 +90,7 @@ class MigoAPIService:
 
     def _get_endpoint(self, endpoint_name: str) -> Optional[ApiEndpoint]:
         """
-        Obtiene la configuración de un endpoint desde la base de datos.
+        Obtiene la configuración de un endpoint (registro en memoria).
 
         Args:
             endpoint_name: Nombre del endpoint
@@ -105,76 +112,43 @@ class MigoAPIService:
                 ep.timeout = getattr(self, "timeout", 30)
                 return ep
 
-            return ApiEndpoint.objects.filter(
-                service=self.service, name=endpoint_name
-            ).first()
+            return get_service_registry().get_endpoint(self.service, endpoint_name)
         except Exception as e:
             logger.error(f"Error obteniendo endpoint {endpoint_name}: {str(e)}")
             return None
 
-    def _check_rate_limit(self, endpoint_name: str) -> Tuple[bool, float]:
+    def _check_rate_limit(
+        self, endpoint_name: str, endpoint: Optional[ApiEndpoint] = None
+    ) -> Tuple[bool, float]:
         """
-        Verifica rate limit y lanza excepción si se excede.
+        Verifica rate limit y reserva el cupo para la petición.
         Args:
             endpoint_name: Nombre del endpoint
+            endpoint: ApiEndpoint ya resuelto (evita otra consulta a BD)
         Returns:
             Tuple[bool, float]: (puede_proceder, tiempo_espera_segundos)
         """
-        try:
-            if not getattr(self, "service", None):
-                return True, 0
+        rate_limiter = getattr(self, "rate_limiter", None)
+        if not getattr(self, "service", None) or rate_limiter is None:
+            return True, 0
 
-            endpoint = self._get_endpoint(endpoint_name)
-            if endpoint:
-                # Obtener o crear el registro de rate limit para este endpoint
-                rate_limit, created = ApiRateLimit.get_for_service_endpoint(
-                    self.service, endpoint
-                )
-
-                # Usar el método can_make_request() del modelo
-                if rate_limit.can_make_request():
-                    return True, 0
-                else:
-                    # Si no se puede hacer la petición, obtener tiempo de espera
-                    wait_seconds = rate_limit.get_wait_time()
-                    logger.warning(
-                        f"Rate limit excedido para endpoint {endpoint_name}. "
-                        f"Esperar {wait_seconds:.1f} segundos"
-                    )
-                    return False, wait_seconds
-        except Exception as e:
-            logger.error(f"Error checking rate limit: {str(e)}")
-
-        # Por defecto, permitir la petición si hay error
-        return True, 0
+        return rate_limiter.check_rate_limit_sync(endpoint_name, endpoint)
 
     def _update_rate_limit(self, endpoint_name: str) -> None:
         """
         Actualiza rate limit después de una llamada.
-        Incrementa el contador de peticiones realizadas.
+
+        El cupo ya se reservó en _check_rate_limit; se mantiene por
+        compatibilidad con el flujo existente.
 
         Args:
             endpoint_name: Nombre del endpoint
         """
-        try:
-            if not getattr(self, "service", None):
-                return
-
-            endpoint = self._get_endpoint(endpoint_name)
-            if endpoint:
-                # Obtener o crear el registro de rate limit para este endpoint
-                rate_limit, created = ApiRateLimit.get_for_service_endpoint(
-                    self.service, endpoint
-                )
+        rate_limiter = getattr(self, "rate_limiter", None)
+        if not getattr(self, "service", None) or rate_limiter is None:
+            return
 
-                # Usar el método increment_count() del modelo
-                rate_limit.increment_count()
-                logger.debug(
-                    f"Rate limit actualizado para endpoint {endpoint_name}. "
-                    f"Conteo actual: {rate_limit.current_count}/{rate_limit.get_limit()}"
-                )
-        except Exception as e:
-            logger.error(f"Error updating rate limit: {str(e)}")
+        rate_limiter.update_rate_limit_sync(endpoint_name)
 
     def _log_api_call(
         self,
@@ -212,16 +186,17 @@ class MigoAPIService:
             return
 
         try:
-            endpoint = self._get_endpoint(endpoint_name)
+            sink = get_log_sink()
 
             # Si es un RUC inválido (404), registrar información adicional
             if status == "FAILED" and "404" in error_message:
                 response_data["invalid_ruc"] = True
                 response_data["invalid_reason"] = "RUC_NO_EXISTE_SUNAT"
 
-            ApiCallLog.objects.create(
-                service=self.service,
-                endpoint=endpoint,
+            # Encolar: el buffer se escribe en lote fuera de la petición
+            sink.enqueue(
+                service_id=self.service.pk,
+                endpoint_id=sink.endpoint_id(self.service.pk, endpoint_name),
                 batch_request=batch_request,
                 status=status,
                 request_data=request_data,
@@ -270,7 +245,7 @@ class MigoAPIService:
             }
 
         # Verificar rate limit
-        can_proceed, wait_time = self._check_rate_limit(endpoint_name)
+        can_proceed, wait_time = self._check_rate_limit(endpoint_name, endpoint)
         if not can_proceed:
             error_msg = f"Rate limit excedido para {endpoint_name}. Esperar {wait_time:.1f} segundos"
             self._log_api_call(
@@ -292,14 +267,14 @@ class MigoAPIService:
         try:
             # Realizar la petición
             if method.upper() == "POST":
-                response = requests.post(
+                response = self.session.post(
                     f"{self.base_url}{endpoint.path}",
                     json=request_data,
                     headers={"Content-Type": "application/json"},
                     timeout=endpoint.timeout or 30,
                 )
             else:
-                response = requests.get(
+                response = self.session.get(
                     f"{self.base_url}{endpoint.path}",
                     params=request_data,
                     timeout=endpoint.timeout or 30,
@@ -523,8 +498,10 @@ class MigoAPIService:
         Returns:
             bool: True si el RUC está marcado como inválido
         """
-        invalid_rucs = self.cache_service.get(self.INVALID_RUCS_CACHE_KEY, {}) or {}
-        return ruc in invalid_rucs
+        if not ruc:
+            return False
+        # Una sola clave por RUC; la expiración la maneja el TTL del cache
+        return self.cache_service.is_ruc_invalid(ruc)
 
     def _mark_ruc_as_invalid(self, ruc: str, reason: str = "NO_EXISTE_SUNAT"):
         """
@@ -534,19 +511,36 @@ class MigoAPIService:
             ruc: Número de RUC a marcar como inválido
             reason: Razón por la cual es inválido
         """
-        invalid_rucs = self.cache_service.get(self.INVALID_RUCS_CACHE_KEY, {}) or {}
-        invalid_rucs[ruc] = {
-            "reason": reason,
-            "timestamp": timezone.now().isoformat(),
-            "ttl_hours": self.INVALID_RUC_TTL_HOURS,
-        }
-        self.cache_service.set(
-            self.INVALID_RUCS_CACHE_KEY,
-            invalid_rucs,
-            ttl=self.INVALID_RUC_TTL_HOURS * 3600,
+        self.cache_service.add_invalid_ruc(
+            ruc, reason, ttl_hours=self.INVALID_RUC_TTL_HOURS
         )
         logger.info(f"RUC {ruc} marcado como inválido: {reason}")
 
+    def _particionar_por_cache(
+        self, rucs: List[str]
+    ) -> Tuple[Dict[str, Dict], Dict[str, Dict], List[str]]:
+        """
+        Clasifica RUCs (con formato válido) según el cache en una sola ida:
+        válidos cacheados, inválidos conocidos y pendientes de consultar.
+
+        Args:
+            rucs: Lista de RUCs
+
+        Returns:
+            Tuple: (cacheados {ruc: datos}, inválidos {ruc: info}, por_consultar [rucs])
+        """
+        try:
+            particion = self.cache_service.partition_rucs(rucs)
+        except Exception as e:
+            logger.error(f"Error particionando RUCs por cache: {e}")
+            particion = None
+
+        if not isinstance(particion, dict):
+            # Cache no disponible: consultar todos
+            return {}, {}, list(rucs)
+
+        return particion["cached"], particion["invalid"], particion["missing"]
+
     def _update_partner_sunat_status(
         self, ruc: str, api_response: Dict[str, Any]
     ) -> None:
@@ -571,52 +565,18 @@ class MigoAPIService:
                 logger.debug(f"Partner con RUC {ruc} no encontrado en la base de datos")
                 return
 
-            with transaction.atomic():
-                is_valid = api_response.get("success", False)
-
-                if not is_valid:
-                    # RUC inválido o no encontrado
-                    partner.sunat_valid = False
-                    partner.sunat_state = "NO_VERIFICADO"
-                    partner.sunat_condition = "NO_VERIFICADO"
-
-                    error_msg = api_response.get("error", "RUC inválido")
-
-                    # Agregar nueva observación manteniendo las anteriores
-                    new_comment = f"[{timezone.now().date()}] SUNAT: {error_msg}\n"
-                    partner.sunat_comment = new_comment[:1000]  # Limitar longitud
-
-                    logger.info(
-                        f"Partner {ruc} marcado como inválido en SUNAT: {error_msg}"
-                    )
+            fields = compute_sunat_fields(api_response)
+            for field, value in fields.items():
+                setattr(partner, field, value)
+            partner.save(update_fields=[*fields, "updated_at"])
 
-                else:
-                    # RUC válido con datos
-                    data = api_response.get("data", {})
-                    partner.sunat_valid = True
-                    partner.sunat_state = data.get(
-                        "estado_del_contribuyente", "NO_VERIFICADO"
-                    )
-                    partner.sunat_condition = data.get(
-                        "condicion_de_domicilio", "NO_VERIFICADO"
-                    )
-                    partner.sunat_last_check = timezone.now()
-
-                    # Guardar datos de dirección si están disponibles
-                    if "direccion_simple" in data:
-                        partner.sunat_address = data["direccion_simple"][:500]
-                    if "ubigeo" in data:
-                        partner.sunat_ubigeo = data["ubigeo"][:6]
-
-                    # Agregar observación de verificación exitosa
-                    new_comment = (
-                        f"[{timezone.now().date()}] SUNAT: Validación exitosa\n"
-                    )
-                    partner.sunat_comment = new_comment[:1000]
-
-                    logger.info(f"Partner {ruc} actualizado con datos SUNAT válidos")
-
-                partner.save()
+            if fields["sunat_valid"]:
+                logger.info(f"Partner {ruc} actualizado con datos SUNAT válidos")
+            else:
+                logger.info(
+                    f"Partner {ruc} marcado como inválido en SUNAT: "
+                    f"{api_response.get('error', 'RUC inválido')}"
+                )
 
         except Exception as e:
             logger.error(
@@ -685,9 +645,7 @@ class MigoAPIService:
             )
             duration_ms = (timezone.now() - start_time).total_seconds() * 1000
 
-            invalid_info = self.cache_service.get(self.INVALID_RUCS_CACHE_KEY, {}).get(
-                ruc, {}
-            )
+            invalid_info = self.cache_service.get_invalid_ruc_info(ruc) or {}
             api_response = {
                 "success": False,
                 "error": f"RUC marcado como inválido: {invalid_info.get('reason', 'Desconocido')}",
@@ -1409,16 +1367,25 @@ class MigoAPIService:
             raise Exception(error_msg)
 
     def consultar_ruc_masivo(
-        self, rucs: List[str], batch_size: int = 50, update_partners: bool = True
+        self,
+        rucs: List[str],
+        batch_size: int = 50,
+        update_partners: bool = True,
+        force_refresh: bool = False,
     ) -> Dict[str, Any]:
         """
         Consulta masiva de RUCs con manejo optimizado de inválidos.
         FUNCIÓN EXISTENTE: Mejorada con filtrado de inválidos y procesamiento por lotes.
 
+        Cache-first: los RUCs ya cacheados (válidos o inválidos) se resuelven
+        localmente y solo los faltantes se envían a Migo, en lotes completos.
+        Los resultados nuevos se guardan en las claves `migo:ruc_*`.
+
         Args:
             rucs: Lista de RUCs a consultar
             batch_size: Tamaño de lote para procesamiento
             update_partners: Actualizar estado de partners en base de datos
+            force_refresh: Ignorar el cache y consultar todos los RUCs
 
         Returns:
             Dict con resultados consolidados
@@ -1464,9 +1431,29 @@ class MigoAPIService:
                     }
                 )
 
-        # Procesar RUCs válidos en formato
-        for i in range(0, len(rucs_a_procesar), batch_size):
-            batch = rucs_a_procesar[i : i + batch_size]
+        # Estados SUNAT a escribir en bloque al final
+        actualizador = PartnerSunatBulkUpdater() if update_partners else None
+
+        # Cache-first: resolver localmente antes de armar los lotes
+        if force_refresh:
+            rucs_pendientes = rucs_a_procesar
+        else:
+            cacheados, invalidos_cache, rucs_pendientes = self._particionar_por_cache(
+                rucs_a_procesar
+            )
+            self._registrar_hits_de_cache(
+                cacheados, invalidos_cache, resultados, actualizador
+            )
+        resultados["cache_misses"] = len(rucs_pendientes)
+
+        logger.info(
+            f"Consulta masiva: {resultados['cache_hits']} RUCs desde cache, "
+            f"{len(rucs_pendientes)} por consultar a Migo"
+        )
+
+        # Procesar solo los RUCs pendientes (lotes densos)
+        for i in range(0, len(rucs_pendientes), batch_size):
+            batch = rucs_pendientes[i : i + batch_size]
             resultados["batches_processed"] += 1
 
             logger.info(
@@ -1474,6 +1461,8 @@ class MigoAPIService:
             )
 
             # Consultar lote usando endpoint masivo (si existe) o individualmente
+            rucs_invalidos_sunat = []
+            rucs_validos_nuevos = {}
             try:
                 # Intentar consulta masiva
                 request_data = {"ruc": batch, "token": self.token}
@@ -1506,16 +1495,14 @@ class MigoAPIService:
                             if is_success:
                                 # RUC válido en SUNAT
                                 resultados["validos"].append({"ruc": ruc, "data": item})
+                                rucs_validos_nuevos[ruc] = item
 
                                 # Actualizar partner si se solicita
-                                if update_partners:
-                                    self._update_partner_sunat_status(
+                                if actualizador is not None:
+                                    actualizador.add(
                                         ruc, {"success": True, "data": item}
                                     )
 
-                                # Marcar como válido removiendo del cache de inválidos si existe
-                                if self.cache_service.is_ruc_invalid(ruc):
-                                    self.cache_service.remove_invalid_ruc(ruc)
                             else:
                                 # RUC no encontrado o error en SUNAT
                                 resultados["invalidos"].append(
@@ -1529,12 +1516,12 @@ class MigoAPIService:
                                     }
                                 )
 
-                                # Marcar como inválido
-                                self._mark_ruc_as_invalid(ruc, "NO_EXISTE_SUNAT")
+                                # Marcar como inválido (en bloque al final del lote)
+                                rucs_invalidos_sunat.append(ruc)
 
                                 # Actualizar partner si se solicita
-                                if update_partners:
-                                    self._update_partner_sunat_status(
+                                if actualizador is not None:
+                                    actualizador.add(
                                         ruc,
                                         {
                                             "success": False,
@@ -1559,19 +1546,51 @@ class MigoAPIService:
                         f"Error en consulta masiva: {batch_response.get('error', 'Error desconocido')}"
                     )
                     # Procesar individualmente como fallback
-                    self._process_batch_individually(batch, resultados, update_partners)
+                    self._process_batch_individually(
+                        batch,
+                        resultados,
+                        update_partners,
+                        revisar_cache=False,
+                        actualizador=actualizador,
+                    )
                 else:
                     # Respuesta inesperada
                     logger.warning(
                         f"Respuesta inesperada de la API: {type(batch_response)}"
                     )
                     # Procesar individualmente como fallback
-                    self._process_batch_individually(batch, resultados, update_partners)
+                    self._process_batch_individually(
+                        batch,
+                        resultados,
+                        update_partners,
+                        revisar_cache=False,
+                        actualizador=actualizador,
+                    )
 
             except Exception as e:
                 logger.error(f"Error procesando lote: {str(e)}")
                 # Procesar individualmente como fallback
-                self._process_batch_individually(batch, resultados, update_partners)
+                self._process_batch_individually(
+                    batch,
+                    resultados,
+                    update_partners,
+                    revisar_cache=False,
+                    actualizador=actualizador,
+                )
+
+            # Guardar resultados del lote en cache (mismas claves que consultar_ruc)
+            if rucs_validos_nuevos:
+                self.cache_service.set_many_rucs(rucs_validos_nuevos)
+            if rucs_invalidos_sunat:
+                self.cache_service.mark_many_invalid(
+                    rucs_invalidos_sunat,
+                    "NO_EXISTE_SUNAT",
+                    ttl_hours=self.INVALID_RUC_TTL_HOURS,
+                )
+
+        # Actualizar partners en bloque
+        if actualizador is not None:
+            resultados["partners"] = actualizador.flush()
 
         # Estadísticas finales
         resultados["total_validos"] = len(resultados["validos"])
@@ -1587,8 +1606,54 @@ class MigoAPIService:
 
         return resultados
 
+    def _registrar_hits_de_cache(
+        self,
+        cacheados: Dict[str, Dict],
+        invalidos_cache: Dict[str, Dict],
+        resultados: Dict[str, Any],
+        actualizador: Optional[PartnerSunatBulkUpdater] = None,
+    ) -> None:
+        """
+        Agrega a los resultados los RUCs resueltos desde el cache.
+
+        Args:
+            cacheados: {ruc: datos} de RUCs válidos en cache
+            invalidos_cache: {ruc: info} de RUCs marcados como inválidos
+            resultados: Dict donde almacenar resultados
+            actualizador: Acumulador de estados SUNAT (None = no actualizar partners)
+        """
+        for ruc, info in invalidos_cache.items():
+            reason = (info or {}).get("reason", "Desconocido")
+            resultados["cache_hits"] += 1
+            resultados["invalidos"].append(
+                {
+                    "ruc": ruc,
+                    "error": f"RUC en cache inválidos: {reason}",
+                    "type": "invalid",
+                    "subtype": "cached",
+                }
+            )
+            if actualizador is not None:
+                actualizador.add(
+                    ruc,
+                    {"success": False, "error": f"RUC marcado como inválido: {reason}"},
+                )
+
+        for ruc, cached_data in cacheados.items():
+            resultados["cache_hits"] += 1
+            resultados["validos"].append(
+                {"ruc": ruc, "data": cached_data, "cache_hit": True}
+            )
+            if actualizador is not None:
+                actualizador.add(ruc, cached_data)
+
     def _process_batch_individually(
-        self, batch: List[str], resultados: Dict[str, Any], update_partners: bool
+        self,
+        batch: List[str],
+        resultados: Dict[str, Any],
+        update_partners: bool,
+        revisar_cache: bool = True,
+        actualizador: Optional[PartnerSunatBulkUpdater] = None,
     ) -> None:
         """
         Procesa un lote de RUCs individualmente.
@@ -1598,39 +1663,33 @@ class MigoAPIService:
             batch: Lista de RUCs a procesar
             resultados: Dict donde almacenar resultados
             update_partners: Si actualizar partners
+            revisar_cache: False si el lote ya se filtró contra el cache
+            actualizador: Acumulador compartido; si no se pasa y
+                update_partners es True, se crea uno y se aplica al final
         """
-        for ruc in batch:
-            # Verificar cache de inválidos primero
-            if self._is_ruc_marked_invalid(ruc):
-                resultados["cache_hits"] += 1
-                invalid_info = self.cache_service.get(
-                    self.INVALID_RUCS_CACHE_KEY, {}
-                ).get(ruc, {})
-                resultados["invalidos"].append(
-                    {
-                        "ruc": ruc,
-                        "error": f"RUC en cache inválidos: {invalid_info.get('reason', 'Desconocido')}",
-                        "type": "invalid",
-                        "subtype": "cached",
-                    }
-                )
-                continue
-
-            # Verificar cache normal
-            cache_key = self.cache_service.get_service_cache_key("migo", f"ruc_{ruc}")
-            cached_data = self.cache_service.get(cache_key)
-            if cached_data:
-                resultados["cache_hits"] += 1
-                resultados["validos"].append(
-                    {"ruc": ruc, "data": cached_data, "cache_hit": True}
-                )
-                if update_partners:
-                    self._update_partner_sunat_status(ruc, cached_data)
-                continue
+        flush_al_final = actualizador is None and update_partners
+        if flush_al_final:
+            actualizador = PartnerSunatBulkUpdater()
+
+        pendientes = batch
+        if revisar_cache:
+            cacheados, invalidos_cache, pendientes = self._particionar_por_cache(batch)
+            self._registrar_hits_de_cache(
+                cacheados, invalidos_cache, resultados, actualizador
+            )
 
-            # Consultar API individualmente
-            api_response = self.consultar_ruc(ruc, update_partner=update_partners)
+        for ruc in pendientes:
+            # Consultar API individualmente (el cache ya se revisó arriba)
+            api_response = self.consultar_ruc(
+                ruc, force_refresh=True, update_partner=False
+            )
             resultados["api_calls"] += 1
+            if actualizador is not None and (
+                api_response.get("success")
+                or api_response.get("invalid_sunat")
+                or api_response.get("invalid_format")
+            ):
+                actualizador.add(ruc, api_response)
 
             if api_response.get("success"):
                 resultados["validos"].append(
@@ -1654,6 +1713,9 @@ class MigoAPIService:
                     {"ruc": ruc, "error": api_response.get("error"), "type": "error"}
                 )
 
+        if flush_al_final:
+            resultados["partners"] = actualizador.flush()
+
     def get_invalid_rucs_report(self) -> Dict[str, Any]:
         """
         Obtiene un reporte de los RUCs marcados como inválidos.
@@ -26,13 +26,24 @@ Status: ✅ Reutiliza lógica existente + Async HTTP
 import asyncio
 import httpx
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from datetime import datetime, timedelta
 
 from django.utils import timezone
 
 from .migo_service import MigoAPIService
+from .partner_updater import PartnerSunatBulkUpdater
 from ..cache_service import APICacheService
+from ..base.http_pool import get_http_pool
+from ..base.io_executor import run_io
+from ..base.log_sink import get_log_sink
+from ..base.rate_limit import RateLimitManager
+from ..base.registry import get_service_registry
+from ..base.scheduler import (
+    AdaptiveConcurrencyLimiter,
+    BatchProgressTracker,
+    stream_bounded,
+)
 from ...models import ApiEndpoint, ApiCallLog, ApiBatchRequest
 
 logger = logging.getLogger(__name__)
@@ -82,6 +93,7 @@ class MigoAPIServiceAsync(MigoAPIService):
         self.token = token
         self.base_url = None
         self.cache_service = APICacheService()
+        self.rate_limiter = RateLimitManager()
         self.invalid_rucs_cache_key = "invalid_rucs_cache"
 
         # Cliente async (exponer como `client` para compatibilidad con tests)
@@ -100,21 +112,19 @@ class MigoAPIServiceAsync(MigoAPIService):
         )
 
     async def __aenter__(self):
-        """Context manager: crear cliente async"""
-        # Crear cliente con el timeout configurado
-        self.async_client = httpx.AsyncClient(timeout=self.timeout)
+        """Context manager: tomar el cliente async compartido del pool"""
+        # Cliente de larga vida (keep-alive, HTTP/2 si está disponible); el
+        # timeout de cada petición se pasa explícitamente
+        self.async_client = get_http_pool().get_async_client("MIGO")
         # Alias para compatibilidad con tests (service.client)
         self.client = self.async_client
-        logger.debug("[ASYNC] Cliente HTTP async creado")
+        logger.debug("[ASYNC] Cliente HTTP async obtenido del pool")
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Context manager: cerrar cliente async"""
-        if self.async_client:
-            await self.async_client.aclose()
-            self.async_client = None
-            self.client = None
-        logger.debug("[ASYNC] Cliente HTTP async cerrado")
+        """Context manager: soltar el cliente (el pool lo mantiene abierto)"""
+        self.async_client = None
+        self.client = None
 
     def _get_client(self) -> httpx.AsyncClient:
         """Obtiene el cliente async, lanzando error si no está inicializado"""
@@ -127,15 +137,64 @@ class MigoAPIServiceAsync(MigoAPIService):
         )
 
     async def close(self):
-        """Cerrar el cliente async si está abierto."""
-        if self.client:
-            try:
-                await self.client.aclose()
-            except Exception:
-                pass
-            finally:
-                self.client = None
-                self.async_client = None
+        """Soltar el cliente async (el pool compartido lo cierra al apagar)."""
+        self.client = None
+        self.async_client = None
+
+    # ========================================================================
+    # EFECTOS SECUNDARIOS FUERA DEL EVENT LOOP
+    # ========================================================================
+    # ORM y cache remoto son síncronos: se ejecutan en el executor de I/O
+    # (`run_io`) para que el event loop siga solapando las llamadas HTTP.
+
+    async def _cache_io(self, fn, *args, **kwargs):
+        """Operación de cache: en línea si el cache es memoria local (sin I/O)."""
+        if getattr(self.cache_service, "backend", None) == "local_memory":
+            return fn(*args, **kwargs)
+        return await run_io(fn, *args, **kwargs)
+
+    async def _aget_endpoint(self, endpoint_name: str):
+        """Versión async de _get_endpoint (sin salto a thread si está en el registro)."""
+        if not getattr(self, "service", None):
+            return self._get_endpoint(endpoint_name)
+        endpoint = get_service_registry().get_endpoint(
+            self.service, endpoint_name, cached_only=True
+        )
+        if endpoint is not None:
+            return endpoint
+        return await run_io(self._get_endpoint, endpoint_name)
+
+    async def _check_rate_limit_async(
+        self, endpoint_name: str, endpoint: Optional[ApiEndpoint] = None
+    ) -> Tuple[bool, float]:
+        """Versión async de _check_rate_limit."""
+        rate_limiter = getattr(self, "rate_limiter", None)
+        if not getattr(self, "service", None) or rate_limiter is None:
+            return True, 0
+        return await rate_limiter.check_rate_limit_async(endpoint_name, endpoint)
+
+    async def _log_api_call_async(self, **kwargs) -> None:
+        """
+        Versión async de _log_api_call.
+
+        Con el sink en buffer y el endpoint ya memorizado, encolar no hace
+        I/O y se hace en línea; en otro caso la escritura va al executor.
+        """
+        # Resolver el llamador aquí: desde el executor el stack no lo contiene
+        kwargs.setdefault("caller_info", self._get_caller_info())
+
+        if not getattr(self, "service", None):
+            return self._log_api_call(**kwargs)
+
+        endpoint_cached = (
+            get_service_registry().get_endpoint(
+                self.service, kwargs["endpoint_name"], cached_only=True
+            )
+            is not None
+        )
+        if get_log_sink().buffered and endpoint_cached:
+            return self._log_api_call(**kwargs)
+        await run_io(self._log_api_call, **kwargs)
 
     # ========================================================================
     # MÉTODO CRÍTICO ASYNC: _make_request_async (Sobrescribe MigoAPIService)
@@ -162,7 +221,7 @@ class MigoAPIServiceAsync(MigoAPIService):
         Solo cambia: usa httpx async en lugar de requests sync
         """
         start_time = timezone.now()
-        endpoint = self._get_endpoint(endpoint_name)
+        endpoint = await self._aget_endpoint(endpoint_name)
 
         if not endpoint:
             return {
@@ -171,10 +230,12 @@ class MigoAPIServiceAsync(MigoAPIService):
             }
 
         # REUTILIZAR: Verificar rate limit (método heredado)
-        can_proceed, wait_time = self._check_rate_limit(endpoint_name)
+        can_proceed, wait_time = await self._check_rate_limit_async(
+            endpoint_name, endpoint
+        )
         if not can_proceed:
             error_msg = f"Rate limit excedido para {endpoint_name}. Esperar {wait_time:.1f} segundos"
-            self._log_api_call(
+            await self._log_api_call_async(
                 endpoint_name=endpoint_name,
                 request_data=data,
                 response_data={},
@@ -224,7 +285,7 @@ class MigoAPIServiceAsync(MigoAPIService):
                     if not success and "404" in str(response_data.get("error", "")):
                         response_data["invalid_sunat"] = True
 
-                self._log_api_call(
+                await self._log_api_call_async(
                     endpoint_name=endpoint_name,
                     request_data=request_data,
                     response_data=response_data,
@@ -265,10 +326,12 @@ class MigoAPIServiceAsync(MigoAPIService):
                     ruc = request_data["ruc"]
 
                 if ruc:
-                    self._mark_ruc_as_invalid(ruc, "404_NOT_FOUND")
+                    await self._cache_io(
+                        self._mark_ruc_as_invalid, ruc, "404_NOT_FOUND"
+                    )
                     response_data["ruc"] = ruc
 
-                self._log_api_call(
+                await self._log_api_call_async(
                     endpoint_name=endpoint_name,
                     request_data=request_data,
                     response_data=response_data,
@@ -301,7 +364,7 @@ class MigoAPIServiceAsync(MigoAPIService):
                     "status_code": response.status_code,
                 }
 
-                self._log_api_call(
+                await self._log_api_call_async(
                     endpoint_name=endpoint_name,
                     request_data=request_data,
                     response_data=response_data,
@@ -336,7 +399,7 @@ class MigoAPIServiceAsync(MigoAPIService):
 
             response_data = {"success": False, "error": error_msg}
 
-            self._log_api_call(
+            await self._log_api_call_async(
                 endpoint_name=endpoint_name,
                 request_data=request_data,
                 response_data=response_data,
@@ -370,7 +433,7 @@ class MigoAPIServiceAsync(MigoAPIService):
 
             response_data = {"success": False, "error": error_msg}
 
-            self._log_api_call(
+            await self._log_api_call_async(
                 endpoint_name=endpoint_name,
                 request_data=request_data,
                 response_data=response_data,
@@ -428,7 +491,7 @@ class MigoAPIServiceAsync(MigoAPIService):
                 "invalid_format": True,
             }
 
-            self._log_api_call(
+            await self._log_api_call_async(
                 endpoint_name="consultar_ruc",
                 request_data={"ruc": ruc},
                 response_data=api_response,
@@ -438,17 +501,17 @@ class MigoAPIServiceAsync(MigoAPIService):
             )
 
             if update_partner:
-                self._update_partner_sunat_status(ruc, api_response)
+                await run_io(self._update_partner_sunat_status, ruc, api_response)
 
             return api_response
 
         # REUTILIZAR: Verificar si está marcado como inválido (método heredado)
-        if not force_refresh and self._is_ruc_marked_invalid(ruc):
+        if not force_refresh and await self._cache_io(self._is_ruc_marked_invalid, ruc):
             logger.debug(f"RUC {ruc} en cache de inválidos")
             duration_ms = (timezone.now() - start_time).total_seconds() * 1000
 
-            invalid_info = self.cache_service.get(self.INVALID_RUCS_CACHE_KEY, {}).get(
-                ruc, {}
+            invalid_info = (
+                await self._cache_io(self.cache_service.get_invalid_ruc_info, ruc) or {}
             )
             api_response = {
                 "success": False,
@@ -458,21 +521,23 @@ class MigoAPIServiceAsync(MigoAPIService):
             }
 
             if update_partner:
-                self._update_partner_sunat_status(ruc, api_response)
+                await run_io(self._update_partner_sunat_status, ruc, api_response)
 
             return api_response
 
         # REUTILIZAR: Verificar cache normal (método heredado)
         if not force_refresh:
             cache_key = self.cache_service.get_service_cache_key("migo", f"ruc_{ruc}")
-            cached_data = self.cache_service.get(cache_key)
+            cached_data = await self._cache_io(self.cache_service.get, cache_key)
             if cached_data:
                 logger.debug(f"Cache hit para RUC {ruc}")
                 # Devolver exactamente lo que hay en cache (las pruebas esperan igualdad)
                 if update_partner:
                     # Mantener compatibilidad: el padre puede manejar la actualización
                     try:
-                        self._update_partner_sunat_status(ruc, cached_data)
+                        await run_io(
+                            self._update_partner_sunat_status, ruc, cached_data
+                        )
                     except Exception:
                         pass
                 return cached_data
@@ -486,21 +551,73 @@ class MigoAPIServiceAsync(MigoAPIService):
         # REUTILIZAR: Procesar respuesta (lógica heredada)
         if api_response.get("success"):
             cache_key = self.cache_service.get_service_cache_key("migo", f"ruc_{ruc}")
-            self.cache_service.set(
-                cache_key, api_response, ttl=self.cache_service.RUC_VALID_TTL
+            await self._cache_io(
+                self.cache_service.set,
+                cache_key,
+                api_response,
+                ttl=self.cache_service.RUC_VALID_TTL,
             )
 
             if update_partner:
-                self._update_partner_sunat_status(ruc, api_response)
+                await run_io(self._update_partner_sunat_status, ruc, api_response)
 
         elif api_response.get("invalid_sunat"):
             if update_partner:
-                self._update_partner_sunat_status(ruc, api_response)
+                await run_io(self._update_partner_sunat_status, ruc, api_response)
 
         return api_response
 
+    @staticmethod
+    def _es_sobrecarga(response: Dict[str, Any]) -> bool:
+        """True si la respuesta indica que APIMIGO (o el rate limit local) está saturado."""
+        if not isinstance(response, dict) or response.get("success"):
+            return False
+        status_code = response.get("status_code") or 0
+        return (
+            status_code == 429
+            or status_code >= 500
+            or "Rate limit excedido" in str(response.get("error", ""))
+        )
+
+    async def iter_consultar_ruc_async(
+        self,
+        rucs: List[str],
+        max_concurrency: int = 50,
+        force_refresh: bool = False,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Consulta RUCs con concurrencia acotada y entrega `(ruc, respuesta)` a
+        medida que cada uno termina (orden de finalización, no de entrada).
+
+        La concurrencia arranca en `max_concurrency` y se reduce ante 429/5xx
+        o latencias altas. No actualiza partners: lo decide quien consume.
+
+        Uso:
+            async for ruc, respuesta in service.iter_consultar_ruc_async(rucs):
+                ...
+        """
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(
+                initial=max_concurrency, max_limit=max_concurrency
+            )
+
+        async def consultar(ruc):
+            return await self.consultar_ruc_async(
+                ruc, force_refresh=force_refresh, update_partner=False
+            )
+
+        async for _, ruc, response in stream_bounded(
+            consultar, rucs, limiter=limiter, is_overloaded=self._es_sobrecarga
+        ):
+            yield ruc, response
+
     async def consultar_ruc_masivo_async(
-        self, rucs: List[str], batch_size: int = 50, update_partners: bool = True
+        self,
+        rucs: List[str],
+        batch_size: int = 50,
+        update_partners: bool = True,
+        batch_request: Optional[ApiBatchRequest] = None,
     ) -> Dict[str, Any]:
         """
         Versión ASYNC de consultar_ruc_masivo().
@@ -510,7 +627,10 @@ class MigoAPIServiceAsync(MigoAPIService):
         - Cache
         - Procesamiento masivo
 
-        Solo cambia: procesa en paralelo con asyncio
+        Cambia: en lugar de lotes con barrera, una cola de trabajo con
+        `batch_size` consultas simultáneas como máximo (adaptativo, ver
+        `iter_consultar_ruc_async`). Si se pasa `batch_request`, su avance
+        se guarda periódicamente (API_BATCH_PROGRESS_INTERVAL).
         """
         if not rucs:
             return {"success": False, "error": "Lista de RUCs vacía", "total": 0}
@@ -528,9 +648,11 @@ class MigoAPIServiceAsync(MigoAPIService):
             "errores": [],
             "cache_hits": 0,
             "api_calls": 0,
-            "batches_processed": 0,
         }
 
+        progreso = BatchProgressTracker(batch_request, total=len(rucs_unicos))
+        await progreso.start()
+
         # Pre-filtrar por formato (REUTILIZAR validación)
         rucs_a_procesar = []
         for ruc in rucs_unicos:
@@ -541,55 +663,71 @@ class MigoAPIServiceAsync(MigoAPIService):
                 resultados["invalidos"].append(
                     {"ruc": ruc, "error": "Formato inválido", "type": "invalid"}
                 )
+        progreso.record(False, count=len(resultados["invalidos"]))
 
-        # Procesar en lotes de forma PARALELA
-        for i in range(0, len(rucs_a_procesar), batch_size):
-            batch = rucs_a_procesar[i : i + batch_size]
-            resultados["batches_processed"] += 1
+        # Estados SUNAT a escribir en bloque al final (una sola ida a BD)
+        actualizador = PartnerSunatBulkUpdater() if update_partners else None
 
-            logger.info(
-                f"[ASYNC] Procesando lote {resultados['batches_processed']}: {len(batch)} RUCs"
-            )
+        # REUTILIZAR: Cache-first, resolver hits e inválidos antes de consultar
+        cacheados, invalidos_cache, rucs_pendientes = await self._cache_io(
+            self._particionar_por_cache, rucs_a_procesar
+        )
+        self._registrar_hits_de_cache(
+            cacheados, invalidos_cache, resultados, actualizador
+        )
+        progreso.record(True, count=len(cacheados))
+        progreso.record(False, count=len(invalidos_cache))
+        resultados["cache_misses"] = len(rucs_pendientes)
+
+        logger.info(
+            f"[ASYNC] Consultando {len(rucs_pendientes)} RUCs "
+            f"(máx. {batch_size} simultáneos)"
+        )
 
-            # CAMBIO: Procesar en paralelo con asyncio
-            tasks = [
-                asyncio.create_task(
-                    self.consultar_ruc_async(ruc, update_partner=update_partners)
+        # Cola de trabajo acotada: cada RUC se procesa apenas termina
+        limitador = AdaptiveConcurrencyLimiter(initial=batch_size, max_limit=batch_size)
+        async for ruc, response in self.iter_consultar_ruc_async(
+            rucs_pendientes, force_refresh=True, limiter=limitador
+        ):
+            if (
+                actualizador is not None
+                and isinstance(response, dict)
+                and (
+                    response.get("success")
+                    or response.get("invalid_sunat")
+                    or response.get("invalid_format")
                 )
-                for ruc in batch
-            ]
+            ):
+                actualizador.add(ruc, response)
 
-            responses = await asyncio.gather(*tasks)
+            if isinstance(response, dict) and response.get("success"):
+                resultados["validos"].append(
+                    {"ruc": ruc, "data": response.get("data", {})}
+                )
+            elif isinstance(response, dict) and (
+                response.get("invalid_sunat") or response.get("invalid_format")
+            ):
+                resultados["invalidos"].append(
+                    {"ruc": ruc, "error": response.get("error"), "type": "invalid"}
+                )
+            else:
+                resultados["errores"].append(
+                    {"ruc": ruc, "error": response.get("error"), "type": "error"}
+                )
 
-            # Procesar respuestas
-            for ruc, response in zip(batch, responses):
-                # Asegurar que si la respuesta es un coroutine la aguardamos
-                if asyncio.iscoroutine(response):
-                    response = await response
+            if response.get("cache_hit"):
+                resultados["cache_hits"] += 1
+            else:
+                resultados["api_calls"] += 1
 
-                if isinstance(response, dict) and response.get("success"):
-                    resultados["validos"].append(
-                        {"ruc": ruc, "data": response.get("data", {})}
-                    )
-                elif isinstance(response, dict) and (
-                    response.get("invalid_sunat") or response.get("invalid_format")
-                ):
-                    resultados["invalidos"].append(
-                        {"ruc": ruc, "error": response.get("error"), "type": "invalid"}
-                    )
-                else:
-                    resultados["errores"].append(
-                        {"ruc": ruc, "error": response.get("error"), "type": "error"}
-                    )
+            progreso.record(bool(response.get("success")))
+            await progreso.maybe_save()
 
-                if response.get("cache_hit"):
-                    resultados["cache_hits"] += 1
-                else:
-                    resultados["api_calls"] += 1
+        resultados["concurrency"] = limitador.snapshot()
 
-            # Pequeña pausa entre lotes para respetar rate limiting
-            if i + batch_size < len(rucs_a_procesar):
-                await asyncio.sleep(0.05)
+        # Actualizar partners en bloque fuera del event loop
+        if actualizador is not None:
+            resultados["partners"] = await run_io(actualizador.flush)
 
         # Estadísticas
         resultados["total_validos"] = len(resultados["validos"])
@@ -599,8 +737,18 @@ class MigoAPIServiceAsync(MigoAPIService):
         resultados["total"] = len(rucs)
         resultados["exitosos"] = len(resultados["validos"])
 
+        await progreso.finish(
+            {
+                "total_validos": resultados["total_validos"],
+                "total_invalidos": resultados["total_invalidos"],
+                "total_errores": resultados["total_errores"],
+                "cache_hits": resultados["cache_hits"],
+                "api_calls": resultados["api_calls"],
+            }
+        )
+
         logger.info(
-            f"[ASYNC] Lote completado: {resultados['total_validos']} válidos, "
+            f"[ASYNC] Consulta masiva completada: {resultados['total_validos']} válidos, "
             f"{resultados['total_invalidos']} inválidos"
         )
 
@@ -612,7 +760,7 @@ class MigoAPIServiceAsync(MigoAPIService):
         Reutiliza validación y cache, solo cambia a async.
         """
         cache_key = self.cache_service.get_service_cache_key("migo", f"dni_{dni}")
-        cached_data = self.cache_service.get(cache_key)
+        cached_data = await self._cache_io(self.cache_service.get, cache_key)
 
         if cached_data:
             return {**cached_data, "cache_hit": True}
@@ -620,8 +768,11 @@ class MigoAPIServiceAsync(MigoAPIService):
         result = await self._make_request_async("consultar_dni", {"dni": dni})
 
         if result.get("success"):
-            self.cache_service.set(
-                cache_key, result, ttl=self.cache_service.RUC_INVALID_TTL
+            await self._cache_io(
+                self.cache_service.set,
+                cache_key,
+                result,
+                ttl=self.cache_service.RUC_INVALID_TTL,
             )
 
         return result
@@ -732,14 +883,14 @@ def run_async(coro):
 
 
 async def batch_query(func, items: List[Any], batch_size: int = 10) -> List[Any]:
-    """Ejecuta `func` sobre `items` en batches asíncronos y devuelve resultados.
+    """Ejecuta `func` sobre `items` con hasta `batch_size` llamadas simultáneas.
 
-    `func` debe ser una coroutine function que acepte un item.
+    `func` debe ser una coroutine function que acepte un item. Sin barrera
+    entre lotes: apenas termina una llamada empieza la siguiente. Los
+    resultados se devuelven en el orden de `items`.
     """
-    results: List[Any] = []
-    for i in range(0, len(items), batch_size):
-        batch = items[i : i + batch_size]
-        tasks = [func(item) for item in batch]
-        batch_results = await asyncio.gather(*tasks)
-        results.extend(batch_results)
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    async for index, _, result in stream_bounded(func, items, concurrency=batch_size):
+        results[index] = result
     return results
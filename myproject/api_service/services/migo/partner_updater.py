@@ -0,0 +1,177 @@
+"""
+Actualización masiva del estado SUNAT de partners.
+
+Acumula las respuestas de Migo por RUC y las aplica a `Partner` en bloque:
+una consulta `num_document__in` por bloque de RUCs y `bulk_update` solo de
+las columnas que cambiaron, en lugar de un SELECT + transacción + save()
+completo por RUC.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from billing.models import Partner
+
+logger = logging.getLogger(__name__)
+
+
+def compute_sunat_fields(api_response: Dict[str, Any], now=None) -> Dict[str, Any]:
+    """
+    Calcula los campos `sunat_*` de un partner a partir de la respuesta de Migo.
+
+    Args:
+        api_response: Respuesta de la API ({"success", "data"|campos, "error"})
+        now: Momento de la verificación (por defecto timezone.now())
+
+    Returns:
+        Dict {campo: valor} a asignar en Partner
+    """
+    now = now or timezone.now()
+
+    if not api_response.get("success", False):
+        error_msg = api_response.get("error", "RUC inválido")
+        return {
+            "sunat_valid": False,
+            "sunat_state": "NO_VERIFICADO",
+            "sunat_condition": "NO_VERIFICADO",
+            "sunat_comment": f"[{now.date()}] SUNAT: {error_msg}\n"[:1000],
+        }
+
+    # Las respuestas masivas vienen envueltas en "data"; las individuales, planas
+    data = api_response.get("data")
+    if not isinstance(data, dict):
+        data = api_response
+
+    fields = {
+        "sunat_valid": True,
+        "sunat_state": data.get("estado_del_contribuyente", "NO_VERIFICADO"),
+        "sunat_condition": data.get("condicion_de_domicilio", "NO_VERIFICADO"),
+        "sunat_last_check": now,
+        "sunat_comment": f"[{now.date()}] SUNAT: Validación exitosa\n"[:1000],
+    }
+    if "direccion_simple" in data:
+        fields["sunat_address"] = (data["direccion_simple"] or "")[:500]
+    if "ubigeo" in data:
+        fields["sunat_ubigeo"] = (data["ubigeo"] or "")[:6]
+    return fields
+
+
+class PartnerSunatBulkUpdater:
+    """
+    Acumula respuestas de Migo por RUC y actualiza los partners en bloque.
+
+    Uso:
+        updater = PartnerSunatBulkUpdater()
+        updater.add(ruc, {"success": True, "data": item})
+        resumen = updater.flush()
+    """
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, ruc: str, api_response: Dict[str, Any]) -> None:
+        """Registra la respuesta de un RUC (la última registrada prevalece)."""
+        if ruc and isinstance(api_response, dict):
+            self._pending[str(ruc)] = api_response
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Aplica las respuestas pendientes a la base de datos.
+
+        Returns:
+            Dict con el resumen: rucs, partners_encontrados,
+            partners_actualizados, sin_cambios, no_encontrados (y "error" si
+            la actualización falló; en ese caso no se aplica ningún cambio)
+        """
+        pending, self._pending = self._pending, {}
+        summary = {
+            "rucs": len(pending),
+            "partners_encontrados": 0,
+            "partners_actualizados": 0,
+            "sin_cambios": 0,
+            "no_encontrados": 0,
+        }
+        if not pending:
+            return summary
+
+        now = timezone.now()
+        new_values = {
+            ruc: compute_sunat_fields(response, now)
+            for ruc, response in pending.items()
+        }
+        rucs = list(new_values)
+        found_rucs = set()
+
+        # Como el save() por RUC de antes: un fallo de BD se registra y no
+        # invalida las respuestas ya obtenidas de Migo
+        try:
+            with transaction.atomic():
+                for start in range(0, len(rucs), self.chunk_size):
+                    chunk = rucs[start : start + self.chunk_size]
+                    partners = list(
+                        Partner.objects.filter(num_document__in=chunk).only(
+                            "pk", "num_document", *self._all_fields(new_values, chunk)
+                        )
+                    )
+                    summary["partners_encontrados"] += len(partners)
+
+                    changed: List[Partner] = []
+                    changed_fields = set()
+                    for partner in partners:
+                        found_rucs.add(partner.num_document)
+                        fields = self._apply(partner, new_values[partner.num_document])
+                        if fields:
+                            changed.append(partner)
+                            changed_fields.update(fields)
+                        else:
+                            summary["sin_cambios"] += 1
+
+                    if changed:
+                        for partner in changed:
+                            partner.updated_at = now
+                        Partner.objects.bulk_update(
+                            changed, sorted(changed_fields | {"updated_at"})
+                        )
+                        summary["partners_actualizados"] += len(changed)
+        except Exception as e:
+            logger.error(
+                f"Error actualizando estado SUNAT de {len(rucs)} partners: {str(e)}"
+            )
+            # La transacción se revirtió: no quedó ningún partner actualizado
+            summary["partners_actualizados"] = 0
+            summary["error"] = str(e)
+            return summary
+
+        summary["no_encontrados"] = len(set(rucs) - found_rucs)
+        logger.info(
+            f"Partners SUNAT actualizados en bloque: "
+            f"{summary['partners_actualizados']}/{summary['rucs']} RUCs "
+            f"({summary['no_encontrados']} sin partner)"
+        )
+        return summary
+
+    @staticmethod
+    def _all_fields(new_values: Dict[str, Dict], rucs: List[str]) -> List[str]:
+        fields = set()
+        for ruc in rucs:
+            fields.update(new_values[ruc])
+        return sorted(fields)
+
+    @staticmethod
+    def _apply(partner: Partner, values: Dict[str, Any]) -> List[str]:
+        """Asigna los valores y devuelve solo los campos que cambiaron."""
+        changed = []
+        for field, value in values.items():
+            if getattr(partner, field) != value:
+                setattr(partner, field, value)
+                changed.append(field)
+        return changed
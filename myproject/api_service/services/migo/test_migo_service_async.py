@@ -96,6 +96,7 @@ class TestConsultarRucAsync:
 
         service.client.post = AsyncMock(return_value=mock_response)
         service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
         service.cache_service.get = MagicMock(return_value=None)
         service.cache_service.set = MagicMock()
 
@@ -121,6 +122,7 @@ class TestConsultarRucAsync:
 
         # Mock caché
         service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
         service.cache_service.get = MagicMock(return_value=cached_result)
         service.cache_service.get_service_cache_key = MagicMock(
             return_value="migo:ruc_20100038146"
@@ -299,6 +301,42 @@ class TestConsultarRucMasivoAsync:
         assert result["total"] == 3
         assert result["exitosos"] >= 2  # Al menos 2 deberían ser exitosos
 
+    @pytest.mark.asyncio
+    async def test_consultar_ruc_masivo_uses_cache_partition(
+        self, async_service_with_mock
+    ):
+        """Verificar que solo los RUCs sin cache llegan a la API."""
+        service = async_service_with_mock
+        cache = service.cache_service
+        cache.set_many_rucs(
+            {"20100038146": {"success": True, "nombre_o_razon_social": "EN CACHE"}}
+        )
+        cache.mark_many_invalid(["20987654321"], "NO_EXISTE_SUNAT")
+
+        async def mock_post(*args, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            response.json = AsyncMock(return_value={"success": True})
+            return response
+
+        service.client.post = AsyncMock(side_effect=mock_post)
+
+        try:
+            result = await service.consultar_ruc_masivo_async(
+                ["20100038146", "20987654321", "20345678902"],
+                batch_size=10,
+                update_partners=False,
+            )
+        finally:
+            cache.delete_many_rucs(["20100038146", "20345678902"])
+            cache.remove_many_invalid(["20987654321"])
+
+        assert service.client.post.call_count == 1
+        assert result["cache_hits"] == 2
+        assert result["api_calls"] == 1
+        assert result["exitosos"] == 2
+        assert len(result["invalidos"]) == 1
+
 
 class TestConsultarDniAsync:
     """Pruebas para consultar_dni_async()."""
@@ -308,6 +346,7 @@ class TestConsultarDniAsync:
         """Prueba exitosa de consulta de DNI."""
         service = async_service_with_mock
         service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
         service.cache_service.get = MagicMock(return_value=None)
 
         # Mock response
@@ -340,6 +379,7 @@ class TestConsultarTipoCambioAsync:
         """Prueba exitosa de consulta tipo de cambio."""
         service = async_service_with_mock
         service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
         service.cache_service.get = MagicMock(return_value=None)
 
         # Mock response
@@ -410,6 +450,7 @@ class TestCaching:
         """Verificar que se respetan los TTLs de caché."""
         service = async_service_with_mock
         service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
         service.cache_service.get = MagicMock(return_value=None)
 
         mock_response = MagicMock()
@@ -453,6 +494,7 @@ class TestLogging:
 
         service = async_service_with_mock
         service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
         service.cache_service.get = MagicMock(return_value=None)
 
         mock_response = MagicMock()
@@ -499,12 +541,43 @@ class TestRateLimiting:
         await service.consultar_ruc_masivo_async(rucs, batch_size=1)
         elapsed = asyncio.get_event_loop().time() - start
 
-        # With batch_size=1, requests should be sequential with sleep in between
-        # Batch 1: ~0.1s, Sleep: ~0.05s, Batch 2: ~0.1s = ~0.25s total
+        # With batch_size=1 at most one request is in flight: ~0.1s + ~0.1s
         # Allow some margin for execution overhead
         assert elapsed >= 0.15, f"Expected at least 0.15s, got {elapsed:.2f}s"
 
 
+class TestNonBlockingSideEffects:
+    """Los efectos síncronos (BD/cache) no bloquean el event loop."""
+
+    @pytest.mark.asyncio
+    async def test_slow_partner_update_runs_off_loop(self, async_service_with_mock):
+        """4 actualizaciones de 0.2s en paralelo no deben serializarse."""
+        import time
+
+        service = async_service_with_mock
+        service.cache_service = MagicMock()
+        service.cache_service.is_ruc_invalid = MagicMock(return_value=False)
+        service.cache_service.get = MagicMock(return_value=None)
+
+        response = MagicMock()
+        response.status_code = 200
+        response.json = AsyncMock(return_value={"success": True})
+        service.client.post = AsyncMock(return_value=response)
+
+        # Simula un UPDATE lento y síncrono del ORM
+        service._update_partner_sunat_status = MagicMock(
+            side_effect=lambda ruc, data: time.sleep(0.2)
+        )
+
+        rucs = ["20100038146", "20987654321", "20100070970", "20505377142"]
+        start = asyncio.get_event_loop().time()
+        await asyncio.gather(*(service.consultar_ruc_async(ruc) for ruc in rucs))
+        elapsed = asyncio.get_event_loop().time() - start
+
+        assert service._update_partner_sunat_status.call_count == 4
+        assert elapsed < 0.6, f"Efectos serializados en el loop: {elapsed:.2f}s"
+
+
 class TestHelperFunctions:
     """Pruebas de funciones helper."""
 
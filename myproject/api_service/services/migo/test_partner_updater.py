@@ -0,0 +1,142 @@
+"""
+Tests de la actualización masiva de estado SUNAT en Partners.
+
+Modo de ejecución:
+    pytest api_service/services/migo/test_partner_updater.py -v
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api_service.services.migo.partner_updater import (
+    PartnerSunatBulkUpdater,
+    compute_sunat_fields,
+)
+from billing.models import Partner
+
+NOW = timezone.make_aware(datetime(2026, 1, 15, 10, 30))
+
+VALID_DATA = {
+    "ruc": "20100038146",
+    "nombre_o_razon_social": "EMPRESA DE PRUEBA S.A.C.",
+    "estado_del_contribuyente": "ACTIVO",
+    "condicion_de_domicilio": "HABIDO",
+    "direccion_simple": "AV. PRUEBA 123",
+    "ubigeo": "150101",
+}
+
+
+class TestComputeSunatFields:
+    """Cálculo de campos sunat_* - NO necesita BD"""
+
+    def test_valid_response_wrapped_in_data(self):
+        fields = compute_sunat_fields({"success": True, "data": VALID_DATA}, NOW)
+
+        assert fields["sunat_valid"] is True
+        assert fields["sunat_state"] == "ACTIVO"
+        assert fields["sunat_condition"] == "HABIDO"
+        assert fields["sunat_last_check"] == NOW
+        assert fields["sunat_address"] == "AV. PRUEBA 123"
+        assert fields["sunat_ubigeo"] == "150101"
+
+    def test_valid_flat_response(self):
+        """consultar_ruc devuelve los campos sin envolver en 'data'"""
+        fields = compute_sunat_fields({"success": True, **VALID_DATA}, NOW)
+        assert fields["sunat_state"] == "ACTIVO"
+        assert fields["sunat_ubigeo"] == "150101"
+
+    def test_invalid_response(self):
+        fields = compute_sunat_fields({"success": False, "error": "RUC no existe"}, NOW)
+
+        assert fields["sunat_valid"] is False
+        assert fields["sunat_state"] == "NO_VERIFICADO"
+        assert "RUC no existe" in fields["sunat_comment"]
+        assert "sunat_last_check" not in fields
+
+
+@pytest.mark.django_db
+class TestPartnerSunatBulkUpdater:
+    """Escritura en bloque sobre Partner"""
+
+    def _partner(self, ruc, **kwargs):
+        return Partner.objects.create(
+            name=f"Partner {ruc}",
+            display_name=f"Partner {ruc}",
+            document_type="ruc",
+            num_document=ruc,
+            **kwargs,
+        )
+
+    def test_flush_uses_one_select_and_one_update(self):
+        rucs = [str(20100000000 + i) for i in range(20)]
+        for ruc in rucs:
+            self._partner(ruc)
+
+        updater = PartnerSunatBulkUpdater()
+        for ruc in rucs:
+            updater.add(ruc, {"success": True, "data": {**VALID_DATA, "ruc": ruc}})
+
+        with CaptureQueriesContext(connection) as ctx:
+            summary = updater.flush()
+
+        selects = [q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        assert len(selects) == 1
+        assert len(updates) == 1
+        assert summary["partners_actualizados"] == 20
+        assert len(updater) == 0
+
+        partner = Partner.objects.get(num_document=rucs[0])
+        assert partner.sunat_valid is True
+        assert partner.sunat_state == "ACTIVO"
+        assert partner.sunat_ubigeo == "150101"
+
+    def test_flush_reports_missing_partners(self):
+        self._partner("20100038146")
+
+        updater = PartnerSunatBulkUpdater()
+        updater.add("20100038146", {"success": False, "error": "RUC no existe"})
+        updater.add("20999999999", {"success": False, "error": "RUC no existe"})
+        summary = updater.flush()
+
+        assert summary["rucs"] == 2
+        assert summary["partners_encontrados"] == 1
+        assert summary["no_encontrados"] == 1
+        assert Partner.objects.get(num_document="20100038146").sunat_valid is False
+
+    def test_flush_chunks_large_batches(self):
+        rucs = [str(20200000000 + i) for i in range(5)]
+        for ruc in rucs:
+            self._partner(ruc)
+
+        updater = PartnerSunatBulkUpdater(chunk_size=2)
+        for ruc in rucs:
+            updater.add(ruc, {"success": True, "data": VALID_DATA})
+
+        with CaptureQueriesContext(connection) as ctx:
+            summary = updater.flush()
+
+        selects = [q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        assert len(selects) == 3
+        assert summary["partners_actualizados"] == 5
+
+    def test_flush_logs_database_errors(self):
+        self._partner("20100038146")
+
+        updater = PartnerSunatBulkUpdater()
+        updater.add("20100038146", {"success": True, "data": VALID_DATA})
+        with patch.object(
+            Partner.objects, "bulk_update", side_effect=RuntimeError("BD caída")
+        ):
+            summary = updater.flush()
+
+        # Como el save() por RUC anterior: se registra y no se propaga
+        assert summary["error"] == "BD caída"
+        assert summary["partners_actualizados"] == 0
+        assert len(updater) == 0
+        assert Partner.objects.get(num_document="20100038146").sunat_valid is not True
@@ -8,6 +8,7 @@ Maneja timeouts, reintentos y logging de errores.
 import httpx
 from typing import Optional, Dict, Any
 from datetime import datetime
+from api_service.services.base.http_pool import get_http_pool
 from .config import NubefactConfig
 from .exceptions import (
     NubefactAPIError,
@@ -51,22 +52,18 @@ class NubefactHttpClient:
         }
     
     async def _get_async_client(self) -> httpx.AsyncClient:
-        """Obtiene o crea cliente asíncrono."""
+        """Obtiene el cliente asíncrono compartido (pool del proceso)."""
         if self._client is None:
-            self._client = httpx.AsyncClient(
-                timeout=self.config.timeout_config.httpx_timeout,
-                limits=httpx.Limits(max_keepalive_connections=10, max_connections=100),
-                verify=True
+            self._client = get_http_pool().get_async_client(
+                "NUBEFACT", self.config.timeout_config
             )
         return self._client
     
     def _get_sync_client(self) -> httpx.Client:
-        """Obtiene o crea cliente síncrono."""
+        """Obtiene el cliente síncrono compartido (pool del proceso)."""
         if self._sync_client is None:
-            self._sync_client = httpx.Client(
-                timeout=self.config.timeout_config.httpx_timeout,
-                limits=httpx.Limits(max_keepalive_connections=10, max_connections=100),
-                verify=True
+            self._sync_client = get_http_pool().get_sync_client(
+                "NUBEFACT", self.config.timeout_config
             )
         return self._sync_client
     
@@ -182,16 +179,12 @@ class NubefactHttpClient:
             raise NubefactAPIError(f"Error de conexión: {str(e)}")
     
     async def close_async(self):
-        """Cierra cliente asíncrono."""
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        """Suelta el cliente asíncrono (el pool lo mantiene abierto)."""
+        self._client = None
     
     def close_sync(self):
-        """Cierra cliente síncrono."""
-        if self._sync_client:
-            self._sync_client.close()
-            self._sync_client = None
+        """Suelta el cliente síncrono (el pool lo mantiene abierto)."""
+        self._sync_client = None
     
     async def __aenter__(self):
         return self
@@ -5,10 +5,9 @@ Carga configuración desde BD y proporciona acceso a token, URL y timeouts.
 
 import logging
 from typing import Optional
-from asgiref.sync import sync_to_async
 import httpx
 
-from api_service.models import ApiService
+from api_service.services.base.registry import get_service_registry
 from api_service.services.base.timeout_config import TimeoutConfig
 
 logger = logging.getLogger(__name__)
@@ -19,6 +18,8 @@ class NubefactConfig:
     Configuración para Nubefact, con soporte síncrono y asíncrono.
     """
 
+    SERVICE_NAME = "NUBEFACT Perú"
+
     def __init__(self, timeout_config: Optional[TimeoutConfig] = None, _skip_load: bool = False):
         self.service = None
         self.base_url = None
@@ -29,40 +30,39 @@ class NubefactConfig:
             self._load_sync()
 
     def _load_sync(self) -> None:
-        """Carga síncrona desde BD."""
+        """Carga síncrona (registro en memoria, BD si no está memorizado)."""
         try:
-            self.service = ApiService.objects.get(name="NUBEFACT Perú")
-            self.base_url = getattr(self.service, 'base_url', 'https://api.nubefact.com').rstrip('/')
-            raw_token = getattr(self.service, 'auth_token', '')
-            # Sanitizar token: eliminar espacios, saltos de línea y caracteres invisibles
-            self.auth_token = raw_token.strip().replace('\n', '').replace('\r', '')
-            if not self.base_url:
-                raise ValueError("URL base no configurada para NUBEFACT Perú")
-            if not self.auth_token:
-                raise ValueError("Token no configurado para NUBEFACT Perú")
-        except ApiService.DoesNotExist:
-            raise ValueError("Servicio NUBEFACT Perú no existe en la base de datos")
+            self._apply_service(
+                get_service_registry().get_service(name=self.SERVICE_NAME)
+            )
         except Exception as e:
             logger.error(f"Error cargando configuración: {e}")
             raise
 
     async def load_async(self) -> None:
-        """Carga asíncrona desde BD."""
+        """Carga asíncrona (sin salto a thread si el servicio ya está memorizado)."""
         try:
-            self.service = await sync_to_async(ApiService.objects.get)(name="NUBEFACT Perú")
-            self.base_url = getattr(self.service, 'base_url', 'https://api.nubefact.com').rstrip('/')
-            raw_token = getattr(self.service, 'auth_token', '')
-            self.auth_token = raw_token.strip().replace('\n', '').replace('\r', '')
-            if not self.base_url:
-                raise ValueError("URL base no configurada para NUBEFACT Perú")
-            if not self.auth_token:
-                raise ValueError("Token no configurado para NUBEFACT Perú")
-        except ApiService.DoesNotExist:
-            raise ValueError("Servicio NUBEFACT Perú no existe en la base de datos")
+            self._apply_service(
+                await get_service_registry().aget_service(name=self.SERVICE_NAME)
+            )
         except Exception as e:
             logger.error(f"Error cargando configuración asíncrona: {e}")
             raise
 
+    def _apply_service(self, service) -> None:
+        """Toma URL y token del ApiService y valida que estén configurados."""
+        if service is None:
+            raise ValueError("Servicio NUBEFACT Perú no existe en la base de datos")
+        self.service = service
+        self.base_url = getattr(self.service, 'base_url', 'https://api.nubefact.com').rstrip('/')
+        raw_token = getattr(self.service, 'auth_token', '')
+        # Sanitizar token: eliminar espacios, saltos de línea y caracteres invisibles
+        self.auth_token = raw_token.strip().replace('\n', '').replace('\r', '')
+        if not self.base_url:
+            raise ValueError("URL base no configurada para NUBEFACT Perú")
+        if not self.auth_token:
+            raise ValueError("Token no configurado para NUBEFACT Perú")
+
     @classmethod
     async def create(cls, timeout_config: Optional[TimeoutConfig] = None):
         """Factory asíncrono."""
@@ -1,17 +1,53 @@
 """
 Módulo de logging para API calls.
 Proporciona funciones para guardar logs en ApiCallLog de forma síncrona y asíncrona.
+
+Los registros se encolan en el sink compartido (base/log_sink.py), que los
+escribe en lote; los IDs de servicio y endpoint se resuelven una vez por proceso.
 """
 
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, Any
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 
-from api_service.models import ApiCallLog, ApiService, ApiEndpoint, ApiBatchRequest
+from api_service.models import ApiBatchRequest
+from api_service.services.base.log_sink import get_log_sink
 
 logger = logging.getLogger(__name__)
 
+NUBEFACT_SERVICE_NAME = "NUBEFACT Perú"
+
+
+def _build_log_fields(
+    service_id: int,
+    endpoint_id: int,
+    status_code: int,
+    duration_ms: int,
+    request_data: Optional[Dict],
+    response_data: Optional[Dict],
+    called_from: str,
+    batch_request: Optional[ApiBatchRequest],
+) -> Dict[str, Any]:
+    is_success = 200 <= status_code < 300
+    error_message = None
+    if not is_success and response_data:
+        error_message = response_data.get("error") or response_data.get("errors")
+
+    return {
+        "service_id": service_id,
+        "endpoint_id": endpoint_id,
+        "response_code": status_code,
+        "duration_ms": duration_ms,
+        "request_data": request_data,
+        "response_data": response_data,
+        "called_from": called_from,
+        "batch_request": batch_request,
+        "status": "SUCCESS" if is_success else "FAILED",
+        "error_message": error_message,
+        "created_at": timezone.now(),
+    }
+
 
 async def save_api_log_async(
     endpoint_name: str,
@@ -24,36 +60,40 @@ async def save_api_log_async(
 ) -> None:
     """
     Guarda un log de API de manera asíncrona.
+
+    Con el sink en modo buffer y los IDs ya resueltos, encola sin salir del
+    event loop; en otro caso delega en save_api_log_sync en un hilo.
     """
     try:
-        service = await sync_to_async(ApiService.objects.get)(name="NUBEFACT Perú")
-        endpoint = await sync_to_async(ApiEndpoint.objects.get)(
-            service=service, name=endpoint_name
+        sink = get_log_sink()
+        service_id, endpoint_id = sink.cached_ids(
+            NUBEFACT_SERVICE_NAME, endpoint_name
         )
+        if sink.buffered and endpoint_id is not None:
+            sink.enqueue(
+                **_build_log_fields(
+                    service_id,
+                    endpoint_id,
+                    status_code,
+                    duration_ms,
+                    request_data,
+                    response_data,
+                    called_from,
+                    batch_request,
+                )
+            )
+            logger.debug(f"Log encolado para {endpoint_name} - status: {status_code}")
+            return
 
-        is_success = 200 <= status_code < 300
-        error_message = None
-        if not is_success and response_data:
-            error_message = response_data.get("error") or response_data.get("errors")
-
-        await sync_to_async(ApiCallLog.objects.create)(
-            service=service,
-            endpoint=endpoint,
-            response_code=status_code,
+        await sync_to_async(save_api_log_sync)(
+            endpoint_name=endpoint_name,
+            status_code=status_code,
             duration_ms=duration_ms,
             request_data=request_data,
             response_data=response_data,
             called_from=called_from,
             batch_request=batch_request,
-            status="SUCCESS" if is_success else "FAILED",
-            error_message=error_message,
-            created_at=timezone.now(),
         )
-        logger.debug(f"Log guardado para {endpoint_name} - status: {status_code}")
-    except ApiService.DoesNotExist:
-        logger.error("Servicio NUBEFACT Perú no encontrado en BD")
-    except ApiEndpoint.DoesNotExist:
-        logger.error(f"Endpoint '{endpoint_name}' no encontrado en BD")
     except Exception as e:
         logger.error(f"Error guardando log: {e}", exc_info=True)
 
@@ -71,27 +111,28 @@ def save_api_log_sync(
     Guarda un log de API de manera síncrona.
     """
     try:
-        service = ApiService.objects.get(name="NUBEFACT Perú")
-        endpoint = ApiEndpoint.objects.get(service=service, name=endpoint_name)
+        sink = get_log_sink()
+        service_id = sink.service_id(NUBEFACT_SERVICE_NAME)
+        if service_id is None:
+            logger.error(f"Servicio {NUBEFACT_SERVICE_NAME} no encontrado en BD")
+            return
+        endpoint_id = sink.endpoint_id(service_id, endpoint_name)
+        if endpoint_id is None:
+            logger.error(f"Endpoint '{endpoint_name}' no encontrado en BD")
+            return
 
-        is_success = 200 <= status_code < 300
-        error_message = None
-        if not is_success and response_data:
-            error_message = response_data.get("error") or response_data.get("errors")
-
-        ApiCallLog.objects.create(
-            service=service,
-            endpoint=endpoint,
-            response_code=status_code,
-            duration_ms=duration_ms,
-            request_data=request_data,
-            response_data=response_data,
-            called_from=called_from,
-            batch_request=batch_request,
-            status="SUCCESS" if is_success else "FAILED",
-            error_message=error_message,
-            created_at=timezone.now(),
+        sink.enqueue(
+            **_build_log_fields(
+                service_id,
+                endpoint_id,
+                status_code,
+                duration_ms,
+                request_data,
+                response_data,
+                called_from,
+                batch_request,
+            )
         )
         logger.debug(f"Log guardado para {endpoint_name} - status: {status_code}")
     except Exception as e:
-        logger.error(f"Error guardando log síncrono: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Error guardando log síncrono: {e}", exc_info=True)
@@ -15,6 +15,7 @@ from .logging import save_api_log_sync
 from ..base import (
     TimeoutConfig,
     RateLimitManager,
+    get_http_pool,
     validate_and_format_token
 )
 
@@ -56,20 +57,21 @@ class NubefactService(BaseAPIService):
         # Rate limiting
         self.rate_limiter = RateLimitManager(self.service)
         
-        # Cliente HTTP
-        self.session = requests.Session()
+        # Cliente HTTP: sesión compartida por el proceso (keep-alive)
         self.timeout_config = timeout_config or TimeoutConfig.from_settings("NUBEFACT")
+        self.session = get_http_pool().get_session("NUBEFACT", self.timeout_config)
         self._configure_session()
 
     def _configure_session(self):
-        """Configura la sesión HTTP con headers y timeout validados."""
+        """Prepara los headers validados que se envían en cada petición."""
         try:
             token = validate_and_format_token(self.auth_token, "NubeFact")
-            self.session.headers.update({
+            # Headers por petición: la sesión es compartida, no se modifica
+            self.headers = {
                 "Authorization": token,
                 "Content-Type": "application/json",
                 "Accept": "application/json",
-            })
+            }
             logger.debug(f"Sesión HTTP configurada con timeout {self.timeout_config}")
         except ValueError as e:
             logger.error(f"Error configurando sesión: {str(e)}")
@@ -210,6 +212,7 @@ class NubefactService(BaseAPIService):
             response = self.session.post(
                 url, 
                 json=validated_data, 
+                headers=self.headers,
                 timeout=endpoint.timeout or self.timeout_config.as_tuple
             )
 
@@ -287,17 +290,11 @@ class NubefactService(BaseAPIService):
 
     # ===== CONTEXT MANAGER =====
     
-    def __del__(self):
-        """Cierra la sesión al destruir el objeto (fallback)."""
-        if hasattr(self, "session"):
-            try:
-                self.session.close()
-            except Exception:
-                pass
+    # La sesión pertenece al pool del proceso (get_http_pool): no se cierra
+    # al salir del context manager para conservar las conexiones abiertas.
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.session.close()
         return False
\ No newline at end of file
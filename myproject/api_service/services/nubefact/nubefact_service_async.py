@@ -22,6 +22,8 @@ from .config import NubefactConfig
 from ..base import (
     TimeoutConfig,
     RateLimitManager,
+    get_http_pool,
+    get_service_registry,
     validate_and_format_token
 )
 
@@ -77,9 +79,9 @@ class NubefactServiceAsync(ABC):
     def _load_config_sync(self):
         """Sincrónico - se ejecuta en thread pool."""
         try:
-            service = ApiService.objects.filter(
-                service_type=self.service_type, is_active=True
-            ).first()
+            service = get_service_registry().get_service(
+                self.service_type, active_only=True
+            )
             if service:
                 logger.info(
                     f"Configuración cargada para {self.service_type}: {service.base_url}"
@@ -123,14 +125,10 @@ class NubefactServiceAsync(ABC):
 
 
     async def _ensure_client(self) -> httpx.AsyncClient:
-        """Asegura que exista un cliente HTTP configurado."""
+        """Asegura que exista un cliente HTTP (compartido, del pool del proceso)."""
         if not hasattr(self, '_client') or self._client is None:
-            limits = httpx.Limits(max_keepalive_connections=10, max_connections=100)
-            
-            self._client = httpx.AsyncClient(
-                timeout=self.timeout_config.httpx_timeout,
-                limits=limits,
-                verify=True
+            self._client = get_http_pool().get_async_client(
+                "NUBEFACT", getattr(self, "timeout_config", None)
             )
         return self._client
     
@@ -138,9 +136,7 @@ class NubefactServiceAsync(ABC):
         """Sincrónico - se ejecuta en thread pool."""
         if not self.service:
             return None
-        return ApiEndpoint.objects.filter(
-            service=self.service, name=endpoint_name
-        ).first()
+        return get_service_registry().get_endpoint(self.service, endpoint_name)
 
     def _get_caller_info(self):
         """Obtiene información del caller de forma segura"""
@@ -413,5 +409,5 @@ class NubefactServiceAsync(ABC):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        if self._client is not None:
-            await self._client.aclose()
+        # El cliente pertenece al pool del proceso: solo se suelta la referencia
+        self._client = None
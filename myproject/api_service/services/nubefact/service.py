@@ -6,11 +6,11 @@ Utiliza NubefactHttpClient y logging separado.
 import logging
 import asyncio
 from typing import Optional, Dict, Any
-from asgiref.sync import sync_to_async
 
 from .config import NubefactConfig
 from .client import NubefactHttpClient
 from .logging import save_api_log_async
+from ..base.registry import get_service_registry
 from ..base.timeout_config import TimeoutConfig
 
 logger = logging.getLogger(__name__)
@@ -52,18 +52,20 @@ class NubefactServiceAsync:
             self._initialized = True
 
     async def _get_endpoint_path(self, name: str) -> str:
-        """Obtiene el path del endpoint, primero desde BD, luego desde defaults."""
+        """Obtiene el path del endpoint, primero desde BD (registro), luego desde defaults."""
+        endpoint = None
         try:
-            from api_service.models import ApiEndpoint
-            endpoint = await sync_to_async(ApiEndpoint.objects.get)(
-                service__name="NUBEFACT Perú", name=name
+            endpoint = await get_service_registry().aget_endpoint(
+                self.config.service, name
             )
+        except Exception as e:
+            logger.debug(f"No se pudo resolver endpoint {name}: {e}")
+        if endpoint is not None:
             return endpoint.path
-        except Exception:
-            # Si no está en BD, usar default
-            if name in self.DEFAULT_ENDPOINTS:
-                return self.DEFAULT_ENDPOINTS[name]["path"]
-            raise ValueError(f"Endpoint {name} no configurado")
+        # Si no está en BD, usar default
+        if name in self.DEFAULT_ENDPOINTS:
+            return self.DEFAULT_ENDPOINTS[name]["path"]
+        raise ValueError(f"Endpoint {name} no configurado")
 
     async def _call(
         self,
@@ -617,14 +617,14 @@ class TestContextManager:
         with nubefact_service as service:
             assert service is nubefact_service
 
-    def test_context_manager_exit_cierra_sesion(self, nubefact_service):
-        """Verifica que __exit__ cierra la sesión."""
+    def test_context_manager_exit_conserva_sesion_compartida(self, nubefact_service):
+        """Verifica que __exit__ no cierra la sesión compartida del pool."""
         nubefact_service.session.close = Mock()
 
         with nubefact_service:
             pass
 
-        nubefact_service.session.close.assert_called_once()
+        nubefact_service.session.close.assert_not_called()
 
 
 # ============================================================================
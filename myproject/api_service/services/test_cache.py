@@ -14,7 +14,7 @@ Requisitos:
     - pytest-django (opcional, pero conftest.py lo reemplaza)
 """
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 
 
@@ -320,6 +320,121 @@ def test_cache_error_handling(cache_service):
     print("=" * 70 + "\n")
 
 
+def test_cache_invalid_rucs_sharded_storage(cache_service):
+    """Test 13: Una clave por RUC inválido + índice por shards"""
+
+    print("\n✓ TEST 13: Almacenamiento por RUC de inválidos")
+
+    cache_service.clear_invalid_rucs()
+    rucs = [str(20400000000 + i) for i in range(20)]
+    for ruc in rucs:
+        cache_service.add_invalid_ruc(ruc, "NO_EXISTE_SUNAT")
+
+    # Cada RUC vive en su propia clave
+    key = cache_service.get_invalid_ruc_key(rucs[0])
+    assert cache_service.cache.get(key)["reason"] == "NO_EXISTE_SUNAT"
+    assert cache_service.get(cache_service.INVALID_RUCS_KEY) is None
+
+    # Remover uno no afecta al resto
+    cache_service.remove_invalid_ruc(rucs[0])
+    all_invalid = cache_service.get_all_invalid_rucs()
+    assert rucs[0] not in all_invalid
+    assert set(rucs[1:]) <= set(all_invalid)
+
+    # Las estadísticas salen del índice
+    breakdown = cache_service.count_invalid_rucs_by_reason()
+    assert breakdown.get("NO_EXISTE_SUNAT") == len(rucs) - 1
+
+    cache_service.clear_invalid_rucs()
+    assert cache_service.get_all_invalid_rucs() == {}
+    print("  SHARDED STORAGE: ✅")
+
+
+def test_cache_invalid_rucs_legacy_migration(cache_service):
+    """Test 14: Migración desde el dict único legado"""
+
+    print("\n✓ TEST 14: Migración de RUCs inválidos legados")
+
+    cache_service.clear_invalid_rucs()
+    now = datetime.now()
+    legacy = {
+        # Formato de APICacheService.add_invalid_ruc
+        "20500000001": {
+            "reason": "NO_EXISTE_SUNAT",
+            "added_at": now.isoformat(),
+            "ttl_hours": 24,
+            "expires_at": (now + timedelta(hours=1)).isoformat(),
+        },
+        # Formato de MigoAPIService._mark_ruc_as_invalid
+        "20500000002": {
+            "reason": "404_NOT_FOUND",
+            "timestamp": now.isoformat(),
+            "ttl_hours": 24,
+        },
+        # Expirado: se descarta
+        "20500000003": {
+            "reason": "NO_EXISTE_SUNAT",
+            "added_at": (now - timedelta(hours=30)).isoformat(),
+            "expires_at": (now - timedelta(hours=6)).isoformat(),
+        },
+    }
+    cache_service.set(cache_service.INVALID_RUCS_KEY, legacy, 3600)
+
+    migrated = cache_service.migrate_legacy_invalid_rucs()
+
+    assert migrated == 2
+    assert cache_service.is_ruc_invalid("20500000001")
+    assert cache_service.is_ruc_invalid("20500000002")
+    assert not cache_service.is_ruc_invalid("20500000003")
+    assert cache_service.get_invalid_ruc_info("20500000002")["added_at"]
+    assert cache_service.get(cache_service.INVALID_RUCS_KEY) is None
+
+    cache_service.clear_invalid_rucs()
+    print("  LEGACY MIGRATION: ✅")
+
+
+def test_cache_bulk_rucs(cache_service):
+    """Test 15: API masiva de RUCs (get_many/set_many/delete_many)"""
+
+    print("\n✓ TEST 15: API masiva de RUCs")
+
+    cache_service.clear_invalid_rucs()
+    data = {
+        "20100038146": {"success": True, "nombre_o_razon_social": "EMPRESA A"},
+        "20987654321": {"success": True, "nombre_o_razon_social": "EMPRESA B"},
+    }
+    assert cache_service.set_many_rucs(data) is True
+
+    # Misma clave que usa consultar_ruc
+    key = cache_service.get_service_cache_key("migo", "ruc_20100038146")
+    assert cache_service.get(key)["nombre_o_razon_social"] == "EMPRESA A"
+
+    found = cache_service.get_many_rucs(["20100038146", "20987654321", "20345678902"])
+    assert set(found) == {"20100038146", "20987654321"}
+
+    # Inválidos en bloque
+    marked = cache_service.mark_many_invalid(
+        {"20345678902": "NO_EXISTE_SUNAT", "20111111112": "404_NOT_FOUND"}
+    )
+    assert marked == 2
+    assert (
+        cache_service.get_invalid_ruc_info("20111111112")["reason"] == "404_NOT_FOUND"
+    )
+
+    particion = cache_service.partition_rucs(
+        ["20100038146", "20345678902", "20222222223", "20987654321"]
+    )
+    assert set(particion["cached"]) == {"20100038146", "20987654321"}
+    assert set(particion["invalid"]) == {"20345678902"}
+    assert particion["missing"] == ["20222222223"]
+
+    cache_service.remove_many_invalid(["20345678902", "20111111112"])
+    cache_service.delete_many_rucs(list(data))
+    assert cache_service.get_many_rucs(list(data)) == {}
+    assert cache_service.get_all_invalid_rucs() == {}
+    print("  BULK RUCS: ✅")
+
+
 if __name__ == "__main__":
     try:
         test_cache_service()
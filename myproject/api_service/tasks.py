@@ -5,7 +5,7 @@ from celery.result import allow_join_result
 from django.db import transaction
 from django.utils import timezone
 from .models import ApiBatchRequest, ApiService, ApiCallLog
-from .services.migo_service import MigoAPIClient
+from .services.migo.migo_service import MigoAPIService
 import logging
 import json
 
@@ -16,7 +16,7 @@ logger = logging.getLogger(__name__)
 def consultar_ruc_task(self, ruc, retry_count=0):
     """Tarea asíncrona para consultar RUC con reintentos automáticos"""
     try:
-        client = MigoAPIClient()
+        client = MigoAPIService()
         result = client.consultar_ruc(ruc)
         return result
 
@@ -40,7 +40,7 @@ def consultar_ruc_task(self, ruc, retry_count=0):
 @shared_task
 def procesar_batch_ruc(ruc_list):
     """Procesa un batch de RUCs respetando rate limiting"""
-    client = MigoAPIClient()
+    client = MigoAPIService()
     results = []
 
     for ruc in ruc_list:
@@ -179,7 +179,7 @@ def procesar_validacion_masiva_ruc(
 def procesar_lote_ruc(self, lote, batch_id=None, lote_numero=1):
     """Procesa un lote de hasta 100 RUCs"""
     try:
-        client = MigoAPIClient()
+        client = MigoAPIService()
 
         # Usar consulta masiva para el lote completo
         resultado = client.consultar_ruc_masivo(lote, batch_id)
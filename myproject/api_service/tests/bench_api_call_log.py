@@ -0,0 +1,143 @@
+# bench_api_call_log.py
+"""
+Prueba de carga del registro de llamadas API (ApiCallLog).
+
+- Ejecuta `MigoAPIService.consultar_ruc(force_refresh=True)` repetidamente
+  contra una respuesta HTTP simulada (latencia fija configurable), de modo
+  que la diferencia entre modos sea solo el costo del log.
+- Compara escritura directa (`ApiCallLog.objects.create` por llamada) contra
+  el sink en buffer (`bulk_create` en segundo plano).
+- Reporta p50/p95/p99 de latencia por llamada y guarda el resumen en
+  `bench_api_call_log_results.json`.
+
+USO:
+    python api_service/tests/bench_api_call_log.py --calls 2000
+    python api_service/tests/bench_api_call_log.py --calls 5000 --latency-ms 5
+
+Nota: Usa el servicio MIGO configurado en BD. Los registros creados por la
+prueba se eliminan al final.
+"""
+
+import os
+import sys
+import django
+import time
+import json
+import argparse
+import statistics
+from unittest.mock import patch
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from django.utils import timezone
+
+from api_service.models import ApiCallLog
+from api_service.services.base import log_sink
+from api_service.services.base.log_sink import ApiCallLogSink
+from api_service.services.migo.migo_service import MigoAPIService
+
+DEFAULT_CALLS = 1000
+DEFAULT_LATENCY_MS = 2.0
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, ruc):
+        self._data = {
+            "success": True,
+            "ruc": ruc,
+            "nombre_o_razon_social": "EMPRESA DE PRUEBA S.A.C.",
+            "estado_del_contribuyente": "ACTIVO",
+            "condicion_de_domicilio": "HABIDO",
+        }
+
+    def json(self):
+        return dict(self._data)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(buffered, calls, latency_s):
+    """Ejecuta `calls` consultas con el sink en el modo indicado."""
+    sink = ApiCallLogSink(buffered=buffered)
+    log_sink._sink = sink
+
+    def fake_post(url, json=None, **kwargs):
+        time.sleep(latency_s)
+        return _FakeResponse(json.get("ruc"))
+
+    service = MigoAPIService()
+    rucs = [str(20100000000 + i) for i in range(calls)]
+    latencies = []
+
+    # Sin rechazos por rate limit: solo se mide HTTP simulado + log
+    with patch.object(service.session, "post", side_effect=fake_post), patch.object(
+        service, "_check_rate_limit", return_value=(True, 0.0)
+    ):
+        for ruc in rucs:
+            start = time.perf_counter()
+            service.consultar_ruc(ruc, force_refresh=True, update_partner=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    flush_start = time.perf_counter()
+    sink.close()
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+
+    return {
+        "calls": calls,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "final_flush_ms": round(flush_ms, 1),
+        "sink_stats": dict(sink.stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de ApiCallLog")
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--output", default="bench_api_call_log_results.json")
+    args = parser.parse_args()
+
+    started_at = timezone.now()
+    results = {}
+    try:
+        for name, buffered in (("directo", False), ("buffer", True)):
+            print(f"▶ Modo {name}...")
+            results[name] = run_mode(buffered, args.calls, args.latency_ms / 1000)
+    finally:
+        deleted, _ = ApiCallLog.objects.filter(
+            created_at__gte=started_at, endpoint__name="consultar_ruc"
+        ).delete()
+        print(f"🧹 {deleted} registros de prueba eliminados")
+
+    print(
+        f"\n{'modo':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'flush final ms':>15}"
+    )
+    print("-" * 56)
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} "
+            f"{r['final_flush_ms']:>15}"
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# bench_invalid_rucs.py
+"""
+Benchmark del cache de RUCs inválidos.
+
+- Compara el formato legado (un único dict en `migo_invalid_rucs` que se lee,
+  modifica y reescribe en cada operación) contra el almacenamiento por RUC
+  con índice por shards de APICacheService.
+- Mide alta, verificación, listado completo y estadísticas.
+- Guarda el resumen en `bench_invalid_rucs_results.json`.
+
+USO:
+    python api_service/tests/bench_invalid_rucs.py --total 50000
+    python api_service/tests/bench_invalid_rucs.py --total 50000 --legacy-total 5000
+
+Nota: El formato legado es O(n²); por defecto se mide con menos RUCs
+(--legacy-total) y se reporta por operación para poder comparar.
+Usa el cache configurado en settings (CACHES["default"]) y lo limpia al final.
+"""
+
+import os
+import sys
+import django
+import time
+import json
+import argparse
+from datetime import datetime, timedelta
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from django.core.cache import cache
+
+from api_service.services.cache_service import APICacheService
+
+DEFAULT_TOTAL = 50000
+DEFAULT_LEGACY_TOTAL = 5000
+LEGACY_KEY = "bench_legacy_invalid_rucs"
+REASONS = ["NO_EXISTE_SUNAT", "404_NOT_FOUND", "FORMATO_INVALIDO"]
+
+
+def generate_rucs(total):
+    return [str(20000000000 + i) for i in range(total)]
+
+
+def _timed(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    elapsed = time.perf_counter() - start
+    return {
+        "ops": len(items),
+        "elapsed_s": round(elapsed, 4),
+        "us_per_op": round(elapsed / max(len(items), 1) * 1_000_000, 1),
+    }
+
+
+def bench_legacy(rucs):
+    """Reproduce el patrón anterior: leer-modificar-escribir el dict completo."""
+    cache.delete(LEGACY_KEY)
+
+    def add(ruc):
+        invalid_rucs = cache.get(LEGACY_KEY) or {}
+        invalid_rucs[ruc] = {
+            "reason": REASONS[int(ruc) % len(REASONS)],
+            "added_at": datetime.now().isoformat(),
+            "ttl_hours": 24,
+            "expires_at": (datetime.now() + timedelta(hours=24)).isoformat(),
+        }
+        cache.set(LEGACY_KEY, invalid_rucs, 86400)
+
+    def check(ruc):
+        return ruc in (cache.get(LEGACY_KEY) or {})
+
+    results = {"add": _timed(add, rucs), "is_invalid": _timed(check, rucs)}
+
+    start = time.perf_counter()
+    all_rucs = cache.get(LEGACY_KEY) or {}
+    results["get_all"] = {
+        "count": len(all_rucs),
+        "elapsed_s": round(time.perf_counter() - start, 4),
+    }
+    cache.delete(LEGACY_KEY)
+    return results
+
+
+def bench_sharded(service, rucs):
+    """Almacenamiento actual: una clave por RUC + índice compacto."""
+    service.clear_invalid_rucs()
+
+    results = {
+        "add": _timed(
+            lambda r: service.add_invalid_ruc(r, REASONS[int(r) % len(REASONS)]),
+            rucs,
+        ),
+        "is_invalid": _timed(service.is_ruc_invalid, rucs),
+    }
+
+    start = time.perf_counter()
+    all_rucs = service.get_all_invalid_rucs()
+    results["get_all"] = {
+        "count": len(all_rucs),
+        "elapsed_s": round(time.perf_counter() - start, 4),
+    }
+
+    start = time.perf_counter()
+    stats = service.get_cache_stats()
+    results["stats"] = {
+        "count": stats["invalid_rucs"]["total_count"],
+        "elapsed_s": round(time.perf_counter() - start, 4),
+    }
+
+    service.clear_invalid_rucs()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de RUCs inválidos")
+    parser.add_argument("--total", type=int, default=DEFAULT_TOTAL)
+    parser.add_argument("--legacy-total", type=int, default=DEFAULT_LEGACY_TOTAL)
+    parser.add_argument("--output", default="bench_invalid_rucs_results.json")
+    args = parser.parse_args()
+
+    service = APICacheService()
+    print(f"Backend de cache: {service.backend}")
+
+    results = {
+        "legacy": bench_legacy(generate_rucs(args.legacy_total)),
+        "sharded": bench_sharded(service, generate_rucs(args.total)),
+    }
+
+    print(
+        f"\n{'formato':<10} {'RUCs':>8} {'alta µs/op':>12} {'check µs/op':>12} {'listado s':>10}"
+    )
+    print("-" * 56)
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['add']['ops']:>8} {r['add']['us_per_op']:>12} "
+            f"{r['is_invalid']['us_per_op']:>12} {r['get_all']['elapsed_s']:>10}"
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench_rate_limit.py
+"""
+Benchmark del rate limiting de APIs externas.
+
+- Compara el flujo legado (get_for_service_endpoint + can_make_request +
+  increment_count sobre ApiRateLimit) contra cada backend de RateLimitManager.
+- Reporta consultas SQL por llamada y llamadas por segundo.
+- Guarda el resumen en `bench_rate_limit_results.json`.
+
+USO:
+    python api_service/tests/bench_rate_limit.py --calls 2000
+    python api_service/tests/bench_rate_limit.py --backends memory cache
+
+Nota: Usa el servicio MIGO configurado en BD y su endpoint `consultar_ruc`.
+El límite se eleva temporalmente en memoria para que ninguna llamada sea
+rechazada y se mida solo el costo de la verificación.
+"""
+
+import os
+import sys
+import django
+import time
+import json
+import argparse
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api_service.models import ApiService, ApiEndpoint, ApiRateLimit
+from api_service.services.base import RateLimitManager, get_rate_limit_backend
+
+DEFAULT_CALLS = 1000
+DEFAULT_ENDPOINT = "consultar_ruc"
+BENCH_LIMIT = 10_000_000
+
+
+def bench_legacy(service, endpoint_name, calls):
+    """Flujo anterior: 2x(endpoint + get_or_create) + save() por llamada."""
+
+    def one_call():
+        for step in ("check", "update"):
+            endpoint = ApiEndpoint.objects.filter(
+                service=service, name=endpoint_name
+            ).first()
+            rate_limit, _ = ApiRateLimit.get_for_service_endpoint(service, endpoint)
+            if step == "check":
+                rate_limit.can_make_request()
+            else:
+                rate_limit.increment_count()
+
+    return _run(one_call, calls)
+
+
+def bench_backend(service, endpoint_name, calls, backend_name):
+    """Flujo nuevo: RateLimitManager con el backend indicado."""
+    manager = RateLimitManager(service, backend=get_rate_limit_backend(backend_name))
+    manager.check_rate_limit_sync(endpoint_name)  # resolver scope
+    scope = manager._scopes.get(endpoint_name)
+    if scope is not None:
+        # Evitar rechazos durante la medición
+        manager._scopes[endpoint_name] = scope.__class__(
+            key=f"bench:{scope.key}",
+            limit=BENCH_LIMIT,
+            window_seconds=scope.window_seconds,
+            service_id=scope.service_id,
+            endpoint_id=scope.endpoint_id,
+        )
+
+    def one_call():
+        manager.check_rate_limit_sync(endpoint_name)
+        manager.update_rate_limit_sync(endpoint_name)
+
+    return _run(one_call, calls)
+
+
+def _run(fn, calls):
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "calls": calls,
+        "elapsed_s": round(elapsed, 4),
+        "calls_per_s": round(calls / elapsed, 1) if elapsed else None,
+        "queries_total": len(ctx.captured_queries),
+        "queries_per_call": round(len(ctx.captured_queries) / calls, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de rate limiting")
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS)
+    parser.add_argument("--endpoint", default=DEFAULT_ENDPOINT)
+    parser.add_argument(
+        "--backends", nargs="+", default=["memory", "cache", "database"]
+    )
+    parser.add_argument("--output", default="bench_rate_limit_results.json")
+    args = parser.parse_args()
+
+    service = ApiService.objects.filter(service_type="MIGO").first()
+    if not service:
+        print("❌ Servicio MIGO no configurado")
+        sys.exit(1)
+
+    results = {"legacy": bench_legacy(service, args.endpoint, args.calls)}
+
+    for name in args.backends:
+        results[name] = bench_backend(service, args.endpoint, args.calls, name)
+
+    print(f"\n{'flujo':<10} {'llamadas/s':>12} {'queries/llamada':>16}")
+    print("-" * 40)
+    for name, r in results.items():
+        print(f"{name:<10} {r['calls_per_s']:>12} {r['queries_per_call']:>16}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bench_registry.py
+"""
+Benchmark de consultas SQL por llamada a `consultar_ruc`.
+
+- "antes": registro de servicios sin cache (TTL 0), equivalente a leer
+  ApiService/ApiEndpoint de la BD en cada instancia y en cada llamada.
+- "despues": registro con cache ya caliente.
+- Cuenta las consultas de instanciar MigoAPIService + una llamada a
+  `consultar_ruc(force_refresh=True)` con la respuesta HTTP simulada, y las
+  agrupa por tabla.
+- Guarda el resumen en `bench_registry_results.json`.
+
+USO:
+    python api_service/tests/bench_registry.py
+    python api_service/tests/bench_registry.py --ruc 20100038146
+
+Nota: Usa el servicio MIGO configurado en BD. El log de la llamada se escribe
+en el momento (sink sin buffer) en ambos escenarios; los registros creados
+se eliminan al final.
+"""
+
+import os
+import sys
+import django
+import json
+import argparse
+from collections import Counter
+from unittest.mock import patch
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api_service.models import ApiCallLog
+from api_service.services.base import log_sink, registry
+from api_service.services.base.log_sink import ApiCallLogSink
+from api_service.services.base.registry import ServiceRegistry
+from api_service.services.migo.migo_service import MigoAPIService
+
+DEFAULT_RUC = "20100038146"
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, ruc):
+        self._data = {
+            "success": True,
+            "ruc": ruc,
+            "estado_del_contribuyente": "ACTIVO",
+        }
+
+    def json(self):
+        return dict(self._data)
+
+
+def _table(sql):
+    for keyword in ("FROM", "INTO", "UPDATE"):
+        marker = f"{keyword} "
+        if marker in sql:
+            return sql.split(marker, 1)[1].split()[0].strip('"`')
+    return sql.split()[0]
+
+
+def one_call(ruc):
+    """Instancia el servicio y consulta un RUC; devuelve las consultas SQL."""
+    with patch(
+        "requests.Session.post",
+        side_effect=lambda url, json=None, **kw: _FakeResponse(json.get("ruc")),
+    ), CaptureQueriesContext(connection) as ctx:
+        service = MigoAPIService()
+        service.consultar_ruc(ruc, force_refresh=True, update_partner=False)
+
+    tables = Counter(_table(q["sql"]) for q in ctx.captured_queries)
+    return {"queries": len(ctx.captured_queries), "por_tabla": dict(tables)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas SQL por consultar_ruc")
+    parser.add_argument("--ruc", default=DEFAULT_RUC)
+    parser.add_argument("--output", default="bench_registry_results.json")
+    args = parser.parse_args()
+
+    started_at = timezone.now()
+    log_sink._sink = ApiCallLogSink(buffered=False)
+    results = {}
+    try:
+        registry._registry = ServiceRegistry(ttl=0)
+        results["antes"] = one_call(args.ruc)
+
+        registry._registry = ServiceRegistry(ttl=300)
+        one_call(args.ruc)  # calentar el registro
+        results["despues"] = one_call(args.ruc)
+    finally:
+        ApiCallLog.objects.filter(
+            created_at__gte=started_at, request_data__ruc=args.ruc
+        ).delete()
+
+    print(f"\n{'escenario':<10} {'queries':>8}  detalle")
+    print("-" * 60)
+    for name, r in results.items():
+        print(f"{name:<10} {r['queries']:>8}  {r['por_tabla']}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# stress_migo_async.py
+"""
+Stress test de MigoAPIServiceAsync contra un servidor Migo simulado local.
+
+- Levanta un servidor HTTP en 127.0.0.1 que responde `consultar_ruc` con
+  una latencia fija (--latency-ms), sin tocar la API real.
+- Usa el servicio MIGO configurado en BD (endpoints, log, partners, cache)
+  apuntando su base_url al servidor simulado; el rate limit se desactiva
+  para medir solo el camino de E/S.
+- Para cada nivel de concurrencia (1, 2, 4, ... 64) consulta --per-level
+  RUCs con `force_refresh=True` y mide throughput, latencia p50/p95 y el
+  retraso máximo del event loop (un ticker cada 10 ms). Si el ORM o el
+  cache bloquearan el loop, el throughput se estanca y el retraso crece.
+- Guarda el resumen en `stress_migo_async_results.json`.
+
+USO:
+    python api_service/tests/stress_migo_async.py
+    python api_service/tests/stress_migo_async.py --latency-ms 100 --per-level 256
+    python api_service/tests/stress_migo_async.py --max-concurrency 32
+
+Nota: Los ApiCallLog creados durante la prueba se eliminan al final.
+"""
+
+import os
+import sys
+import django
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from django.utils import timezone
+
+from api_service.models import ApiCallLog
+from api_service.services.base import get_log_sink
+from api_service.services.migo.migo_service_async import MigoAPIServiceAsync
+
+
+class _FakeMigoHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+
+        payload = json.dumps(
+            {
+                "success": True,
+                "ruc": body.get("ruc"),
+                "nombre_o_razon_social": "EMPRESA SIMULADA S.A.C.",
+                "estado_del_contribuyente": "ACTIVO",
+                "condicion_de_domicilio": "HABIDO",
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_server(latency_ms):
+    """Servidor Migo simulado en un hilo; devuelve (server, base_url)."""
+    _FakeMigoHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeMigoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def random_ruc():
+    return "20" + "".join(random.choices("0123456789", k=9))
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def _loop_lag(stop, interval=0.01):
+    """Retraso máximo (ms) observado por un ticker del event loop."""
+    max_lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - started - interval)
+    return max_lag * 1000
+
+
+async def run_level(service, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(ruc):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            result = await service.consultar_ruc_async(ruc, force_refresh=True)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not result.get("success"):
+                errors += 1
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(random_ruc()) for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "max_loop_lag_ms": round(await lag_task, 2),
+    }
+
+
+async def run_stress(base_url, per_level, max_concurrency):
+    results = []
+    async with MigoAPIServiceAsync(call_super=True) as service:
+        service.base_url = base_url
+        # Medir solo E/S: sin límite de peticiones por minuto
+        service.rate_limiter.backend.acquire = lambda scope: (True, 0.0)
+
+        concurrency = 1
+        while concurrency <= max_concurrency:
+            results.append(await run_level(service, concurrency, per_level))
+            concurrency *= 2
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress de MigoAPIServiceAsync")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--per-level", type=int, default=128)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--output", default="stress_migo_async_results.json")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.latency_ms)
+    started_at = timezone.now()
+    try:
+        results = asyncio.run(
+            run_stress(base_url, args.per_level, args.max_concurrency)
+        )
+        get_log_sink().flush()
+    finally:
+        server.shutdown()
+        ApiCallLog.objects.filter(
+            created_at__gte=started_at, endpoint__name="consultar_ruc"
+        ).delete()
+
+    print(
+        f"\n{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'lag ms':>8} {'errores':>8}"
+    )
+    print("-" * 52)
+    for r in results:
+        print(
+            f"{r['concurrency']:>5} {r['rps']:>8} {r['p50_ms']:>8} "
+            f"{r['p95_ms']:>8} {r['max_loop_lag_ms']:>8} {r['errors']:>8}"
+        )
+
+    output = {"latency_ms": args.latency_ms, "levels": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# api_service/tests/test_http_pool.py
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from api_service.services.base import (
+    HttpClientPool,
+    HttpPoolLifespan,
+    TimeoutConfig,
+)
+from api_service.services.base import http_pool as http_pool_module
+
+
+class TestHttpClientPoolSync:
+    """Sesiones y clientes síncronos - NO necesita BD"""
+
+    def test_session_is_shared_per_service(self):
+        pool = HttpClientPool()
+        session = pool.get_session("MIGO", TimeoutConfig(max_connections=7))
+
+        assert pool.get_session("MIGO") is session
+        assert pool.get_session("NUBEFACT") is not session
+        assert session.get_adapter("https://api.example.com")._pool_maxsize == 7
+        pool.close()
+
+    def test_sync_client_uses_timeout_config_limits(self):
+        pool = HttpClientPool(http2=False)
+        config = TimeoutConfig(max_connections=12, max_keepalive_connections=3)
+        client = pool.get_sync_client("NUBEFACT", config)
+
+        assert pool.get_sync_client("NUBEFACT") is client
+        pool.close()
+        assert client.is_closed
+
+    def test_different_timeout_config_gets_its_own_client(self):
+        pool = HttpClientPool(http2=False)
+        default = pool.get_sync_client("NUBEFACT")
+        slow = pool.get_sync_client("NUBEFACT", TimeoutConfig(read_timeout=90.0))
+
+        assert slow is not default
+        assert slow.timeout.read == 90.0
+        assert (
+            pool.get_sync_client("NUBEFACT", TimeoutConfig(read_timeout=90.0)) is slow
+        )
+        assert pool.get_sync_client("NUBEFACT") is default
+        pool.close()
+        assert default.is_closed and slow.is_closed
+
+    def test_session_only_keyed_by_pool_size(self):
+        pool = HttpClientPool()
+        session = pool.get_session("NUBEFACT", TimeoutConfig(read_timeout=5.0))
+
+        # El timeout se pasa en cada petición: misma sesión
+        assert pool.get_session("NUBEFACT", TimeoutConfig(read_timeout=60.0)) is session
+        assert (
+            pool.get_session("NUBEFACT", TimeoutConfig(max_connections=3))
+            is not session
+        )
+        pool.close()
+
+    def test_fork_discards_inherited_clients(self):
+        pool = HttpClientPool()
+        session = pool.get_session("MIGO")
+        with patch.object(http_pool_module.os, "getpid", return_value=-1):
+            assert pool.get_session("MIGO") is not session
+        pool.close()
+
+    def test_http2_requires_h2(self):
+        with patch.object(http_pool_module, "http2_available", return_value=False):
+            assert HttpClientPool(http2=True).http2 is False
+
+
+class TestHttpClientPoolAsync:
+    """Clientes async por event loop"""
+
+    @pytest.mark.asyncio
+    async def test_async_client_reused_in_same_loop(self):
+        pool = HttpClientPool(http2=False)
+        client = pool.get_async_client("MIGO")
+
+        assert pool.get_async_client("MIGO") is client
+        assert pool.stats == {"created": 1, "reused": 1}
+
+        await pool.aclose()
+        assert client.is_closed
+        assert pool.get_async_client("MIGO") is not client
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_async_client_per_timeout_config(self):
+        pool = HttpClientPool(http2=False)
+        client = pool.get_async_client("NUBEFACT", TimeoutConfig(read_timeout=15.0))
+        other = pool.get_async_client("NUBEFACT", TimeoutConfig(read_timeout=45.0))
+
+        assert other is not client
+        assert (client.timeout.read, other.timeout.read) == (15.0, 45.0)
+        assert pool.get_async_client("NUBEFACT") is client
+
+        await pool.aclose()
+        assert client.is_closed and other.is_closed
+
+    @pytest.mark.asyncio
+    async def test_lifespan_closes_pool_on_shutdown(self):
+        app = AsyncMock()
+        lifespan = HttpPoolLifespan(app)
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        with patch.object(
+            http_pool_module, "aclose_http_pool", AsyncMock()
+        ) as mock_aclose:
+            await lifespan({"type": "lifespan"}, receive, send)
+
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        mock_aclose.assert_awaited_once()
+        app.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_lifespan_forwards_http(self):
+        app = AsyncMock()
+        await HttpPoolLifespan(app)({"type": "http"}, None, None)
+        app.assert_awaited_once()
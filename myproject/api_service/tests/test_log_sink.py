@@ -0,0 +1,141 @@
+# api_service/tests/test_log_sink.py
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api_service.models import ApiCallLog, ApiEndpoint, ApiService
+from api_service.services.base import ApiCallLogSink, ServiceRegistry
+
+
+@pytest.fixture
+def service_endpoint(db):
+    service = ApiService.objects.create(
+        name="Servicio Log Sink",
+        service_type="MIGO",
+        base_url="https://api.example.com",
+        auth_token="token",
+    )
+    endpoint = ApiEndpoint.objects.create(
+        service=service, name="consultar_ruc", path="/ruc"
+    )
+    return service, endpoint
+
+
+def _sink(**kwargs):
+    kwargs.setdefault("buffered", True)
+    sink = ApiCallLogSink(**kwargs)
+    # Sin hilo de fondo: los tests vacían el buffer explícitamente
+    sink._ensure_thread = lambda: None
+    return sink
+
+
+def _fields(service, endpoint, **extra):
+    return {
+        "service_id": service.pk,
+        "endpoint_id": endpoint.pk,
+        "status": "SUCCESS",
+        "request_data": {"ruc": "20100038146"},
+        "response_data": {"success": True},
+        "duration_ms": 12,
+        **extra,
+    }
+
+
+class TestApiCallLogSinkBuffer:
+    """Tests del buffer en memoria - NO necesita BD"""
+
+    def test_overflow_drops_oldest(self):
+        sink = _sink(max_size=3, batch_size=100)
+        for i in range(5):
+            sink.enqueue(status="SUCCESS", duration_ms=i)
+
+        assert sink.pending() == 3
+        assert sink.stats["dropped"] == 2
+        assert [f["duration_ms"] for f in sink._buffer] == [2, 3, 4]
+
+    def test_batch_size_wakes_flusher(self):
+        sink = _sink(batch_size=2)
+        sink.enqueue(status="SUCCESS")
+        assert not sink._wakeup.is_set()
+        sink.enqueue(status="SUCCESS")
+        assert sink._wakeup.is_set()
+
+    def test_enqueue_copies_payload(self):
+        sink = _sink()
+        response = {"success": True}
+        sink.enqueue(status="SUCCESS", response_data=response)
+        response["mutado"] = True
+        assert "mutado" not in sink._buffer[0]["response_data"]
+
+
+@pytest.mark.django_db
+class TestApiCallLogSinkWrites:
+    """Escritura en BD"""
+
+    def test_flush_uses_bulk_insert(self, service_endpoint):
+        service, endpoint = service_endpoint
+        sink = _sink(batch_size=50)
+        for _ in range(120):
+            sink.enqueue(**_fields(service, endpoint))
+
+        assert ApiCallLog.objects.count() == 0
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert sink.flush() == 120
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        assert len(inserts) == 3
+        assert ApiCallLog.objects.filter(service=service).count() == 120
+        assert sink.pending() == 0
+
+    def test_keeps_call_timestamp(self, service_endpoint):
+        service, endpoint = service_endpoint
+        called_at = timezone.now() - timedelta(seconds=30)
+        sink = _sink()
+        sink.enqueue(**_fields(service, endpoint, created_at=called_at))
+        sink.flush()
+        assert ApiCallLog.objects.get().created_at == called_at
+
+    def test_unbuffered_writes_immediately(self, service_endpoint):
+        service, endpoint = service_endpoint
+        sink = _sink(buffered=False)
+        sink.enqueue(**_fields(service, endpoint))
+        assert ApiCallLog.objects.count() == 1
+        assert sink.pending() == 0
+
+    def test_close_flushes_pending(self, service_endpoint):
+        service, endpoint = service_endpoint
+        sink = _sink()
+        sink.enqueue(**_fields(service, endpoint))
+        sink.close()
+        assert ApiCallLog.objects.count() == 1
+
+    def test_failed_batch_is_counted(self, service_endpoint):
+        service, endpoint = service_endpoint
+        sink = _sink()
+        sink.enqueue(**_fields(service, endpoint))
+        with patch.object(
+            ApiCallLog.objects, "bulk_create", side_effect=Exception("BD caída")
+        ):
+            assert sink.flush() == 0
+        assert sink.stats["failed"] == 1
+
+    @patch("api_service.services.base.registry._registry", ServiceRegistry(ttl=60))
+    def test_endpoint_id_is_cached(self, service_endpoint):
+        service, endpoint = service_endpoint
+        sink = _sink()
+        assert sink.endpoint_id(service.pk, "consultar_ruc") == endpoint.pk
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert sink.endpoint_id(service.pk, "consultar_ruc") == endpoint.pk
+        assert len(ctx.captured_queries) == 0
+        assert sink.cached_ids(service.name, "consultar_ruc") == (None, None)
+        sink.service_id(service.name)
+        assert sink.cached_ids(service.name, "consultar_ruc") == (
+            service.pk,
+            endpoint.pk,
+        )
@@ -0,0 +1,98 @@
+# api_service/tests/test_migo_masivo_cache.py
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+
+from api_service.services.migo.migo_service import MigoAPIService
+
+RESPUESTA_MASIVA = {
+    "success": True,
+    "data": [
+        {"ruc": "20345678902", "success": True, "nombre_o_razon_social": "NUEVA"},
+        {"ruc": "20555555551", "success": False, "error": "No encontrado"},
+    ],
+}
+
+
+@pytest.fixture
+def migo_service(api_service_migo):
+    cache.clear()
+    yield MigoAPIService()
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestConsultaMasivaCacheFirst:
+    """RUCs en cache (válidos o inválidos) no viajan a Migo"""
+
+    def test_solo_consulta_los_faltantes(self, migo_service):
+        cache_service = migo_service.cache_service
+        cache_service.set_many_rucs(
+            {"20100038146": {"success": True, "nombre_o_razon_social": "EN CACHE"}}
+        )
+        cache_service.mark_many_invalid(["20987654321"], "NO_EXISTE_SUNAT")
+
+        with patch.object(
+            migo_service, "_make_request", return_value=RESPUESTA_MASIVA
+        ) as mock_request:
+            result = migo_service.consultar_ruc_masivo(
+                ["20100038146", "20987654321", "20345678902", "20555555551"],
+                update_partners=False,
+            )
+
+        # Una sola llamada, solo con los RUCs no cacheados
+        assert mock_request.call_count == 1
+        enviados = mock_request.call_args.kwargs["data"]["ruc"]
+        assert sorted(enviados) == ["20345678902", "20555555551"]
+
+        assert result["cache_hits"] == 2
+        assert result["cache_misses"] == 2
+        assert result["api_calls"] == 1
+        assert result["total_validos"] == 2
+        assert result["total_invalidos"] == 2
+
+    def test_todo_en_cache_no_llama_a_migo(self, migo_service):
+        migo_service.cache_service.set_many_rucs(
+            {"20100038146": {"success": True, "nombre_o_razon_social": "EN CACHE"}}
+        )
+        migo_service.cache_service.mark_many_invalid(["20987654321"], "NO_EXISTE")
+
+        with patch.object(migo_service, "_make_request") as mock_request:
+            result = migo_service.consultar_ruc_masivo(
+                ["20100038146", "20987654321"], update_partners=False
+            )
+
+        mock_request.assert_not_called()
+        assert result["cache_hits"] == 2
+        assert result["batches_processed"] == 0
+
+    def test_faltantes_se_guardan_en_bloque(self, migo_service):
+        cache_service = migo_service.cache_service
+
+        with patch.object(
+            migo_service, "_make_request", return_value=RESPUESTA_MASIVA
+        ), patch.object(
+            cache_service, "set_many_rucs", wraps=cache_service.set_many_rucs
+        ) as set_many, patch.object(
+            cache_service, "mark_many_invalid", wraps=cache_service.mark_many_invalid
+        ) as mark_many:
+            migo_service.consultar_ruc_masivo(
+                ["20345678902", "20555555551"], update_partners=False
+            )
+
+        # Una escritura por tipo para todo el lote
+        assert set_many.call_count == 1
+        assert list(set_many.call_args.args[0]) == ["20345678902"]
+        assert mark_many.call_count == 1
+        assert list(mark_many.call_args.args[0]) == ["20555555551"]
+
+        # La siguiente corrida los resuelve desde el cache
+        assert "20345678902" in cache_service.get_many_rucs(["20345678902"])
+        assert cache_service.is_ruc_invalid("20555555551")
+        with patch.object(migo_service, "_make_request") as mock_request:
+            result = migo_service.consultar_ruc_masivo(
+                ["20345678902", "20555555551"], update_partners=False
+            )
+        mock_request.assert_not_called()
+        assert result["cache_hits"] == 2
@@ -0,0 +1,177 @@
+# api_service/tests/test_rate_limit.py
+import pytest
+from unittest.mock import patch, MagicMock
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+
+from api_service.services.base import (
+    RateLimitManager,
+    RateLimitScope,
+    MemoryTokenBucketBackend,
+    CacheSlidingWindowBackend,
+    DatabaseRateLimitBackend,
+    get_rate_limit_backend,
+)
+
+
+class TestMemoryTokenBucketBackend:
+    """Tests para el token bucket en memoria - NO necesita BD"""
+
+    def test_allows_until_capacity(self):
+        """Permite `limit` peticiones en ráfaga y luego rechaza"""
+        backend = MemoryTokenBucketBackend()
+        scope = RateLimitScope(key="test:burst", limit=5)
+
+        results = [backend.acquire(scope)[0] for _ in range(5)]
+        assert all(results)
+
+        allowed, wait = backend.acquire(scope)
+        assert allowed is False
+        assert 0 < wait <= 60 / 5
+
+    def test_refill_over_time(self):
+        """Recarga tokens de forma proporcional al tiempo transcurrido"""
+        backend = MemoryTokenBucketBackend()
+        scope = RateLimitScope(key="test:refill", limit=60, window_seconds=60)
+
+        with patch(
+            "api_service.services.base.rate_limit_backends.time.monotonic"
+        ) as mock_time:
+            mock_time.return_value = 1000.0
+            for _ in range(60):
+                backend.acquire(scope)
+            assert backend.acquire(scope)[0] is False
+
+            # 1 token por segundo
+            mock_time.return_value = 1001.0
+            assert backend.acquire(scope)[0] is True
+            assert backend.acquire(scope)[0] is False
+
+    def test_keys_are_independent(self):
+        """Cada clave tiene su propio bucket"""
+        backend = MemoryTokenBucketBackend()
+        backend.acquire(RateLimitScope(key="a", limit=1))
+        assert backend.acquire(RateLimitScope(key="a", limit=1))[0] is False
+        assert backend.acquire(RateLimitScope(key="b", limit=1))[0] is True
+
+    def test_reset(self):
+        backend = MemoryTokenBucketBackend()
+        scope = RateLimitScope(key="test:reset", limit=1)
+        backend.acquire(scope)
+        backend.reset("test:reset")
+        assert backend.acquire(scope)[0] is True
+
+
+class TestCacheSlidingWindowBackend:
+    """Tests para la ventana deslizante sobre cache - NO necesita BD"""
+
+    def _backend(self):
+        return CacheSlidingWindowBackend(
+            cache_backend=LocMemCache("rate-limit-tests", {})
+        )
+
+    def test_allows_until_limit(self):
+        backend = self._backend()
+        scope = RateLimitScope(key="test:cache", limit=3)
+
+        with patch(
+            "api_service.services.base.rate_limit_backends.time.time"
+        ) as mock_time:
+            mock_time.return_value = 6000.0  # inicio de ventana
+            assert [backend.acquire(scope)[0] for _ in range(3)] == [True] * 3
+
+            allowed, wait = backend.acquire(scope)
+            assert allowed is False
+            assert wait > 0
+
+    def test_denied_request_is_not_counted(self):
+        """Una petición rechazada revierte su incremento"""
+        backend = self._backend()
+        scope = RateLimitScope(key="test:decr", limit=1)
+
+        with patch(
+            "api_service.services.base.rate_limit_backends.time.time"
+        ) as mock_time:
+            mock_time.return_value = 6000.0
+            backend.acquire(scope)
+            backend.acquire(scope)
+            backend.acquire(scope)
+            assert backend.cache.get(backend._bucket_key("test:decr", 100)) == 1
+
+    def test_previous_window_is_weighted(self):
+        """El uso de la ventana anterior pesa según el tiempo transcurrido"""
+        backend = self._backend()
+        scope = RateLimitScope(key="test:slide", limit=10)
+
+        with patch(
+            "api_service.services.base.rate_limit_backends.time.time"
+        ) as mock_time:
+            mock_time.return_value = 6000.0
+            for _ in range(10):
+                backend.acquire(scope)
+
+            # Mitad de la siguiente ventana: 10 * 0.5 = 5 usados
+            mock_time.return_value = 6090.0
+            results = [backend.acquire(scope)[0] for _ in range(6)]
+            assert results == [True] * 5 + [False]
+
+    def test_fails_open_on_cache_error(self):
+        broken = MagicMock()
+        broken.add.side_effect = Exception("cache caído")
+        backend = CacheSlidingWindowBackend(cache_backend=broken)
+        assert backend.acquire(RateLimitScope(key="x", limit=1)) == (True, 0.0)
+
+
+class TestRateLimitBackendFactory:
+    """Tests para get_rate_limit_backend"""
+
+    def test_default_backend_from_settings(self):
+        with patch.object(settings, "API_RATE_LIMIT_BACKEND", "memory", create=True):
+            assert isinstance(get_rate_limit_backend(), MemoryTokenBucketBackend)
+
+    def test_named_backends(self):
+        assert isinstance(get_rate_limit_backend("cache"), CacheSlidingWindowBackend)
+        assert isinstance(get_rate_limit_backend("database"), DatabaseRateLimitBackend)
+
+    def test_backend_is_shared_per_process(self):
+        assert get_rate_limit_backend("memory") is get_rate_limit_backend("memory")
+
+    def test_invalid_backend(self):
+        with pytest.raises(ValueError):
+            get_rate_limit_backend("redis-cluster")
+
+
+class TestRateLimitManager:
+    """Tests para RateLimitManager sin acceso a BD"""
+
+    def test_without_service_allows(self):
+        manager = RateLimitManager(backend=MemoryTokenBucketBackend())
+        assert manager.check_rate_limit_sync("consultar_ruc") == (True, 0.0)
+
+    def test_uses_endpoint_limit_and_caches_scope(self):
+        service = MagicMock(pk=7, requests_per_minute=60)
+        endpoint = MagicMock(pk=3, custom_rate_limit=2)
+        manager = RateLimitManager(service, backend=MemoryTokenBucketBackend())
+
+        assert manager.check_rate_limit_sync("consultar_ruc", endpoint)[0] is True
+        # Segunda llamada sin endpoint: usa el scope memorizado, sin consultar BD
+        assert manager.check_rate_limit_sync("consultar_ruc")[0] is True
+        assert manager.check_rate_limit_sync("consultar_ruc")[0] is False
+
+        scope = manager._scopes["consultar_ruc"]
+        assert scope.key == "7:consultar_ruc"
+        assert scope.limit == 2
+        assert scope.endpoint_id == 3
+
+    def test_falls_back_to_service_limit(self):
+        service = MagicMock(pk=1, requests_per_minute=45)
+        endpoint = MagicMock(pk=2, custom_rate_limit=None)
+        manager = RateLimitManager(service, backend=MemoryTokenBucketBackend())
+        manager.check_rate_limit_sync("x", endpoint)
+        assert manager._scopes["x"].limit == 45
+
+    def test_update_is_noop(self):
+        backend = MagicMock()
+        manager = RateLimitManager(MagicMock(pk=1), backend=backend)
+        manager.update_rate_limit_sync("x")
+        backend.acquire.assert_not_called()
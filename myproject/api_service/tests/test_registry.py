@@ -0,0 +1,106 @@
+# api_service/tests/test_registry.py
+import pytest
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api_service.models import ApiEndpoint, ApiService
+from api_service.services.base import ServiceRegistry
+from api_service.services.base import registry as registry_module
+
+
+@pytest.fixture
+def registry():
+    """Registro con cache activo instalado como registro del proceso."""
+    instance = ServiceRegistry(ttl=60)
+    with patch.object(registry_module, "_registry", instance):
+        yield instance
+
+
+@pytest.fixture
+def service_endpoint(db):
+    service = ApiService.objects.create(
+        name="Servicio Registro",
+        service_type="REGISTRO",
+        base_url="https://api.example.com",
+        auth_token="token",
+    )
+    endpoint = ApiEndpoint.objects.create(
+        service=service, name="consultar_ruc", path="/ruc"
+    )
+    return service, endpoint
+
+
+@pytest.mark.django_db
+class TestServiceRegistry:
+
+    def test_lookups_are_memoized(self, registry, service_endpoint):
+        service, endpoint = service_endpoint
+        assert registry.get_service("REGISTRO") == service
+        assert registry.get_endpoint(service, "consultar_ruc") == endpoint
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert registry.get_service("REGISTRO") == service
+            assert registry.get_endpoint(service.pk, "consultar_ruc") == endpoint
+            # select_related: acceder al servicio no consulta la BD
+            assert registry.get_endpoint(service, "consultar_ruc").service == service
+        assert len(ctx.captured_queries) == 0
+
+    def test_missing_lookups_are_memoized(self, registry, db):
+        assert registry.get_service("NO_EXISTE") is None
+        with CaptureQueriesContext(connection) as ctx:
+            assert registry.get_service("NO_EXISTE") is None
+        assert len(ctx.captured_queries) == 0
+
+    def test_save_invalidates(self, registry, service_endpoint):
+        service, endpoint = service_endpoint
+        registry.get_endpoint(service, "consultar_ruc")
+
+        endpoint.path = "/ruc/v2"
+        endpoint.save()
+
+        assert registry.get_endpoint(service, "consultar_ruc").path == "/ruc/v2"
+        assert registry.stats["invalidations"] >= 1
+
+    def test_create_invalidates_negative_entry(self, registry, service_endpoint):
+        service, _ = service_endpoint
+        assert registry.get_endpoint(service, "consultar_dni") is None
+
+        ApiEndpoint.objects.create(service=service, name="consultar_dni", path="/dni")
+
+        assert registry.get_endpoint(service, "consultar_dni") is not None
+
+    def test_ttl_expiry(self, registry, service_endpoint):
+        service, _ = service_endpoint
+        with patch("api_service.services.base.registry.time.monotonic") as mock_time:
+            mock_time.return_value = 1000.0
+            registry.get_service("REGISTRO")
+            mock_time.return_value = 1061.0
+            with CaptureQueriesContext(connection) as ctx:
+                registry.get_service("REGISTRO")
+        assert len(ctx.captured_queries) == 1
+
+    def test_cached_only_does_not_query(self, registry, service_endpoint):
+        with CaptureQueriesContext(connection) as ctx:
+            assert registry.get_service("REGISTRO", cached_only=True) is None
+        assert len(ctx.captured_queries) == 0
+
+    def test_active_only(self, registry, service_endpoint):
+        service, _ = service_endpoint
+        ApiService.objects.filter(pk=service.pk).update(is_active=False)
+        assert registry.get_service("REGISTRO", active_only=True) is None
+        assert registry.get_service("REGISTRO") == service
+
+
+class TestServiceRegistryWithoutCache:
+    """TTL 0: siempre consulta la BD - NO necesita BD (ORM simulado)"""
+
+    def test_ttl_zero_does_not_store(self):
+        registry = ServiceRegistry(ttl=0)
+        with patch.object(ApiService.objects, "filter") as mock_filter:
+            mock_filter.return_value.first.return_value = None
+            registry.get_service("MIGO")
+            registry.get_service("MIGO")
+        assert mock_filter.call_count == 2
+        assert registry._entries == {}
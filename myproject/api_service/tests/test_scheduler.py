@@ -0,0 +1,114 @@
+# api_service/tests/test_scheduler.py
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from api_service.services.base import (
+    AdaptiveConcurrencyLimiter,
+    BatchProgressTracker,
+    stream_bounded,
+)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Ajuste AIMD del límite - NO necesita BD"""
+
+    def test_overload_halves_limit_once_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=16, max_limit=16)
+        sent_before = time.monotonic()
+
+        limiter._record(time.monotonic(), 0.1, overloaded=True)
+        assert limiter.current == 8
+
+        # Enviada antes del recorte: no vuelve a recortar
+        limiter._record(sent_before, 0.1, overloaded=True)
+        assert limiter.current == 8
+        assert limiter.stats["overloaded"] == 2
+        assert limiter.stats["decreases"] == 1
+
+    def test_healthy_responses_increase_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=8)
+        for _ in range(5):
+            limiter._record(time.monotonic(), 0.1, overloaded=False)
+        assert limiter.current == 5
+
+    def test_high_latency_decreases_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=10, max_limit=10)
+        limiter._record(time.monotonic(), 0.1, overloaded=False)
+        limiter._record(time.monotonic(), 1.0, overloaded=False)
+        assert limiter.current == 9
+
+    def test_never_below_min_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, min_limit=2, max_limit=4)
+        limiter._record(time.monotonic(), 0.1, overloaded=True)
+        assert limiter.current == 2
+
+
+class TestStreamBounded:
+    """Cola de trabajo acotada"""
+
+    @pytest.mark.asyncio
+    async def test_bounded_and_yields_in_completion_order(self):
+        in_flight = 0
+        peak = 0
+
+        async def work(delay):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(delay)
+            in_flight -= 1
+            return delay
+
+        delays = [0.2, 0.01, 0.01, 0.01, 0.01]
+        received = [
+            index async for index, _, _ in stream_bounded(work, delays, concurrency=2)
+        ]
+
+        assert peak == 2
+        assert sorted(received) == [0, 1, 2, 3, 4]
+        # El item lento no retiene a los demás
+        assert received[-1] == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_propagates(self):
+        async def work(item):
+            if item == "malo":
+                raise ValueError("falló")
+            return item
+
+        with pytest.raises(ValueError):
+            async for _ in stream_bounded(work, ["a", "malo", "b"], concurrency=3):
+                pass
+
+
+class TestBatchProgressTracker:
+    """Guardado periódico del avance (ORM simulado)"""
+
+    @pytest.mark.asyncio
+    async def test_saves_at_most_once_per_interval(self):
+        tracker = BatchProgressTracker(MagicMock(pk=1), total=10, interval=60)
+        tracker._save = MagicMock()
+
+        await tracker.start()
+        for _ in range(10):
+            tracker.record(True)
+            await tracker.maybe_save()
+        await tracker.finish()
+
+        # start + finish; ningún guardado intermedio dentro del intervalo
+        assert tracker._save.call_count == 2
+        assert tracker._save.call_args.kwargs["status"] == "COMPLETED"
+        assert tracker.processed == 10
+
+    @pytest.mark.asyncio
+    async def test_without_batch_request_does_nothing(self):
+        tracker = BatchProgressTracker(None, total=1)
+        tracker._save = MagicMock()
+        await tracker.start()
+        tracker.record(False)
+        await tracker.maybe_save()
+        await tracker.finish()
+        assert tracker._save.call_count == 0
@@ -21,13 +21,12 @@ from django.views.decorators.http import require_http_methods
 from django.utils.decorators import sync_and_async_middleware
 from django.db import transaction
 
-from api_service.services.migo_service_async import (
+from api_service.services.migo.migo_service_async import (
     MigoAPIServiceAsync,
     run_async,
     batch_query,
 )
 from api_service.models import ApiCallLog
-from partners.models import Partner
 
 logger = logging.getLogger(__name__)
 
@@ -114,7 +113,8 @@ class ConsultarRucMasivoAsyncView(View):
             # ⏱️ Inicio de cronómetro
             start_time = datetime.now()
 
-            # Consultar RUCs en paralelo
+            # Consultar RUCs en paralelo. Con update_partners=True el servicio
+            # actualiza los Partners en bloque (bulk_update) al final.
             async with MigoAPIServiceAsync() as service:
                 results = await service.consultar_ruc_masivo_async(
                     rucs, batch_size=batch_size, update_partners=update_partners
@@ -123,10 +123,6 @@ class ConsultarRucMasivoAsyncView(View):
             # ⏱️ Fin de cronómetro
             duration_ms = (datetime.now() - start_time).total_seconds() * 1000
 
-            # Actualizar Partners si aplica (async-safe)
-            if update_partners and results["validos"]:
-                await self._actualizar_partners_async(results["validos"])
-
             # Log de operación
             await self._log_operation_async(rucs, results, duration_ms)
 
@@ -139,6 +135,7 @@ class ConsultarRucMasivoAsyncView(View):
                 "invalidos": len(results["invalidos"]),
                 "errores": len(results["errores"]),
                 "duration_ms": results.get("duration_ms", 0),
+                "partners": results.get("partners"),
                 "data": {
                     "validos": results["validos"],
                     "invalidos": results["invalidos"],
@@ -152,33 +149,6 @@ class ConsultarRucMasivoAsyncView(View):
             logger.error(f"Error en ConsultarRucMasivoAsyncView: {e}")
             return JsonResponse({"success": False, "error": str(e)}, status=500)
 
-    async def _actualizar_partners_async(self, resultados_validos):
-        """Actualizar Partners con datos de SUNAT."""
-        from asgiref.sync import sync_to_async
-
-        for resultado in resultados_validos:
-            ruc = resultado.get("ruc")
-            try:
-                # Buscar Partner por RUC (sync_to_async)
-                def get_partner():
-                    return Partner.objects.filter(ruc=ruc).first()
-
-                partner = await sync_to_async(get_partner)()
-
-                if partner:
-                    # Actualizar datos
-                    def update_partner():
-                        partner.legal_name = resultado.get("nombre_o_razon_social")
-                        partner.status = resultado.get("estado_del_contribuyente")
-                        partner.last_sunat_check = datetime.now()
-                        partner.save()
-
-                    await sync_to_async(update_partner)()
-                    logger.info(f"✅ Partner {ruc} actualizado desde SUNAT")
-
-            except Exception as e:
-                logger.error(f"❌ Error actualizando Partner {ruc}: {e}")
-
     async def _log_operation_async(self, rucs, results, duration_ms):
         """Log de operación masiva."""
         from asgiref.sync import sync_to_async
@@ -346,10 +316,15 @@ def consultar_ruc_task(ruc: str):
 
 
 @shared_task
-def consultar_rucs_masivo_task(rucs: list, batch_size=10, update_partners=False):
+def consultar_rucs_masivo_task(
+    rucs: list, batch_size=10, update_partners=False, batch_id=None
+):
     """
     Tarea Celery para consultar múltiples RUCs.
 
+    Con `batch_id` (ApiBatchRequest) el avance se guarda periódicamente
+    mientras se procesa.
+
     Uso:
     consultar_rucs_masivo_task.delay(
         ['20100038146', '20123456789'],
@@ -360,9 +335,21 @@ def consultar_rucs_masivo_task(rucs: list, batch_size=10, update_partners=False)
     logger.info(f"🔄 Iniciando consulta masiva de {len(rucs)} RUCs")
 
     async def do_query():
+        from asgiref.sync import sync_to_async
+        from api_service.models import ApiBatchRequest
+
+        batch_request = None
+        if batch_id:
+            batch_request = await sync_to_async(
+                ApiBatchRequest.objects.filter(id=batch_id).first
+            )()
+
         async with MigoAPIServiceAsync() as service:
             return await service.consultar_ruc_masivo_async(
-                rucs, batch_size=batch_size, update_partners=update_partners
+                rucs,
+                batch_size=batch_size,
+                update_partners=update_partners,
+                batch_request=batch_request,
             )
 
     result = async_to_sync(do_query)()
@@ -384,14 +371,18 @@ def actualizar_partners_sunat():
     logger.info("🔄 Iniciando actualización de Partners desde SUNAT")
 
     async def do_update():
-        from partners.models import Partner
-
-        # Obtener Partners sin revisar últimamente
-        partners = Partner.objects.filter(last_sunat_check__isnull=True)[
-            :1000
-        ]  # Limitar a 1000 por ejecución
+        from asgiref.sync import sync_to_async
+        from billing.models import Partner
+
+        # Obtener RUCs de Partners sin revisar (solo la columna necesaria)
+        def get_rucs():
+            return list(
+                Partner.objects.filter(sunat_last_check__isnull=True)
+                .values_list("num_document", flat=True)
+                .distinct()[:1000]  # Limitar a 1000 por ejecución
+            )
 
-        rucs = [p.ruc for p in partners]
+        rucs = await sync_to_async(get_rucs)()
 
         if not rucs:
             logger.info("No hay Partners para actualizar")
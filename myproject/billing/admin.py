@@ -8,6 +8,9 @@ from .models import (
     SaleSubscriptionLine,
     AccountMove,
     AccountMoveLine,
+    BillingRun,
+    BillingRunShard,
+    SubscriptionLedgerEntry,
 )
 
 
@@ -34,4 +37,41 @@ class SaleSubscriptionLineAdmin(admin.ModelAdmin):
     # list_filter = ("state","company")
 
 
+@admin.register(BillingRun)
+class BillingRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "target_date",
+        "company",
+        "status",
+        "total_items",
+        "successful_items",
+        "failed_items",
+        "created_at",
+    )
+    list_filter = ("status", "company")
+
+
+@admin.register(BillingRunShard)
+class BillingRunShardAdmin(admin.ModelAdmin):
+    list_display = ("id", "run", "number", "company", "document_type", "status")
+    list_filter = ("status", "document_type")
+
+
+@admin.register(SubscriptionLedgerEntry)
+class SubscriptionLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "subscription",
+        "partner",
+        "invoice",
+        "event_type",
+        "billing_period",
+        "amount_total",
+        "created_at",
+    )
+    list_filter = ("event_type", "company", "billing_period")
+    raw_id_fields = ("subscription", "partner", "invoice")
+
+
 # Registra demás modelos...
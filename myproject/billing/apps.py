@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BillingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "billing"
+
+    def ready(self):
+        # Señales del libro de facturación (altas, anulaciones y bajas)
+        from .services import billing_ledger_service  # noqa: F401
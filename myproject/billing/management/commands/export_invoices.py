@@ -0,0 +1,70 @@
+# billing/management/commands/export_invoices.py
+from django.core.management.base import BaseCommand, CommandError
+from billing.services.invoice_export_service import EXPORT_FORMATS, InvoiceExport
+
+
+class Command(BaseCommand):
+    help = "Exportar los PDFs guardados de facturas (ZIP con metadatos o PDF combinado)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", type=int, help="ID de compañía")
+        parser.add_argument("--partner-id", type=int, help="ID de cliente")
+        parser.add_argument("--period", type=int, help="Período AAAAMM")
+        parser.add_argument(
+            "--from", dest="period_from", type=int, help="Desde el período AAAAMM"
+        )
+        parser.add_argument(
+            "--to", dest="period_to", type=int, help="Hasta el período AAAAMM"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Archivo de salida (.zip o .pdf); por defecto facturas_<filtros>.zip",
+        )
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            help="Formato de salida (por defecto según la extensión)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Facturas por bloque (BILLING_EXPORT_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            export = InvoiceExport(
+                company_id=options.get("company_id"),
+                partner_id=options.get("partner_id"),
+                period=options.get("period"),
+                period_from=options.get("period_from"),
+                period_to=options.get("period_to"),
+                chunk_size=options.get("chunk_size"),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        fmt = options.get("format")
+        output_file = options.get("output") or (
+            f"facturas_{export.label}.{fmt or 'zip'}"
+        )
+
+        self.stdout.write(f"📦 Exportando facturas a {output_file}...")
+        try:
+            stats = export.write_file(output_file, fmt=fmt)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not stats["invoices"]:
+            self.stdout.write(self.style.WARNING("⚠️  No hay facturas con esos filtros"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Exportación generada: {output_file}"))
+        self.stdout.write(f"   🧾 Facturas: {stats['invoices']}")
+        self.stdout.write(f"   📄 PDFs incluidos: {stats['documents']}")
+        self.stdout.write(f"   💾 Tamaño de los PDFs: {stats['bytes'] / 1024:.1f} KB")
+        if stats["missing"]:
+            self.stdout.write(
+                self.style.WARNING(f"   ⚠️  Sin PDF guardado: {stats['missing']}")
+            )
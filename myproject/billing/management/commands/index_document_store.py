@@ -0,0 +1,73 @@
+# billing/management/commands/index_document_store.py
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shared.utils.document_store import DocumentStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexar en el almacén de documentos los PDFs guardados con "
+        "_metadata.json (esquema anterior)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            type=str,
+            default=settings.DOCUMENT_STORAGE["BASE_DIR"],
+            help="Directorio a recorrer",
+        )
+        parser.add_argument(
+            "--delete-legacy",
+            action="store_true",
+            help="Borrar el PDF y el JSON originales una vez indexados",
+        )
+
+    def handle(self, *args, **options):
+        store = DocumentStore()
+        indexed = missing = errors = 0
+
+        self.stdout.write(f"📂 Buscando metadatos en {options['path']}...")
+        for root, dirs, files in os.walk(options["path"]):
+            # No entrar al propio almacén
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != store.blobs_dir]
+
+            for name in files:
+                if not name.endswith("_metadata.json"):
+                    continue
+                metadata_path = os.path.join(root, name)
+                try:
+                    document = store.import_legacy_metadata(metadata_path)
+                except Exception as e:
+                    errors += 1
+                    self.stdout.write(f"   ❌ {metadata_path}: {str(e)}")
+                    continue
+
+                if document is None:
+                    missing += 1
+                    continue
+
+                indexed += 1
+                if options["delete_legacy"]:
+                    legacy_pdf = os.path.join(
+                        os.path.dirname(root), document["filename"]
+                    )
+                    for path in (legacy_pdf, metadata_path):
+                        if os.path.exists(path):
+                            os.unlink(path)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {indexed} documentos indexados "
+                f"({missing} sin PDF, {errors} con error)"
+            )
+        )
+
+        normalized = store.normalize_issue_dates()
+        if normalized:
+            self.stdout.write(
+                f"📅 {normalized} fechas de emisión normalizadas a AAAA-MM-DD"
+            )
@@ -3,14 +3,26 @@ from django.core.management.base import BaseCommand
 from billing.models import Partner, Company
 from django.utils import timezone
 import random
+from billing.services.bulk_seed_service import (
+    SCALE_UNITS,
+    BulkSeeder,
+    add_seed_arguments,
+    seed_partners,
+)
 
 
 class Command(BaseCommand):
     help = "Poblar clientes de prueba para facturas y boletas"
 
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+
     def handle(self, *args, **options):
         self.stdout.write("👥 Poblando clientes de prueba...")
 
+        if options.get("scale"):
+            return self._bulk_seed(options)
+
         companies = Company.objects.all()
 
         # Datos de clientes para pruebas
@@ -178,3 +190,24 @@ class Command(BaseCommand):
             f"\n🎯 Total de asociaciones cliente-compañía creadas: {total_created}"
         )
         self.stdout.write(self.style.SUCCESS("✅ Clientes poblados exitosamente!"))
+
+    def _bulk_seed(self, options):
+        """Carga masiva: SCALE_UNITS["partners"] clientes por unidad de --scale"""
+        companies = list(Company.objects.all())
+        if not companies:
+            self.stdout.write(self.style.ERROR("❌ No hay compañías"))
+            return
+
+        count = SCALE_UNITS["partners"] * options["scale"]
+        with BulkSeeder(
+            seed=options["seed"],
+            batch_size=options.get("batch_size"),
+            use_copy=options.get("copy"),
+            stdout=self.stdout,
+            base_date=options.get("base_date"),
+        ) as seeder:
+            created = seed_partners(seeder, count, companies)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {created} clientes creados en carga masiva")
+        )
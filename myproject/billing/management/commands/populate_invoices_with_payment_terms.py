@@ -18,7 +18,14 @@ from billing.models import (
     Tax,
     Currency,
 )
+from billing.services.billing_ledger_service import BillingLedgerService
 from billing.services.sequence_service import SequenceService
+from billing.services.bulk_seed_service import (
+    SCALE_UNITS,
+    BulkSeeder,
+    add_seed_arguments,
+    seed_invoices,
+)
 
 
 class Command(BaseCommand):
@@ -37,6 +44,7 @@ class Command(BaseCommand):
             action="store_true",
             help="Solo crear facturas para suscripciones",
         )
+        add_seed_arguments(parser)
 
     def handle(self, *args, **options):
         self.stdout.write("🧾 Creando facturas de prueba con términos de pago...")
@@ -49,6 +57,9 @@ class Command(BaseCommand):
         if company_id:
             companies = companies.filter(id=company_id)
 
+        if options.get("scale"):
+            return self._bulk_seed(companies, subscription_only, options)
+
         total_invoices = 0
 
         with transaction.atomic():
@@ -209,3 +220,38 @@ class Command(BaseCommand):
             # Por ahora, solo calcular totales
 
         return total
+
+    def _bulk_seed(self, companies, subscription_only, options):
+        """
+        Carga masiva: SCALE_UNITS["invoices"] facturas por unidad de --scale
+        (1-3 líneas cada una), repartidas entre las compañías
+        """
+        companies = list(companies)
+        if not companies:
+            self.stdout.write(self.style.ERROR("❌ No hay compañías"))
+            return
+
+        count = SCALE_UNITS["invoices"] * options["scale"]
+        with BulkSeeder(
+            seed=options["seed"],
+            batch_size=options.get("batch_size"),
+            use_copy=options.get("copy"),
+            stdout=self.stdout,
+            base_date=options.get("base_date"),
+        ) as seeder:
+            created = seed_invoices(
+                seeder,
+                count,
+                companies,
+                subscription_ratio=1.0 if subscription_only else 0.5,
+            )
+
+        # La carga masiva no pasa por save(): registrar en el libro aparte
+        recorded = BillingLedgerService().record_missing(
+            company_ids=[company.id for company in companies]
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {created} facturas creadas en carga masiva")
+        )
+        self.stdout.write(f"   📒 Facturas registradas en el libro: {recorded}")
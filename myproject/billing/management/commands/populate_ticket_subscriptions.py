@@ -15,6 +15,12 @@ from billing.models import (
 from billing.services.sequence_service import get_next_subscription_code
 from decimal import Decimal
 import random
+from billing.services.bulk_seed_service import (
+    SCALE_UNITS,
+    BulkSeeder,
+    add_seed_arguments,
+    seed_subscriptions,
+)
 
 
 class Command(BaseCommand):
@@ -27,10 +33,14 @@ class Command(BaseCommand):
             default=3,
             help="Número de suscripciones a crear por compañía (default: 3)",
         )
+        add_seed_arguments(parser)
 
     def handle(self, *args, **options):
         self.stdout.write("🚀 Creando suscripciones para boletas...")
 
+        if options.get("scale"):
+            return self._bulk_seed(options)
+
         subscription_count = options.get("count", 3)
         self.create_ticket_subscriptions(subscription_count)
 
@@ -283,3 +293,27 @@ class Command(BaseCommand):
             return monthly_total * billing_cycles
         else:
             return monthly_total * months_duration
+
+    def _bulk_seed(self, options):
+        """
+        Carga masiva: SCALE_UNITS["subscriptions"] suscripciones por unidad de
+        --scale, repartidas entre las compañías (solo clientes de boleta)
+        """
+        companies = list(Company.objects.all())
+        if not companies:
+            self.stdout.write(self.style.ERROR("❌ No hay compañías"))
+            return
+
+        count = SCALE_UNITS["subscriptions"] * options["scale"]
+        with BulkSeeder(
+            seed=options["seed"],
+            batch_size=options.get("batch_size"),
+            use_copy=options.get("copy"),
+            stdout=self.stdout,
+            base_date=options.get("base_date"),
+        ) as seeder:
+            created = seed_subscriptions(seeder, count, companies, ticket_only=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {created} suscripciones creadas en carga masiva")
+        )
@@ -1,5 +1,9 @@
 # billing/management/commands/process_invoices.py
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from billing.services.invoice_processing_service import InvoiceProcessingService
 from billing.models import AccountMove
 
@@ -23,12 +27,19 @@ class Command(BaseCommand):
         parser.add_argument(
             "--verbose", action="store_true", help="Mostrar detalles de debug"
         )
+        parser.add_argument(
+            "--benchmark",
+            action="store_true",
+            help="Comparar validación por factura vs cálculo en bloque (solo lectura)",
+        )
 
     def handle(self, *args, **options):
         service = InvoiceProcessingService(company_id=options.get("company"))
         verbose = options.get("verbose")
 
-        if options.get("validate"):
+        if options.get("benchmark"):
+            self._benchmark(service)
+        elif options.get("validate"):
             self._validate_invoices(service, verbose)
         elif options.get("fix"):
             self._fix_invoices(service)
@@ -95,6 +106,51 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f"✅ {fixed_count} facturas corregidas"))
 
+    def _benchmark(self, service):
+        """Medir tiempo y consultas: cálculo por factura vs en bloque"""
+        invoices = service._draft_invoices()
+        self.stdout.write(
+            f"⏱️ Benchmark de totales sobre {invoices.count()} facturas draft..."
+        )
+
+        with CaptureQueriesContext(connection) as legacy_queries:
+            start = time.perf_counter()
+            legacy = {
+                invoice.id: service._calculate_invoice_with_debug(invoice)
+                for invoice in invoices
+            }
+            legacy_seconds = time.perf_counter() - start
+
+        with CaptureQueriesContext(connection) as bulk_queries:
+            start = time.perf_counter()
+            bulk = service.compute_invoice_totals(invoices)
+            bulk_seconds = time.perf_counter() - start
+
+        mismatches = [
+            result["invoice"]
+            for result in bulk
+            if result["theoretical_total"] != legacy[result["id"]]["theoretical_total"]
+            or result["is_consistent"] != legacy[result["id"]]["is_consistent"]
+        ]
+
+        self.stdout.write(
+            f"   • Por factura: {legacy_seconds:.3f}s, {len(legacy_queries)} consultas"
+        )
+        self.stdout.write(
+            f"   • En bloque:   {bulk_seconds:.3f}s, {len(bulk_queries)} consultas"
+        )
+        if bulk_seconds:
+            self.stdout.write(f"   • Aceleración: x{legacy_seconds / bulk_seconds:.1f}")
+        if mismatches:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"❌ {len(mismatches)} facturas con resultados distintos: "
+                    f"{mismatches[:10]}"
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Resultados idénticos"))
+
     def _show_invoice_status(self, service):
         """Mostrar estado de facturas"""
         invoices = AccountMove.objects.all()
@@ -1,6 +1,7 @@
 # billing/management/commands/set_default_payment_terms.py
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from billing.models import (
     Partner,
     ContractTemplate,
@@ -8,7 +9,9 @@ from billing.models import (
     AccountMove,
     AccountPaymentTerm,
     Company,
+    billing_period_key,
 )
+from billing.services.payment_term_evaluator import get_payment_term_evaluator
 
 
 class Command(BaseCommand):
@@ -284,9 +287,14 @@ class Command(BaseCommand):
                 type="out_invoice",  # Solo facturas de cliente
                 invoice_payment_term__isnull=True,
                 subscription__isnull=False,  # Solo facturas de suscripción
+            ).select_related(
+                "partner__payment_term",
+                "subscription__payment_term",
+                "subscription__contract_template__payment_term",
             )
 
             count = 0
+            to_update = []
             for invoice in invoices:
                 # Si tiene suscripción, obtener su término de pago
                 if invoice.subscription:
@@ -319,16 +327,7 @@ class Command(BaseCommand):
 
                     if payment_term and not dry_run:
                         invoice.invoice_payment_term = payment_term
-
-                        # Recalcular fecha de vencimiento (implementar método calculate_due_date)
-                        try:
-                            due_date = invoice.calculate_due_date()
-                            if due_date:
-                                invoice.invoice_date_due = due_date
-                        except:
-                            pass  # Si no existe el método, continuar
-
-                        invoice.save()
+                        to_update.append(invoice)
 
                     if payment_term:
                         count += 1
@@ -341,9 +340,39 @@ class Command(BaseCommand):
                                 f"      • ... y {invoices.count() - 5} más"
                             )
 
+            if to_update:
+                self._save_invoices_payment_terms(to_update)
+
             return count
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"      ❌ Error actualizando facturas: {str(e)}")
             )
             return 0
+
+    def _save_invoices_payment_terms(self, invoices):
+        """
+        Recalcula vencimientos en bloque (términos compilados una vez) y
+        guarda con bulk_update en lugar de un save() por factura
+        """
+        now = timezone.now()
+        due_dates = get_payment_term_evaluator().due_dates_for(invoices)
+        for invoice, due_date in zip(invoices, due_dates):
+            if due_date:
+                invoice.invoice_date_due = due_date
+            # bulk_update no pasa por save(): replicar sus campos derivados
+            if invoice.invoice_date:
+                invoice.billing_period = billing_period_key(invoice.invoice_date)
+            invoice.updated_at = now
+
+        with transaction.atomic():
+            AccountMove.objects.bulk_update(
+                invoices,
+                fields=[
+                    "invoice_payment_term",
+                    "invoice_date_due",
+                    "billing_period",
+                    "updated_at",
+                ],
+                batch_size=1000,
+            )
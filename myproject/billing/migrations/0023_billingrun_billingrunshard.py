@@ -0,0 +1,156 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("billing", "0022_partner_billing_par_num_doc_d1290c_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BillingRun",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "target_date",
+                    models.DateField(help_text="Fecha objetivo de facturación"),
+                ),
+                ("dry_run", models.BooleanField(default=False)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "⏳ Pendiente"),
+                            ("PROCESSING", "🔄 Procesando"),
+                            ("PARTIAL", "⚠️ Parcialmente Completado"),
+                            ("COMPLETED", "✅ Completado"),
+                            ("FAILED", "❌ Fallido"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("context", models.CharField(blank=True, max_length=50, null=True)),
+                ("metadata", models.JSONField(blank=True, null=True)),
+                ("total_items", models.IntegerField(default=0)),
+                ("processed_items", models.IntegerField(default=0)),
+                ("successful_items", models.IntegerField(default=0)),
+                ("failed_items", models.IntegerField(default=0)),
+                ("skipped_items", models.IntegerField(default=0)),
+                ("results", models.JSONField(blank=True, null=True)),
+                ("error_summary", models.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Compañía facturada (vacío = todas)",
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="billing.company",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Corrida de Facturación",
+                "verbose_name_plural": "Corridas de Facturación",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="billing_run_status_created_idx",
+                    ),
+                    models.Index(
+                        fields=["company", "target_date"],
+                        name="billing_run_company_date_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="BillingRunShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "number",
+                    models.IntegerField(
+                        help_text="Número de shard dentro de la corrida"
+                    ),
+                ),
+                (
+                    "document_type",
+                    models.CharField(
+                        help_text="'invoice' (serie F001) o 'ticket' (serie B001)",
+                        max_length=10,
+                    ),
+                ),
+                ("subscription_ids", models.JSONField(default=list)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "⏳ Pendiente"),
+                            ("PROCESSING", "🔄 Procesando"),
+                            ("COMPLETED", "✅ Completado"),
+                            ("FAILED", "❌ Fallido"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("task_id", models.CharField(blank=True, max_length=255, null=True)),
+                ("attempts", models.IntegerField(default=0)),
+                ("stats", models.JSONField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="billing.company",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="billing.billingrun",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Shard de Facturación",
+                "verbose_name_plural": "Shards de Facturación",
+                "ordering": ["run", "number"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "number"),
+                        name="billing_run_shard_unique_number",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 11:00
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_billing_period(apps, schema_editor):
+    AccountMove = apps.get_model("billing", "AccountMove")
+    AccountMove.objects.filter(invoice_date__isnull=False).update(
+        billing_period=ExtractYear("invoice_date") * 100 + ExtractMonth("invoice_date")
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("billing", "0023_billingrun_billingrunshard"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accountmove",
+            name="billing_period",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Período de facturación AAAAMM (derivado de invoice_date)",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_billing_period, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="accountmove",
+            index=models.Index(
+                fields=["subscription", "billing_period", "state"],
+                name="billing_acc_sub_period_idx",
+            ),
+        ),
+    ]
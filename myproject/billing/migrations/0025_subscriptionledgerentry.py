@@ -0,0 +1,168 @@
+# Generated by Django 5.2.9 on 2026-10-17 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    """Una entrada `invoice` por cada factura de suscripción no anulada"""
+    AccountMove = apps.get_model("billing", "AccountMove")
+    SubscriptionLedgerEntry = apps.get_model("billing", "SubscriptionLedgerEntry")
+
+    invoices = (
+        AccountMove.objects.filter(
+            subscription__isnull=False, billing_period__isnull=False
+        )
+        .exclude(state="canceled")
+        .values_list(
+            "id",
+            "subscription_id",
+            "partner_id",
+            "company_id",
+            "billing_period",
+            "amount_total",
+            "amount_tax",
+            "created_at",
+        )
+    )
+
+    batch = []
+    for row in invoices.iterator(chunk_size=2000):
+        (
+            invoice_id,
+            subscription_id,
+            partner_id,
+            company_id,
+            billing_period,
+            amount_total,
+            amount_tax,
+            created_at,
+        ) = row
+        batch.append(
+            SubscriptionLedgerEntry(
+                invoice_id=invoice_id,
+                subscription_id=subscription_id,
+                partner_id=partner_id,
+                company_id=company_id,
+                event_type="invoice",
+                billing_period=billing_period,
+                invoice_count=1,
+                amount_total=amount_total,
+                amount_tax=amount_tax,
+                created_at=created_at,
+            )
+        )
+        if len(batch) >= 2000:
+            SubscriptionLedgerEntry.objects.bulk_create(batch)
+            batch = []
+    SubscriptionLedgerEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("billing", "0024_accountmove_billing_period"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("invoice", "Factura emitida"),
+                            ("reversal", "Factura anulada"),
+                        ],
+                        default="invoice",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "billing_period",
+                    models.PositiveIntegerField(
+                        help_text="Período de facturación AAAAMM"
+                    ),
+                ),
+                ("invoice_count", models.SmallIntegerField(default=1)),
+                (
+                    "amount_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=18),
+                ),
+                (
+                    "amount_tax",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=18),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="billing.company",
+                    ),
+                ),
+                (
+                    "invoice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to="billing.accountmove",
+                    ),
+                ),
+                (
+                    "partner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="billing.partner",
+                    ),
+                ),
+                (
+                    "subscription",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to="billing.salesubscription",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Movimiento de Facturación",
+                "verbose_name_plural": "Libro de Facturación",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["partner", "billing_period"],
+                        name="billing_ledger_partner_idx",
+                    ),
+                    models.Index(
+                        fields=["company", "billing_period"],
+                        name="billing_ledger_company_idx",
+                    ),
+                    models.Index(
+                        fields=["subscription", "billing_period"],
+                        name="billing_ledger_sub_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("invoice", "event_type"),
+                        name="billing_ledger_unique_invoice_event",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
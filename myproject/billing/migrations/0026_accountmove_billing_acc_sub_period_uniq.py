@@ -0,0 +1,126 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:00
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+LIVE_STATES = ("draft", "posted")
+
+
+def resolve_duplicate_periods(apps, schema_editor):
+    """
+    Deja una sola factura de suscripción vigente por (suscripción, período)
+    antes de crear la restricción única.
+
+    En cada grupo duplicado se conserva la factura publicada (o la más
+    antigua si todas son borradores) y se anulan los borradores restantes,
+    con su reversión en el libro y en los contadores de la suscripción. Si
+    un grupo tiene más de una factura publicada no se toca nada y la
+    migración se detiene con los ids: esas se anulan a mano (nota de
+    crédito) antes de volver a migrar.
+    """
+    AccountMove = apps.get_model("billing", "AccountMove")
+    SaleSubscription = apps.get_model("billing", "SaleSubscription")
+    SubscriptionLedgerEntry = apps.get_model("billing", "SubscriptionLedgerEntry")
+
+    live = AccountMove.objects.filter(
+        billing_type="subscription",
+        state__in=LIVE_STATES,
+        subscription__isnull=False,
+        billing_period__isnull=False,
+    )
+    groups = (
+        live.values("subscription_id", "billing_period")
+        .annotate(invoices=Count("id"))
+        .filter(invoices__gt=1)
+        .order_by()
+    )
+
+    to_cancel = []
+    conflicts = []
+    for group in groups:
+        moves = list(
+            live.filter(
+                subscription_id=group["subscription_id"],
+                billing_period=group["billing_period"],
+            )
+            .order_by("id")
+            .values_list("id", "state")
+        )
+        posted = [pk for pk, state in moves if state == "posted"]
+        if len(posted) > 1:
+            conflicts.append(
+                f"suscripción {group['subscription_id']}, período "
+                f"{group['billing_period']}: facturas {posted}"
+            )
+            continue
+        keeper = posted[0] if posted else moves[0][0]
+        to_cancel.extend(pk for pk, _ in moves if pk != keeper)
+
+    if conflicts:
+        raise RuntimeError(
+            "No se puede crear billing_acc_sub_period_uniq: hay más de una "
+            "factura de suscripción publicada en el mismo período. Anúlalas "
+            "antes de migrar:\n  " + "\n  ".join(conflicts)
+        )
+    if not to_cancel:
+        return
+
+    AccountMove.objects.filter(id__in=to_cancel).update(state="canceled")
+
+    # Reversión en el libro de lo que se había registrado por cada borrador
+    reversed_ids = set(
+        SubscriptionLedgerEntry.objects.filter(
+            invoice_id__in=to_cancel, event_type="reversal"
+        ).values_list("invoice_id", flat=True)
+    )
+    reversals = []
+    deltas = defaultdict(lambda: [0, 0])
+    for entry in SubscriptionLedgerEntry.objects.filter(
+        invoice_id__in=to_cancel, event_type="invoice"
+    ).exclude(invoice_id__in=reversed_ids):
+        reversals.append(
+            SubscriptionLedgerEntry(
+                invoice_id=entry.invoice_id,
+                subscription_id=entry.subscription_id,
+                partner_id=entry.partner_id,
+                company_id=entry.company_id,
+                event_type="reversal",
+                billing_period=entry.billing_period,
+                invoice_count=-1,
+                amount_total=-entry.amount_total,
+                amount_tax=-entry.amount_tax,
+            )
+        )
+        deltas[entry.subscription_id][0] += 1
+        deltas[entry.subscription_id][1] += entry.amount_total
+    SubscriptionLedgerEntry.objects.bulk_create(reversals)
+
+    for subscription_id, (count, amount) in deltas.items():
+        SaleSubscription.objects.filter(pk=subscription_id).update(
+            recurring_invoice_count=F("recurring_invoice_count") - count,
+            invoices_generated=F("invoices_generated") - count,
+            total_invoiced=F("total_invoiced") - amount,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("billing", "0025_subscriptionledgerentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicate_periods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="accountmove",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("billing_type", "subscription"),
+                    ("state__in", ["draft", "posted"]),
+                ),
+                fields=("subscription", "billing_period"),
+                name="billing_acc_sub_period_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("billing", "0026_accountmove_billing_acc_sub_period_uniq"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="subscriptionledgerentry",
+            name="billing_ledger_unique_invoice_event",
+        ),
+        migrations.AlterField(
+            model_name="subscriptionledgerentry",
+            name="event_type",
+            field=models.CharField(
+                choices=[
+                    ("invoice", "Factura emitida"),
+                    ("adjustment", "Ajuste de montos"),
+                    ("reversal", "Factura anulada"),
+                ],
+                default="invoice",
+                max_length=10,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="subscriptionledgerentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("event_type__in", ["invoice", "reversal"])),
+                fields=("invoice", "event_type"),
+                name="billing_ledger_unique_invoice_event",
+            ),
+        ),
+    ]
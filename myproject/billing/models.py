@@ -1,19 +1,26 @@
 # billing/models.py
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.utils import timezone
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
-from datetime import timedelta
-import calendar
+from datetime import date
 import re
+import uuid
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def billing_period_key(value):
+    """Clave del período de facturación (AAAAMM) de una fecha"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.year * 100 + value.month
+
+
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -748,6 +755,12 @@ class AccountMove(TimeStampedModel):
     invoice_date_due = models.DateField(
         blank=True, null=True, help_text="Fecha de Vencimiento de la Factura"
     )
+    billing_period = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Período de facturación AAAAMM (derivado de invoice_date)",
+    )
     hash_code = models.CharField(max_length=64, null=True, blank=True)
     print_version = models.IntegerField(default=1)
     billing_type = models.CharField(max_length=20, blank=True, null=True)
@@ -847,6 +860,21 @@ class AccountMove(TimeStampedModel):
             models.Index(fields=["sunat_state"]),
             models.Index(fields=["company", "invoice_number"]),
             models.Index(fields=["serie", "invoice_number"]),
+            models.Index(
+                fields=["subscription", "billing_period", "state"],
+                name="billing_acc_sub_period_idx",
+            ),
+        ]
+        constraints = [
+            # Una factura recurrente vigente por suscripción y período, aunque
+            # dos workers procesen la misma suscripción a la vez
+            models.UniqueConstraint(
+                fields=["subscription", "billing_period"],
+                condition=models.Q(
+                    billing_type="subscription", state__in=["draft", "posted"]
+                ),
+                name="billing_acc_sub_period_uniq",
+            ),
         ]
 
     def __str__(self):
@@ -870,124 +898,86 @@ class AccountMove(TimeStampedModel):
         if not self.invoice_payment_term or not self.invoice_date:
             return None
 
-        # Buscar la primera línea del término de pago
-        payment_line = self.invoice_payment_term.lines.first()
-        if not payment_line:
-            return None
+        from .services.payment_term_evaluator import get_payment_term_evaluator
 
-        due_date = self.invoice_date
-
-        if payment_line.option == "day_after_invoice_date":
-            # Días después de la fecha de factura
-            due_date = self.invoice_date + timedelta(days=payment_line.days)
-
-        elif payment_line.option == "day_following_month":
-            # Día específico del mes siguiente
-            if payment_line.day_of_the_month:
-                next_month = self.invoice_date.replace(day=1) + relativedelta(months=1)
-                try:
-                    due_date = next_month.replace(day=payment_line.day_of_the_month)
-                except ValueError:
-                    # Si el día no existe en ese mes, usar último día
-                    last_day = calendar.monthrange(next_month.year, next_month.month)[1]
-                    due_date = next_month.replace(
-                        day=min(payment_line.day_of_the_month, last_day)
-                    )
-
-        elif payment_line.option == "end_of_month":
-            # Fin del mes actual - USAR LÓGICA ESPECIAL 30/28
-            due_date = self._calculate_end_of_month_due_date()
-
-        # Verificar que la fecha de vencimiento no sea menor o igual a la emisión
-        if due_date <= self.invoice_date:
-            # Mover al siguiente periodo según el tipo de término
-            if payment_line.option == "end_of_month":
-                # Para fin de mes, usar el siguiente mes
-                due_date = self._get_next_end_of_month(due_date)
-            else:
-                # Para otros tipos, agregar más días
-                due_date = due_date + timedelta(days=1)
-
-        return due_date
+        # El término compilado se reutiliza entre facturas; el flag de fin de
+        # mes solo se consulta si el término es de tipo end_of_month
+        evaluator = get_payment_term_evaluator()
+        compiled = evaluator.compile(self.invoice_payment_term)
+        end_of_month_payment = (
+            compiled.uses_end_of_month and self.invoice_end_of_month_payment
+        )
+        return evaluator.due_date(
+            self.invoice_payment_term, self.invoice_date, end_of_month_payment
+        )
 
     def _calculate_end_of_month_due_date(self):
         """Calcula fecha de vencimiento para fin de mes con regla 30/28"""
+        from .services.payment_term_evaluator import end_of_month_due_date
 
-        # Determinar el mes de vencimiento
-        if self.invoice_end_of_month_payment:
-            # Si es factura fin de mes, verificar condiciones especiales
-            return self._calculate_end_of_month_with_hotfix()
-        else:
-            # Fin de mes normal (último día del mes)
-            last_day = calendar.monthrange(
-                self.invoice_date.year, self.invoice_date.month
-            )[1]
-            return self.invoice_date.replace(day=last_day)
+        return end_of_month_due_date(
+            self.invoice_date, self.invoice_end_of_month_payment
+        )
 
     def _calculate_end_of_month_with_hotfix(self):
         """Aplica la lógica de hotfix 30/28 días"""
+        from .services.payment_term_evaluator import end_of_month_with_hotfix
 
-        # Obtener último día natural del mes
-        _, num_dias_en_mes = calendar.monthrange(
-            self.invoice_date.year, self.invoice_date.month
-        )
-        ultimo_dia_mes = self.invoice_date.replace(day=num_dias_en_mes)
+        return end_of_month_with_hotfix(self.invoice_date)
 
-        # Determinar día de cierre (30 o 28)
-        mes = self.invoice_date.month
-        dia_de_cierre = 28 if mes == 2 else 30
+    def _get_next_end_of_month(self, fecha_base):
+        """Obtiene el 30/28 del mes siguiente"""
+        from .services.payment_term_evaluator import next_end_of_month
 
-        # Intentar establecer el día de cierre
-        try:
-            fecha_vencimiento_original = self.invoice_date.replace(day=dia_de_cierre)
-        except ValueError:
-            # Si el día no existe (ej: 30 en febrero), usar último día
-            fecha_vencimiento_original = ultimo_dia_mes
-
-        # Verificar condiciones para aplicar hotfix
-        condicion_a_ultimo_dia = self.invoice_date.day == num_dias_en_mes
-        condicion_b_dia_30_en_mes_31 = (
-            self.invoice_date.day == 30 and num_dias_en_mes == 31
-        )
-        condicion_c_es_28_feb_en_bisiesto = (
-            self.invoice_date.month == 2
-            and self.invoice_date.day == 28
-            and num_dias_en_mes == 29  # Año bisiesto
-        )
+        return next_end_of_month(fecha_base)
 
-        # Aplicar hotfix si se cumple alguna condición
-        if (
-            condicion_a_ultimo_dia
-            or condicion_b_dia_30_en_mes_31
-            or condicion_c_es_28_feb_en_bisiesto
-        ):
-            return self._get_next_end_of_month(self.invoice_date)
-        else:
-            return fecha_vencimiento_original
+    def get_print_data(self):
+        """Datos para imprimir la factura: lo enviado a Nubefact + QR/hash"""
+        if not self.json_sent:
+            return None
+        invoice_data = dict(self.json_sent)
+        response = self.json_response or {}
+        for key in ("cadena_para_codigo_qr", "codigo_hash"):
+            if response.get(key) and not invoice_data.get(key):
+                invoice_data[key] = response[key]
+        return invoice_data
+
+    def render_pdf(self, invoice_data=None, template_name=None, reprint=False):
+        """
+        PDF de la factura a través del cache de renderizado.
 
-    def _get_next_end_of_month(self, fecha_base):
-        """Obtiene el 30/28 del mes siguiente"""
+        `hash_code` guarda la clave del render: si los datos, el template y el
+        CSS no cambiaron, el PDF sale del cache sin volver a renderizar.
+        `reprint=True` incrementa `print_version`.
+        """
+        from shared.utils.pdf.invoice_generator import InvoicePDFGenerator
 
-        # Calcular primer día del mes siguiente
-        primer_dia_mes_siguiente = fecha_base.replace(day=1) + relativedelta(months=1)
+        invoice_data = invoice_data or self.get_print_data()
+        if not invoice_data:
+            raise ValueError(f"{self} no tiene datos para imprimir (json_sent)")
 
-        # Determinar día de cierre para el mes siguiente
-        mes_siguiente = primer_dia_mes_siguiente.month
-        dia_de_cierre = 28 if mes_siguiente == 2 else 30
+        generator = InvoicePDFGenerator(invoice_data, template_name)
+        pdf_bytes = generator.generate_sync()
 
-        # Intentar establecer el día de cierre
-        try:
-            return primer_dia_mes_siguiente.replace(day=dia_de_cierre)
-        except ValueError:
-            # Si el día no existe (ej: 30 en febrero), usar último día
-            last_day = calendar.monthrange(
-                primer_dia_mes_siguiente.year, mes_siguiente
-            )[1]
-            return primer_dia_mes_siguiente.replace(day=last_day)
+        updates = {}
+        if self.hash_code != generator.cache_key():
+            self.hash_code = updates["hash_code"] = generator.cache_key()
+        if reprint:
+            updates["print_version"] = models.F("print_version") + 1
+        if updates and self.pk:
+            AccountMove.objects.filter(pk=self.pk).update(**updates)
+            if reprint:
+                self.refresh_from_db(fields=["print_version"])
+
+        return pdf_bytes
 
     def save(self, *args, **kwargs):
         """Sobrescribir save para calcular automáticamente fecha de vencimiento"""
 
+        # Mantener la clave de período sincronizada con la fecha de emisión
+        if self.invoice_date:
+            self.billing_period = billing_period_key(self.invoice_date)
+
         # Si es una factura de suscripción y no tiene término de pago asignado
         if self.subscription and not self.invoice_payment_term:
             payment_term = self.subscription.get_payment_term()
@@ -1433,6 +1423,59 @@ class Sequence(TimeStampedModel):
 
             return next_number
 
+    def reserve_numbers(self, count):
+        """
+        Reserva `count` números consecutivos con un único UPDATE ... RETURNING
+        (sin SELECT previo ni refresh). Devuelve el primer número reservado.
+
+        El UPDATE bloquea la fila hasta el fin de la transacción en curso:
+        fuera de una transacción la reserva se confirma de inmediato.
+        """
+        if count < 1:
+            raise ValueError("count debe ser mayor que 0")
+
+        with transaction.atomic():
+            table = connection.ops.quote_name(self._meta.db_table)
+            if connection.features.can_return_columns_from_insert:
+                # PostgreSQL y SQLite >= 3.35 admiten RETURNING también en UPDATE
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"UPDATE {table} "
+                        "SET number_next = number_next + %s * number_increment, "
+                        "updated_at = %s "
+                        "WHERE id = %s AND active = %s "
+                        "RETURNING number_next, number_increment",
+                        [count, timezone.now(), self.id, True],
+                    )
+                    row = cursor.fetchone()
+            else:
+                row = (
+                    Sequence.objects.select_for_update()
+                    .filter(id=self.id, active=True)
+                    .values_list("number_next", "number_increment")
+                    .first()
+                )
+                if row is not None:
+                    Sequence.objects.filter(id=self.id).update(
+                        number_next=models.F("number_next")
+                        + count * models.F("number_increment"),
+                        updated_at=timezone.now(),
+                    )
+                    row = (row[0] + count * row[1], row[1])
+
+            if row is None:
+                raise ValueError(f"La secuencia {self.code} no está activa")
+
+            number_end, self.number_increment = row
+            first_number = number_end - count * self.number_increment
+            if first_number < 1:
+                raise ValueError(
+                    f"Número siguiente inválido ({first_number}) en la secuencia {self.code}"
+                )
+
+        self.number_next = number_end
+        return first_number
+
     def format_number(self, number):
         """Formatea el número según el prefijo, sufijo y padding"""
         formatted_number = str(number).zfill(self.padding)
@@ -1499,3 +1542,175 @@ class Sequence(TimeStampedModel):
             self.save()
             return True
         return False
+
+
+class BillingRun(models.Model):
+    """
+    Corrida de facturación masiva distribuida en workers Celery.
+
+    Las suscripciones elegibles se reparten en shards (compañía + tipo de
+    documento/serie); el callback del chord consolida aquí sus estadísticas.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "⏳ Pendiente"),
+        ("PROCESSING", "🔄 Procesando"),
+        ("PARTIAL", "⚠️ Parcialmente Completado"),
+        ("COMPLETED", "✅ Completado"),
+        ("FAILED", "❌ Fallido"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        help_text="Compañía facturada (vacío = todas)",
+    )
+    target_date = models.DateField(help_text="Fecha objetivo de facturación")
+    dry_run = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    context = models.CharField(max_length=50, blank=True, null=True)
+    metadata = models.JSONField(null=True, blank=True)
+
+    total_items = models.IntegerField(default=0)
+    processed_items = models.IntegerField(default=0)
+    successful_items = models.IntegerField(default=0)
+    failed_items = models.IntegerField(default=0)
+    skipped_items = models.IntegerField(default=0)
+    results = models.JSONField(null=True, blank=True)
+    error_summary = models.JSONField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Corrida de Facturación"
+        verbose_name_plural = "Corridas de Facturación"
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"], name="billing_run_status_created_idx"
+            ),
+            models.Index(
+                fields=["company", "target_date"], name="billing_run_company_date_idx"
+            ),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"BillingRun {self.id} - {self.target_date} - {self.status}"
+
+    @property
+    def progress_percentage(self):
+        """Porcentaje de completado de la corrida"""
+        if self.total_items == 0:
+            return 0
+        return int((self.processed_items / self.total_items) * 100)
+
+
+class BillingRunShard(models.Model):
+    """Porción de una BillingRun procesada por una subtarea Celery"""
+
+    STATUS_CHOICES = [
+        ("PENDING", "⏳ Pendiente"),
+        ("PROCESSING", "🔄 Procesando"),
+        ("COMPLETED", "✅ Completado"),
+        ("FAILED", "❌ Fallido"),
+    ]
+
+    run = models.ForeignKey(BillingRun, on_delete=models.CASCADE, related_name="shards")
+    number = models.IntegerField(help_text="Número de shard dentro de la corrida")
+    company = models.ForeignKey(Company, on_delete=models.PROTECT)
+    document_type = models.CharField(
+        max_length=10, help_text="'invoice' (serie F001) o 'ticket' (serie B001)"
+    )
+    subscription_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    attempts = models.IntegerField(default=0)
+    stats = models.JSONField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Shard de Facturación"
+        verbose_name_plural = "Shards de Facturación"
+        ordering = ["run", "number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run", "number"], name="billing_run_shard_unique_number"
+            )
+        ]
+
+    def __str__(self):
+        return f"Shard {self.number} ({self.document_type}) - {self.status}"
+
+
+class SubscriptionLedgerEntry(models.Model):
+    """
+    Movimiento del libro de facturación de una suscripción (solo inserción).
+
+    Cada factura emitida agrega una entrada `invoice` (+1, +monto), cada
+    cambio posterior de sus montos una `adjustment` (0, diferencia) y su
+    anulación una `reversal` (-1, -monto registrado), de modo que los
+    totales por cliente/mes salen de sumar el libro sin recorrer AccountMove.
+    """
+
+    EVENT_CHOICES = [
+        ("invoice", "Factura emitida"),
+        ("adjustment", "Ajuste de montos"),
+        ("reversal", "Factura anulada"),
+    ]
+
+    subscription = models.ForeignKey(
+        SaleSubscription, on_delete=models.CASCADE, related_name="ledger_entries"
+    )
+    partner = models.ForeignKey(Partner, on_delete=models.PROTECT)
+    company = models.ForeignKey(Company, on_delete=models.PROTECT)
+    invoice = models.ForeignKey(
+        AccountMove, on_delete=models.CASCADE, related_name="ledger_entries"
+    )
+    event_type = models.CharField(
+        max_length=10, choices=EVENT_CHOICES, default="invoice"
+    )
+    billing_period = models.PositiveIntegerField(
+        help_text="Período de facturación AAAAMM"
+    )
+    invoice_count = models.SmallIntegerField(default=1)
+    amount_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    amount_tax = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Movimiento de Facturación"
+        verbose_name_plural = "Libro de Facturación"
+        ordering = ["-created_at"]
+        constraints = [
+            # Una emisión y una anulación por factura; ajustes sin límite
+            models.UniqueConstraint(
+                fields=["invoice", "event_type"],
+                condition=models.Q(event_type__in=["invoice", "reversal"]),
+                name="billing_ledger_unique_invoice_event",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["partner", "billing_period"],
+                name="billing_ledger_partner_idx",
+            ),
+            models.Index(
+                fields=["company", "billing_period"],
+                name="billing_ledger_company_idx",
+            ),
+            models.Index(
+                fields=["subscription", "billing_period"],
+                name="billing_ledger_sub_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.get_event_type_display()} {self.invoice_id} ({self.billing_period})"
+        )
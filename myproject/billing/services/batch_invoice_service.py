@@ -1,12 +1,16 @@
 # billing/services/batch_invoice_service.py (versión simplificada)
 import logging
+from collections import defaultdict
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from decimal import Decimal
-from .sequence_service import get_next_invoice_reference, get_document_type
+from decimal import ROUND_HALF_UP, Decimal
+from .billing_ledger_service import BillingLedgerService
+from .payment_term_evaluator import get_payment_term_evaluator
+from .sequence_service import SequenceService, get_document_type
 from ..models import (
     SaleSubscription,
     AccountMove,
@@ -20,20 +24,45 @@ from ..models import (
     Partner,
     Sequence,
     AccountPaymentTerm,
+    billing_period_key,
 )
 
 logger = logging.getLogger(__name__)
 
+CENT = Decimal("0.01")
+# Filas por INSERT/UPDATE en las operaciones bulk
+BULK_BATCH_SIZE = 1000
+
 
 class BatchInvoiceService:
     """
-    Servicio simplificado para generar facturas en lote
+    Servicio para generar facturas en lote.
+
+    Procesa las suscripciones elegibles por bloques (`chunk_size`,
+    `BILLING_BATCH_CHUNK_SIZE`): cada bloque se carga con sus líneas e
+    impuestos en pocas consultas, las facturas se calculan en memoria y se
+    guardan con `bulk_create` (facturas, líneas y relación línea-impuesto)
+    dentro de una transacción por bloque. Si el bloque falla, se reintenta
+    suscripción por suscripción para aislar el error.
+
+    `reference_blocks` permite pasar bloques de numeración ya reservados
+    (ver `SequenceService.reserve_block`), p. ej. uno por shard en la
+    facturación distribuida.
     """
 
-    def __init__(self, company_id=None, dry_run=False):
+    def __init__(
+        self, company_id=None, dry_run=False, chunk_size=None, reference_blocks=None
+    ):
         self.company_id = company_id
         self.dry_run = dry_run
+        self.chunk_size = chunk_size or getattr(
+            settings, "BILLING_BATCH_CHUNK_SIZE", 500
+        )
         self.today = timezone.now().date()
+        self.sequence_service = SequenceService(company_id)
+        self.ledger = BillingLedgerService()
+        # (company_id, "invoice"/"ticket") -> SequenceBlock pre-reservado
+        self.reference_blocks = reference_blocks or {}
         self.stats = {
             "processed": 0,
             "created": 0,
@@ -42,6 +71,14 @@ class BatchInvoiceService:
             "details": [],
         }
 
+        # Configuración precargada por compañía durante la corrida
+        self._loaded_companies = set()
+        self._series = {}  # (company_id, "F001"/"B001") -> InvoiceSerie
+        self._payment_terms = {}  # company_id -> AccountPaymentTerm | None
+        self._default_currency = None
+        # (term_id, emission_date) -> fecha de vencimiento
+        self._due_dates = {}
+
     def generate_batch_invoices(self, target_date=None, subscription_ids=None):
         """
         Genera facturas en lote para suscripciones recurrentes
@@ -54,15 +91,18 @@ class BatchInvoiceService:
             print(f"🚀 Generando facturas para {target_date}")
 
         try:
-            # Obtener suscripciones elegibles
-            subscriptions = self._get_eligible_subscriptions(
-                target_date, subscription_ids
+            # Obtener suscripciones elegibles (solo ids; se cargan por bloque)
+            eligible_ids = list(
+                self._get_eligible_subscriptions(target_date, subscription_ids)
+                .order_by("id")
+                .values_list("id", flat=True)
             )
-            print(f"📊 Encontradas {len(subscriptions)} suscripciones elegibles")
+            print(f"📊 Encontradas {len(eligible_ids)} suscripciones elegibles")
 
-            # Procesar cada suscripción
-            for subscription in subscriptions:
-                self._process_subscription_invoice(subscription, target_date)
+            # Procesar por bloques
+            for start in range(0, len(eligible_ids), self.chunk_size):
+                chunk_ids = eligible_ids[start : start + self.chunk_size]
+                self._process_chunk(self._load_subscriptions(chunk_ids), target_date)
 
             print(f"✅ Proceso completado: {self.stats}")
             return self.stats
@@ -98,62 +138,168 @@ class BatchInvoiceService:
 
         return base_query.select_related("partner", "company").prefetch_related("lines")
 
-    def _process_subscription_invoice(self, subscription, target_date):
+    def _load_subscriptions(self, subscription_ids):
         """
-        Procesa la generación de factura para una suscripción individual
+        Carga un bloque de suscripciones con todo lo necesario para facturar
+        (cliente, compañía, términos de pago, líneas e impuestos)
         """
-        self.stats["processed"] += 1
+        return list(
+            SaleSubscription.objects.filter(id__in=subscription_ids)
+            .select_related(
+                "partner__payment_term",
+                "company__currency",
+                "contract_template__payment_term",
+                "payment_term",
+            )
+            .prefetch_related("lines__tax_ids")
+            .order_by("id")
+        )
+
+    def _process_chunk(self, subscriptions, target_date):
+        """
+        Procesa un bloque de suscripciones ya cargadas
+        """
+        invoiced_ids = self._invoiced_subscription_ids(
+            [subscription.id for subscription in subscriptions], target_date
+        )
+        if not self.dry_run:
+            self._preload_company_config(
+                {subscription.company_id for subscription in subscriptions}
+            )
+
+        plans = []
+        for subscription in subscriptions:
+            self.stats["processed"] += 1
 
-        try:
             # Verificar si ya existe factura para este período
-            if self._invoice_exists_for_period(subscription, target_date):
+            if subscription.id in invoiced_ids:
                 self.stats["skipped"] += 1
                 self.stats["details"].append(
                     f"Factura ya existe para {subscription.code}"
                 )
-                return
+                continue
 
             if self.dry_run:
                 self.stats["details"].append(
                     f"SIMULACIÓN: Factura para {subscription.code}"
                 )
-                return
+                continue
 
-            with transaction.atomic():
-                # Crear factura
-                invoice = self._create_invoice_from_subscription(
-                    subscription, target_date
-                )
-
-                # Crear líneas de factura
-                self._create_invoice_lines(invoice, subscription)
-
-                # Calcular totales
-                self._calculate_invoice_totals(invoice)
-
-                # Actualizar suscripción
-                self._update_subscription_after_invoice(
-                    subscription, invoice, target_date
-                )
+            try:
+                plans.append(self._build_invoice_plan(subscription, target_date))
+            except Exception as e:
+                self._record_error(subscription, e)
 
-                self.stats["created"] += 1
-                self.stats["details"].append(f"Factura creada para {subscription.code}")
+        if not plans:
+            return
 
+        try:
+            with transaction.atomic():
+                self._persist_invoice_plans(plans, target_date)
         except Exception as e:
-            logger.error(f"<> Error procesando suscripción {subscription.id}: {str(e)}")
-            self.stats["errors"] += 1
-            self.stats["details"].append(f"Error en {subscription.code}: {str(e)}")
+            logger.warning(
+                f"Bloque de {len(plans)} facturas falló ({str(e)}); "
+                "reintentando suscripción por suscripción"
+            )
+            for plan in plans:
+                subscription = plan["subscription"]
+                try:
+                    with transaction.atomic():
+                        self._persist_invoice_plans([plan], target_date)
+                except IntegrityError as e:
+                    # Otro worker facturó la suscripción en este período
+                    if self._invoice_exists_for_period(subscription, target_date):
+                        self.stats["skipped"] += 1
+                        self.stats["details"].append(
+                            f"Factura ya existe para {subscription.code}"
+                        )
+                    else:
+                        self._record_error(subscription, e)
+                except Exception as e:
+                    self._record_error(subscription, e)
+                else:
+                    self._record_created([plan])
+            return
+
+        self._record_created(plans)
+
+    def _process_subscription_invoice(self, subscription, target_date):
+        """
+        Procesa la generación de factura para una suscripción individual
+        """
+        self._process_chunk([subscription], target_date)
+
+    def _record_created(self, plans):
+        for plan in plans:
+            subscription = plan["subscription"]
+            # Reflejar en memoria lo que el libro ya sumó en la BD
+            subscription.recurring_invoice_count += 1
+            subscription.invoices_generated += 1
+            subscription.total_invoiced += plan["move"]["amount_total"]
+            subscription.next_invoice_date = plan["next_invoice_date"]
+            self.stats["created"] += 1
+            self.stats["details"].append(f"Factura creada para {subscription.code}")
+
+    def _record_error(self, subscription, error):
+        logger.error(f"<> Error procesando suscripción {subscription.id}: {str(error)}")
+        self.stats["errors"] += 1
+        self.stats["details"].append(f"Error en {subscription.code}: {str(error)}")
+
+    def _invoiced_subscription_ids(self, subscription_ids, target_date):
+        """
+        Ids de las suscripciones que ya tienen factura en el período
+        (una consulta para todo el bloque, por el índice
+        subscription + billing_period + state)
+        """
+        return set(
+            AccountMove.objects.filter(
+                subscription_id__in=subscription_ids,
+                billing_period=billing_period_key(target_date),
+                state__in=["draft", "posted"],
+            ).values_list("subscription_id", flat=True)
+        )
 
     def _invoice_exists_for_period(self, subscription, target_date):
         """
         Verifica si ya existe una factura para el período
         """
-        return AccountMove.objects.filter(
-            subscription=subscription,
-            invoice_date__year=target_date.year,
-            invoice_date__month=target_date.month,
-            state__in=["draft", "posted"],
-        ).exists()
+        return subscription.id in self._invoiced_subscription_ids(
+            [subscription.id], target_date
+        )
+
+    def _preload_company_config(self, company_ids):
+        """
+        Carga de una vez las series F001/B001 y el término de pago de las
+        compañías que aún no se han visto en la corrida
+        """
+        missing = set(company_ids) - self._loaded_companies
+        if not missing:
+            return
+
+        series = (
+            InvoiceSerie.objects.filter(
+                company_id__in=missing,
+                is_active=True,
+                series__in=["F001", "B001"],
+            )
+            .select_related("journal")
+            .order_by("pk")
+        )
+        for serie in series:
+            self._series.setdefault((serie.company_id, serie.series), serie)
+
+        terms = (
+            AccountPaymentTerm.objects.filter(company_id__in=missing, is_active=True)
+            .prefetch_related("lines")
+            .order_by("pk")
+        )
+        for company_id in missing:
+            self._payment_terms[company_id] = None
+        for term in terms:
+            if self._payment_terms[term.company_id] is None:
+                self._payment_terms[term.company_id] = term
+
+        self._loaded_companies |= missing
 
     def _calculate_emission_date(self, subscription, target_date):
         """
@@ -181,19 +327,26 @@ class BatchInvoiceService:
         # Intentar obtener término de pago de la plantilla o usar por defecto
         payment_term = self._get_payment_term_for_subscription(subscription)
 
-        if payment_term:
-            return self._calculate_due_date_from_payment_term(
-                emission_date, payment_term
-            )
-        else:
-            # Lógica por defecto: día 30 del mes siguiente
-            return self._calculate_default_due_date(emission_date)
+        # Las suscripciones de un lote comparten término y fecha de emisión
+        key = (payment_term.id if payment_term else None, emission_date)
+        if key not in self._due_dates:
+            if payment_term:
+                self._due_dates[key] = self._calculate_due_date_from_payment_term(
+                    emission_date, payment_term
+                )
+            else:
+                # Lógica por defecto: día 30 del mes siguiente
+                self._due_dates[key] = self._calculate_default_due_date(emission_date)
+        return self._due_dates[key]
 
     def _get_payment_term_for_subscription(self, subscription):
         """
         Obtiene el término de pago para la suscripción
         (Por ahora usamos el primero disponible, luego se puede personalizar)
         """
+        if subscription.company_id in self._payment_terms:
+            return self._payment_terms[subscription.company_id]
+
         try:
             return AccountPaymentTerm.objects.filter(
                 company=subscription.company, is_active=True
@@ -205,10 +358,10 @@ class BatchInvoiceService:
         """
         Calcula fecha de vencimiento basada en términos de pago
         """
-        # Obtener la primera línea del término de pago
-        term_line = payment_term.lines.first()
+        # Primera línea del término, compilada una vez por proceso
+        term_line = get_payment_term_evaluator().compile(payment_term)
 
-        if not term_line:
+        if term_line.option is None:
             return self._calculate_default_due_date(emission_date)
 
         if term_line.option == "day_after_invoice_date":
@@ -251,55 +404,18 @@ class BatchInvoiceService:
 
         return due_date
 
-    def _create_invoice_from_subscription(self, subscription, target_date):
-        """Crear factura o boleta según el tipo de partner"""
-
-        try:
-            # CORRECCIÓN: Usar función corregida
-            reference = get_next_invoice_reference(
-                subscription.company, subscription.partner
-            )
-
-        except Exception as e:
-            logger.error(f"<> Error generando referencia: {str(e)}")
-
-        document_type = get_document_type(subscription.partner)
-        invoice_serie = self._get_invoice_serie(subscription.company, document_type)
-
-        if not invoice_serie:
-            invoice_serie = self._create_fallback_serie(
-                subscription.company, document_type
-            )
-
-        # Crear documento
-        invoice = AccountMove.objects.create(
-            partner=subscription.partner,
-            subscription=subscription,
-            company=subscription.company,
-            currency=subscription.company.currency or Currency.objects.first(),
-            journal=invoice_serie.journal,
-            type="out_invoice",
-            state="draft",
-            invoice_date=target_date,
-            invoice_date_due=self._calculate_due_date(
-                target_date, subscription
-            ),  # CORREGIDO
-            serie=invoice_serie,
-            invoice_number=reference,
-            ref=subscription.code,
-            narration=f"{'Factura' if document_type == 'invoice' else 'Boleta'} recurrente - {subscription.description or 'Suscripción'}",
-            billing_type="subscription",
-            document_type=subscription.partner.document_type or "dni",
-        )
-
-        doc_type_name = "Factura" if document_type == "invoice" else "Boleta"
-        logger.info(f"📄 {doc_type_name} {reference} creada para {subscription.code}")
-        return invoice
-
     def _get_invoice_serie(self, company, document_type):
         """Obtener serie según tipo de documento"""
         series_code = "F001" if document_type == "invoice" else "B001"
 
+        if company.id in self._loaded_companies:
+            serie = self._series.get((company.id, series_code))
+            if not serie:
+                logger.warning(
+                    f"No se encontró serie {series_code} para {company.name}"
+                )
+            return serie
+
         try:
             serie = InvoiceSerie.objects.filter(
                 company=company,
@@ -380,72 +496,198 @@ class BatchInvoiceService:
 
         return serie
 
-    def _create_invoice_lines(self, invoice, subscription):
+    def _build_invoice_plan(self, subscription, target_date):
         """
-        Crea las líneas de factura desde las líneas de suscripción
+        Calcula en memoria la factura, sus líneas y totales y la
+        actualización de la suscripción (sin tocar la BD salvo para crear
+        una serie de fallback)
         """
+        company = subscription.company
+        document_type = get_document_type(subscription.partner)
+        invoice_serie = self._get_invoice_serie(company, document_type)
+
+        if not invoice_serie:
+            invoice_serie = self._create_fallback_serie(company, document_type)
+            self._series[(company.id, invoice_serie.series)] = invoice_serie
+
+        lines = []
+        amount_tax = Decimal("0")
+        amount_total = Decimal("0")
         for sub_line in subscription.lines.all():
-            # Calcular precio unitario con descuento
-            price_unit = sub_line.price_unit * (1 - sub_line.discount / 100)
-
-            # Crear línea de factura
-            invoice_line = AccountMoveLine.objects.create(
-                move=invoice,
-                product=sub_line.product,
-                quantity=sub_line.quantity,
-                price_unit=price_unit,
-                discount=sub_line.discount,
-                subtotal=sub_line.quantity * price_unit,
+            # Precio unitario con descuento, redondeado como queda en la línea
+            price_unit = (sub_line.price_unit * (1 - sub_line.discount / 100)).quantize(
+                CENT, rounding=ROUND_HALF_UP
             )
+            subtotal = sub_line.quantity * price_unit * (1 - sub_line.discount / 100)
 
-            # Agregar impuestos
-            if sub_line.tax_ids.exists():
-                invoice_line.tax.set(sub_line.tax_ids.all())
+            # Impuestos (simplificado)
+            taxes = list(sub_line.tax_ids.all())
+            igv_amount = Decimal("0")
+            for tax in taxes:
+                if tax.amount_type == "percent":
+                    igv_amount += subtotal * (tax.amount / 100)
+
+            lines.append(
+                {
+                    "fields": {
+                        "product_id": sub_line.product_id,
+                        "quantity": sub_line.quantity,
+                        "price_unit": price_unit,
+                        "discount": sub_line.discount,
+                        "subtotal": subtotal,
+                        "igv_amount": igv_amount,
+                        "total": subtotal + igv_amount,
+                    },
+                    "tax_ids": [tax.id for tax in taxes],
+                }
+            )
+            amount_tax += igv_amount
+            amount_total += subtotal + igv_amount
+
+        # Calcular próxima fecha de facturación usando la plantilla
+        if subscription.contract_template:
+            next_invoice_date = subscription.contract_template.get_next_invoice_date(
+                target_date
+            )
+        else:
+            # Por defecto: 30 días después
+            next_invoice_date = target_date + timedelta(days=30)
 
-    def _calculate_invoice_totals(self, invoice):
+        doc_type_name = "Factura" if document_type == "invoice" else "Boleta"
+        return {
+            "subscription": subscription,
+            "document_type": document_type,
+            "move": {
+                "partner": subscription.partner,
+                "subscription": subscription,
+                "company": company,
+                "currency": company.currency or self._get_default_currency(),
+                "journal": invoice_serie.journal,
+                "type": "out_invoice",
+                "state": "draft",
+                "invoice_date": target_date,
+                "billing_period": billing_period_key(target_date),
+                "invoice_date_due": self._calculate_due_date(target_date, subscription),
+                # bulk_create no pasa por AccountMove.save(): asignar aquí el
+                # término de pago que save() tomaría de la suscripción
+                "invoice_payment_term": subscription.get_payment_term(),
+                "serie": invoice_serie,
+                "ref": subscription.code,
+                "narration": f"{doc_type_name} recurrente - {subscription.description or 'Suscripción'}",
+                "billing_type": "subscription",
+                "document_type": subscription.partner.document_type or "dni",
+                "amount_tax": amount_tax,
+                "amount_total": amount_total,
+            },
+            "lines": lines,
+            "next_invoice_date": next_invoice_date,
+        }
+
+    def _persist_invoice_plans(self, plans, target_date):
         """
-        Calcula los totales de la factura
+        Guarda facturas, líneas e impuestos de línea con bulk_create y
+        registra las facturas en el libro de suscripciones. Debe llamarse
+        dentro de una transacción.
         """
-        lines = invoice.lines.all()
+        # Numeración: un bloque de referencias por secuencia
+        groups = defaultdict(list)
+        for plan in plans:
+            groups[(plan["subscription"].company_id, plan["document_type"])].append(
+                plan
+            )
+
+        moves = []
+        for (_, document_type), group in groups.items():
+            references = self._reserve_references(
+                group[0]["subscription"].company, document_type, len(group)
+            )
+            for plan, reference in zip(group, references):
+                moves.append(
+                    (plan, AccountMove(invoice_number=reference, **plan["move"]))
+                )
 
-        for line in lines:
-            # Calcular subtotal
-            line.subtotal = line.quantity * line.price_unit * (1 - line.discount / 100)
+        AccountMove.objects.bulk_create(
+            [move for _, move in moves], batch_size=BULK_BATCH_SIZE
+        )
 
-            # Calcular impuestos (simplificado)
-            tax_amount = Decimal("0")
-            for tax in line.tax.all():
-                if tax.amount_type == "percent":
-                    tax_amount += line.subtotal * (tax.amount / 100)
+        move_lines = []
+        line_tax_ids = []
+        for plan, move in moves:
+            for line in plan["lines"]:
+                move_lines.append(AccountMoveLine(move=move, **line["fields"]))
+                line_tax_ids.append(line["tax_ids"])
+
+        AccountMoveLine.objects.bulk_create(move_lines, batch_size=BULK_BATCH_SIZE)
+
+        LineTax = AccountMoveLine.tax.through
+        LineTax.objects.bulk_create(
+            [
+                LineTax(accountmoveline_id=line.pk, tax_id=tax_id)
+                for line, tax_ids in zip(move_lines, line_tax_ids)
+                for tax_id in tax_ids
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
 
-            line.igv_amount = tax_amount
-            line.total = line.subtotal + tax_amount
-            line.save()
+        # Contadores de las suscripciones: entradas en el libro y UPDATE con
+        # F() (sin leer-modificar-escribir ni SaleSubscription.save())
+        self.ledger.record_invoices(
+            [move for _, move in moves],
+            next_invoice_dates={
+                plan["subscription"].pk: plan["next_invoice_date"] for plan in plans
+            },
+        )
 
-        # Calcular totales de la factura
-        invoice.amount_tax = sum(line.igv_amount for line in lines)
-        invoice.amount_total = sum(line.total for line in lines)
-        invoice.save()
+        logger.info(
+            f"📄 {len(moves)} comprobantes creados para el período "
+            f"{target_date:%Y-%m} ({len(move_lines)} líneas)"
+        )
 
-    def _update_subscription_after_invoice(self, subscription, invoice, target_date):
+    def _reserve_references(self, company, document_type, count):
         """
-        Actualiza la suscripción después de generar factura - VERSIÓN MEJORADA
+        Reserva `count` referencias de la secuencia del tipo de documento,
+        saltando las que ya estén en uso. Consume primero el bloque
+        pre-reservado para (compañía, tipo) si existe; si no, reserva un
+        bloque nuevo (un UPDATE por bloque).
+
+        En secuencias `no_gap` saltar una referencia dejaría un hueco en la
+        numeración: si alguna ya está en uso se lanza ValueError y la
+        transacción del bloque se revierte con la reserva.
         """
-        subscription.recurring_invoice_count += 1
-        subscription.invoices_generated += 1
-        subscription.total_invoiced += invoice.amount_total
-
-        # Calcular próxima fecha de facturación usando la plantilla
-        if subscription.contract_template:
-            next_invoice_date = subscription.contract_template.get_next_invoice_date(
-                target_date
+        references = []
+        while len(references) < count:
+            needed = count - len(references)
+            block = self.reference_blocks.get((company.id, document_type))
+            if block is not None and block.remaining:
+                candidates = block.take(min(needed, block.remaining))
+            else:
+                with self.sequence_service.reserve_block(
+                    "account.move", company, needed, document_type=document_type
+                ) as block:
+                    candidates = block.take(block.count)
+
+            in_use = set(
+                AccountMove.objects.filter(
+                    company=company, invoice_number__in=candidates
+                ).values_list("invoice_number", flat=True)
             )
-        else:
-            # Por defecto: 30 días después
-            next_invoice_date = target_date + timedelta(days=30)
+            if in_use and block.sequence.implementation == "no_gap":
+                raise ValueError(
+                    f"La secuencia no_gap {block.sequence.code} está desfasada: "
+                    f"referencias ya usadas {sorted(in_use)} (ver sync_sequences)"
+                )
+            if in_use:
+                logger.warning(
+                    f"Referencias duplicadas en {block.sequence.code}: {sorted(in_use)}"
+                )
+            references.extend(ref for ref in candidates if ref not in in_use)
+
+        return references
 
-        subscription.next_invoice_date = next_invoice_date
-        subscription.save()
+    def _get_default_currency(self):
+        if self._default_currency is None:
+            self._default_currency = Currency.objects.first()
+        return self._default_currency
 
 
 # Funciones de conveniencia
@@ -0,0 +1,353 @@
+# billing/services/billing_ledger_service.py
+"""
+Libro de facturación por suscripción.
+
+Los contadores de SaleSubscription (`recurring_invoice_count`,
+`invoices_generated`, `total_invoiced`) se actualizaban leyendo el valor,
+sumando en Python y guardando: dos corridas concurrentes podían perder
+incrementos. Aquí cada factura agrega una `SubscriptionLedgerEntry` (solo
+inserción: emisión, ajustes de montos y anulación) y los contadores se
+ajustan con expresiones F() en un UPDATE por bloque, sin pasar por
+`SaleSubscription.save()`.
+
+Quién registra:
+- Altas en bloque (bulk_create, sin señales): `record_invoices` desde
+  BatchInvoiceService; cambios con UPDATE en bloque: `sync_invoices` desde
+  InvoiceProcessingService; cargas masivas sin save(): `record_missing`.
+- Cualquier save() o delete() de AccountMove: señales post_save
+  (`sync_invoices`) y pre_delete (`forget_invoices`) conectadas aquí; el
+  módulo se importa en BillingConfig.ready().
+
+El libro también responde las consultas agregadas de los dashboards
+(total facturado por cliente/mes, por compañía/mes) sin recorrer
+AccountMove.
+"""
+
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateField,
+    DecimalField,
+    F,
+    IntegerField,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.signals import post_save, pre_delete
+from django.utils import timezone
+
+from ..models import (
+    AccountMove,
+    SaleSubscription,
+    SubscriptionLedgerEntry,
+    billing_period_key,
+)
+
+logger = logging.getLogger(__name__)
+
+# Suscripciones por UPDATE al aplicar contadores
+COUNTER_BATCH_SIZE = 500
+
+# Estados en que una factura cuenta en el libro
+LIVE_STATES = ("draft", "posted")
+
+
+class BillingLedgerService:
+    """
+    Uso:
+        ledger = BillingLedgerService()
+        ledger.record_invoices(moves, next_invoice_dates={sub_id: date})
+        ledger.partner_month_totals(company_id=1, period_from=202501)
+    """
+
+    def __init__(self, batch_size=COUNTER_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    # ===== REGISTRO =====
+
+    def record_invoices(self, moves, next_invoice_dates=None):
+        """
+        Registra facturas de suscripción ya guardadas y suma sus contadores.
+        Las facturas ya registradas se ignoran (reintentos idempotentes).
+        Devuelve las entradas creadas.
+        """
+        moves = [move for move in moves if move.subscription_id]
+        recorded = self._recorded(moves)
+        entries = [
+            self._entry(move, "invoice", 1, move.amount_total, move.amount_tax)
+            for move in moves
+            if move.pk not in recorded
+        ]
+        return self._insert(entries, next_invoice_dates)
+
+    def record_reversals(self, moves):
+        """
+        Registra anulaciones: resta de los contadores lo registrado de cada
+        factura (emisión más ajustes). Las no registradas o ya anuladas se
+        ignoran.
+        """
+        moves = [move for move in moves if move.subscription_id]
+        recorded = self._recorded(moves)
+        entries = []
+        for move in moves:
+            net = recorded.get(move.pk)
+            if net is None or net["reversed"]:
+                continue
+            entries.append(
+                self._entry(move, "reversal", -1, -net["total"], -net["tax"])
+            )
+        return self._insert(entries)
+
+    def sync_invoices(self, moves):
+        """
+        Alinea el libro con el estado y los montos actuales de las facturas:
+        registra las vigentes nuevas, agrega un ajuste si sus montos cambiaron
+        y anula las que pasaron a un estado no vigente. Devuelve las entradas
+        creadas.
+        """
+        moves = [move for move in moves if move.subscription_id]
+        recorded = self._recorded(moves)
+        entries = []
+        for move in moves:
+            net = recorded.get(move.pk)
+            live = move.state in LIVE_STATES
+            if net is None:
+                if live:
+                    entries.append(
+                        self._entry(
+                            move, "invoice", 1, move.amount_total, move.amount_tax
+                        )
+                    )
+            elif net["reversed"]:
+                if live:
+                    logger.warning(
+                        f"Factura {move.pk} reactivada tras su anulación: "
+                        "el libro no la vuelve a contar"
+                    )
+            elif not live:
+                entries.append(
+                    self._entry(move, "reversal", -1, -net["total"], -net["tax"])
+                )
+            else:
+                total_delta = (move.amount_total or 0) - net["total"]
+                tax_delta = (move.amount_tax or 0) - net["tax"]
+                if total_delta or tax_delta:
+                    entries.append(
+                        self._entry(move, "adjustment", 0, total_delta, tax_delta)
+                    )
+        return self._insert(entries)
+
+    def record_missing(self, company_ids=None, chunk_size=2000):
+        """
+        Registra las facturas vigentes de suscripción que no tienen entradas
+        (cargas masivas que escriben AccountMove sin señales). Devuelve las
+        entradas creadas.
+        """
+        moves = AccountMove.objects.filter(
+            subscription__isnull=False,
+            state__in=LIVE_STATES,
+            ledger_entries__isnull=True,
+        )
+        if company_ids:
+            moves = moves.filter(company_id__in=company_ids)
+
+        created = 0
+        batch = []
+        for move in moves.order_by("id").iterator(chunk_size=chunk_size):
+            batch.append(move)
+            if len(batch) >= chunk_size:
+                created += self.record_invoices(batch)
+                batch = []
+        if batch:
+            created += self.record_invoices(batch)
+        return created
+
+    @transaction.atomic
+    def forget_invoices(self, moves):
+        """
+        Antes de borrar facturas: descuenta de los contadores lo que el libro
+        aún cuenta de ellas (sus entradas se borran en cascada)
+        """
+        moves = [move for move in moves if move.subscription_id]
+        recorded = self._recorded(moves)
+        deltas = defaultdict(lambda: [0, Decimal("0")])
+        for move in moves:
+            net = recorded.get(move.pk)
+            if net is not None and not net["reversed"]:
+                deltas[move.subscription_id][0] -= net["count"]
+                deltas[move.subscription_id][1] -= net["total"]
+        self.apply_counters(deltas)
+        return len(deltas)
+
+    def _recorded(self, moves):
+        """{invoice_id: neto registrado} de las facturas con entradas"""
+        recorded = {}
+        rows = (
+            SubscriptionLedgerEntry.objects.filter(
+                invoice_id__in=[move.pk for move in moves]
+            )
+            .values("invoice_id")
+            .annotate(
+                count=Sum("invoice_count"),
+                total=Sum("amount_total"),
+                tax=Sum("amount_tax"),
+                reversals=Count("id", filter=Q(event_type="reversal")),
+            )
+            .order_by()
+        )
+        for row in rows:
+            row["reversed"] = row.pop("reversals") > 0
+            recorded[row.pop("invoice_id")] = row
+        return recorded
+
+    def _entry(self, move, event_type, count, amount_total, amount_tax):
+        return SubscriptionLedgerEntry(
+            subscription_id=move.subscription_id,
+            partner_id=move.partner_id,
+            company_id=move.company_id,
+            invoice_id=move.pk,
+            event_type=event_type,
+            billing_period=move.billing_period or billing_period_key(move.invoice_date),
+            invoice_count=count,
+            amount_total=amount_total or 0,
+            amount_tax=amount_tax or 0,
+        )
+
+    @transaction.atomic
+    def _insert(self, entries, next_invoice_dates=None):
+        SubscriptionLedgerEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+
+        deltas = defaultdict(lambda: [0, Decimal("0")])
+        for entry in entries:
+            deltas[entry.subscription_id][0] += entry.invoice_count
+            deltas[entry.subscription_id][1] += entry.amount_total
+
+        self.apply_counters(deltas, next_invoice_dates)
+        return len(entries)
+
+    def apply_counters(self, deltas, next_invoice_dates=None):
+        """
+        Suma `deltas` ({subscription_id: (facturas, monto)}) a los contadores
+        con F(), un UPDATE por bloque de suscripciones
+        """
+        next_invoice_dates = next_invoice_dates or {}
+        ids = sorted(set(deltas) | set(next_invoice_dates))
+        now = timezone.now()
+
+        for start in range(0, len(ids), self.batch_size):
+            chunk = ids[start : start + self.batch_size]
+            counted = [pk for pk in chunk if pk in deltas]
+            update = {"updated_at": now}
+
+            if counted:
+                count_delta = Case(
+                    *[When(pk=pk, then=Value(deltas[pk][0])) for pk in counted],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                update["recurring_invoice_count"] = (
+                    F("recurring_invoice_count") + count_delta
+                )
+                update["invoices_generated"] = F("invoices_generated") + count_delta
+                update["total_invoiced"] = F("total_invoiced") + Case(
+                    *[When(pk=pk, then=Value(deltas[pk][1])) for pk in counted],
+                    default=Value(Decimal("0")),
+                    output_field=DecimalField(max_digits=18, decimal_places=2),
+                )
+
+            dated = [pk for pk in chunk if pk in next_invoice_dates]
+            if dated:
+                update["next_invoice_date"] = Case(
+                    *[When(pk=pk, then=Value(next_invoice_dates[pk])) for pk in dated],
+                    default=F("next_invoice_date"),
+                    output_field=DateField(),
+                )
+
+            SaleSubscription.objects.filter(pk__in=chunk).update(**update)
+
+    # ===== CONSULTAS =====
+
+    def _entries(self, company_id=None, period_from=None, period_to=None):
+        entries = SubscriptionLedgerEntry.objects.all()
+        if company_id:
+            entries = entries.filter(company_id=company_id)
+        if period_from:
+            entries = entries.filter(billing_period__gte=period_from)
+        if period_to:
+            entries = entries.filter(billing_period__lte=period_to)
+        return entries
+
+    def _totals(self, entries, *group_by):
+        return (
+            entries.values(*group_by)
+            .annotate(
+                invoices=Sum("invoice_count"),
+                total=Sum("amount_total"),
+                tax=Sum("amount_tax"),
+                subscriptions=Count("subscription_id", distinct=True),
+            )
+            .order_by(*group_by)
+        )
+
+    def partner_month_totals(
+        self, company_id=None, partner_id=None, period_from=None, period_to=None
+    ):
+        """Total facturado por cliente y período AAAAMM"""
+        entries = self._entries(company_id, period_from, period_to)
+        if partner_id:
+            entries = entries.filter(partner_id=partner_id)
+        return self._totals(entries, "partner_id", "billing_period")
+
+    def company_month_totals(self, company_id=None, period_from=None, period_to=None):
+        """Total facturado por compañía y período AAAAMM"""
+        return self._totals(
+            self._entries(company_id, period_from, period_to),
+            "company_id",
+            "billing_period",
+        )
+
+    def subscription_totals(self, subscription_ids):
+        """{subscription_id: {invoices, total, tax}} según el libro"""
+        return {
+            row["subscription_id"]: row
+            for row in SubscriptionLedgerEntry.objects.filter(
+                subscription_id__in=subscription_ids
+            )
+            .values("subscription_id")
+            .annotate(
+                invoices=Sum("invoice_count"),
+                total=Sum("amount_total"),
+                tax=Sum("amount_tax"),
+            )
+            .order_by()
+        }
+
+
+def _sync_saved_invoice(sender, instance, raw=False, **kwargs) -> None:
+    if raw or not instance.subscription_id:
+        return
+    BillingLedgerService().sync_invoices([instance])
+
+
+def _forget_deleted_invoice(sender, instance, **kwargs) -> None:
+    if instance.subscription_id:
+        BillingLedgerService().forget_invoices([instance])
+
+
+post_save.connect(
+    _sync_saved_invoice,
+    sender=AccountMove,
+    dispatch_uid="billing_ledger_sync_invoice",
+)
+pre_delete.connect(
+    _forget_deleted_invoice,
+    sender=AccountMove,
+    dispatch_uid="billing_ledger_forget_invoice",
+)
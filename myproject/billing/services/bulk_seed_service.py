@@ -0,0 +1,665 @@
+# billing/services/bulk_seed_service.py
+"""
+Carga masiva de datos de prueba para los comandos populate_*.
+
+Los comandos crean sus datos fila por fila (`objects.create` + `save()`),
+lo que para un dataset de pruebas de carga (100k clientes, 200k
+suscripciones, 1M de líneas de factura) tarda horas. Con `--scale N` usan
+este módulo:
+
+- Generadores deterministas: todo el azar sale de `random.Random(seed)` y
+  las fechas se calculan desde una fecha base fija (`DEFAULT_BASE_DATE` o
+  `--base-date`), no desde el día en que corre el comando.
+- Las claves primarias se asignan en memoria (`allocate_ids`), así padres,
+  hijos y relaciones M2M se arman sin leer lo insertado.
+- Las filas se escriben con `bulk_create` en lotes de `batch_size` o, en
+  PostgreSQL con `use_copy`, con `COPY ... FROM STDIN` desde un buffer.
+- Las secuencias se sincronizan al final (`finish`): `setval` de las claves
+  primarias y `sync_sequences()` de la numeración de documentos.
+
+Uso:
+    with BulkSeeder(seed=42, use_copy=True) as seeder:
+        seed_partners(seeder, 1000 * scale, companies)
+
+Mientras dura la carga no debe haber otros procesos insertando en las
+mismas tablas: los ids se toman de MAX(id) y la secuencia se ajusta recién
+al terminar.
+"""
+
+import io
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Max
+
+from ..models import (
+    AccountMove,
+    AccountMoveLine,
+    AccountPaymentTerm,
+    ContractTemplate,
+    InvoiceSerie,
+    Partner,
+    Product,
+    SaleSubscription,
+    SaleSubscriptionLine,
+    Sequence,
+    Tax,
+    billing_period_key,
+)
+from .payment_term_evaluator import get_payment_term_evaluator
+from .sequence_service import SequenceService, sync_sequences
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+
+# Filas por unidad de --scale: --scale 100 = 100k clientes, 200k
+# suscripciones y 500k facturas (~1M de líneas)
+SCALE_UNITS = {
+    "partners": 1000,
+    "subscriptions": 2000,
+    "invoices": 5000,
+}
+
+# Fecha base de los datos generados: con la misma semilla y la misma fecha
+# base la carga es idéntica sin importar el día en que se ejecute
+DEFAULT_BASE_DATE = date(2025, 1, 1)
+
+
+def add_seed_arguments(parser):
+    """Argumentos comunes de la carga masiva en los comandos populate_*"""
+    parser.add_argument(
+        "--scale",
+        type=int,
+        help="Carga masiva: multiplica el volumen base (ver SCALE_UNITS)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Semilla de los generadores (mismo valor = mismos datos)",
+    )
+    parser.add_argument(
+        "--base-date",
+        type=date.fromisoformat,
+        default=DEFAULT_BASE_DATE,
+        help=(
+            "Fecha base AAAA-MM-DD de inicios de suscripción y fechas de "
+            f"factura (por defecto {DEFAULT_BASE_DATE.isoformat()})"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Filas por INSERT en la carga masiva (BILLING_SEED_BATCH_SIZE)",
+    )
+    parser.add_argument(
+        "--copy",
+        action="store_true",
+        help="Usar COPY de PostgreSQL en lugar de bulk_create",
+    )
+
+
+class BulkSeeder:
+    """
+    Escritor de filas en lote con ids asignados en memoria.
+
+    `add(obj)` acumula instancias por modelo y las escribe al llenarse el
+    lote. Las FK de Django en PostgreSQL son DEFERRABLE INITIALLY DEFERRED,
+    por lo que el orden de escritura entre modelos no importa dentro de la
+    transacción que abre el context manager.
+    """
+
+    def __init__(
+        self, seed=None, batch_size=None, use_copy=False, stdout=None, base_date=None
+    ):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size or getattr(
+            settings, "BILLING_SEED_BATCH_SIZE", 5000
+        )
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.stdout = stdout
+        self.base_date = base_date or DEFAULT_BASE_DATE
+        self.stats = defaultdict(int)
+        self._buffers = {}  # modelo -> [instancias], en orden de registro
+        self._next_ids = {}
+        self._atomic = None
+        self._started = None
+
+        if use_copy and not self.use_copy:
+            logger.warning(
+                "COPY solo está disponible en PostgreSQL; se usa bulk_create"
+            )
+
+    # ===== CICLO DE VIDA =====
+
+    def __enter__(self):
+        self._started = time.monotonic()
+        self._atomic = transaction.atomic()
+        self._atomic.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        atomic, self._atomic = self._atomic, None
+        if exc_type is not None:
+            return atomic.__exit__(exc_type, exc, tb)
+
+        try:
+            self.flush()
+        except Exception as e:
+            atomic.__exit__(type(e), e, e.__traceback__)
+            raise
+        atomic.__exit__(None, None, None)
+        self.finish()
+        return False
+
+    def finish(self):
+        """Sincronización diferida de secuencias al terminar la carga"""
+        self._sync_pk_sequences()
+        synced = sync_sequences()
+        elapsed = time.monotonic() - self._started if self._started else 0
+        self._log(
+            f"⏱️  Carga masiva en {elapsed:.1f}s "
+            f"({', '.join(f'{name}: {count}' for name, count in self.stats.items())}); "
+            f"{synced} secuencias de documentos sincronizadas"
+        )
+
+    # ===== IDS =====
+
+    def allocate_ids(self, model, count):
+        """Rango de `count` ids nuevos para `model` (desde MAX(id) + 1)"""
+        if model not in self._next_ids:
+            current = model.objects.aggregate(max_id=Max("pk"))["max_id"] or 0
+            self._next_ids[model] = current + 1
+        start = self._next_ids[model]
+        self._next_ids[model] = start + count
+        return range(start, start + count)
+
+    def _sync_pk_sequences(self):
+        if connection.vendor != "postgresql":
+            return
+        with connection.cursor() as cursor:
+            for model in self._next_ids:
+                table = model._meta.db_table
+                pk_column = model._meta.pk.column
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                    f'COALESCE(MAX("{pk_column}"), 1), MAX("{pk_column}") IS NOT NULL) '
+                    f'FROM "{table}"',
+                    [table, pk_column],
+                )
+
+    # ===== ESCRITURA =====
+
+    def add(self, obj):
+        buffer = self._buffers.setdefault(type(obj), [])
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self._write(type(obj), buffer)
+            buffer.clear()
+
+    def add_m2m(self, field, source_id, target_ids):
+        """Filas de la tabla intermedia de un ManyToManyField"""
+        through = field.remote_field.through
+        source = f"{field.model._meta.model_name}_id"
+        target = f"{field.related_model._meta.model_name}_id"
+        for target_id in target_ids:
+            self.add(through(**{source: source_id, target: target_id}))
+
+    def flush(self):
+        for model, buffer in self._buffers.items():
+            if buffer:
+                self._write(model, buffer)
+                buffer.clear()
+
+    def _write(self, model, objs):
+        if self.use_copy:
+            self._copy(model, objs)
+        else:
+            model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.stats[model._meta.model_name] += len(objs)
+
+    def _copy(self, model, objs):
+        """COPY FROM STDIN en formato texto desde un buffer en memoria"""
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not (field.primary_key and objs[0].pk is None)
+        ]
+        buffer = io.StringIO()
+        for obj in objs:
+            buffer.write(
+                "\t".join(
+                    _copy_value(field, field.pre_save(obj, add=True))
+                    for field in fields
+                )
+            )
+            buffer.write("\n")
+        buffer.seek(0)
+
+        columns = ", ".join(f'"{field.column}"' for field in fields)
+        sql = f'COPY "{model._meta.db_table}" ({columns}) FROM STDIN'
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, "copy_expert"):  # psycopg2
+                raw.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def _log(self, message):
+        logger.info(message)
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+
+def _copy_value(field, value):
+    """Valor en el formato texto de COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, cls=field.encoder)
+    elif isinstance(value, bool):
+        return "t" if value else "f"
+    elif isinstance(value, models.Model):
+        value = value.pk
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+# ===== GENERADORES =====
+
+NOMBRES = [
+    "Juan", "María", "Carlos", "Ana", "Luis", "Rosa", "Jorge", "Lucía",
+    "Miguel", "Carmen", "José", "Elena", "Pedro", "Sofía", "Raúl", "Julia",
+]  # fmt: skip
+APELLIDOS = [
+    "Pérez", "García", "Rodríguez", "López", "Martínez", "Sánchez", "Ramírez",
+    "Torres", "Flores", "Rivera", "Gómez", "Díaz", "Vargas", "Castillo",
+    "Mendoza", "Quispe", "Huamán", "Rojas", "Chávez", "Soto",
+]  # fmt: skip
+RUBROS = [
+    "COMERCIAL", "INVERSIONES", "SERVICIOS", "TECNOLOGIA", "CONSTRUCCIONES",
+    "CONSULTORES", "AGROINDUSTRIAL", "DISTRIBUIDORA", "LOGISTICA", "TEXTIL",
+]  # fmt: skip
+RAZONES = ["S.A.C.", "S.A.", "E.I.R.L.", "S.R.L."]
+
+# Tipo de documento -> peso en la muestra
+DOCUMENT_TYPES = {"ruc": 45, "dni": 45, "ce": 7, "pasaporte": 3}
+
+
+def _partner_identity(rng, pk):
+    """Nombre y documento deterministas; el número deriva del id (único)"""
+    document_type = rng.choices(
+        list(DOCUMENT_TYPES), weights=list(DOCUMENT_TYPES.values())
+    )[0]
+    if document_type == "ruc":
+        name = (
+            f"{rng.choice(RUBROS)} {rng.choice(APELLIDOS).upper()} "
+            f"{rng.choice(RAZONES)}"
+        )
+        return name, document_type, f"20{pk:09d}"
+    name = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+    if document_type == "dni":
+        return name, document_type, f"{pk:08d}"
+    prefix = "C" if document_type == "ce" else "P"
+    return name, document_type, f"{prefix}{pk:08d}"
+
+
+def seed_partners(seeder, count, companies):
+    """Clientes activos, cada uno asociado a una compañía"""
+    rng = seeder.rng
+    companies = list(companies)
+    companies_field = Partner._meta.get_field("companies")
+
+    for pk in seeder.allocate_ids(Partner, count):
+        name, document_type, num_document = _partner_identity(rng, pk)
+        seeder.add(
+            Partner(
+                id=pk,
+                name=name,
+                display_name=name,
+                document_type=document_type,
+                num_document=num_document,
+                ref=f"SEED-{pk}",
+                email=f"cliente{pk}@example.com",
+                is_customer=True,
+                is_active=True,
+                is_company=document_type == "ruc",
+                invoice_end_of_month_payment=rng.random() < 0.3,
+            )
+        )
+        seeder.add_m2m(companies_field, pk, [rng.choice(companies).id])
+    return count
+
+
+def _end_date(start_date, template):
+    """Fecha de fin según la plantilla (ilimitado: 1 año)"""
+    total = (template.recurring_rule_count or 1) * template.recurring_interval
+    if template.recurring_rule_boundary == "limited":
+        if template.recurring_rule_type == "daily":
+            return start_date + timedelta(days=total)
+        if template.recurring_rule_type == "weekly":
+            return start_date + timedelta(weeks=total)
+        if template.recurring_rule_type == "monthly":
+            return start_date + relativedelta(months=total)
+        if template.recurring_rule_type == "yearly":
+            return start_date + relativedelta(years=total)
+    return start_date + relativedelta(years=1)
+
+
+def _reserve_codes(sequence_type, company, count, document_type=None):
+    """Bloque de numeración o None si la compañía no tiene la secuencia"""
+    try:
+        return SequenceService().reserve_block(
+            sequence_type, company, count, document_type
+        )
+    except Sequence.DoesNotExist:
+        return None
+
+
+def seed_subscriptions(seeder, count, companies, ticket_only=False):
+    """
+    Suscripciones activas con 1-3 líneas e impuestos, repartidas entre los
+    clientes de cada compañía. `ticket_only`: solo clientes de boleta.
+    """
+    rng = seeder.rng
+    companies = list(companies)
+    products = list(
+        Product.objects.filter(is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    taxes = list(
+        Tax.objects.filter(is_active=True, type_tax_use="sale")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    prices = [Decimal(p) for p in ("89.90", "129.90", "159.90", "199.90", "249.90")]
+    tax_field = SaleSubscriptionLine._meta.get_field("tax_ids")
+
+    if not products:
+        seeder._log("❌ No hay productos activos para las líneas")
+        return 0
+
+    per_company = count // len(companies) if companies else 0
+    created = 0
+    for index, company in enumerate(companies):
+        # El resto de la división va a la primera compañía
+        target = per_company + (count % len(companies) if index == 0 else 0)
+        templates = list(
+            ContractTemplate.objects.filter(company=company, active=True).order_by("id")
+        )
+        partners = Partner.objects.filter(
+            companies=company, is_customer=True, is_active=True
+        )
+        if ticket_only:
+            partners = partners.exclude(document_type="ruc")
+        partner_rows = list(
+            partners.order_by("id").values_list("id", "display_name", "name")
+        )
+        if not target or not templates or not partner_rows:
+            seeder._log(f"⚠️ Sin plantillas o clientes para: {company}")
+            continue
+
+        codes = _reserve_codes("sale.subscription", company, target)
+        for pk in seeder.allocate_ids(SaleSubscription, target):
+            partner_id, display_name, partner_name = rng.choice(partner_rows)
+            template = rng.choice(templates)
+            date_start = seeder.base_date - timedelta(days=rng.randint(0, 60))
+
+            monthly = Decimal("0")
+            line_ids = seeder.allocate_ids(SaleSubscriptionLine, rng.randint(1, 3))
+            for line_id in line_ids:
+                quantity = Decimal(rng.randint(1, 2))
+                price_unit = rng.choice(prices)
+                discount = Decimal(rng.choice([0, 5, 10, 15]))
+                monthly += quantity * price_unit * (1 - discount / 100)
+                seeder.add(
+                    SaleSubscriptionLine(
+                        id=line_id,
+                        subscription_id=pk,
+                        product_id=rng.choice(products),
+                        quantity=quantity,
+                        price_unit=price_unit,
+                        discount=discount,
+                    )
+                )
+                if taxes:
+                    seeder.add_m2m(tax_field, line_id, [rng.choice(taxes)])
+
+            date_end = _end_date(date_start, template)
+            months = max(
+                1,
+                (date_end.year - date_start.year) * 12
+                + date_end.month
+                - date_start.month,
+            )
+            seeder.add(
+                SaleSubscription(
+                    id=pk,
+                    partner_id=partner_id,
+                    company_id=company.id,
+                    contract_template_id=template.id,
+                    payment_term_id=template.payment_term_id,
+                    date_start=date_start,
+                    date_end=date_end,
+                    recurring_monthly=monthly.quantize(CENT, ROUND_HALF_UP),
+                    recurring_total=(monthly * months).quantize(CENT, ROUND_HALF_UP),
+                    state="active",
+                    code=(
+                        codes.next_reference()
+                        if codes
+                        else f"SUB{company.id:02d}-{pk:07d}"
+                    ),
+                    description=f"{template.name} - {display_name or partner_name}",
+                    uuid=f"sub-{company.id}-{partner_id}-{pk}",
+                    health="normal",
+                    to_renew=True,
+                    # save() no corre: next_invoice_date como lo calcularía
+                    next_invoice_date=template.get_next_invoice_date(date_start),
+                    invoicing_interval=template.recurring_rule_type,
+                )
+            )
+            created += 1
+    return created
+
+
+def seed_invoices(seeder, count, companies, subscription_ratio=0.5):
+    """
+    Facturas con 1-3 líneas (~2 de media). Parte de ellas se asocian a
+    suscripciones existentes; la numeración sale de un bloque reservado por
+    compañía y tipo de documento, y el vencimiento del evaluador compilado
+    de términos de pago (AccountMove.save() no corre).
+    """
+    rng = seeder.rng
+    companies = list(companies)
+    evaluator = get_payment_term_evaluator()
+    products = list(
+        Product.objects.filter(is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    tax_field = AccountMoveLine._meta.get_field("tax")
+
+    if not products:
+        seeder._log("❌ No hay productos activos para las líneas")
+        return 0
+
+    per_company = count // len(companies) if companies else 0
+    created = 0
+    for index, company in enumerate(companies):
+        target = per_company + (count % len(companies) if index == 0 else 0)
+        partners = {
+            row[0]: row
+            for row in Partner.objects.filter(
+                companies=company, is_customer=True, is_active=True
+            )
+            .order_by("id")
+            .values_list(
+                "id",
+                "document_type",
+                "num_document",
+                "payment_term_id",
+                "invoice_end_of_month_payment",
+            )
+        }
+        subscriptions = list(
+            SaleSubscription.objects.filter(
+                company=company, is_active=True, partner_id__in=partners
+            )
+            .order_by("id")
+            .values_list(
+                "id",
+                "partner_id",
+                "payment_term_id",
+                "contract_template__payment_term_id",
+            )
+        )
+        taxes = {
+            tax_id: amount
+            for tax_id, amount in Tax.objects.filter(
+                company=company, is_active=True, amount_type="percent"
+            )
+            .order_by("id")
+            .values_list("id", "amount")
+        }
+        tax_ids_list = list(taxes)
+        payment_terms = list(
+            AccountPaymentTerm.objects.filter(company=company, is_active=True)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        series = {
+            serie.series[:1]: serie
+            for serie in InvoiceSerie.objects.filter(
+                company=company, is_active=True
+            ).order_by("-id")
+        }
+        if not target or not partners or not series:
+            seeder._log(f"⚠️ Faltan datos para crear facturas en: {company}")
+            continue
+
+        # Primero se decide tipo de documento de cada factura para reservar
+        # la numeración en un solo bloque por tipo
+        partner_ids = list(partners)
+        drafts = []
+        for _ in range(target):
+            subscription = None
+            if subscriptions and rng.random() < subscription_ratio:
+                subscription = rng.choice(subscriptions)
+                partner = partners[subscription[1]]
+            else:
+                partner = partners[rng.choice(partner_ids)]
+            document_type = (
+                "invoice"
+                if partner[1] == "ruc" and partner[2] and len(partner[2]) == 11
+                else "ticket"
+            )
+            drafts.append((partner, subscription, document_type))
+
+        blocks = {}
+        for document_type in ("invoice", "ticket"):
+            needed = sum(1 for draft in drafts if draft[2] == document_type)
+            if needed:
+                blocks[document_type] = _reserve_codes(
+                    "account.move", company, needed, document_type
+                )
+
+        for pk, (partner, subscription, document_type) in zip(
+            seeder.allocate_ids(AccountMove, target), drafts
+        ):
+            serie = series.get("F" if document_type == "invoice" else "B")
+            if not serie:
+                continue
+            block = blocks.get(document_type)
+            reference = block.next_reference() if block else f"{serie.series}-{pk:08d}"
+
+            # Jerarquía de AccountMove.save(): suscripción -> plantilla -> cliente
+            if subscription:
+                payment_term_id = subscription[2] or subscription[3] or partner[3]
+            else:
+                # Término del cliente o uno aleatorio de la compañía
+                payment_term_id = partner[3] or (
+                    rng.choice(payment_terms) if payment_terms else None
+                )
+
+            invoice_date = seeder.base_date - timedelta(days=rng.randint(0, 30))
+
+            amount_tax = Decimal("0")
+            amount_total = Decimal("0")
+            for line_id in seeder.allocate_ids(AccountMoveLine, rng.randint(1, 3)):
+                quantity = Decimal(rng.randint(1, 5))
+                price_unit = Decimal(rng.choice([50, 100, 150, 200, 250]))
+                discount = Decimal(rng.choice([0, 5, 10]))
+                subtotal = (quantity * price_unit * (1 - discount / 100)).quantize(CENT)
+                tax_ids = [rng.choice(tax_ids_list)] if tax_ids_list else []
+                igv_amount = sum(
+                    (subtotal * taxes[tax_id] / 100 for tax_id in tax_ids),
+                    Decimal("0"),
+                ).quantize(CENT, ROUND_HALF_UP)
+
+                seeder.add(
+                    AccountMoveLine(
+                        id=line_id,
+                        move_id=pk,
+                        product_id=rng.choice(products),
+                        quantity=quantity,
+                        price_unit=price_unit,
+                        discount=discount,
+                        subtotal=subtotal,
+                        igv_amount=igv_amount,
+                        total=subtotal + igv_amount,
+                    )
+                )
+                seeder.add_m2m(tax_field, line_id, tax_ids)
+                amount_tax += igv_amount
+                amount_total += subtotal + igv_amount
+
+            seeder.add(
+                AccountMove(
+                    id=pk,
+                    invoice_number=reference,
+                    partner_id=partner[0],
+                    subscription_id=subscription[0] if subscription else None,
+                    journal_id=serie.journal_id,
+                    company_id=company.id,
+                    currency_id=company.currency_id or 1,
+                    type="out_invoice",
+                    ref=reference,
+                    name=f"Factura {reference}",
+                    invoice_date=invoice_date,
+                    billing_period=billing_period_key(invoice_date),
+                    invoice_payment_term_id=payment_term_id,
+                    invoice_date_due=(
+                        evaluator.due_date(payment_term_id, invoice_date, partner[4])
+                        if payment_term_id
+                        else None
+                    ),
+                    serie_id=serie.id,
+                    document_type=partner[1] or "dni",
+                    state="draft" if rng.random() < 0.5 else "posted",
+                    amount_tax=amount_tax,
+                    amount_total=amount_total,
+                )
+            )
+            created += 1
+
+        for block in blocks.values():
+            if block:
+                block.release()
+    return created
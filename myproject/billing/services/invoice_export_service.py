@@ -0,0 +1,375 @@
+# billing/services/invoice_export_service.py
+"""
+Exportación de los PDFs guardados de un conjunto de facturas (ZIP o PDF
+combinado).
+
+`InvoiceExport` selecciona facturas (AccountMove) por compañía, cliente y
+período AAAAMM y las recorre con un cursor del servidor
+(`.iterator(chunk_size=...)`). Cada bloque de facturas se resuelve contra el
+índice del DocumentStore con una consulta por serie y los PDFs se leen del
+almacén en bloques de 64 KB: la memoria no depende del número de facturas.
+
+- ZIP (`iter_zip`): zipfile escribe sobre un buffer sin seek que se vacía
+  después de cada bloque, así que el archivo sale a medida que se arma. Los
+  PDFs van sin recomprimir (ZIP_STORED) en `pdf/` y al final se agrega
+  `facturas.csv` con los metadatos de cada factura, incluidas las que no
+  tienen PDF guardado. Ese CSV se acumula en un SpooledTemporaryFile (en
+  disco a partir de 1 MB), no en memoria.
+- PDF combinado (`merge_pdf`): pypdf necesita todas las páginas para escribir
+  la tabla xref al final, así que el documento se arma en un archivo
+  temporal y se limita a `BILLING_EXPORT_MERGE_LIMIT` facturas.
+
+Uso:
+    export = InvoiceExport(company_id=1, period=202503)
+    StreamingHttpResponse(export.iter_zip())    # vista
+    export.write_file("facturas_202503.zip")    # comando
+"""
+
+import csv
+import io
+import logging
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from shared.utils.document_store import CHUNK_SIZE
+from shared.utils.file_manager import DocumentFileManager
+
+from ..models import AccountMove
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("zip", "pdf")
+
+MANIFEST_NAME = "facturas.csv"
+
+MANIFEST_HEADERS = (
+    "Factura",
+    "Serie",
+    "Número",
+    "Fecha Emisión",
+    "Período",
+    "Cliente",
+    "N° Documento",
+    "Moneda",
+    "Monto Total",
+    "Estado",
+    "Archivo",
+    "Tamaño (bytes)",
+    "SHA-256",
+)
+
+# El CSV de metadatos pasa a disco a partir de este tamaño
+MANIFEST_SPOOL_BYTES = 1024 * 1024
+
+# El PDF combinado pasa a disco a partir de este tamaño
+MERGE_SPOOL_BYTES = 10 * 1024 * 1024
+
+
+def document_key(move):
+    """
+    (serie, numero) con que se guardó el PDF de la factura: los del JSON
+    enviado a Nubefact (lo que usa DocumentFileManager.save_pdf) o, si no
+    está, la serie y el correlativo de `invoice_number`.
+    """
+    sent = move.json_sent or {}
+    if sent.get("serie") and sent.get("numero"):
+        return str(sent["serie"]), str(sent["numero"])
+
+    if not move.invoice_number:
+        return None
+    serie, _, numero = move.invoice_number.rpartition("-")
+    if move.serie_id:
+        serie = move.serie.series
+    if not serie or not numero:
+        return None
+    return serie, str(int(numero)) if numero.isdigit() else numero
+
+
+class _StreamBuffer(io.RawIOBase):
+    """
+    Destino de zipfile sin seek: guarda lo escrito hasta `drain()`. Al no
+    poder posicionarse, zipfile escribe los tamaños y el CRC de cada entrada
+    después de sus datos (data descriptor) y nunca vuelve atrás.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class InvoiceExport:
+    """Facturas seleccionadas y sus PDFs del DocumentStore"""
+
+    def __init__(
+        self,
+        company_id=None,
+        partner_id=None,
+        period=None,
+        period_from=None,
+        period_to=None,
+        file_manager=None,
+        chunk_size=None,
+    ):
+        if not any((company_id, partner_id, period, period_from, period_to)):
+            raise ValueError("Indica compañía, cliente o período a exportar")
+        for value in (period, period_from, period_to):
+            if value and not (value >= 190001 and 1 <= value % 100 <= 12):
+                raise ValueError(f"Período inválido (AAAAMM): {value}")
+
+        self.company_id = company_id
+        self.partner_id = partner_id
+        self.period = period
+        self.period_from = period_from
+        self.period_to = period_to
+        self.file_manager = file_manager or DocumentFileManager("invoices")
+        self.store = self.file_manager.store
+        self.chunk_size = chunk_size or getattr(
+            settings, "BILLING_EXPORT_CHUNK_SIZE", 500
+        )
+        self.merge_limit = getattr(settings, "BILLING_EXPORT_MERGE_LIMIT", 500)
+        self.stats = {"invoices": 0, "documents": 0, "missing": 0, "bytes": 0}
+
+    def get_queryset(self):
+        # Filtrar por la clave de período AAAAMM (indexada)
+        filters = Q()
+        if self.company_id:
+            filters &= Q(company_id=self.company_id)
+        if self.partner_id:
+            filters &= Q(partner_id=self.partner_id)
+        if self.period:
+            filters &= Q(billing_period=self.period)
+        if self.period_from:
+            filters &= Q(billing_period__gte=self.period_from)
+        if self.period_to:
+            filters &= Q(billing_period__lte=self.period_to)
+
+        return (
+            AccountMove.objects.filter(filters)
+            .select_related("serie", "partner", "currency")
+            .defer("json_response", "narration")
+            .order_by("invoice_date", "id")
+        )
+
+    @property
+    def label(self):
+        """Sufijo para el nombre del archivo exportado"""
+        parts = []
+        if self.company_id:
+            parts.append(f"cia{self.company_id}")
+        if self.partner_id:
+            parts.append(f"cliente{self.partner_id}")
+        if self.period:
+            parts.append(str(self.period))
+        elif self.period_from or self.period_to:
+            parts.append(f"{self.period_from or 'inicio'}-{self.period_to or 'fin'}")
+        return "_".join(parts)
+
+    # ===== RECORRIDO =====
+
+    def iter_documents(self):
+        """(factura, entrada del índice o None), en bloques de `chunk_size`"""
+        moves = self.get_queryset().iterator(chunk_size=self.chunk_size)
+        while True:
+            block = list(islice(moves, self.chunk_size))
+            if not block:
+                return
+            keys = [document_key(move) for move in block]
+            documents = self.store.find_many(
+                self.file_manager.document_type, [key for key in keys if key]
+            )
+            for move, key in zip(block, keys):
+                yield move, documents.get(key) if key else None
+
+    def _count(self, document):
+        self.stats["invoices"] += 1
+        if document is None:
+            self.stats["missing"] += 1
+        else:
+            self.stats["documents"] += 1
+            self.stats["bytes"] += document["size_bytes"]
+
+    def manifest_row(self, move, document, arcname):
+        return (
+            move.invoice_number or f"#{move.id}",
+            document["serie"] if document else "",
+            document["numero"] if document else "",
+            move.invoice_date.strftime("%d/%m/%Y") if move.invoice_date else "",
+            move.billing_period or "",
+            move.partner.name,
+            move.partner.num_document or "",
+            move.currency.name,
+            f"{move.amount_total:.2f}",
+            move.state,
+            arcname or "NO DISPONIBLE",
+            document["size_bytes"] if arcname else "",
+            document["sha256"] if arcname else "",
+        )
+
+    # ===== ZIP =====
+
+    def _zip_document(self, archive, buffer, move, document, arcname):
+        """Copia el blob a una entrada del ZIP en bloques de CHUNK_SIZE"""
+        # Se abre antes de crear la entrada: si falta el blob no queda a medias
+        blob = self.store.open_blob(document["sha256"])
+        date = move.invoice_date or datetime.now()
+        info = zipfile.ZipInfo(
+            arcname, date_time=(date.year, date.month, date.day, 0, 0, 0)
+        )
+        info.compress_type = zipfile.ZIP_STORED
+        info.file_size = document["size_bytes"]
+        with blob, archive.open(info, "w") as entry:
+            for chunk in iter(lambda: blob.read(CHUNK_SIZE), b""):
+                entry.write(chunk)
+                data = buffer.drain()
+                if data:
+                    yield data
+
+    def iter_zip(self):
+        """Bytes del ZIP (PDFs + facturas.csv) para `StreamingHttpResponse`"""
+        buffer = _StreamBuffer()
+        manifest = tempfile.SpooledTemporaryFile(
+            max_size=MANIFEST_SPOOL_BYTES, mode="w+", newline="", encoding="utf-8"
+        )
+        writer = csv.writer(manifest)
+        manifest.write("\ufeff")  # BOM para Excel
+        writer.writerow(MANIFEST_HEADERS)
+
+        with manifest, zipfile.ZipFile(buffer, "w", allowZip64=True) as archive:
+            for move, document in self.iter_documents():
+                arcname = f"pdf/{document['filename']}" if document else None
+                if document is not None:
+                    try:
+                        yield from self._zip_document(
+                            archive, buffer, move, document, arcname
+                        )
+                    except FileNotFoundError:
+                        logger.warning(
+                            "Blob %s de %s no encontrado", document["sha256"], move
+                        )
+                        arcname = document = None
+                self._count(document)
+                writer.writerow(self.manifest_row(move, document, arcname))
+
+            manifest.seek(0)
+            info = zipfile.ZipInfo(
+                MANIFEST_NAME, date_time=datetime.now().timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, "w") as entry:
+                for chunk in iter(lambda: manifest.read(CHUNK_SIZE), ""):
+                    entry.write(chunk.encode("utf-8"))
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+        # Directorio central, escrito al cerrar el ZipFile
+        data = buffer.drain()
+        if data:
+            yield data
+
+        logger.info(
+            "Exportación ZIP %s: %s facturas, %s PDFs, %s sin PDF",
+            self.label,
+            self.stats["invoices"],
+            self.stats["documents"],
+            self.stats["missing"],
+        )
+
+    # ===== PDF COMBINADO =====
+
+    def merge_pdf(self, target=None):
+        """
+        Escribe en `target` (o en un archivo temporal, que se devuelve
+        posicionado al inicio) un PDF con las facturas que tienen PDF
+        guardado, con un marcador por factura. ValueError si la selección
+        supera `merge_limit`.
+        """
+        from pypdf import PdfWriter
+
+        total = self.get_queryset().count()
+        if total > self.merge_limit:
+            raise ValueError(
+                f"{total} facturas superan el límite del PDF combinado "
+                f"({self.merge_limit}); usa el formato zip"
+            )
+
+        writer = PdfWriter()
+        for move, document in self.iter_documents():
+            if document is not None:
+                try:
+                    # append clona las páginas: el blob se puede cerrar al terminar
+                    with self.store.open_blob(document["sha256"]) as blob:
+                        writer.append(
+                            blob,
+                            outline_item=f"{document['serie']}-{document['numero']}",
+                            import_outline=False,
+                        )
+                except FileNotFoundError:
+                    logger.warning(
+                        "Blob %s de %s no encontrado", document["sha256"], move
+                    )
+                    document = None
+            self._count(document)
+
+        # Fuentes e imágenes de la plantilla se repiten en cada factura
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+        if target is None:
+            target = tempfile.SpooledTemporaryFile(max_size=MERGE_SPOOL_BYTES)
+            writer.write(target)
+            target.seek(0)
+        else:
+            writer.write(target)
+
+        logger.info(
+            "PDF combinado %s: %s facturas, %s PDFs, %s sin PDF",
+            self.label,
+            self.stats["invoices"],
+            self.stats["documents"],
+            self.stats["missing"],
+        )
+        return target
+
+    # ===== ARCHIVOS =====
+
+    def write_file(self, path, fmt=None):
+        """
+        Escribe la exportación en `path`; el formato se deduce de la
+        extensión (.pdf) si no se indica. Devuelve las estadísticas.
+        """
+        fmt = fmt or ("pdf" if path.endswith(".pdf") else "zip")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+        if fmt == "pdf":
+            # Se arma antes de abrir `path`: si supera el límite no queda vacío
+            with self.merge_pdf() as merged, open(path, "wb") as fileobj:
+                shutil.copyfileobj(merged, fileobj, CHUNK_SIZE)
+        else:
+            with open(path, "wb") as fileobj:
+                for chunk in self.iter_zip():
+                    fileobj.write(chunk)
+        return self.stats
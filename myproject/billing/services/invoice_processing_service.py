@@ -1,25 +1,39 @@
 # billing/services/invoice_processing_service.py
+from collections import defaultdict
 from decimal import Decimal
 import logging
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from ..models import AccountMove
+from ..models import AccountMove, AccountMoveLine
+from .billing_ledger_service import BillingLedgerService
 
 logger = logging.getLogger(__name__)
 
+# Facturas por bloque en el cálculo y guardado de totales
+TOTALS_CHUNK_SIZE = 2000
+TOLERANCE = Decimal("0.01")  # Tolerancia de 1 céntimo
+
+# Campos que el libro de facturación sigue
+LEDGER_FIELDS = {"state", "amount_total", "amount_tax"}
+
 
 class InvoiceProcessingService:
     """
     Servicio para procesar facturas (postear, cancelar, etc.)
+
+    Los totales teóricos se calculan en bloque (`compute_invoice_totals`):
+    líneas e impuestos se leen como tuplas en dos consultas por bloque de
+    facturas y se suman en Decimal; el detalle por línea solo se arma para
+    las facturas inconsistentes.
     """
 
-    def __init__(self, company_id=None):
+    def __init__(self, company_id=None, chunk_size=TOTALS_CHUNK_SIZE):
         self.company_id = company_id
+        self.chunk_size = chunk_size
+        self.ledger = BillingLedgerService()
 
-    def post_draft_invoices(self, invoice_ids=None):
-        """
-        Cambiar facturas de draft a posted
-        """
+    def _draft_invoices(self, invoice_ids=None):
         invoices = AccountMove.objects.filter(state="draft")
 
         if self.company_id:
@@ -28,31 +42,39 @@ class InvoiceProcessingService:
         if invoice_ids:
             invoices = invoices.filter(id__in=invoice_ids)
 
-        posted_count = 0
+        return invoices
+
+    def post_draft_invoices(self, invoice_ids=None):
+        """
+        Cambiar facturas de draft a posted
+        """
+        posted_ids = []
         failed_count = 0
 
-        for invoice in invoices:
-            # Validar antes de postear
-            validation = self._calculate_invoice_with_debug(invoice)
-
-            if validation["is_consistent"]:
-                try:
-                    with transaction.atomic():
-                        invoice.state = "posted"
-                        invoice.save()
-                        posted_count += 1
-                        logger.info(f"📄 Factura {invoice.invoice_number} posteada")
-
-                except Exception as e:
-                    logger.error(f"❌ Error posteando factura {invoice.id}: {str(e)}")
-                    failed_count += 1
+        # Validar antes de postear
+        for result in self.compute_invoice_totals(self._draft_invoices(invoice_ids)):
+            if result["is_consistent"]:
+                posted_ids.append(result["id"])
             else:
                 logger.warning(
-                    f"⚠️ Factura {invoice.invoice_number} no posteada - "
-                    f"Inconsistencia: ${validation['discrepancy']:.4f}"
+                    f"⚠️ Factura {result['invoice']} no posteada - "
+                    f"Inconsistencia: ${result['discrepancy']:.4f}"
                 )
                 failed_count += 1
 
+        posted_count = 0
+        for start in range(0, len(posted_ids), self.chunk_size):
+            chunk = posted_ids[start : start + self.chunk_size]
+            try:
+                with transaction.atomic():
+                    posted_count += self._bulk_save(chunk, fields={"state": "posted"})
+            except Exception as e:
+                logger.error(f"❌ Error posteando bloque de {len(chunk)} facturas: {e}")
+                failed_count += len(chunk)
+
+        if posted_count:
+            logger.info(f"📄 {posted_count} facturas posteadas")
+
         return {
             "posted": posted_count,
             "failed": failed_count,
@@ -63,73 +85,172 @@ class InvoiceProcessingService:
         """
         Corregir automáticamente los totales de facturas inconsistentes
         """
-        invoices = AccountMove.objects.filter(state="draft")
-
-        if self.company_id:
-            invoices = invoices.filter(company_id=self.company_id)
-
-        if invoice_ids:
-            invoices = invoices.filter(id__in=invoice_ids)
-
-        fixed_count = 0
-
-        for invoice in invoices:
-            validation = self._calculate_invoice_with_debug(invoice)
-
-            if not validation["is_consistent"]:
-                # Corregir totales
-                invoice.amount_total = validation["theoretical_total"]
-
-                # Recalcular impuestos totales
-                total_tax = Decimal("0")
-                for line_detail in validation["line_details"]:
-                    total_tax += Decimal(str(line_detail["tax_amount"]))
-
-                invoice.amount_tax = total_tax
-                invoice.save()
-
-                fixed_count += 1
+        updates = {}
+        for result in self.compute_invoice_totals(self._draft_invoices(invoice_ids)):
+            if not result["is_consistent"]:
+                updates[result["id"]] = {
+                    "amount_total": result["theoretical_total"],
+                    "amount_tax": result["theoretical_tax"],
+                }
                 logger.info(
-                    f"🔧 Factura {invoice.invoice_number} corregida: "
-                    f"${invoice.amount_total:.2f} (antes: ${validation['actual_total']:.2f})"
+                    f"🔧 Factura {result['invoice']} corregida: "
+                    f"${result['theoretical_total']:.2f} (antes: ${result['actual_total']:.2f})"
                 )
 
-        return fixed_count
+        ids = list(updates)
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start : start + self.chunk_size]
+            with transaction.atomic():
+                self._bulk_save(chunk, per_invoice=updates)
+
+        return len(updates)
 
     def validate_invoice_totals(self, invoice_ids=None):
         """
         Validar que los totales de las facturas sean consistentes
         """
-        invoices = AccountMove.objects.filter(state="draft")
+        return [
+            {
+                "invoice": result["invoice"],
+                "theoretical_total": result["theoretical_total"],
+                "actual_total": result["actual_total"],
+                "discrepancy": result["discrepancy"],
+                "is_consistent": result["is_consistent"],
+                "subscription": result["subscription"],
+                "debug_info": result["line_details"],
+            }
+            for result in self.compute_invoice_totals(
+                self._draft_invoices(invoice_ids), with_details=True
+            )
+        ]
 
-        if self.company_id:
-            invoices = invoices.filter(company_id=self.company_id)
+    def compute_invoice_totals(self, invoices, with_details=False):
+        """
+        Calcula los totales teóricos de las facturas del queryset en bloque
 
-        if invoice_ids:
-            invoices = invoices.filter(id__in=invoice_ids)
+        Por cada bloque de `chunk_size` facturas: una consulta de facturas,
+        una de líneas (quantity, price_unit, discount) y una de impuestos
+        porcentuales por línea. Con `with_details` se arma el detalle por
+        línea (`_calculate_invoice_with_debug`) solo de las inconsistentes.
+        """
+        invoice_ids = list(invoices.order_by("id").values_list("id", flat=True))
+        results = []
+
+        for start in range(0, len(invoice_ids), self.chunk_size):
+            chunk = invoice_ids[start : start + self.chunk_size]
+
+            taxes_by_line = defaultdict(list)
+            for line_id, tax_amount in AccountMoveLine.tax.through.objects.filter(
+                accountmoveline__move_id__in=chunk, tax__amount_type="percent"
+            ).values_list("accountmoveline_id", "tax__amount"):
+                taxes_by_line[line_id].append(tax_amount)
+
+            totals = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+            for (
+                line_id,
+                move_id,
+                quantity,
+                price_unit,
+                discount,
+            ) in AccountMoveLine.objects.filter(move_id__in=chunk).values_list(
+                "id", "move_id", "quantity", "price_unit", "discount"
+            ):
+                # Calcular subtotal sin impuestos
+                subtotal = quantity * price_unit * (1 - discount / 100)
+
+                # Calcular impuestos
+                tax_amount = Decimal("0")
+                for amount in taxes_by_line.get(line_id, ()):
+                    tax_amount += subtotal * (amount / 100)
+
+                move_totals = totals[move_id]
+                move_totals[0] += subtotal + tax_amount
+                move_totals[1] += tax_amount
+
+            for move_id, number, amount_total, subscription_code in (
+                AccountMove.objects.filter(id__in=chunk)
+                .order_by("id")
+                .values_list(
+                    "id", "invoice_number", "amount_total", "subscription__code"
+                )
+            ):
+                theoretical_total, theoretical_tax = totals.get(
+                    move_id, (Decimal("0"), Decimal("0"))
+                )
+                discrepancy = abs(amount_total - theoretical_total)
+                results.append(
+                    {
+                        "id": move_id,
+                        "invoice": number,
+                        "theoretical_total": theoretical_total,
+                        "theoretical_tax": theoretical_tax,
+                        "actual_total": amount_total,
+                        "discrepancy": discrepancy,
+                        "is_consistent": discrepancy < TOLERANCE,
+                        "subscription": subscription_code,
+                        "line_details": [],
+                    }
+                )
 
-        validation_results = []
+        if with_details:
+            inconsistent = {r["id"]: r for r in results if not r["is_consistent"]}
+            if inconsistent:
+                for invoice in AccountMove.objects.filter(
+                    id__in=list(inconsistent)
+                ).prefetch_related("lines__product", "lines__tax"):
+                    inconsistent[invoice.id]["line_details"] = (
+                        self._calculate_invoice_with_debug(invoice)["line_details"]
+                    )
 
-        for invoice in invoices.select_related("subscription").prefetch_related(
-            "lines"
-        ):
-            debug_info = self._calculate_invoice_with_debug(invoice)
+        return results
 
-            validation_results.append(
-                {
-                    "invoice": invoice.invoice_number,
-                    "theoretical_total": debug_info["theoretical_total"],
-                    "actual_total": invoice.amount_total,
-                    "discrepancy": debug_info["discrepancy"],
-                    "is_consistent": debug_info["is_consistent"],
-                    "subscription": (
-                        invoice.subscription.code if invoice.subscription else None
-                    ),
-                    "debug_info": debug_info["line_details"],
-                }
+    def _bulk_save(self, invoice_ids, fields=None, per_invoice=None):
+        """
+        Guarda cambios de facturas con UPDATE en bloque: `fields` comunes a
+        todas o `per_invoice` ({id: campos}).
+
+        Las facturas a las que AccountMove.save() aún completaría término de
+        pago o vencimiento pasan por save() para no perder esa lógica. El
+        UPDATE en bloque no dispara señales: el libro de facturación se
+        sincroniza aquí.
+        """
+        needs_save = AccountMove.objects.filter(id__in=invoice_ids).filter(
+            Q(subscription__isnull=False, invoice_payment_term__isnull=True)
+            | Q(invoice_payment_term__isnull=False, invoice_date_due__isnull=True)
+        )
+
+        saved_ids = set()
+        for invoice in needs_save.select_related("subscription"):
+            values = fields if per_invoice is None else per_invoice[invoice.id]
+            for field, value in values.items():
+                setattr(invoice, field, value)
+            invoice.save()
+            saved_ids.add(invoice.id)
+
+        bulk_ids = [pk for pk in invoice_ids if pk not in saved_ids]
+        now = timezone.now()
+        if per_invoice is None:
+            update_fields = list(fields)
+            saved = AccountMove.objects.filter(id__in=bulk_ids).update(
+                updated_at=now, **fields
+            ) + len(saved_ids)
+        else:
+            update_fields = list(per_invoice[invoice_ids[0]])
+            AccountMove.objects.bulk_update(
+                [
+                    AccountMove(pk=pk, updated_at=now, **per_invoice[pk])
+                    for pk in bulk_ids
+                ],
+                fields=[*update_fields, "updated_at"],
+                batch_size=self.chunk_size,
             )
+            saved = len(invoice_ids)
 
-        return validation_results
+        if bulk_ids and LEDGER_FIELDS.intersection(update_fields):
+            self.ledger.sync_invoices(
+                AccountMove.objects.filter(id__in=bulk_ids, subscription__isnull=False)
+            )
+        return saved
 
     def _calculate_invoice_with_debug(self, invoice):
         """
@@ -168,7 +289,7 @@ class InvoiceProcessingService:
             )
 
         discrepancy = abs(invoice.amount_total - theoretical_total)
-        is_consistent = discrepancy < Decimal("0.01")  # Tolerancia de 1 céntimo
+        is_consistent = discrepancy < TOLERANCE
 
         return {
             "theoretical_total": theoretical_total,
@@ -9,6 +9,7 @@ from django.core.files.base import ContentFile
 
 from shared.utils.file_manager import DocumentFileManager
 from shared.utils.pdf.invoice_generator import InvoicePDFGenerator
+from shared.utils.pdf.batch_renderer import get_batch_renderer
 from api_service.services.nubefact.nubefact_service_async import NubefactServiceAsync
 from asgiref.sync import sync_to_async
 
@@ -85,13 +86,16 @@ class InvoiceService:
 
             # 3. Generar PDF local si se solicita
             pdf_content = None
+            render_key = None
             if generate_pdf:
                 # Determinar qué template usar
                 template_name = invoice_data.get(
                     "template", settings.PDF_TEMPLATES["invoice"]
                 )
+                # Si ya se renderizó con los mismos datos, sale del cache
                 pdf_generator = InvoicePDFGenerator(invoice_data, template_name)
                 pdf_content = await pdf_generator.generate_async()
+                render_key = pdf_generator.cache_key()
                 print(
                     f"✅ PDF generado: {len(pdf_content) if pdf_content else 0} bytes"
                 )
@@ -108,6 +112,8 @@ class InvoiceService:
                 "pdf_content": pdf_content if not save_to_disk else None,
                 "storage_result": storage_result,
                 "invoice_data": invoice_data,
+                # Clave del cache de renderizado, para AccountMove.hash_code
+                "render_key": render_key,
                 "download_url": (
                     storage_result.get("pdf_path") if storage_result else None
                 ),
@@ -117,10 +123,32 @@ class InvoiceService:
             return {"success": False, "error": str(e)}
 
     def generate_pdf_only(self, invoice_data):
-        """Genera solo el PDF sin enviar a Nubefact"""
+        """Genera solo el PDF sin enviar a Nubefact (usa el cache de renderizado)"""
         generator = InvoicePDFGenerator(invoice_data)
         return generator.generate_sync()
 
+    def generate_pdf_batch(self, invoice_datas, save_to_disk=True, template_name=None):
+        """
+        Genera los PDFs de muchas facturas en el pool de procesos (sin enviar a
+        Nubefact). Devuelve un generador de resultados a medida que terminan;
+        los datos se leen de `invoice_datas` solo cuando hay lugar en el pool.
+        """
+        renderer = get_batch_renderer()
+        for result in renderer.render_many(invoice_datas, template_name):
+            storage_result = None
+            if result.ok and save_to_disk:
+                storage_result = self.file_manager.save_pdf(
+                    result.pdf, result.invoice_data
+                )
+            yield {
+                "success": result.ok,
+                "index": result.index,
+                "invoice_data": result.invoice_data,
+                "pdf_content": result.pdf if not save_to_disk else None,
+                "storage_result": storage_result,
+                "error": result.error,
+            }
+
     def _determine_caller_context(self):
         """
         Intenta determinar automáticamente quién está llamando
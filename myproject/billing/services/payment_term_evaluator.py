@@ -0,0 +1,328 @@
+# billing/services/payment_term_evaluator.py
+"""
+Evaluador compilado de términos de pago.
+
+`AccountMove.calculate_due_date` leía `invoice_payment_term.lines.first()`
+en cada save y recalculaba la regla fin de mes 30/28 por factura, aunque el
+resultado depende solo de (término, fecha de emisión, pago fin de mes).
+
+Aquí cada AccountPaymentTerm se compila una vez en un `CompiledPaymentTerm`
+(función pura sobre su primera línea) y los vencimientos se memorizan por
+(regla, invoice_date, eom), donde la regla es el contenido de la línea y no
+el id del término. `due_dates_for` resuelve muchas facturas con una sola
+consulta de términos.
+
+Los términos compilados se refrescan tras `BILLING_PAYMENT_TERM_CACHE_TTL`
+segundos (0 = sin cache ni memo) y se invalidan al guardar/borrar un término
+o una de sus líneas en este proceso (señales post_save/post_delete). Como el
+memo depende solo de la regla, un término editado desde otro proceso deja de
+usar los vencimientos viejos en cuanto se recompila.
+"""
+
+import calendar
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from ..models import AccountPaymentTerm, AccountPaymentTermLine
+
+logger = logging.getLogger(__name__)
+
+
+# ===== REGLA FIN DE MES 30/28 =====
+
+
+def next_end_of_month(fecha_base: date) -> date:
+    """Obtiene el 30/28 del mes siguiente"""
+    primer_dia_mes_siguiente = fecha_base.replace(day=1) + relativedelta(months=1)
+    mes_siguiente = primer_dia_mes_siguiente.month
+    dia_de_cierre = 28 if mes_siguiente == 2 else 30
+
+    try:
+        return primer_dia_mes_siguiente.replace(day=dia_de_cierre)
+    except ValueError:
+        # Si el día no existe (ej: 30 en febrero), usar último día
+        last_day = calendar.monthrange(primer_dia_mes_siguiente.year, mes_siguiente)[1]
+        return primer_dia_mes_siguiente.replace(day=last_day)
+
+
+def end_of_month_with_hotfix(invoice_date: date) -> date:
+    """Aplica la lógica de hotfix 30/28 días"""
+    _, num_dias_en_mes = calendar.monthrange(invoice_date.year, invoice_date.month)
+    dia_de_cierre = 28 if invoice_date.month == 2 else 30
+
+    try:
+        fecha_vencimiento_original = invoice_date.replace(day=dia_de_cierre)
+    except ValueError:
+        fecha_vencimiento_original = invoice_date.replace(day=num_dias_en_mes)
+
+    condicion_a_ultimo_dia = invoice_date.day == num_dias_en_mes
+    condicion_b_dia_30_en_mes_31 = invoice_date.day == 30 and num_dias_en_mes == 31
+    condicion_c_es_28_feb_en_bisiesto = (
+        invoice_date.month == 2 and invoice_date.day == 28 and num_dias_en_mes == 29
+    )
+
+    if (
+        condicion_a_ultimo_dia
+        or condicion_b_dia_30_en_mes_31
+        or condicion_c_es_28_feb_en_bisiesto
+    ):
+        return next_end_of_month(invoice_date)
+    return fecha_vencimiento_original
+
+
+def end_of_month_due_date(invoice_date: date, end_of_month_payment: bool) -> date:
+    """Fin de mes: hotfix 30/28 si el cliente paga a fin de mes, si no último día"""
+    if end_of_month_payment:
+        return end_of_month_with_hotfix(invoice_date)
+    last_day = calendar.monthrange(invoice_date.year, invoice_date.month)[1]
+    return invoice_date.replace(day=last_day)
+
+
+# ===== TÉRMINO COMPILADO =====
+
+
+class CompiledPaymentTerm:
+    """Primera línea de un término de pago reducida a una función pura"""
+
+    __slots__ = ("term_id", "option", "days", "day_of_the_month")
+
+    def __init__(self, term_id, option=None, days=0, day_of_the_month=None):
+        self.term_id = term_id
+        self.option = option  # None = término sin líneas
+        self.days = days
+        self.day_of_the_month = day_of_the_month
+
+    @classmethod
+    def from_term(cls, term) -> "CompiledPaymentTerm":
+        # lines.first() usa el prefetch si existe (Meta.ordering = sequence)
+        line = term.lines.first()
+        if line is None:
+            return cls(term.id)
+        return cls(term.id, line.option, line.days, line.day_of_the_month)
+
+    @property
+    def rule(self) -> Tuple:
+        """Lo único de lo que depende `due_date` (clave del memo)"""
+        return (self.option, self.days, self.day_of_the_month)
+
+    @property
+    def uses_end_of_month(self) -> bool:
+        return self.option == "end_of_month"
+
+    def due_date(
+        self, invoice_date: date, end_of_month_payment: bool = False
+    ) -> Optional[date]:
+        """Misma regla que AccountMove.calculate_due_date"""
+        if self.option is None or not invoice_date:
+            return None
+
+        due_date = invoice_date
+
+        if self.option == "day_after_invoice_date":
+            due_date = invoice_date + timedelta(days=self.days)
+
+        elif self.option == "day_following_month":
+            if self.day_of_the_month:
+                next_month = invoice_date.replace(day=1) + relativedelta(months=1)
+                last_day = calendar.monthrange(next_month.year, next_month.month)[1]
+                due_date = next_month.replace(day=min(self.day_of_the_month, last_day))
+
+        elif self.option == "end_of_month":
+            due_date = end_of_month_due_date(invoice_date, end_of_month_payment)
+
+        # La fecha de vencimiento no puede ser menor o igual a la emisión
+        if due_date <= invoice_date:
+            if self.option == "end_of_month":
+                due_date = next_end_of_month(due_date)
+            else:
+                due_date = due_date + timedelta(days=1)
+
+        return due_date
+
+
+# ===== EVALUADOR =====
+
+
+class PaymentTermEvaluator:
+    """
+    Cache por proceso de términos compilados y vencimientos calculados.
+
+    Uso:
+        evaluator = get_payment_term_evaluator()
+        due = evaluator.due_date(term, invoice_date, end_of_month_payment)
+        dues = evaluator.due_dates_for(invoices)
+    """
+
+    DEFAULT_TTL = 300
+    MAX_MEMO = 20000
+
+    def __init__(self, ttl: Optional[float] = None, max_memo: int = MAX_MEMO):
+        self.ttl = (
+            getattr(settings, "BILLING_PAYMENT_TERM_CACHE_TTL", self.DEFAULT_TTL)
+            if ttl is None
+            else ttl
+        )
+        self.max_memo = max_memo
+        self._compiled: Dict[int, Tuple[CompiledPaymentTerm, float]] = {}
+        self._memo: Dict[Tuple[Tuple, date, bool], Optional[date]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"compiled": 0, "hits": 0, "misses": 0, "invalidations": 0}
+
+    # ===== COMPILACIÓN =====
+
+    def _cached(self, term_id) -> Optional[CompiledPaymentTerm]:
+        entry = self._compiled.get(term_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def _store(self, compiled: CompiledPaymentTerm) -> CompiledPaymentTerm:
+        self.stats["compiled"] += 1
+        if self.ttl > 0:
+            with self._lock:
+                self._compiled[compiled.term_id] = (
+                    compiled,
+                    time.monotonic() + self.ttl,
+                )
+        return compiled
+
+    def compile(self, term) -> CompiledPaymentTerm:
+        """Compila un AccountPaymentTerm (instancia o id)"""
+        term_id = getattr(term, "id", term)
+        compiled = self._cached(term_id)
+        if compiled is not None:
+            return compiled
+
+        if not isinstance(term, AccountPaymentTerm):
+            return self.compile_many([term_id])[term_id]
+        return self._store(CompiledPaymentTerm.from_term(term))
+
+    def compile_many(self, term_ids: Iterable[int]) -> Dict[int, CompiledPaymentTerm]:
+        """Compila varios términos con una consulta para los no cacheados"""
+        result = {}
+        missing = set()
+        for term_id in set(term_ids):
+            compiled = self._cached(term_id)
+            if compiled is not None:
+                result[term_id] = compiled
+            else:
+                missing.add(term_id)
+
+        if missing:
+            for term in AccountPaymentTerm.objects.filter(
+                id__in=missing
+            ).prefetch_related("lines"):
+                result[term.id] = self._store(CompiledPaymentTerm.from_term(term))
+            for term_id in missing - set(result):
+                # Término inexistente: sin vencimiento
+                result[term_id] = CompiledPaymentTerm(term_id)
+
+        return result
+
+    # ===== VENCIMIENTOS =====
+
+    def _memoized(
+        self, compiled: CompiledPaymentTerm, invoice_date: date, eom: bool
+    ) -> Optional[date]:
+        # El flag de fin de mes solo influye en términos end_of_month
+        eom = bool(eom) and compiled.uses_end_of_month
+        if self.ttl <= 0:
+            return compiled.due_date(invoice_date, eom)
+
+        # Clave por contenido de la regla: un término recompilado con otra
+        # línea no reutiliza vencimientos de la versión anterior
+        key = (compiled.rule, invoice_date, eom)
+        if key in self._memo:
+            self.stats["hits"] += 1
+            return self._memo[key]
+
+        self.stats["misses"] += 1
+        value = compiled.due_date(invoice_date, eom)
+        with self._lock:
+            if len(self._memo) >= self.max_memo:
+                self._memo.clear()
+            self._memo[key] = value
+        return value
+
+    def due_date(
+        self, term, invoice_date: date, end_of_month_payment: bool = False
+    ) -> Optional[date]:
+        """Vencimiento de una fecha de emisión con un término"""
+        if term is None or not invoice_date:
+            return None
+        return self._memoized(self.compile(term), invoice_date, end_of_month_payment)
+
+    def due_dates_for(self, invoices: Iterable) -> List[Optional[date]]:
+        """
+        Vencimientos de varias facturas (en el mismo orden), compilando sus
+        términos con una sola consulta.
+
+        El flag de pago a fin de mes (`invoice_end_of_month_payment`) solo se
+        evalúa en facturas con término fin de mes: conviene
+        `select_related("partner")` en el queryset.
+        """
+        invoices = list(invoices)
+        compiled = self.compile_many(
+            invoice.invoice_payment_term_id
+            for invoice in invoices
+            if invoice.invoice_payment_term_id
+        )
+
+        due_dates = []
+        for invoice in invoices:
+            term = compiled.get(invoice.invoice_payment_term_id)
+            if term is None or not invoice.invoice_date:
+                due_dates.append(None)
+                continue
+            eom = term.uses_end_of_month and invoice.invoice_end_of_month_payment
+            due_dates.append(self._memoized(term, invoice.invoice_date, eom))
+        return due_dates
+
+    def invalidate(self) -> None:
+        """Descarta términos compilados y vencimientos memorizados."""
+        with self._lock:
+            self._compiled.clear()
+            self._memo.clear()
+        self.stats["invalidations"] += 1
+
+
+_evaluator: Optional[PaymentTermEvaluator] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_payment_term_evaluator() -> PaymentTermEvaluator:
+    """Evaluador compartido por el proceso."""
+    global _evaluator
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = PaymentTermEvaluator()
+    return _evaluator
+
+
+def _invalidate_evaluator(sender, **kwargs) -> None:
+    if _evaluator is not None:
+        _evaluator.invalidate()
+        logger.debug(
+            f"Evaluador de términos de pago invalidado por cambio en {sender.__name__}"
+        )
+
+
+for _model in (AccountPaymentTerm, AccountPaymentTermLine):
+    post_save.connect(
+        _invalidate_evaluator,
+        sender=_model,
+        dispatch_uid=f"payment_term_evaluator_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        _invalidate_evaluator,
+        sender=_model,
+        dispatch_uid=f"payment_term_evaluator_delete_{_model.__name__}",
+    )
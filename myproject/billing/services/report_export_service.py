@@ -0,0 +1,317 @@
+# billing/services/report_export_service.py
+"""
+Exportación de reportes en streaming (CSV, CSV.gz y XLSX).
+
+Un reporte (`StreamingReport`) define su queryset, las columnas que lee con
+`values_list` y cómo formatear cada fila. `ReportExporter` lo recorre con un
+cursor del servidor (`.iterator(chunk_size=...)`), escribe cada fila directo
+al destino sin acumularlas en memoria y actualiza las estadísticas del
+reporte en la misma pasada.
+
+Uso:
+    report = EndOfMonthReport(company_id=1, year=2025, month=3)
+    exporter = ReportExporter(report)
+    exporter.write_file("reporte.csv.gz")         # comando
+    StreamingHttpResponse(exporter.iter_csv())    # vista
+"""
+
+import calendar
+import csv
+import gzip
+import io
+import logging
+import zlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+
+from ..models import AccountMove
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "xlsx")
+
+
+class StreamingReport:
+    """
+    Definición de un reporte exportable.
+
+    Las subclases definen `headers`, `columns` (campos para values_list, en
+    el orden en que `format_row` los recibe), `get_queryset()` y
+    `format_row(values)`. `accumulate(values)` se llama por cada fila para
+    calcular estadísticas sin volver a consultar la BD.
+    """
+
+    headers = ()
+    columns = ()
+    delimiter = ","
+    sheet_title = "Reporte"
+
+    def __init__(self):
+        self.rows = 0
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def format_row(self, values):
+        raise NotImplementedError
+
+    def accumulate(self, values):
+        self.rows += 1
+
+    def iter_values(self, chunk_size):
+        """Tuplas de `columns` leídas con cursor del servidor"""
+        return (
+            self.get_queryset()
+            .values_list(*self.columns)
+            .iterator(chunk_size=chunk_size)
+        )
+
+
+class ReportExporter:
+    """Recorre un `StreamingReport` una sola vez y escribe sus filas"""
+
+    def __init__(self, report, chunk_size=None):
+        self.report = report
+        self.chunk_size = chunk_size or getattr(
+            settings, "BILLING_REPORT_CHUNK_SIZE", 2000
+        )
+
+    def iter_rows(self):
+        """Filas formateadas; actualiza las estadísticas del reporte"""
+        for values in self.report.iter_values(self.chunk_size):
+            self.report.accumulate(values)
+            yield self.report.format_row(values)
+
+    # ===== ARCHIVOS =====
+
+    def write_file(self, path, fmt=None, compress=None):
+        """
+        Escribe el reporte en `path`. El formato y la compresión se deducen
+        de la extensión (.xlsx, .gz) si no se indican. Devuelve las filas
+        escritas.
+        """
+        fmt = fmt or ("xlsx" if path.endswith(".xlsx") else "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+        if fmt == "xlsx":
+            self.write_xlsx(path)
+        else:
+            compress = path.endswith(".gz") if compress is None else compress
+            opener = gzip.open if compress else open
+            # utf-8-sig: BOM para que Excel reconozca los acentos
+            with opener(path, "wt", newline="", encoding="utf-8-sig") as fileobj:
+                self.write_csv(fileobj)
+        return self.report.rows
+
+    def write_csv(self, fileobj):
+        writer = csv.writer(fileobj, delimiter=self.report.delimiter)
+        writer.writerow(self.report.headers)
+        for row in self.iter_rows():
+            writer.writerow(row)
+
+    def write_xlsx(self, target):
+        """XLSX en modo write_only: openpyxl no mantiene las filas en memoria"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=self.report.sheet_title)
+        sheet.append(list(self.report.headers))
+        for row in self.iter_rows():
+            sheet.append(list(row))
+        workbook.save(target)
+
+    # ===== HTTP =====
+
+    def iter_csv(self, compress=False, rows_per_chunk=500):
+        """
+        Bytes del CSV para `StreamingHttpResponse`, en bloques de
+        `rows_per_chunk` filas; con `compress` se emite gzip incremental.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=self.report.delimiter)
+        compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip
+
+        def flush():
+            data = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            return compressor.compress(data) if compressor else data
+
+        buffer.write("\ufeff")  # BOM para Excel
+        writer.writerow(self.report.headers)
+        for index, row in enumerate(self.iter_rows(), start=1):
+            writer.writerow(row)
+            if index % rows_per_chunk == 0:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+
+
+# ===== REPORTE FIN DE MES =====
+
+NOMBRES_MESES = [
+    "Ene",
+    "Feb",
+    "Mar",
+    "Abr",
+    "May",
+    "Jun",
+    "Jul",
+    "Ago",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dic",
+]
+
+
+def hotfix_applied(invoice_date, invoice_date_due, end_of_month_payment):
+    """Determinar si se aplicó el hotfix 30/28 días"""
+    if not invoice_date or not invoice_date_due:
+        return False
+
+    # Si el cliente no tiene pago fin de mes, no hay hotfix
+    if not end_of_month_payment:
+        return False
+
+    # Calcular fecha esperada sin hotfix
+    mes = invoice_date.month
+    dia_esperado = 28 if mes == 2 else 30
+
+    try:
+        fecha_esperada = invoice_date.replace(day=dia_esperado)
+    except ValueError:
+        # Mes con menos días
+        _, ultimo_dia = calendar.monthrange(invoice_date.year, mes)
+        fecha_esperada = invoice_date.replace(day=ultimo_dia)
+
+    # Si la fecha real es diferente, se aplicó hotfix
+    return invoice_date_due != fecha_esperada
+
+
+class EndOfMonthReport(StreamingReport):
+    """Facturas con término de pago a fin de mes en un año o mes"""
+
+    headers = (
+        "Compañía",
+        "Cliente",
+        "Tipo Doc",
+        "N° Documento",
+        "Factura",
+        "Fecha Emisión",
+        "Fecha Vencimiento",
+        "Días",
+        "Pago Fin Mes",
+        "Hotfix Aplicado",
+        "Monto Total",
+        "Estado",
+    )
+    columns = (
+        "id",
+        "company__partner__name",
+        "partner__name",
+        "partner__document_type",
+        "partner__num_document",
+        "partner__invoice_end_of_month_payment",
+        "invoice_number",
+        "invoice_date",
+        "invoice_date_due",
+        "amount_total",
+        "state",
+    )
+    delimiter = "|"
+    sheet_title = "Facturas fin de mes"
+
+    def __init__(self, company_id=None, year=None, month=None):
+        super().__init__()
+        self.company_id = company_id
+        self.year = year
+        self.month = month
+        self.con_pago_fin_mes = 0
+        self.con_hotfix = 0
+        self.monto_total = Decimal("0")
+        self.meses = {}  # mes -> {"total", "hotfix"}
+
+    def get_queryset(self):
+        # Filtrar facturas (por la clave de período AAAAMM, indexada)
+        filters = Q(invoice_payment_term__lines__option="end_of_month")
+
+        if self.company_id:
+            filters &= Q(company_id=self.company_id)
+
+        if self.month:
+            filters &= Q(billing_period=self.year * 100 + self.month)
+        else:
+            filters &= Q(
+                billing_period__range=(self.year * 100 + 1, self.year * 100 + 12)
+            )
+
+        return AccountMove.objects.filter(filters).order_by("invoice_date")
+
+    def _hotfix(self, values):
+        return hotfix_applied(values[7], values[8], values[5])
+
+    def format_row(self, values):
+        (
+            invoice_id,
+            company_name,
+            partner_name,
+            document_type,
+            num_document,
+            pago_fin_mes,
+            invoice_number,
+            invoice_date,
+            invoice_date_due,
+            amount_total,
+            state,
+        ) = values
+
+        # Calcular días entre emisión y vencimiento
+        dias = (invoice_date_due - invoice_date).days if invoice_date_due else None
+
+        return (
+            company_name,
+            partner_name,
+            (document_type or "").upper(),
+            num_document or "N/A",
+            invoice_number or f"#{invoice_id}",
+            invoice_date.strftime("%d/%m/%Y"),
+            invoice_date_due.strftime("%d/%m/%Y") if invoice_date_due else "N/A",
+            str(dias) if dias else "N/A",
+            "SÍ" if pago_fin_mes else "NO",
+            "SÍ" if self._hotfix(values) else "NO",
+            f"${amount_total:.2f}",
+            state,
+        )
+
+    def accumulate(self, values):
+        super().accumulate(values)
+        hotfix = self._hotfix(values)
+
+        if values[5]:
+            self.con_pago_fin_mes += 1
+        if hotfix:
+            self.con_hotfix += 1
+        self.monto_total += values[9] or 0
+
+        mes = self.meses.setdefault(values[7].month, {"total": 0, "hotfix": 0})
+        mes["total"] += 1
+        if hotfix:
+            mes["hotfix"] += 1
+
+    @property
+    def monto_promedio(self):
+        return self.monto_total / self.rows if self.rows else 0
+
+    @property
+    def periodo(self):
+        return f"{self.year}" + (f"-{self.month:02d}" if self.month else "")
@@ -1,14 +1,106 @@
 # billing/services/sequence_service.py
-from datetime import time
 import logging
 import re
-from django.db import OperationalError, transaction
+import time
+from django.db import OperationalError, connection, transaction
 from django.db.models import Q
+from django.utils import timezone
 from ..models import Sequence, InvoiceSerie, AccountMove, Company, SaleSubscription
 
 logger = logging.getLogger(__name__)
 
 
+class SequenceBlock:
+    """
+    Bloque de números consecutivos reservado de una secuencia; los números
+    se entregan desde memoria.
+
+    Uso:
+        with service.reserve_block("account.move", company, 500, "invoice") as block:
+            reference = block.next_reference()
+
+    Al salir (o con `release()`) los números no usados se devuelven a la
+    secuencia si el bloque sigue siendo el último reservado. En secuencias
+    `no_gap` la reserva exige una transacción abierta: la fila queda
+    bloqueada hasta el commit, por lo que la devolución siempre procede y, si
+    la transacción se revierte, la reserva se revierte con ella.
+    """
+
+    def __init__(self, sequence, first_number, count):
+        self.sequence = sequence
+        self.first_number = first_number
+        self.count = count
+        self.used = 0
+        self.released = False
+
+    @property
+    def increment(self):
+        return self.sequence.number_increment
+
+    @property
+    def remaining(self):
+        return 0 if self.released else self.count - self.used
+
+    @property
+    def end_number(self):
+        """Primer número posterior al bloque (number_next tras la reserva)"""
+        return self.first_number + self.count * self.increment
+
+    def next_number(self):
+        if self.remaining <= 0:
+            raise ValueError(
+                f"Bloque agotado en la secuencia {self.sequence.code} "
+                f"({self.count} números)"
+            )
+        number = self.first_number + self.used * self.increment
+        self.used += 1
+        return number
+
+    def next_reference(self):
+        return self.sequence.format_number(self.next_number())
+
+    def take(self, count):
+        """Entrega `count` referencias formateadas del bloque"""
+        return [self.next_reference() for _ in range(count)]
+
+    def release(self):
+        """
+        Devuelve a la secuencia los números no usados. Retorna cuántos se
+        devolvieron; si otro proceso ya reservó detrás del bloque quedan
+        como hueco (solo posible en secuencias `standard`).
+        """
+        if self.released:
+            return 0
+        self.released = True
+
+        unused = self.count - self.used
+        if unused <= 0:
+            return 0
+
+        first_unused = self.first_number + self.used * self.increment
+        returned = Sequence.objects.filter(
+            id=self.sequence.id, number_next=self.end_number
+        ).update(number_next=first_unused, updated_at=timezone.now())
+
+        if returned:
+            self.sequence.number_next = first_unused
+            return unused
+
+        log = logger.error if self.sequence.implementation == "no_gap" else logger.debug
+        log(
+            f"Secuencia {self.sequence.code}: {unused} números sin usar quedan "
+            f"como hueco ({first_unused}..{self.end_number - self.increment})"
+        )
+        return 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
 class SequenceService:
     """
     Servicio para manejar secuencias de documentos
@@ -75,6 +167,24 @@ class SequenceService:
         document_type = self.get_document_type(partner)
         return self.get_sequence("account.move", company, document_type)
 
+    def reserve_block(self, sequence_type, company, count, document_type=None):
+        """
+        Reserva un bloque de `count` números consecutivos con un único
+        UPDATE ... RETURNING (ver `SequenceBlock`)
+        """
+        sequence = self.get_sequence(sequence_type, company, document_type)
+        return self.reserve_sequence_block(sequence, count)
+
+    def reserve_sequence_block(self, sequence, count):
+        """Reserva un bloque sobre una secuencia ya obtenida"""
+        if sequence.implementation == "no_gap" and not connection.in_atomic_block:
+            raise ValueError(
+                f"La secuencia {sequence.code} es no_gap: reserve el bloque "
+                "dentro de transaction.atomic()"
+            )
+        first_number = sequence.reserve_numbers(count)
+        return SequenceBlock(sequence, first_number, count)
+
     def generate_next_reference(
         self, sequence_type, company, document_type=None, retries=3
     ):
@@ -82,16 +192,12 @@ class SequenceService:
         for attempt in range(retries):
             try:
                 sequence = self.get_sequence(sequence_type, company, document_type)
-                # logger.info(f"   🔄️ Obtained sequence: {sequence.code} for company {company}")
 
-                # Usamos un bloque atómico con lock explícito
+                # Un solo UPDATE ... RETURNING reserva el número
                 with transaction.atomic():
-                    # Forzamos el lock de la secuencia para evitar duplicados concurrentes
-                    locked_sequence = Sequence.objects.select_for_update(
-                        nowait=True  # Esto evita deadlocks
-                    ).get(id=sequence.id)
-
-                    next_reference = locked_sequence.next_by_code()
+                    next_reference = self.reserve_sequence_block(
+                        sequence, 1
+                    ).next_reference()
 
                     if self.verify_unique_reference(
                         next_reference, sequence_type, company, document_type
@@ -0,0 +1,309 @@
+# billing/tasks.py
+"""
+Facturación mensual distribuida en workers Celery.
+
+    generar_facturas_mensuales
+        └── chord([facturar_shard(shard_id), ...])
+                └── consolidar_facturacion(run_id)
+
+Las suscripciones elegibles se reparten en shards por compañía y tipo de
+documento (serie F001/B001), de hasta `BILLING_SHARD_SIZE` suscripciones.
+Cada shard reserva de una vez un bloque de numeración para sus facturas y
+genera con `BatchInvoiceService`. El callback del chord consolida las
+estadísticas de todos los shards en la `BillingRun`.
+
+Reanudación: `generar_facturas_mensuales(run_id=...)` vuelve a lanzar solo
+los shards pendientes o fallidos (y los que quedaron en PROCESSING más de
+`BILLING_SHARD_STALE_SECONDS`, de un worker caído). Cada `facturar_shard`
+toma su shard con un UPDATE condicional, así que un shard nunca se procesa
+dos veces a la vez; dentro de cada shard las suscripciones ya facturadas en
+el período se omiten, y la restricción única (suscripción, período) de
+AccountMove impide duplicados aunque dos workers coincidan.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BillingRun, BillingRunShard
+from .services.batch_invoice_service import BatchInvoiceService
+from .services.sequence_service import get_document_type
+
+logger = logging.getLogger(__name__)
+
+STAT_KEYS = ("processed", "created", "errors", "skipped")
+
+
+@shared_task(bind=True)
+def generar_facturas_mensuales(
+    self,
+    clientes=None,
+    contexto="manual",
+    metadata=None,
+    target_date=None,
+    company_id=None,
+    subscription_ids=None,
+    run_id=None,
+    dry_run=False,
+    shard_size=None,
+):
+    """
+    Tarea principal de facturación mensual
+
+    Args:
+        clientes: Clientes a facturar (dicts con "ruc"); None = todos los elegibles
+        contexto: Origen de la corrida (post_validacion_api, manual, ...)
+        metadata: Datos adicionales que se guardan en la corrida
+        target_date: Fecha objetivo en ISO (por defecto hoy)
+        company_id: Limitar a una compañía
+        subscription_ids: Limitar a suscripciones específicas
+        run_id: Reanudar una corrida existente (ignora los demás filtros)
+        dry_run: Simular sin crear facturas
+        shard_size: Suscripciones por shard (BILLING_SHARD_SIZE)
+    """
+    if run_id:
+        run = BillingRun.objects.get(pk=run_id)
+        logger.info(f"Reanudando corrida de facturación {run.id}")
+    else:
+        rucs = None
+        if clientes is not None:
+            rucs = [cliente["ruc"] for cliente in clientes if cliente.get("ruc")]
+
+        run = BillingRun.objects.create(
+            company_id=company_id,
+            target_date=(
+                date.fromisoformat(target_date)
+                if target_date
+                else timezone.now().date()
+            ),
+            dry_run=dry_run,
+            context=contexto,
+            metadata=metadata,
+            started_at=timezone.now(),
+        )
+        planificar_shards(run, subscription_ids, rucs, shard_size)
+
+    pendientes = list(
+        run.shards.filter(_shard_reclamable()).values_list("id", flat=True)
+    )
+    if not pendientes:
+        return consolidar_facturacion([], run_id=str(run.id))
+
+    BillingRun.objects.filter(pk=run.pk).update(status="PROCESSING")
+    chord(facturar_shard.s(shard_id) for shard_id in pendientes)(
+        consolidar_facturacion.s(run_id=str(run.id))
+    )
+
+    logger.info(
+        f"Corrida {run.id}: {len(pendientes)} shards lanzados "
+        f"({run.total_items} suscripciones, período {run.target_date:%Y-%m})"
+    )
+    return {
+        "run_id": str(run.id),
+        "shards": len(pendientes),
+        "total": run.total_items,
+        "target_date": run.target_date.isoformat(),
+    }
+
+
+def _shard_reclamable():
+    """
+    Shards que un worker puede tomar: pendientes, fallidos o en PROCESSING
+    desde hace más de BILLING_SHARD_STALE_SECONDS
+    """
+    stale_seconds = getattr(settings, "BILLING_SHARD_STALE_SECONDS", 3600)
+    return Q(status__in=["PENDING", "FAILED"]) | Q(
+        status="PROCESSING",
+        started_at__lt=timezone.now() - timedelta(seconds=stale_seconds),
+    )
+
+
+def planificar_shards(run, subscription_ids=None, rucs=None, shard_size=None):
+    """
+    Reparte las suscripciones elegibles de la corrida en shards por
+    (compañía, tipo de documento)
+    """
+    shard_size = shard_size or getattr(settings, "BILLING_SHARD_SIZE", 2000)
+
+    eligible = (
+        BatchInvoiceService(company_id=run.company_id)
+        ._get_eligible_subscriptions(run.target_date, subscription_ids)
+        .select_related(None)
+        .prefetch_related(None)
+        .select_related("partner")
+        .only("id", "company_id", "partner__document_type", "partner__num_document")
+        .order_by("id")
+    )
+    if rucs is not None:
+        eligible = eligible.filter(partner__num_document__in=rucs)
+
+    groups = defaultdict(list)
+    for subscription in eligible:
+        document_type = get_document_type(subscription.partner)
+        groups[(subscription.company_id, document_type)].append(subscription.id)
+
+    shards = []
+    for (company_id, document_type), ids in sorted(groups.items()):
+        for start in range(0, len(ids), shard_size):
+            shards.append(
+                BillingRunShard(
+                    run=run,
+                    number=len(shards) + 1,
+                    company_id=company_id,
+                    document_type=document_type,
+                    subscription_ids=ids[start : start + shard_size],
+                )
+            )
+    BillingRunShard.objects.bulk_create(shards)
+
+    run.total_items = sum(len(ids) for ids in groups.values())
+    run.save(update_fields=["total_items"])
+    return shards
+
+
+@shared_task(bind=True)
+def facturar_shard(self, shard_id):
+    """
+    Genera las facturas de un shard. No lanza excepciones: un error se
+    registra en el shard para que el callback del chord siempre se ejecute.
+    """
+    # Tomar el shard con un UPDATE condicional: si otro worker ya lo tiene
+    # (o está completado) no se vuelve a procesar
+    claimed = (
+        BillingRunShard.objects.filter(pk=shard_id)
+        .filter(_shard_reclamable())
+        .update(
+            status="PROCESSING",
+            task_id=getattr(self.request, "id", None),
+            attempts=F("attempts") + 1,
+            started_at=timezone.now(),
+        )
+    )
+    shard = BillingRunShard.objects.select_related("run", "company").get(pk=shard_id)
+    if not claimed:
+        logger.info(
+            f"Shard {shard.number} de {shard.run_id} omitido: estado {shard.status}"
+        )
+        return shard.stats or dict.fromkeys(STAT_KEYS, 0)
+
+    run = shard.run
+
+    service = BatchInvoiceService(company_id=shard.company_id, dry_run=run.dry_run)
+    try:
+        service.reference_blocks = _reservar_numeracion(shard, service)
+        stats = service.generate_batch_invoices(
+            run.target_date, subscription_ids=shard.subscription_ids
+        )
+    except Exception as e:
+        logger.error(f"Error en shard {shard.number} de {run.id}: {e}", exc_info=True)
+        stats = {
+            "processed": 0,
+            "created": 0,
+            "errors": len(shard.subscription_ids),
+            "skipped": 0,
+            "details": [f"Error en shard: {e}"],
+        }
+    finally:
+        for block in service.reference_blocks.values():
+            block.release()
+
+    shard_stats = {key: stats.get(key, 0) for key in STAT_KEYS}
+    # Las facturas creadas en intentos anteriores ahora aparecen como omitidas
+    previous_created = (shard.stats or {}).get("created", 0)
+    shard_stats["created"] += previous_created
+    shard_stats["skipped"] = max(0, shard_stats["skipped"] - previous_created)
+    shard_stats["error_details"] = [
+        detail for detail in stats.get("details", []) if detail.startswith("Error")
+    ][:50]
+
+    shard.stats = shard_stats
+    shard.status = "FAILED" if stats.get("errors") else "COMPLETED"
+    shard.completed_at = timezone.now()
+    shard.save(update_fields=["stats", "status", "completed_at"])
+
+    logger.info(
+        f"Shard {shard.number} de {run.id} ({shard.document_type}): "
+        f"{shard_stats['created']} creadas, {shard_stats['errors']} errores"
+    )
+    return shard_stats
+
+
+def _reservar_numeracion(shard, service):
+    """
+    Pre-reserva un bloque de numeración para las suscripciones pendientes del
+    shard. Las secuencias `no_gap` no se pre-reservan: se numeran dentro de
+    la transacción de cada bloque de facturas.
+    """
+    if shard.run.dry_run:
+        return {}
+
+    pending = len(shard.subscription_ids) - len(
+        service._invoiced_subscription_ids(
+            shard.subscription_ids, shard.run.target_date
+        )
+    )
+    if pending <= 0:
+        return {}
+
+    sequence = service.sequence_service.get_sequence(
+        "account.move", shard.company, shard.document_type
+    )
+    if sequence.implementation == "no_gap":
+        return {}
+
+    block = service.sequence_service.reserve_sequence_block(sequence, pending)
+    return {(shard.company_id, shard.document_type): block}
+
+
+@shared_task
+def consolidar_facturacion(resultados, run_id):
+    """
+    Callback del chord: consolida las estadísticas de todos los shards de la
+    corrida (incluidos los completados en intentos anteriores)
+    """
+    run = BillingRun.objects.get(pk=run_id)
+    shards = list(run.shards.all())
+
+    totals = dict.fromkeys(STAT_KEYS, 0)
+    error_details = []
+    for shard in shards:
+        stats = shard.stats or {}
+        for key in STAT_KEYS:
+            totals[key] += stats.get(key, 0)
+        error_details.extend(stats.get("error_details", []))
+
+    pending_shards = [shard.number for shard in shards if shard.status != "COMPLETED"]
+    if not pending_shards:
+        status = "COMPLETED"
+    elif totals["created"] or totals["skipped"]:
+        status = "PARTIAL"
+    else:
+        status = "FAILED"
+
+    run.status = status
+    run.processed_items = totals["processed"]
+    run.successful_items = totals["created"]
+    run.failed_items = totals["errors"]
+    run.skipped_items = totals["skipped"]
+    run.results = {
+        "totals": totals,
+        "shards": {
+            shard.number: {key: (shard.stats or {}).get(key, 0) for key in STAT_KEYS}
+            for shard in shards
+        },
+        "pending_shards": pending_shards,
+    }
+    run.error_summary = {"errors": error_details[:100]} if error_details else None
+    run.completed_at = timezone.now()
+    run.save()
+
+    logger.info(
+        f"Corrida {run.id} {status}: {totals['created']} creadas, "
+        f"{totals['skipped']} omitidas, {totals['errors']} errores"
+    )
+    return {"run_id": str(run.id), "status": status, **totals}
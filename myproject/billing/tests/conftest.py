@@ -0,0 +1,152 @@
+# billing/tests/conftest.py
+import itertools
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from billing.models import (
+    AccountPaymentTerm,
+    AccountPaymentTermLine,
+    Company,
+    Currency,
+    InvoiceSerie,
+    Journal,
+    Partner,
+    Product,
+    SaleSubscription,
+    SaleSubscriptionLine,
+    Sequence,
+    Tax,
+)
+
+_counter = itertools.count(1)
+
+TARGET_DATE = date(2025, 3, 1)
+
+
+def make_partner(name, document_type="ruc", num_document=None):
+    n = next(_counter)
+    if num_document is None:
+        num_document = f"20{n:09d}" if document_type == "ruc" else f"{n:08d}"
+    return Partner.objects.create(
+        name=name,
+        display_name=name,
+        document_type=document_type,
+        num_document=num_document,
+    )
+
+
+def make_company(currency, name="Empresa Demo"):
+    """Compañía con diarios, secuencias y series F001/B001"""
+    company = Company.objects.create(
+        partner=make_partner(name), sequence="1", currency=currency
+    )
+    for document_type, series in (("invoice", "F001"), ("ticket", "B001")):
+        journal = Journal.objects.create(
+            name=f"Ventas {series}",
+            code=f"V{series}",
+            type="sale",
+            sequence="1",
+            bank_position="-",
+            company=company,
+        )
+        sequence = Sequence.objects.create(
+            name=f"Secuencia {series}",
+            code=f"account.move.{document_type}.{company.id}",
+            prefix=f"{series}-",
+            padding=8,
+            company=company,
+        )
+        InvoiceSerie.objects.create(
+            name=f"Serie {series}",
+            series=series,
+            journal=journal,
+            company=company,
+            sequence=sequence,
+        )
+    return company
+
+
+def make_payment_term(company, option="day_after_invoice_date", days=15, **fields):
+    n = next(_counter)
+    term = AccountPaymentTerm.objects.create(
+        name=f"Término {n}", code=f"T{n}", company=company
+    )
+    AccountPaymentTermLine.objects.create(
+        payment_term=term, option=option, days=days, **fields
+    )
+    return term
+
+
+def make_subscription(company, partner, lines, next_invoice_date=TARGET_DATE, **fields):
+    """
+    Suscripción activa con `lines`: tuplas (cantidad, precio, descuento,
+    impuestos)
+    """
+    n = next(_counter)
+    subscription = SaleSubscription.objects.create(
+        partner=partner,
+        company=company,
+        date_start=date(2024, 1, 1),
+        next_invoice_date=next_invoice_date,
+        code=f"SUB{n:05d}",
+        uuid=f"uuid-{n}",
+        **fields,
+    )
+    for quantity, price_unit, discount, taxes in lines:
+        product = Product.objects.create(
+            name=f"Servicio {n}", defaultcode=f"P{next(_counter)}"
+        )
+        line = SaleSubscriptionLine.objects.create(
+            subscription=subscription,
+            product=product,
+            quantity=Decimal(quantity),
+            price_unit=Decimal(price_unit),
+            discount=Decimal(discount),
+        )
+        line.tax_ids.set(taxes)
+    return subscription
+
+
+@pytest.fixture
+def currency(db):
+    # AccountMove.currency y Company.currency usan default=1
+    return Currency.objects.create(
+        id=1,
+        name="PEN",
+        symbol="S/",
+        pse_code="1",
+        singular_name="Sol",
+        plural_name="Soles",
+        fraction_name="Céntimos",
+    )
+
+
+@pytest.fixture
+def company(currency):
+    return make_company(currency)
+
+
+@pytest.fixture
+def igv(company):
+    return Tax.objects.create(
+        name="IGV",
+        type_tax_use="sale",
+        amount_type="percent",
+        amount=Decimal("18"),
+        company=company,
+        sequence="1",
+    )
+
+
+@pytest.fixture
+def customer(db):
+    """Cliente con RUC (factura)"""
+    return make_partner("Cliente RUC")
+
+
+@pytest.fixture
+def consumer(db):
+    """Cliente con DNI (boleta)"""
+    return make_partner("Cliente DNI", document_type="dni")
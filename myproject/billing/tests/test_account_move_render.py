@@ -0,0 +1,89 @@
+# billing/tests/test_account_move_render.py
+from unittest.mock import patch
+
+import pytest
+
+from billing.models import AccountMove
+from billing.services.batch_invoice_service import BatchInvoiceService
+from shared.utils.pdf import render_cache
+from shared.utils.pdf.render_cache import RenderCache
+
+from .conftest import TARGET_DATE, make_subscription
+
+try:
+    from shared.utils.pdf import invoice_generator
+except (ImportError, OSError):  # WeasyPrint sin sus librerías nativas
+    invoice_generator = None
+
+pytestmark = pytest.mark.skipif(
+    invoice_generator is None, reason="WeasyPrint no disponible"
+)
+
+PDF = b"%PDF-1.4 factura"
+
+
+@pytest.fixture
+def invoice(company, customer, igv):
+    subscription = make_subscription(company, customer, [(1, 100, 0, [igv])])
+    BatchInvoiceService(company.id).generate_batch_invoices(
+        TARGET_DATE, [subscription.id]
+    )
+    invoice = AccountMove.objects.get(subscription=subscription)
+    invoice.json_sent = {"serie": "F001", "numero": 1, "total": "118.00"}
+    invoice.json_response = {"cadena_para_codigo_qr": "20123456789|01|F001|1"}
+    invoice.save()
+    return invoice
+
+
+@pytest.fixture
+def generator(tmp_path):
+    """Render sustituido y cache aislado; devuelve el mock de generate_pdf"""
+    cache = RenderCache(
+        memory_bytes=1024 * 1024, disk_bytes=1024 * 1024, directory=str(tmp_path)
+    )
+    generator_class = invoice_generator.InvoicePDFGenerator
+    with patch.object(
+        invoice_generator, "get_render_cache", return_value=cache
+    ), patch.object(render_cache, "_template_mtimes", return_value=""), patch.object(
+        render_cache, "_css_mtime", return_value=1
+    ), patch.object(
+        generator_class, "render_html", return_value="<p>factura</p>"
+    ), patch.object(
+        generator_class, "generate_pdf", return_value=PDF
+    ) as generate_pdf:
+        yield generate_pdf
+
+
+@pytest.mark.django_db
+class TestRenderPdf:
+
+    def test_reprint_bumps_version_and_reuses_cached_pdf(self, invoice, generator):
+        assert invoice.render_pdf() == PDF
+        invoice.refresh_from_db()
+        assert invoice.print_version == 1
+        assert len(invoice.hash_code) == 64
+        first_key = invoice.hash_code
+
+        assert invoice.render_pdf(reprint=True) == PDF
+        assert invoice.render_pdf(reprint=True) == PDF
+
+        assert generator.call_count == 1
+        invoice.refresh_from_db()
+        assert invoice.print_version == 3
+        assert invoice.hash_code == first_key
+
+    def test_changed_data_renders_again(self, invoice, generator):
+        invoice.render_pdf()
+        first_key = invoice.hash_code
+
+        invoice.json_sent = {**invoice.json_sent, "total": "236.00"}
+        invoice.render_pdf()
+
+        assert generator.call_count == 2
+        assert AccountMove.objects.get(pk=invoice.pk).hash_code != first_key
+
+    def test_without_print_data(self, invoice, generator):
+        invoice.json_sent = None
+
+        with pytest.raises(ValueError):
+            invoice.render_pdf()
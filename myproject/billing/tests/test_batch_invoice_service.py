@@ -0,0 +1,228 @@
+# billing/tests/test_batch_invoice_service.py
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from billing.models import AccountMove, AccountMoveLine, Sequence
+from billing.services.batch_invoice_service import BatchInvoiceService
+from billing.services.sequence_service import get_document_type
+
+from .conftest import TARGET_DATE, make_payment_term, make_subscription
+
+
+def legacy_invoice(service, subscription, target_date, reference):
+    """
+    Factura armada como en el camino anterior (una suscripción por vez):
+    create de la factura y de cada línea, luego totales con save() por línea.
+    """
+    document_type = get_document_type(subscription.partner)
+    serie = service._get_invoice_serie(subscription.company, document_type)
+    doc_type_name = "Factura" if document_type == "invoice" else "Boleta"
+    invoice = AccountMove.objects.create(
+        partner=subscription.partner,
+        subscription=subscription,
+        company=subscription.company,
+        currency=subscription.company.currency,
+        journal=serie.journal,
+        type="out_invoice",
+        state="draft",
+        invoice_date=target_date,
+        invoice_date_due=service._calculate_due_date(target_date, subscription),
+        serie=serie,
+        invoice_number=reference,
+        ref=subscription.code,
+        narration=f"{doc_type_name} recurrente - {subscription.description or 'Suscripción'}",
+        billing_type="subscription",
+        document_type=subscription.partner.document_type or "dni",
+    )
+    for sub_line in subscription.lines.all():
+        price_unit = sub_line.price_unit * (1 - sub_line.discount / 100)
+        line = AccountMoveLine.objects.create(
+            move=invoice,
+            product=sub_line.product,
+            quantity=sub_line.quantity,
+            price_unit=price_unit,
+            discount=sub_line.discount,
+            subtotal=sub_line.quantity * price_unit,
+        )
+        line.tax.set(sub_line.tax_ids.all())
+
+    lines = invoice.lines.all()
+    for line in lines:
+        line.subtotal = line.quantity * line.price_unit * (1 - line.discount / 100)
+        tax_amount = Decimal("0")
+        for tax in line.tax.all():
+            if tax.amount_type == "percent":
+                tax_amount += line.subtotal * (tax.amount / 100)
+        line.igv_amount = tax_amount
+        line.total = line.subtotal + tax_amount
+        line.save()
+    invoice.amount_tax = sum(line.igv_amount for line in lines)
+    invoice.amount_total = sum(line.total for line in lines)
+    invoice.save()
+    return invoice
+
+
+def line_values(move):
+    return [
+        (
+            line.quantity,
+            line.price_unit,
+            line.discount,
+            line.subtotal,
+            line.igv_amount,
+            line.total,
+            sorted(line.tax.values_list("id", flat=True)),
+        )
+        for line in move.lines.order_by("id")
+    ]
+
+
+SUBSCRIPTION_LINES = [
+    ("2", "100.00", "10", "igv"),
+    ("3", "33.33", "0", "igv"),
+    ("1", "49.80", "5", None),
+]
+
+
+@pytest.fixture
+def lines(igv):
+    return [
+        (quantity, price, discount, [igv] if tax else [])
+        for quantity, price, discount, tax in SUBSCRIPTION_LINES
+    ]
+
+
+@pytest.mark.django_db
+class TestBuildInvoicePlan:
+
+    def test_plan_totals_and_lines(self, company, customer, lines):
+        make_payment_term(company, days=15)
+        subscription = make_subscription(company, customer, lines)
+        service = BatchInvoiceService(company.id)
+        (loaded,) = service._load_subscriptions([subscription.id])
+        service._preload_company_config({company.id})
+
+        with CaptureQueriesContext(connection) as ctx:
+            plan = service._build_invoice_plan(loaded, TARGET_DATE)
+        # Todo sale de lo precargado: armar el plan no consulta la BD
+        assert len(ctx.captured_queries) == 0
+
+        assert plan["document_type"] == "invoice"
+        assert plan["move"]["serie"].series == "F001"
+        assert plan["move"]["billing_period"] == 202503
+        assert plan["move"]["invoice_date_due"] == TARGET_DATE + timedelta(days=15)
+        assert plan["next_invoice_date"] == TARGET_DATE + timedelta(days=30)
+
+        subtotals = [line["fields"]["subtotal"] for line in plan["lines"]]
+        taxes = [line["fields"]["igv_amount"] for line in plan["lines"]]
+        # 2 x 90.00 x 0.90 (el descuento se aplica sobre el precio ya descontado)
+        assert subtotals[0] == Decimal("162.0000")
+        assert subtotals[1] == Decimal("99.99")
+        assert taxes[2] == 0
+        assert plan["move"]["amount_tax"] == sum(taxes)
+        assert plan["move"]["amount_total"] == sum(subtotals) + sum(taxes)
+        assert [line["tax_ids"] for line in plan["lines"]] == [
+            [lines[0][3][0].id],
+            [lines[0][3][0].id],
+            [],
+        ]
+
+    def test_ticket_for_dni_partner(self, company, consumer, lines):
+        subscription = make_subscription(company, consumer, lines)
+        service = BatchInvoiceService(company.id)
+        plan = service._build_invoice_plan(subscription, TARGET_DATE)
+
+        assert plan["document_type"] == "ticket"
+        assert plan["move"]["serie"].series == "B001"
+
+
+@pytest.mark.django_db
+class TestPersistInvoicePlans:
+
+    def test_bulk_rows_and_references(self, company, customer, consumer, lines):
+        subscriptions = [
+            make_subscription(company, customer, lines),
+            make_subscription(company, customer, lines),
+            make_subscription(company, consumer, lines),
+        ]
+        service = BatchInvoiceService(company.id)
+        stats = service.generate_batch_invoices(
+            TARGET_DATE, [s.id for s in subscriptions]
+        )
+
+        assert stats["created"] == 3 and stats["errors"] == 0
+        moves = AccountMove.objects.filter(subscription__in=subscriptions).order_by(
+            "id"
+        )
+        assert [move.invoice_number for move in moves] == [
+            "F001-00000001",
+            "F001-00000002",
+            "B001-00000001",
+        ]
+        assert AccountMoveLine.objects.filter(move__in=moves).count() == 9
+        # Relación línea-impuesto: dos líneas con IGV por factura
+        LineTax = AccountMoveLine.tax.through
+        assert LineTax.objects.filter(accountmoveline__move__in=moves).count() == 6
+        assert (
+            Sequence.objects.get(code=f"account.move.invoice.{company.id}").number_next
+            == 3
+        )
+
+    def test_matches_legacy_per_subscription_path(self, company, customer, lines):
+        make_payment_term(company, days=20)
+        batch_subscription = make_subscription(company, customer, lines)
+        legacy_subscription = make_subscription(company, customer, lines)
+
+        service = BatchInvoiceService(company.id)
+        service.generate_batch_invoices(TARGET_DATE, [batch_subscription.id])
+        batch = AccountMove.objects.get(subscription=batch_subscription)
+        legacy = legacy_invoice(
+            BatchInvoiceService(company.id),
+            legacy_subscription,
+            TARGET_DATE,
+            "F001-99999999",
+        )
+        legacy.refresh_from_db()
+
+        for field in (
+            "amount_total",
+            "amount_tax",
+            "invoice_date",
+            "invoice_date_due",
+            "invoice_payment_term_id",
+            "serie_id",
+            "journal_id",
+            "currency_id",
+            "state",
+            "billing_type",
+            "document_type",
+            "narration",
+            "billing_period",
+        ):
+            assert getattr(batch, field) == getattr(legacy, field), field
+        assert line_values(batch) == line_values(legacy)
+        assert batch.ref == batch_subscription.code
+
+        batch_subscription.refresh_from_db()
+        assert batch_subscription.recurring_invoice_count == 1
+        assert batch_subscription.invoices_generated == 1
+        assert batch_subscription.total_invoiced == legacy.amount_total
+        assert batch_subscription.next_invoice_date == TARGET_DATE + timedelta(days=30)
+
+    def test_already_billed_subscription_is_skipped(self, company, customer, lines):
+        subscription = make_subscription(company, customer, lines)
+        BatchInvoiceService(company.id).generate_batch_invoices(
+            TARGET_DATE, [subscription.id]
+        )
+
+        service = BatchInvoiceService(company.id)
+        service._process_chunk(
+            service._load_subscriptions([subscription.id]), TARGET_DATE
+        )
+
+        assert service.stats["skipped"] == 1
+        assert AccountMove.objects.filter(subscription=subscription).count() == 1
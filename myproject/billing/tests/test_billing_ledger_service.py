@@ -0,0 +1,177 @@
+# billing/tests/test_billing_ledger_service.py
+from decimal import Decimal
+
+import pytest
+from django.db.models import Count, Sum
+
+from billing.models import AccountMove, SaleSubscription, SubscriptionLedgerEntry
+from billing.services.batch_invoice_service import BatchInvoiceService
+from billing.services.billing_ledger_service import BillingLedgerService
+from billing.services.invoice_processing_service import InvoiceProcessingService
+
+from .conftest import TARGET_DATE, make_subscription
+
+
+@pytest.fixture
+def subscriptions(company, customer, consumer, igv):
+    return [
+        make_subscription(company, customer, [(2, 100, 0, [igv])]),
+        make_subscription(company, customer, [(1, "59.90", 0, [igv])]),
+        make_subscription(company, consumer, [(3, 20, 0, [])]),
+    ]
+
+
+@pytest.fixture
+def invoices(company, subscriptions):
+    BatchInvoiceService(company.id).generate_batch_invoices(
+        TARGET_DATE, [s.id for s in subscriptions]
+    )
+    return list(
+        AccountMove.objects.filter(subscription__in=subscriptions).order_by("id")
+    )
+
+
+def cents(value):
+    # SQLite no redondea al guardar DecimalField: las sumas pueden traer
+    # más decimales que las columnas
+    return Decimal(value or 0).quantize(Decimal("0.01"))
+
+
+def assert_ledger_matches(subscriptions):
+    """El libro y los contadores coinciden con las facturas vigentes"""
+    ids = [s.id for s in subscriptions]
+    expected = {
+        row["subscription_id"]: (
+            row["invoices"],
+            cents(row["total"]),
+            cents(row["tax"]),
+        )
+        for row in AccountMove.objects.filter(
+            subscription_id__in=ids, state__in=["draft", "posted"]
+        )
+        .values("subscription_id")
+        .annotate(
+            invoices=Count("id"), total=Sum("amount_total"), tax=Sum("amount_tax")
+        )
+        .order_by()
+    }
+    ledger = BillingLedgerService().subscription_totals(ids)
+
+    for subscription in SaleSubscription.objects.filter(id__in=ids):
+        invoices, total, tax = expected.get(subscription.id, (0, cents(0), cents(0)))
+        row = ledger.get(subscription.id, {"invoices": 0, "total": 0, "tax": 0})
+        assert (row["invoices"], cents(row["total"]), cents(row["tax"])) == (
+            invoices,
+            total,
+            tax,
+        )
+        assert subscription.recurring_invoice_count == invoices
+        assert subscription.invoices_generated == invoices
+        assert subscription.total_invoiced == total
+
+
+def events(invoice):
+    return list(
+        SubscriptionLedgerEntry.objects.filter(invoice=invoice)
+        .order_by("id")
+        .values_list("event_type", flat=True)
+    )
+
+
+@pytest.mark.django_db
+class TestLedgerRecording:
+
+    def test_batch_invoices_are_recorded(self, subscriptions, invoices):
+        assert [events(invoice) for invoice in invoices] == [["invoice"]] * 3
+        assert_ledger_matches(subscriptions)
+
+    def test_cancel_records_reversal(self, subscriptions, invoices):
+        invoice = invoices[0]
+        invoice.state = "canceled"
+        invoice.save()
+        # Guardar de nuevo la factura anulada no resta dos veces
+        invoice.save()
+
+        assert events(invoice) == ["invoice", "reversal"]
+        assert_ledger_matches(subscriptions)
+
+        totals = BillingLedgerService().partner_month_totals(
+            partner_id=invoice.partner_id
+        )
+        live = AccountMove.objects.filter(
+            partner_id=invoice.partner_id, state__in=["draft", "posted"]
+        )
+        assert [(row["invoices"], cents(row["total"])) for row in totals] == [
+            (live.count(), cents(live.aggregate(total=Sum("amount_total"))["total"]))
+        ]
+
+    def test_amount_change_records_adjustment(self, subscriptions, invoices):
+        invoice = invoices[1]
+        invoice.amount_total += Decimal("10.00")
+        invoice.amount_tax += Decimal("1.53")
+        invoice.save()
+
+        assert events(invoice) == ["invoice", "adjustment"]
+        assert_ledger_matches(subscriptions)
+
+        # La anulación resta el monto vigente, ajustes incluidos
+        invoice.state = "canceled"
+        invoice.save()
+        assert_ledger_matches(subscriptions)
+
+    def test_invoice_created_with_save(self, company, subscriptions, invoices):
+        # Alta manual: create con montos en cero y luego save() con los totales
+        subscription = subscriptions[0]
+        invoice = AccountMove.objects.create(
+            partner=subscription.partner,
+            subscription=subscription,
+            company=company,
+            journal=invoices[0].journal,
+            invoice_date=TARGET_DATE,
+            invoice_number="F001-00000100",
+            billing_type="manual",
+        )
+        invoice.amount_total = Decimal("50.00")
+        invoice.amount_tax = Decimal("7.63")
+        invoice.save()
+
+        assert events(invoice) == ["invoice", "adjustment"]
+        assert_ledger_matches(subscriptions)
+
+    def test_delete_discounts_counters(self, subscriptions, invoices):
+        invoices[0].delete()
+        AccountMove.objects.filter(pk=invoices[1].pk).delete()
+
+        assert_ledger_matches(subscriptions)
+
+    def test_delete_canceled_invoice_discounts_once(self, subscriptions, invoices):
+        invoice = invoices[2]
+        invoice.state = "canceled"
+        invoice.save()
+        invoice.delete()
+
+        assert not SubscriptionLedgerEntry.objects.filter(
+            subscription=subscriptions[2]
+        ).exists()
+        assert_ledger_matches(subscriptions)
+
+    def test_bulk_fix_records_adjustment(self, subscriptions, invoices):
+        invoice = invoices[0]
+        invoice.amount_total = Decimal("1.00")
+        invoice.save()
+        # La corrección guarda con UPDATE en bloque, sin señales
+        assert InvoiceProcessingService().fix_invoice_totals() == 1
+
+        assert events(invoices[0]) == ["invoice", "adjustment", "adjustment"]
+        assert_ledger_matches(subscriptions)
+
+    def test_record_missing(self, subscriptions, invoices):
+        # Facturas escritas sin señales ni libro (p. ej. carga masiva)
+        SubscriptionLedgerEntry.objects.all().delete()
+        SaleSubscription.objects.update(
+            recurring_invoice_count=0, invoices_generated=0, total_invoiced=0
+        )
+
+        assert BillingLedgerService().record_missing() == 3
+        assert BillingLedgerService().record_missing() == 0
+        assert_ledger_matches(subscriptions)
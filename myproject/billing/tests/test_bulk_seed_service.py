@@ -0,0 +1,323 @@
+# billing/tests/test_bulk_seed_service.py
+import argparse
+from datetime import date, timedelta
+
+import pytest
+from django.db import transaction
+
+from billing.models import (
+    AccountMove,
+    AccountMoveLine,
+    ContractTemplate,
+    Partner,
+    Product,
+    SaleSubscription,
+    SaleSubscriptionLine,
+    Sequence,
+)
+from billing.services.bulk_seed_service import (
+    DEFAULT_BASE_DATE,
+    BulkSeeder,
+    add_seed_arguments,
+    seed_invoices,
+    seed_partners,
+    seed_subscriptions,
+)
+from billing.services.sequence_service import SequenceService
+
+from .conftest import make_company, make_payment_term
+
+BASE_DATE = date(2025, 3, 1)
+# Lote chico para que la carga pase por varios INSERT por modelo
+BATCH_SIZE = 7
+
+PartnerCompany = Partner.companies.through
+LineTax = SaleSubscriptionLine.tax_ids.through
+MoveLineTax = AccountMoveLine.tax.through
+
+
+@pytest.fixture
+def company(currency):
+    """
+    Compañía cuyo RUC queda fuera del rango que genera la carga (los
+    documentos sembrados derivan del id del cliente)
+    """
+    company = make_company(currency)
+    Partner.objects.filter(pk=company.partner_id).update(num_document="20999999999")
+    return company
+
+
+@pytest.fixture
+def catalog(company, igv):
+    """Productos, plantilla de contrato y secuencia de suscripciones"""
+    for n in range(3):
+        Product.objects.create(name=f"Plan {n}", defaultcode=f"PLAN{n}")
+    term = make_payment_term(company)
+    ContractTemplate.objects.create(
+        name="Plan mensual", company=company, payment_term=term
+    )
+    Sequence.objects.create(
+        name="Suscripciones",
+        code=f"sale.subscription.{company.id}",
+        prefix="SUB-",
+        padding=5,
+        company=company,
+    )
+    return company
+
+
+def seeder(seed=42, base_date=BASE_DATE):
+    return BulkSeeder(seed=seed, batch_size=BATCH_SIZE, base_date=base_date)
+
+
+def seed_all(company, seed=42, base_date=BASE_DATE):
+    with seeder(seed, base_date) as bulk:
+        seed_partners(bulk, 30, [company])
+    with seeder(seed, base_date) as bulk:
+        seed_subscriptions(bulk, 20, [company])
+    with seeder(seed, base_date) as bulk:
+        seed_invoices(bulk, 25, [company])
+
+
+def snapshot():
+    """Filas generadas (y sus M2M) en orden de id"""
+    return {
+        "partners": list(
+            Partner.objects.filter(ref__startswith="SEED-")
+            .order_by("id")
+            .values_list(
+                "id",
+                "name",
+                "document_type",
+                "num_document",
+                "is_company",
+                "invoice_end_of_month_payment",
+            )
+        ),
+        "partner_companies": list(
+            PartnerCompany.objects.order_by("id").values_list(
+                "partner_id", "company_id"
+            )
+        ),
+        "subscriptions": list(
+            SaleSubscription.objects.order_by("id").values_list(
+                "id",
+                "partner_id",
+                "code",
+                "date_start",
+                "date_end",
+                "next_invoice_date",
+                "recurring_monthly",
+                "recurring_total",
+            )
+        ),
+        "subscription_lines": list(
+            SaleSubscriptionLine.objects.order_by("id").values_list(
+                "subscription_id", "product_id", "quantity", "price_unit", "discount"
+            )
+        ),
+        "line_taxes": list(
+            LineTax.objects.order_by("id").values_list(
+                "salesubscriptionline_id", "tax_id"
+            )
+        ),
+        "invoices": list(
+            AccountMove.objects.order_by("id").values_list(
+                "id",
+                "invoice_number",
+                "partner_id",
+                "subscription_id",
+                "invoice_date",
+                "invoice_date_due",
+                "state",
+                "amount_total",
+            )
+        ),
+        "invoice_lines": list(
+            AccountMoveLine.objects.order_by("id").values_list(
+                "move_id", "product_id", "quantity", "price_unit", "total"
+            )
+        ),
+    }
+
+
+def rolled_back(build):
+    """Resultado de `build()` dentro de una transacción que se revierte"""
+    with transaction.atomic():
+        result = build()
+        transaction.set_rollback(True)
+    return result
+
+
+def test_base_date_option_defaults_to_constant():
+    parser = argparse.ArgumentParser()
+    add_seed_arguments(parser)
+
+    assert parser.parse_args([]).base_date == DEFAULT_BASE_DATE
+    assert parser.parse_args(["--base-date", "2024-06-30"]).base_date == date(
+        2024, 6, 30
+    )
+
+
+@pytest.mark.django_db
+class TestSeedPartners:
+
+    def test_creates_requested_rows_with_one_company_each(self, company):
+        with seeder() as bulk:
+            assert seed_partners(bulk, 30, [company]) == 30
+
+        partners = Partner.objects.filter(ref__startswith="SEED-")
+        assert partners.count() == 30
+        assert bulk.stats["partner"] == 30
+        links = PartnerCompany.objects.filter(partner__in=partners)
+        assert links.count() == 30
+        assert set(links.values_list("company_id", flat=True)) == {company.id}
+        # El número de documento deriva del id: no hay duplicados
+        documents = list(partners.values_list("num_document", flat=True))
+        assert len(set(documents)) == 30
+
+    def test_same_seed_gives_same_rows(self, company):
+        def build(seed):
+            def run():
+                with seeder(seed) as bulk:
+                    seed_partners(bulk, 30, [company])
+                return snapshot()["partners"]
+
+            return run
+
+        first = rolled_back(build(42))
+        assert rolled_back(build(42)) == first
+        assert rolled_back(build(7)) != first
+
+
+@pytest.mark.django_db
+class TestSeedSubscriptions:
+
+    def test_creates_subscriptions_with_lines_and_taxes(self, catalog, igv):
+        with seeder() as bulk:
+            seed_partners(bulk, 10, [catalog])
+        with seeder() as bulk:
+            assert seed_subscriptions(bulk, 20, [catalog]) == 20
+
+        partner_ids = set(
+            Partner.objects.filter(companies=catalog).values_list("id", flat=True)
+        )
+        subscriptions = SaleSubscription.objects.filter(company=catalog)
+        assert subscriptions.count() == 20
+        for subscription in subscriptions.prefetch_related("lines__tax_ids"):
+            assert subscription.partner_id in partner_ids
+            lines = list(subscription.lines.all())
+            assert 1 <= len(lines) <= 3
+            for line in lines:
+                assert [tax.id for tax in line.tax_ids.all()] == [igv.id]
+            assert (
+                BASE_DATE - timedelta(days=60) <= subscription.date_start <= BASE_DATE
+            )
+        # Los códigos salen de un bloque de la secuencia, que queda al día
+        codes = list(subscriptions.order_by("id").values_list("code", flat=True))
+        assert codes == [f"SUB-{n:05d}" for n in range(1, 21)]
+        sequence = Sequence.objects.get(code=f"sale.subscription.{catalog.id}")
+        assert sequence.number_next == 21
+
+    def test_dates_follow_base_date_not_today(self, catalog, igv):
+        def build(base_date):
+            def run():
+                with seeder(base_date=base_date) as bulk:
+                    seed_partners(bulk, 10, [catalog])
+                with seeder(base_date=base_date) as bulk:
+                    seed_subscriptions(bulk, 20, [catalog])
+                return list(
+                    SaleSubscription.objects.order_by("id").values_list(
+                        "date_start", flat=True
+                    )
+                )
+
+            return run
+
+        first = rolled_back(build(BASE_DATE))
+        shifted = rolled_back(build(BASE_DATE + timedelta(days=10)))
+        assert first == rolled_back(build(BASE_DATE))
+        assert shifted == [day + timedelta(days=10) for day in first]
+
+
+@pytest.mark.django_db
+class TestSeedInvoices:
+
+    def test_creates_invoices_linked_to_existing_rows(self, catalog, igv):
+        seed_all(catalog)
+
+        invoices = AccountMove.objects.filter(company=catalog)
+        assert invoices.count() == 25
+        partner_ids = set(
+            Partner.objects.filter(companies=catalog).values_list("id", flat=True)
+        )
+        subscriptions = dict(SaleSubscription.objects.values_list("id", "partner_id"))
+        for invoice in invoices.prefetch_related("lines__tax"):
+            assert invoice.partner_id in partner_ids
+            if invoice.subscription_id:
+                assert subscriptions[invoice.subscription_id] == invoice.partner_id
+            lines = list(invoice.lines.all())
+            assert 1 <= len(lines) <= 3
+            assert invoice.amount_total == sum(line.total for line in lines)
+            assert all([tax.id for tax in line.tax.all()] == [igv.id] for line in lines)
+            assert invoice.invoice_date_due is not None
+            assert invoice.serie.series[0] == (
+                "F" if invoice.partner.document_type == "ruc" else "B"
+            )
+        # Ninguna fila huérfana en las tablas de líneas e intermedias
+        assert not AccountMoveLine.objects.filter(move__isnull=True).exists()
+        assert MoveLineTax.objects.count() == AccountMoveLine.objects.count()
+
+    def test_same_seed_gives_same_dataset(self, catalog, igv):
+        def build(seed):
+            def run():
+                seed_all(catalog, seed=seed)
+                return snapshot()
+
+            return run
+
+        first = rolled_back(build(42))
+        assert first["invoices"]
+        assert rolled_back(build(42)) == first
+        assert rolled_back(build(7)) != first
+
+    def test_numbering_is_consecutive_and_sequences_in_sync(self, catalog, igv):
+        seed_all(catalog)
+
+        for document_type, series in (("invoice", "F001"), ("ticket", "B001")):
+            numbers = list(
+                AccountMove.objects.filter(serie__series=series)
+                .order_by("id")
+                .values_list("invoice_number", flat=True)
+            )
+            assert numbers == [f"{series}-{n:08d}" for n in range(1, len(numbers) + 1)]
+            sequence = Sequence.objects.get(
+                code=f"account.move.{document_type}.{catalog.id}"
+            )
+            assert sequence.number_next == len(numbers) + 1
+
+        # La numeración normal continúa tras la carga sin repetir referencias
+        reference = SequenceService().generate_next_reference(
+            "account.move", catalog, "invoice"
+        )
+        assert not AccountMove.objects.filter(invoice_number=reference).exists()
+
+    def test_finish_syncs_sequences_left_behind(self, catalog, igv):
+        with seeder() as bulk:
+            seed_partners(bulk, 30, [catalog])
+        with seeder() as bulk:
+            seed_invoices(bulk, 25, [catalog])
+            # Secuencia desfasada respecto a lo insertado en bloque
+            Sequence.objects.filter(company=catalog).update(number_next=1)
+
+        for series in ("F001", "B001"):
+            last = (
+                AccountMove.objects.filter(serie__series=series)
+                .order_by("-id")
+                .values_list("invoice_number", flat=True)
+                .first()
+            )
+            if last is None:
+                continue
+            sequence = Sequence.objects.get(invoice_series__series=series)
+            assert sequence.number_next == int(last.split("-")[1]) + 1
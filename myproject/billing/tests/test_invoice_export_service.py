@@ -0,0 +1,252 @@
+# billing/tests/test_invoice_export_service.py
+import csv
+import io
+import os
+import zipfile
+
+import pytest
+from django.urls import reverse
+from pypdf import PdfReader, PdfWriter
+
+from billing.models import AccountMove
+from billing.services.batch_invoice_service import BatchInvoiceService
+from billing.services.invoice_export_service import (
+    MANIFEST_NAME,
+    InvoiceExport,
+    document_key,
+)
+from shared.utils.document_store import DocumentStore
+from shared.utils.file_manager import DocumentFileManager
+
+from .conftest import TARGET_DATE, make_subscription
+
+try:
+    import weasyprint  # noqa: F401  (las vistas de billing lo importan)
+except (ImportError, OSError):  # WeasyPrint sin sus librerías nativas
+    weasyprint = None
+
+PERIOD = TARGET_DATE.year * 100 + TARGET_DATE.month
+
+
+def blank_pdf(pages=1):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+@pytest.fixture
+def file_manager(tmp_path):
+    store = DocumentStore(
+        base_dir=str(tmp_path), index_path=str(tmp_path / "index.sqlite3")
+    )
+    yield DocumentFileManager("invoices", store=store)
+    store.close()
+
+
+@pytest.fixture
+def invoices(company, customer, consumer, igv):
+    subscriptions = [
+        make_subscription(company, customer, [(1, 100, 0, [igv])]),
+        make_subscription(company, customer, [(2, 50, 0, [igv])]),
+        make_subscription(company, consumer, [(1, 30, 0, [])]),
+    ]
+    BatchInvoiceService(company.id).generate_batch_invoices(
+        TARGET_DATE, [s.id for s in subscriptions]
+    )
+    return list(
+        AccountMove.objects.filter(subscription__in=subscriptions).order_by(
+            "invoice_date", "id"
+        )
+    )
+
+
+@pytest.fixture
+def saved_pdfs(invoices, file_manager):
+    """PDFs guardados para las dos primeras facturas (la tercera no tiene)"""
+    pdfs = {}
+    for pages, move in enumerate(invoices[:2], start=1):
+        serie, numero = document_key(move)
+        pdfs[move.id] = blank_pdf(pages)
+        result = file_manager.save_pdf(
+            pdfs[move.id], {"serie": serie, "numero": numero}
+        )
+        assert result["success"], result
+    return pdfs
+
+
+def export(company, file_manager, **kwargs):
+    return InvoiceExport(
+        company_id=company.id, period=PERIOD, file_manager=file_manager, **kwargs
+    )
+
+
+def read_zip(export):
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(export.iter_zip())))
+    assert archive.testzip() is None
+    return archive
+
+
+def read_manifest(archive):
+    text = archive.read(MANIFEST_NAME).decode("utf-8-sig")
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+@pytest.mark.django_db
+class TestDocumentKey:
+
+    def test_prefers_json_sent(self, invoices):
+        move = invoices[0]
+        move.json_sent = {"serie": "F009", "numero": 15}
+
+        assert document_key(move) == ("F009", "15")
+
+    def test_parses_invoice_number(self, invoices):
+        move = invoices[0]
+        move.json_sent = None
+        move.serie = None
+        move.invoice_number = "F001-00000042"
+
+        assert document_key(move) == ("F001", "42")
+
+        move.invoice_number = "F001-A12"
+        assert document_key(move) == ("F001", "A12")
+
+    def test_uses_serie_of_the_invoice(self, invoices):
+        move = invoices[0]
+        move.json_sent = {"serie": "F001"}
+        move.invoice_number = "X-00000007"
+
+        # Sin número en el JSON, la serie sale de la factura, no del número
+        assert move.serie.series == "F001"
+        assert document_key(move) == ("F001", "7")
+
+    def test_without_number(self, invoices):
+        move = invoices[0]
+        move.json_sent = None
+        move.serie = None
+
+        for invoice_number in ("", "00000042", "F001-"):
+            move.invoice_number = invoice_number
+            assert document_key(move) is None
+
+
+@pytest.mark.django_db
+class TestIterZip:
+
+    def test_archive_is_readable(self, company, invoices, saved_pdfs, file_manager):
+        invoice_export = export(company, file_manager, chunk_size=2)
+
+        archive = read_zip(invoice_export)
+
+        pdf_names = [name for name in archive.namelist() if name.startswith("pdf/")]
+        assert len(pdf_names) == 2
+        assert archive.namelist()[-1] == MANIFEST_NAME
+        assert {archive.read(name) for name in pdf_names} == set(saved_pdfs.values())
+        assert invoice_export.stats == {
+            "invoices": 3,
+            "documents": 2,
+            "missing": 1,
+            "bytes": sum(len(pdf) for pdf in saved_pdfs.values()),
+        }
+
+    def test_manifest_lists_invoice_without_pdf(
+        self, company, invoices, saved_pdfs, file_manager
+    ):
+        rows = read_manifest(read_zip(export(company, file_manager)))
+
+        assert [row["Factura"] for row in rows] == [
+            move.invoice_number for move in invoices
+        ]
+        missing = rows[2]
+        assert missing["Archivo"] == "NO DISPONIBLE"
+        assert missing["Serie"] == missing["SHA-256"] == ""
+        assert missing["Monto Total"] == f"{invoices[2].amount_total:.2f}"
+        assert all(row["Archivo"].startswith("pdf/") for row in rows[:2])
+
+    def test_missing_blob_is_reported(
+        self, company, invoices, saved_pdfs, file_manager
+    ):
+        serie, numero = document_key(invoices[0])
+        document = file_manager.find_document(serie, numero)
+        os.unlink(file_manager.store.blob_path(document["sha256"]))
+        invoice_export = export(company, file_manager)
+
+        archive = read_zip(invoice_export)
+
+        assert len([n for n in archive.namelist() if n.startswith("pdf/")]) == 1
+        assert read_manifest(archive)[0]["Archivo"] == "NO DISPONIBLE"
+        assert invoice_export.stats["missing"] == 2
+
+
+@pytest.mark.django_db
+class TestMergePdf:
+
+    def test_merges_saved_pdfs(self, company, invoices, saved_pdfs, file_manager):
+        with export(company, file_manager).merge_pdf() as merged:
+            reader = PdfReader(merged)
+            # 1 + 2 páginas; la factura sin PDF no aporta páginas
+            assert len(reader.pages) == 3
+            assert len(reader.outline) == 2
+
+    def test_rejects_selection_over_limit(
+        self, company, invoices, saved_pdfs, file_manager, settings
+    ):
+        settings.BILLING_EXPORT_MERGE_LIMIT = 2
+
+        with pytest.raises(ValueError, match="límite"):
+            export(company, file_manager).merge_pdf()
+
+    def test_invalid_period(self, company, file_manager):
+        with pytest.raises(ValueError, match="Período inválido"):
+            InvoiceExport(period=202513, file_manager=file_manager)
+        with pytest.raises(ValueError):
+            InvoiceExport(file_manager=file_manager)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(weasyprint is None, reason="WeasyPrint no disponible")
+class TestExportView:
+
+    @pytest.fixture
+    def logged_client(self, client, django_user_model):
+        user = django_user_model.objects.create_user(username="admin", password="x")
+        client.force_login(user)
+        return client
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"period": "202513"},
+            {"period": "marzo"},
+            {"company_id": "1", "period_from": "202500"},
+            {},
+        ],
+    )
+    def test_bad_period_returns_400(self, logged_client, params):
+        response = logged_client.get(reverse("billing:invoice_export_download"), params)
+
+        assert response.status_code == 400
+
+    def test_bad_format_returns_400(self, logged_client, company):
+        response = logged_client.get(
+            reverse("billing:invoice_export_download"),
+            {"company_id": company.id, "period": PERIOD, "format": "xml"},
+        )
+
+        assert response.status_code == 400
+        assert "xml" in response.content.decode()
+
+    def test_merge_over_limit_returns_400(
+        self, logged_client, company, invoices, settings
+    ):
+        settings.BILLING_EXPORT_MERGE_LIMIT = 1
+
+        response = logged_client.get(
+            reverse("billing:invoice_export_download"),
+            {"company_id": company.id, "period": PERIOD, "format": "pdf"},
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,190 @@
+# billing/tests/test_invoice_processing_service.py
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from billing.models import AccountMove, Tax
+from billing.services.batch_invoice_service import BatchInvoiceService
+from billing.services.invoice_processing_service import InvoiceProcessingService
+
+from .conftest import TARGET_DATE, make_payment_term, make_subscription
+
+COMPARED_FIELDS = (
+    "state",
+    "amount_total",
+    "amount_tax",
+    "invoice_payment_term_id",
+    "invoice_date_due",
+)
+
+
+@pytest.fixture
+def taxes(company, igv):
+    isc = Tax.objects.create(
+        name="ISC",
+        type_tax_use="sale",
+        amount_type="percent",
+        amount=Decimal("10"),
+        company=company,
+        sequence="2",
+    )
+    # Los impuestos no porcentuales no entran en el total teórico
+    icbper = Tax.objects.create(
+        name="ICBPER",
+        type_tax_use="sale",
+        amount_type="fixed",
+        amount=Decimal("0.50"),
+        company=company,
+        sequence="3",
+    )
+    return igv, isc, icbper
+
+
+@pytest.fixture
+def build_invoices(company, customer, taxes):
+    """
+    Crea un juego de facturas en borrador (dos consistentes y tres
+    alteradas); llamarla dos veces da dos juegos idénticos
+    """
+    igv, isc, icbper = taxes
+    term = make_payment_term(company, days=10)
+    lines = [
+        [(2, "100.00", "10", [igv])],
+        [(3, "33.33", "0", [igv, isc]), (1, "15.00", "0", [icbper])],
+        [(1, "49.80", "5", [igv]), (4, "2.50", "0", [])],
+        [(1, "250.00", "0", [igv])],
+        [(5, "12.34", "2", [igv, icbper])],
+    ]
+
+    def build():
+        subscriptions = [
+            make_subscription(company, customer, sub_lines) for sub_lines in lines
+        ]
+        BatchInvoiceService(company.id).generate_batch_invoices(
+            TARGET_DATE, [s.id for s in subscriptions]
+        )
+        invoices = list(
+            AccountMove.objects.filter(subscription__in=subscriptions).order_by("id")
+        )
+        ids = [invoice.id for invoice in invoices]
+        # Total desfasado, totales en cero y un vencimiento que save() completa
+        AccountMove.objects.filter(id=ids[1]).update(amount_total=F("amount_total") + 5)
+        AccountMove.objects.filter(id=ids[2]).update(amount_total=0, amount_tax=0)
+        AccountMove.objects.filter(id=ids[3]).update(
+            invoice_payment_term=term, invoice_date_due=None
+        )
+        AccountMove.objects.filter(id=ids[4]).update(
+            invoice_payment_term=None, amount_total=F("amount_total") - 1
+        )
+        return ids
+
+    return build
+
+
+def legacy_post(service, ids):
+    """Posteo anterior: validar y save() factura por factura"""
+    for invoice in AccountMove.objects.filter(id__in=ids, state="draft"):
+        if service._calculate_invoice_with_debug(invoice)["is_consistent"]:
+            invoice.state = "posted"
+            invoice.save()
+
+
+def legacy_fix(service, ids):
+    """Corrección anterior: totales de `_calculate_invoice_with_debug` y save()"""
+    for invoice in AccountMove.objects.filter(id__in=ids, state="draft"):
+        validation = service._calculate_invoice_with_debug(invoice)
+        if not validation["is_consistent"]:
+            invoice.amount_total = validation["theoretical_total"]
+            invoice.amount_tax = sum(
+                Decimal(str(line["tax_amount"])) for line in validation["line_details"]
+            )
+            invoice.save()
+
+
+def snapshot(ids):
+    rows = AccountMove.objects.filter(id__in=ids).order_by("id")
+    return [tuple(getattr(row, field) for field in COMPARED_FIELDS) for row in rows]
+
+
+@pytest.mark.django_db
+class TestComputeInvoiceTotals:
+
+    def test_matches_per_invoice_computation(self, build_invoices):
+        ids = build_invoices()
+        service = InvoiceProcessingService(chunk_size=2)
+
+        results = service.compute_invoice_totals(AccountMove.objects.filter(id__in=ids))
+
+        assert [result["id"] for result in results] == ids
+        for result in results:
+            invoice = AccountMove.objects.get(id=result["id"])
+            expected = service._calculate_invoice_with_debug(invoice)
+            assert result["theoretical_total"] == expected["theoretical_total"]
+            assert result["discrepancy"] == expected["discrepancy"]
+            assert result["is_consistent"] == expected["is_consistent"]
+            assert float(result["theoretical_tax"]) == pytest.approx(
+                sum(line["tax_amount"] for line in expected["line_details"])
+            )
+        assert [result["is_consistent"] for result in results] == [
+            True,
+            False,
+            False,
+            True,
+            False,
+        ]
+
+    def test_query_count_does_not_grow_with_invoices(self, build_invoices):
+        ids = build_invoices()
+        service = InvoiceProcessingService()
+
+        with CaptureQueriesContext(connection) as ctx:
+            service.compute_invoice_totals(AccountMove.objects.filter(id__in=ids))
+
+        # ids + impuestos + líneas + facturas, para un único bloque
+        assert len(ctx.captured_queries) == 4
+
+    def test_validate_matches_per_invoice_details(self, build_invoices):
+        ids = build_invoices()
+        service = InvoiceProcessingService()
+
+        results = service.validate_invoice_totals(ids)
+
+        for invoice_id, result in zip(ids, results):
+            invoice = AccountMove.objects.get(id=invoice_id)
+            expected = service._calculate_invoice_with_debug(invoice)
+            assert result["invoice"] == invoice.invoice_number
+            assert result["actual_total"] == invoice.amount_total
+            assert result["theoretical_total"] == expected["theoretical_total"]
+            assert result["is_consistent"] == expected["is_consistent"]
+            # El detalle por línea solo se arma para las inconsistentes
+            if not expected["is_consistent"]:
+                assert result["debug_info"] == expected["line_details"]
+
+
+@pytest.mark.django_db
+class TestBulkSave:
+
+    def test_post_matches_per_invoice_save(self, build_invoices):
+        bulk_ids, legacy_ids = build_invoices(), build_invoices()
+        service = InvoiceProcessingService(chunk_size=2)
+
+        stats = service.post_draft_invoices(bulk_ids)
+        legacy_post(service, legacy_ids)
+
+        assert stats == {"posted": 2, "failed": 3, "total_processed": 5}
+        assert snapshot(bulk_ids) == snapshot(legacy_ids)
+
+    def test_fix_matches_per_invoice_save(self, build_invoices):
+        bulk_ids, legacy_ids = build_invoices(), build_invoices()
+        service = InvoiceProcessingService(chunk_size=2)
+
+        fixed = service.fix_invoice_totals(bulk_ids)
+        legacy_fix(service, legacy_ids)
+
+        assert fixed == 3
+        assert snapshot(bulk_ids) == snapshot(legacy_ids)
+        # Tras corregir, todas quedan consistentes y se pueden postear
+        assert service.post_draft_invoices(bulk_ids)["posted"] == 5
@@ -0,0 +1,98 @@
+# billing/tests/test_payment_term_evaluator.py
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from billing.models import AccountPaymentTermLine
+from billing.services import payment_term_evaluator
+from billing.services.payment_term_evaluator import (
+    PaymentTermEvaluator,
+    get_payment_term_evaluator,
+)
+
+from .conftest import make_payment_term
+
+INVOICE_DATE = date(2025, 3, 10)
+
+
+def edit_elsewhere(term, days):
+    """Edición desde otro proceso: UPDATE directo, sin señales en este"""
+    AccountPaymentTermLine.objects.filter(payment_term=term).update(days=days)
+
+
+def later(seconds):
+    return patch.object(
+        payment_term_evaluator.time,
+        "monotonic",
+        return_value=time.monotonic() + seconds,
+    )
+
+
+@pytest.mark.django_db
+class TestPaymentTermEvaluator:
+
+    def test_compiled_term_expires_after_ttl(self, company):
+        term = make_payment_term(company, days=15)
+        evaluator = PaymentTermEvaluator(ttl=60)
+        assert evaluator.due_date(term.id, INVOICE_DATE) == INVOICE_DATE + timedelta(15)
+
+        edit_elsewhere(term, 30)
+        # Dentro del TTL se sigue usando el término compilado
+        assert evaluator.due_date(term.id, INVOICE_DATE) == INVOICE_DATE + timedelta(15)
+
+        with later(61):
+            due = evaluator.due_date(term.id, INVOICE_DATE)
+        assert due == INVOICE_DATE + timedelta(30)
+        assert evaluator.stats["compiled"] == 2
+
+    def test_memo_does_not_outlive_recompiled_term(self, company):
+        term = make_payment_term(company, days=15)
+        evaluator = PaymentTermEvaluator(ttl=60)
+        invoice_dates = [INVOICE_DATE + timedelta(days=n) for n in range(3)]
+        for invoice_date in invoice_dates:
+            evaluator.due_date(term.id, invoice_date)
+
+        edit_elsewhere(term, 45)
+        with later(61):
+            dues = [evaluator.due_date(term.id, d) for d in invoice_dates]
+
+        assert dues == [d + timedelta(45) for d in invoice_dates]
+        assert evaluator.stats["hits"] == 0
+
+    def test_memo_shared_by_terms_with_same_rule(self, company):
+        first = make_payment_term(company, days=15)
+        second = make_payment_term(company, days=15)
+        evaluator = PaymentTermEvaluator(ttl=60)
+
+        evaluator.due_date(first.id, INVOICE_DATE)
+        evaluator.due_date(second.id, INVOICE_DATE)
+
+        assert evaluator.stats == {
+            "compiled": 2,
+            "hits": 1,
+            "misses": 1,
+            "invalidations": 0,
+        }
+
+    def test_zero_ttl_disables_cache_and_memo(self, company):
+        term = make_payment_term(company, days=15)
+        evaluator = PaymentTermEvaluator(ttl=0)
+        assert evaluator.due_date(term.id, INVOICE_DATE) == INVOICE_DATE + timedelta(15)
+
+        edit_elsewhere(term, 20)
+
+        assert evaluator.due_date(term.id, INVOICE_DATE) == INVOICE_DATE + timedelta(20)
+        assert evaluator._memo == {} and evaluator._compiled == {}
+
+    def test_signal_invalidates_shared_evaluator(self, company):
+        term = make_payment_term(company, days=15)
+        evaluator = get_payment_term_evaluator()
+        assert evaluator.due_date(term.id, INVOICE_DATE) == INVOICE_DATE + timedelta(15)
+
+        line = term.lines.get()
+        line.days = 25
+        line.save()
+
+        assert evaluator.due_date(term.id, INVOICE_DATE) == INVOICE_DATE + timedelta(25)
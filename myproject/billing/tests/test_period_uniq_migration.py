@@ -0,0 +1,115 @@
+# billing/tests/test_period_uniq_migration.py
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.db import connection
+
+from billing.models import AccountMove, SubscriptionLedgerEntry
+from billing.services.batch_invoice_service import BatchInvoiceService
+
+from .conftest import TARGET_DATE, make_subscription
+from .test_billing_ledger_service import assert_ledger_matches
+
+migration = import_module(
+    "billing.migrations.0026_accountmove_billing_acc_sub_period_uniq"
+)
+
+
+@pytest.fixture
+def without_constraint(db):
+    """Base anterior a la restricción (en SQLite es un índice parcial)"""
+    constraint = next(
+        c
+        for c in AccountMove._meta.constraints
+        if c.name == "billing_acc_sub_period_uniq"
+    )
+    # Sin `with`: el índice se borra dentro de la transacción del test y
+    # vuelve con el rollback
+    connection.schema_editor().remove_constraint(AccountMove, constraint)
+
+
+@pytest.fixture
+def subscription(company, customer, igv):
+    subscription = make_subscription(company, customer, [(1, 100, 0, [igv])])
+    BatchInvoiceService(company.id).generate_batch_invoices(
+        TARGET_DATE, [subscription.id]
+    )
+    return subscription
+
+
+def duplicate(invoice, state="draft", number=2):
+    """Otra factura de la misma suscripción y período (p. ej. un reintento)"""
+    return AccountMove.objects.create(
+        partner=invoice.partner,
+        subscription=invoice.subscription,
+        company=invoice.company,
+        journal=invoice.journal,
+        invoice_date=invoice.invoice_date,
+        invoice_number=f"F001-{number:08d}",
+        billing_type="subscription",
+        state=state,
+        amount_total=invoice.amount_total,
+        amount_tax=invoice.amount_tax,
+    )
+
+
+def run_migration():
+    migration.resolve_duplicate_periods(apps, connection.schema_editor())
+
+
+@pytest.mark.django_db
+class TestResolveDuplicatePeriods:
+
+    def test_cancels_newer_drafts(self, without_constraint, subscription):
+        original = AccountMove.objects.get(subscription=subscription)
+        copies = [duplicate(original, number=n) for n in (2, 3)]
+
+        run_migration()
+
+        states = dict(
+            AccountMove.objects.filter(subscription=subscription).values_list(
+                "id", "state"
+            )
+        )
+        assert states == {
+            original.id: "draft",
+            copies[0].id: "canceled",
+            copies[1].id: "canceled",
+        }
+        assert (
+            SubscriptionLedgerEntry.objects.filter(
+                invoice__in=copies, event_type="reversal"
+            ).count()
+            == 2
+        )
+        assert_ledger_matches([subscription])
+
+    def test_keeps_posted_invoice(self, without_constraint, subscription):
+        original = AccountMove.objects.get(subscription=subscription)
+        posted = duplicate(original, state="posted")
+
+        run_migration()
+
+        original.refresh_from_db()
+        assert original.state == "canceled"
+        assert AccountMove.objects.get(pk=posted.pk).state == "posted"
+        assert_ledger_matches([subscription])
+
+    def test_aborts_on_several_posted(self, without_constraint, subscription):
+        original = AccountMove.objects.get(subscription=subscription)
+        AccountMove.objects.filter(pk=original.pk).update(state="posted")
+        posted = duplicate(original, state="posted")
+        draft = duplicate(original, number=3)
+
+        with pytest.raises(RuntimeError) as error:
+            run_migration()
+
+        assert f"[{original.id}, {posted.id}]" in str(error.value)
+        # No se anuló nada
+        assert AccountMove.objects.get(pk=draft.pk).state == "draft"
+
+    def test_noop_without_duplicates(self, without_constraint, subscription):
+        run_migration()
+
+        assert AccountMove.objects.get(subscription=subscription).state == "draft"
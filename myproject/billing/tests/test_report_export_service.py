@@ -0,0 +1,230 @@
+# billing/tests/test_report_export_service.py
+import csv
+import gzip
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from billing.models import AccountMove, Journal, Partner
+from billing.services.report_export_service import EndOfMonthReport, ReportExporter
+
+from .conftest import make_payment_term
+
+try:
+    import weasyprint  # noqa: F401  (las vistas de billing lo importan)
+except (ImportError, OSError):  # WeasyPrint sin sus librerías nativas
+    weasyprint = None
+
+HEADERS = list(EndOfMonthReport.headers)
+
+
+def make_move(company, partner, term, invoice_date, invoice_date_due, amount):
+    return AccountMove.objects.create(
+        partner=partner,
+        company=company,
+        journal=Journal.objects.filter(company=company).first(),
+        invoice_number=f"F001-{AccountMove.objects.count() + 1:08d}",
+        invoice_date=invoice_date,
+        invoice_date_due=invoice_date_due,
+        invoice_payment_term=term,
+        amount_total=Decimal(amount),
+        state="posted",
+    )
+
+
+@pytest.fixture
+def moves(company, customer, consumer):
+    """
+    Tres facturas a fin de mes en 2025 (una con hotfix) y una con otro
+    término que el reporte no incluye
+    """
+    Partner.objects.filter(pk__in=[customer.pk, consumer.pk]).update(
+        invoice_end_of_month_payment=True
+    )
+    end_of_month = make_payment_term(company, option="end_of_month", days=0)
+    fifteen_days = make_payment_term(company)
+    return [
+        make_move(
+            company, customer, end_of_month, date(2025, 2, 3), date(2025, 2, 28), 100
+        ),
+        make_move(
+            company, customer, end_of_month, date(2025, 3, 5), date(2025, 3, 30), 118
+        ),
+        # Vence el 31 en lugar del 30: hotfix aplicado
+        make_move(
+            company, consumer, end_of_month, date(2025, 3, 10), date(2025, 3, 31), 59
+        ),
+        make_move(
+            company, customer, fifteen_days, date(2025, 3, 12), date(2025, 3, 27), 500
+        ),
+    ]
+
+
+def report_for(company, month=None):
+    return EndOfMonthReport(company_id=company.id, year=2025, month=month)
+
+
+def parse_csv(text):
+    return list(csv.reader(io.StringIO(text), delimiter="|"))
+
+
+def parse_xlsx(data):
+    sheet = load_workbook(io.BytesIO(data), read_only=True).active
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+@pytest.mark.django_db
+class TestReportExporter:
+
+    def test_csv_file(self, company, moves, tmp_path):
+        path = tmp_path / "reporte.csv"
+
+        rows = ReportExporter(report_for(company, month=3)).write_file(str(path))
+
+        assert rows == 2
+        header, *body = parse_csv(path.read_text(encoding="utf-8-sig"))
+        assert header == HEADERS
+        assert body[0] == [
+            "Empresa Demo",
+            "Cliente RUC",
+            "RUC",
+            moves[1].partner.num_document,
+            "F001-00000002",
+            "05/03/2025",
+            "30/03/2025",
+            "25",
+            "SÍ",
+            "NO",
+            "$118.00",
+            "posted",
+        ]
+        assert body[1][1] == "Cliente DNI"
+        assert body[1][9] == "SÍ"
+
+    def test_gzip_csv_file(self, company, moves, tmp_path):
+        path = tmp_path / "reporte.csv.gz"
+
+        ReportExporter(report_for(company)).write_file(str(path))
+
+        with gzip.open(path, "rt", encoding="utf-8-sig", newline="") as fileobj:
+            header, *body = parse_csv(fileobj.read())
+        assert header == HEADERS
+        assert [row[4] for row in body] == [
+            "F001-00000001",
+            "F001-00000002",
+            "F001-00000003",
+        ]
+
+    def test_xlsx_file(self, company, moves, tmp_path):
+        path = tmp_path / "reporte.xlsx"
+
+        ReportExporter(report_for(company)).write_file(str(path))
+
+        header, *body = parse_xlsx(path.read_bytes())
+        assert header == HEADERS
+        assert len(body) == 3
+        assert body[2][1] == "Cliente DNI"
+        assert body[2][10] == "$59.00"
+
+    def test_rejects_unknown_format(self, company, tmp_path):
+        with pytest.raises(ValueError):
+            ReportExporter(report_for(company)).write_file(
+                str(tmp_path / "reporte.ods"), fmt="ods"
+            )
+
+    def test_iter_csv_gzip_matches_plain_stream(self, company, moves):
+        plain = b"".join(ReportExporter(report_for(company)).iter_csv(rows_per_chunk=1))
+        chunks = list(
+            ReportExporter(report_for(company)).iter_csv(
+                compress=True, rows_per_chunk=1
+            )
+        )
+
+        assert gzip.decompress(b"".join(chunks)) == plain
+        header, *body = parse_csv(plain.decode("utf-8-sig"))
+        assert header == HEADERS
+        assert len(body) == 3
+
+    def test_statistics_in_single_pass(
+        self, company, moves, tmp_path, django_assert_num_queries
+    ):
+        report = report_for(company)
+
+        with django_assert_num_queries(1):
+            ReportExporter(report).write_file(str(tmp_path / "reporte.csv"))
+
+        assert report.rows == 3
+        assert report.con_pago_fin_mes == 3
+        assert report.con_hotfix == 1
+        assert report.monto_total == Decimal("277")
+        assert report.monto_promedio == Decimal("277") / 3
+        assert report.meses == {
+            2: {"total": 1, "hotfix": 0},
+            3: {"total": 2, "hotfix": 1},
+        }
+        assert report.periodo == "2025"
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(weasyprint is None, reason="WeasyPrint no disponible")
+class TestEndOfMonthReportView:
+
+    @pytest.fixture
+    def logged_client(self, client, django_user_model):
+        user = django_user_model.objects.create_user(username="admin", password="x")
+        client.force_login(user)
+        return client
+
+    def get(self, client, **params):
+        return client.get(reverse("billing:end_of_month_report_download"), params)
+
+    def test_csv(self, logged_client, company, moves):
+        response = self.get(logged_client, company_id=company.id, year=2025, month=3)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert "reporte_facturas_fin_mes_2025-03.csv" in (
+            response["Content-Disposition"]
+        )
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        header, *body = parse_csv(content)
+        assert header == HEADERS
+        assert len(body) == 2
+
+    def test_gzip_csv(self, logged_client, company, moves):
+        response = self.get(logged_client, company_id=company.id, year=2025, gzip=1)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/gzip"
+        assert response["Content-Disposition"].endswith('2025.csv.gz"')
+        content = gzip.decompress(b"".join(response.streaming_content))
+        assert len(parse_csv(content.decode("utf-8-sig"))) == 4
+
+    def test_xlsx(self, logged_client, company, moves):
+        response = self.get(
+            logged_client, company_id=company.id, year=2025, format="xlsx"
+        )
+
+        assert response.status_code == 200
+        header, *body = parse_xlsx(b"".join(response.streaming_content))
+        assert header == HEADERS
+        assert len(body) == 3
+
+    def test_bad_format_returns_400(self, logged_client, company):
+        response = self.get(logged_client, company_id=company.id, format="xml")
+
+        assert response.status_code == 400
+        assert "xml" in response.content.decode()
+
+    @pytest.mark.parametrize(
+        "params",
+        [{"month": "13"}, {"month": "0"}, {"year": "dosmil"}, {"company_id": "x"}],
+    )
+    def test_bad_period_returns_400(self, logged_client, params):
+        response = self.get(logged_client, **params)
+
+        assert response.status_code == 400
@@ -0,0 +1,149 @@
+# billing/tests/test_sequence_service.py
+import pytest
+from django.db import transaction
+
+from billing.models import AccountMove, Sequence
+from billing.services.batch_invoice_service import BatchInvoiceService
+from billing.services.sequence_service import SequenceService
+
+from .conftest import TARGET_DATE, make_subscription
+
+
+def sequence_for(company, document_type="invoice"):
+    return Sequence.objects.get(code=f"account.move.{document_type}.{company.id}")
+
+
+def number_next(company, document_type="invoice"):
+    return sequence_for(company, document_type).number_next
+
+
+@pytest.fixture
+def service():
+    return SequenceService()
+
+
+@pytest.mark.django_db
+class TestSequenceBlock:
+
+    def test_take_hands_out_consecutive_references(self, service, company):
+        block = service.reserve_block("account.move", company, 3, "invoice")
+
+        assert number_next(company) == 4
+        assert block.take(2) == ["F001-00000001", "F001-00000002"]
+        assert block.remaining == 1
+        assert block.next_reference() == "F001-00000003"
+        with pytest.raises(ValueError):
+            block.next_number()
+
+    def test_release_returns_unused_numbers(self, service, company):
+        block = service.reserve_block("account.move", company, 5, "invoice")
+        block.take(2)
+
+        assert block.release() == 3
+        assert number_next(company) == 3
+        # Liberar dos veces no devuelve nada más
+        assert block.release() == 0
+        assert block.remaining == 0
+
+    def test_release_leaves_gap_when_another_block_follows(self, service, company):
+        first = service.reserve_block("account.move", company, 5, "invoice")
+        second = service.reserve_block("account.move", company, 5, "invoice")
+        first.take(1)
+
+        assert first.release() == 0
+        assert number_next(company) == 11
+        assert second.next_reference() == "F001-00000006"
+
+    def test_context_exit_releases(self, service, company):
+        with service.reserve_block("account.move", company, 10, "invoice") as block:
+            block.take(4)
+
+        assert block.released
+        assert number_next(company) == 5
+
+    def test_context_exit_releases_on_error(self, service, company):
+        with pytest.raises(RuntimeError):
+            with service.reserve_block("account.move", company, 10, "invoice"):
+                raise RuntimeError("falla")
+
+        assert number_next(company) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNoGapSequence:
+
+    def test_no_gap_block_requires_atomic(self, service, company):
+        Sequence.objects.filter(code=f"account.move.invoice.{company.id}").update(
+            implementation="no_gap"
+        )
+
+        with pytest.raises(ValueError, match="no_gap"):
+            service.reserve_block("account.move", company, 2, "invoice")
+        assert number_next(company) == 1
+
+        with transaction.atomic():
+            with service.reserve_block("account.move", company, 2, "invoice") as block:
+                assert block.next_reference() == "F001-00000001"
+        assert number_next(company) == 2
+
+    def test_no_gap_block_rolls_back_with_transaction(self, service, company):
+        Sequence.objects.filter(code=f"account.move.invoice.{company.id}").update(
+            implementation="no_gap"
+        )
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                block = service.reserve_block("account.move", company, 5, "invoice")
+                block.take(5)
+                raise RuntimeError("falla")
+
+        assert number_next(company) == 1
+
+
+@pytest.mark.django_db
+class TestReserveReferences:
+
+    @pytest.fixture
+    def desynced(self, company, customer, igv):
+        """Una factura emitida y la secuencia vuelta a 1 (desfasada)"""
+        subscription = make_subscription(company, customer, [(1, 100, 0, [igv])])
+        BatchInvoiceService(company.id).generate_batch_invoices(
+            TARGET_DATE, [subscription.id]
+        )
+        Sequence.objects.filter(code=f"account.move.invoice.{company.id}").update(
+            number_next=1
+        )
+        return subscription
+
+    def test_standard_sequence_skips_used_references(self, company, desynced):
+        service = BatchInvoiceService(company.id)
+        with transaction.atomic():
+            references = service._reserve_references(company, "invoice", 2)
+
+        assert references == ["F001-00000002", "F001-00000003"]
+
+    def test_no_gap_sequence_raises_on_used_references(self, company, desynced):
+        Sequence.objects.filter(code=f"account.move.invoice.{company.id}").update(
+            implementation="no_gap"
+        )
+        service = BatchInvoiceService(company.id)
+
+        with pytest.raises(ValueError, match="desfasada"):
+            with transaction.atomic():
+                service._reserve_references(company, "invoice", 2)
+        # La reserva se revirtió con la transacción: no quedan huecos
+        assert number_next(company) == 1
+
+    def test_no_gap_batch_records_error(self, company, customer, igv, desynced):
+        Sequence.objects.filter(code=f"account.move.invoice.{company.id}").update(
+            implementation="no_gap"
+        )
+        subscription = make_subscription(company, customer, [(1, 50, 0, [igv])])
+
+        stats = BatchInvoiceService(company.id).generate_batch_invoices(
+            TARGET_DATE, [subscription.id]
+        )
+
+        assert stats["errors"] == 1 and stats["created"] == 0
+        assert not AccountMove.objects.filter(subscription=subscription).exists()
+        assert number_next(company) == 1
@@ -0,0 +1,256 @@
+# billing/tests/test_tasks.py
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from billing.models import AccountMove, BillingRun, BillingRunShard
+from billing.services.batch_invoice_service import BatchInvoiceService
+from billing.tasks import (
+    consolidar_facturacion,
+    facturar_shard,
+    generar_facturas_mensuales,
+    planificar_shards,
+)
+
+from .conftest import TARGET_DATE, make_company, make_subscription
+
+
+@pytest.fixture
+def subscriptions(company, customer, consumer, igv):
+    lines = [(1, 100, 0, [igv])]
+    return [
+        make_subscription(company, customer, lines),
+        make_subscription(company, customer, lines),
+        make_subscription(company, customer, lines),
+        make_subscription(company, consumer, lines),
+    ]
+
+
+def new_run(**fields):
+    return BillingRun.objects.create(target_date=TARGET_DATE, **fields)
+
+
+def run_billing(subscriptions, **kwargs):
+    result = generar_facturas_mensuales.delay(
+        target_date=TARGET_DATE.isoformat(),
+        subscription_ids=[s.id for s in subscriptions],
+        **kwargs,
+    ).get()
+    return BillingRun.objects.get(pk=result["run_id"])
+
+
+@pytest.mark.django_db
+class TestPlanificarShards:
+
+    def test_groups_by_company_and_document_type(
+        self, currency, company, subscriptions, customer, igv
+    ):
+        other_company = make_company(currency, "Otra Empresa")
+        other = make_subscription(other_company, customer, [(1, 10, 0, [igv])])
+        run = new_run()
+
+        planificar_shards(run, [s.id for s in subscriptions] + [other.id], shard_size=2)
+
+        shards = [
+            (
+                shard.number,
+                shard.company_id,
+                shard.document_type,
+                shard.subscription_ids,
+            )
+            for shard in run.shards.all()
+        ]
+        ids = [s.id for s in subscriptions]
+        assert shards == [
+            (1, company.id, "invoice", ids[:2]),
+            (2, company.id, "invoice", ids[2:3]),
+            (3, company.id, "ticket", ids[3:]),
+            (4, other_company.id, "invoice", [other.id]),
+        ]
+        run.refresh_from_db()
+        assert run.total_items == 5
+
+    def test_filters_by_client_ruc(self, subscriptions, customer):
+        run = new_run()
+        planificar_shards(
+            run, [s.id for s in subscriptions], rucs=[customer.num_document]
+        )
+
+        assert [shard.document_type for shard in run.shards.all()] == ["invoice"]
+        assert run.total_items == 3
+
+
+@pytest.mark.django_db
+class TestGenerarFacturasMensuales:
+
+    def test_chord_creates_invoices_and_merges_stats(self, subscriptions):
+        run = run_billing(subscriptions, shard_size=2)
+
+        assert run.status == "COMPLETED"
+        assert run.successful_items == 4 and run.failed_items == 0
+        assert run.results["totals"]["created"] == 4
+        assert set(run.results["shards"]) == {"1", "2", "3"}
+        assert AccountMove.objects.filter(subscription__in=subscriptions).count() == 4
+        assert set(run.shards.values_list("status", flat=True)) == {"COMPLETED"}
+
+    def test_shard_error_is_captured(self, subscriptions):
+        with patch.object(
+            BatchInvoiceService,
+            "generate_batch_invoices",
+            side_effect=RuntimeError("BD caída"),
+        ):
+            run = run_billing(subscriptions)
+
+        # El callback del chord se ejecuta aunque todos los shards fallen
+        assert run.status == "FAILED"
+        assert run.failed_items == 4
+        assert run.results["pending_shards"] == [1, 2]
+        assert "Error en shard: BD caída" in run.error_summary["errors"]
+        shard = run.shards.first()
+        assert shard.status == "FAILED" and shard.attempts == 1
+
+    def test_resume_relaunches_only_failed_shards(self, subscriptions):
+        original = BatchInvoiceService.generate_batch_invoices
+
+        def fail_tickets(service, target_date, subscription_ids=None):
+            if subscription_ids == [subscriptions[3].id]:
+                raise RuntimeError("falla")
+            return original(service, target_date, subscription_ids)
+
+        with patch.object(BatchInvoiceService, "generate_batch_invoices", fail_tickets):
+            run = run_billing(subscriptions)
+        assert run.status == "PARTIAL"
+
+        generar_facturas_mensuales.delay(run_id=str(run.id)).get()
+
+        run.refresh_from_db()
+        assert run.status == "COMPLETED"
+        assert run.successful_items == 4
+        attempts = dict(run.shards.values_list("document_type", "attempts"))
+        assert attempts == {"invoice": 1, "ticket": 2}
+        assert AccountMove.objects.filter(subscription__in=subscriptions).count() == 4
+
+
+@pytest.mark.django_db
+class TestFacturarShard:
+
+    @pytest.fixture
+    def shard(self, subscriptions):
+        run = new_run()
+        planificar_shards(run, [s.id for s in subscriptions[:3]])
+        return run.shards.get()
+
+    def test_same_shard_twice(self, shard, subscriptions):
+        first = facturar_shard.delay(shard.id).get()
+        second = facturar_shard.delay(shard.id).get()
+
+        assert first["created"] == 3
+        assert second == first
+        shard.refresh_from_db()
+        assert shard.attempts == 1
+        assert AccountMove.objects.filter(subscription__in=subscriptions).count() == 3
+
+    def test_shard_processing_elsewhere_is_not_taken(self, shard):
+        BillingRunShard.objects.filter(pk=shard.pk).update(
+            status="PROCESSING", started_at=timezone.now()
+        )
+
+        facturar_shard.delay(shard.id).get()
+
+        shard.refresh_from_db()
+        assert shard.status == "PROCESSING" and shard.attempts == 0
+        assert not AccountMove.objects.filter(
+            subscription_id__in=shard.subscription_ids
+        ).exists()
+
+    def test_stale_processing_shard_is_taken(self, shard, settings):
+        settings.BILLING_SHARD_STALE_SECONDS = 60
+        BillingRunShard.objects.filter(pk=shard.pk).update(
+            status="PROCESSING", started_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        facturar_shard.delay(shard.id).get()
+
+        shard.refresh_from_db()
+        assert shard.status == "COMPLETED" and shard.attempts == 1
+
+    def test_concurrent_worker_cannot_duplicate_invoice(self, shard, subscriptions):
+        facturar_shard.delay(shard.id).get()
+
+        # Un worker que no vio las facturas del otro: la restricción única
+        # (suscripción, período) convierte el duplicado en omisión
+        real = BatchInvoiceService._invoiced_subscription_ids
+        calls = []
+
+        def stale_first_check(service, subscription_ids, target_date):
+            calls.append(subscription_ids)
+            if len(calls) == 1:
+                return set()
+            return real(service, subscription_ids, target_date)
+
+        service = BatchInvoiceService(shard.company_id)
+        with patch.object(
+            BatchInvoiceService, "_invoiced_subscription_ids", stale_first_check
+        ):
+            service._process_chunk(
+                service._load_subscriptions(shard.subscription_ids), TARGET_DATE
+            )
+
+        assert service.stats["created"] == 0
+        assert service.stats["skipped"] == 3
+        assert AccountMove.objects.filter(subscription__in=subscriptions).count() == 3
+
+
+@pytest.mark.django_db
+class TestConsolidarFacturacion:
+
+    def test_merges_shard_stats(self, company):
+        run = new_run(status="PROCESSING")
+        for number, status, stats in (
+            (1, "COMPLETED", {"processed": 5, "created": 4, "skipped": 1}),
+            (
+                2,
+                "FAILED",
+                {"processed": 3, "created": 1, "errors": 2, "error_details": ["E"]},
+            ),
+        ):
+            BillingRunShard.objects.create(
+                run=run,
+                number=number,
+                company=company,
+                document_type="invoice",
+                status=status,
+                stats=stats,
+            )
+
+        result = consolidar_facturacion([], run_id=str(run.id))
+
+        run.refresh_from_db()
+        assert result["status"] == run.status == "PARTIAL"
+        assert result["created"] == run.successful_items == 5
+        assert run.processed_items == 8
+        assert run.failed_items == 2
+        assert run.skipped_items == 1
+        assert run.results["pending_shards"] == [2]
+        assert run.error_summary == {"errors": ["E"]}
+
+
+@pytest.mark.django_db
+def test_unique_subscription_invoice_per_period(subscriptions):
+    BatchInvoiceService(subscriptions[0].company_id).generate_batch_invoices(
+        TARGET_DATE, [subscriptions[0].id]
+    )
+    invoice = AccountMove.objects.get(subscription=subscriptions[0])
+    invoice.pk = None
+    invoice.invoice_number = "F001-99999999"
+
+    with pytest.raises(IntegrityError):
+        with transaction.atomic():
+            invoice.save()
+
+    # Una factura anulada no bloquea volver a facturar el período
+    AccountMove.objects.filter(subscription=subscriptions[0]).update(state="canceled")
+    invoice.save()
@@ -24,6 +24,8 @@ from .views.company import (
     company_toggle_active,
 )
 
+from .views.reports import end_of_month_report_download, invoice_export_download
+
 app_name = "billing"
 
 urlpatterns = [
@@ -61,4 +63,14 @@ urlpatterns = [
         PartnerWizardFinish.as_view(),
         name="partner_wizard_finish",
     ),
+    path(
+        "reports/end-of-month/",
+        end_of_month_report_download,
+        name="end_of_month_report_download",
+    ),
+    path(
+        "reports/invoices/export/",
+        invoice_export_download,
+        name="invoice_export_download",
+    ),
 ]
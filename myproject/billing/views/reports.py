@@ -0,0 +1,123 @@
+# billing/views/reports.py
+
+import tempfile
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from billing.services.report_export_service import (
+    EXPORT_FORMATS,
+    EndOfMonthReport,
+    ReportExporter,
+)
+from billing.services.invoice_export_service import (
+    EXPORT_FORMATS as INVOICE_EXPORT_FORMATS,
+    InvoiceExport,
+)
+
+
+def _int_param(request, name, default=None):
+    value = request.GET.get(name)
+    if not value:
+        return default
+    return int(value)
+
+
+@login_required
+@require_GET
+def end_of_month_report_download(request):
+    """
+    Descarga el reporte de facturas con pago a fin de mes.
+
+    Parámetros GET: company_id, year, month, format (csv|xlsx), gzip=1.
+    El CSV se genera en streaming; el XLSX se arma en un archivo temporal.
+    """
+    try:
+        report = EndOfMonthReport(
+            company_id=_int_param(request, "company_id"),
+            year=_int_param(request, "year", timezone.now().year),
+            month=_int_param(request, "month"),
+        )
+    except ValueError:
+        return HttpResponseBadRequest("Parámetros inválidos")
+
+    if report.month is not None and not 1 <= report.month <= 12:
+        return HttpResponseBadRequest("Mes inválido")
+
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Formato no soportado: {fmt}")
+
+    exporter = ReportExporter(report)
+    filename = f"reporte_facturas_fin_mes_{report.periodo}"
+
+    if fmt == "xlsx":
+        # openpyxl necesita un archivo con seek; en disco si pasa de 10 MB
+        target = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+        exporter.write_xlsx(target)
+        target.seek(0)
+        return FileResponse(
+            target,
+            as_attachment=True,
+            filename=f"{filename}.xlsx",
+            content_type=(
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            ),
+        )
+
+    compress = request.GET.get("gzip") in ("1", "true")
+    response = StreamingHttpResponse(
+        exporter.iter_csv(compress=compress),
+        content_type="application/gzip" if compress else "text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.csv{".gz" if compress else ""}"'
+    )
+    return response
+
+
+@login_required
+@require_GET
+def invoice_export_download(request):
+    """
+    Descarga los PDFs guardados de un conjunto de facturas.
+
+    Parámetros GET: company_id, partner_id, period (AAAAMM) o
+    period_from/period_to, format (zip|pdf).
+    El ZIP (PDFs + facturas.csv) se genera en streaming; el PDF combinado se
+    arma en un archivo temporal y está limitado a BILLING_EXPORT_MERGE_LIMIT.
+    """
+    try:
+        export = InvoiceExport(
+            company_id=_int_param(request, "company_id"),
+            partner_id=_int_param(request, "partner_id"),
+            period=_int_param(request, "period"),
+            period_from=_int_param(request, "period_from"),
+            period_to=_int_param(request, "period_to"),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(f"Parámetros inválidos: {e}")
+
+    fmt = request.GET.get("format", "zip")
+    if fmt not in INVOICE_EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Formato no soportado: {fmt}")
+
+    filename = f"facturas_{export.label}"
+
+    if fmt == "pdf":
+        try:
+            target = export.merge_pdf()
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        return FileResponse(
+            target,
+            as_attachment=True,
+            filename=f"{filename}.pdf",
+            content_type="application/pdf",
+        )
+
+    response = StreamingHttpResponse(export.iter_zip(), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.zip"'
+    return response
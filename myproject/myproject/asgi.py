@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Atiende `lifespan` para cerrar los clientes HTTP compartidos al apagar
+from api_service.services.base.http_pool import HttpPoolLifespan  # noqa: E402
+
+application = HttpPoolLifespan(django_application)
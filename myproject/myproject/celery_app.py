@@ -1,8 +1,17 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
 
 app = Celery("myproject")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_up_pdf_engine(**kwargs):
+    """Carga templates, CSS y fuentes del motor PDF en cada proceso worker"""
+    from shared.utils.pdf.engine import warm_up_pdf_engine
+
+    warm_up_pdf_engine()
@@ -245,6 +245,8 @@ NUBEFACT_WRITE_TIMEOUT = 10.0
 NUBEFACT_POOL_TIMEOUT = 5.0
 NUBEFACT_MAX_RETRIES = 3
 NUBEFACT_RETRY_ON_TIMEOUT = True
+NUBEFACT_MAX_CONNECTIONS = 100
+NUBEFACT_MAX_KEEPALIVE_CONNECTIONS = 20
 
 # Timeouts para Migo (valores diferentes)
 MIGO_CONNECT_TIMEOUT = 15.0
@@ -253,6 +255,58 @@ MIGO_WRITE_TIMEOUT = 15.0
 MIGO_POOL_TIMEOUT = 10.0
 MIGO_MAX_RETRIES = 5
 MIGO_RETRY_ON_TIMEOUT = True
+MIGO_MAX_CONNECTIONS = 64
+MIGO_MAX_KEEPALIVE_CONNECTIONS = 64
+
+# Rate limiting de APIs externas: "memory" (token bucket por proceso, sin I/O),
+# "cache" (ventana deslizante compartida vía CACHES) o "database" (ApiRateLimit)
+API_RATE_LIMIT_BACKEND = os.getenv("API_RATE_LIMIT_BACKEND", "memory")
+
+# Registro de llamadas API (ApiCallLog): buffer en memoria vaciado con
+# bulk_create por tamaño (BATCH_SIZE) o por tiempo (FLUSH_INTERVAL, segundos)
+API_CALL_LOG_BUFFERED = os.getenv("API_CALL_LOG_BUFFERED", "true").lower() == "true"
+API_CALL_LOG_BUFFER_SIZE = int(os.getenv("API_CALL_LOG_BUFFER_SIZE", "10000"))
+API_CALL_LOG_BATCH_SIZE = int(os.getenv("API_CALL_LOG_BATCH_SIZE", "200"))
+API_CALL_LOG_FLUSH_INTERVAL = float(os.getenv("API_CALL_LOG_FLUSH_INTERVAL", "2.0"))
+
+# Segundos que ApiService/ApiEndpoint permanecen en el registro en memoria
+# (se invalida además al guardar/borrar en el mismo proceso). 0 = sin cache
+API_SERVICE_REGISTRY_TTL = int(os.getenv("API_SERVICE_REGISTRY_TTL", "300"))
+
+# Hilos del executor que ejecuta ORM/cache desde los servicios async
+# (acota también las conexiones a BD abiertas por esos hilos)
+API_ASYNC_IO_WORKERS = int(os.getenv("API_ASYNC_IO_WORKERS", "8"))
+
+# Cada cuántos segundos se guarda el avance de un ApiBatchRequest durante
+# una consulta masiva async
+API_BATCH_PROGRESS_INTERVAL = float(os.getenv("API_BATCH_PROGRESS_INTERVAL", "2.0"))
+
+# Clientes HTTP compartidos (api_service.services.base.http_pool): HTTP/2 solo
+# se usa si además está instalado `h2` (pip install "httpx[http2]")
+API_HTTP2_ENABLED = os.getenv("API_HTTP2_ENABLED", "true").lower() == "true"
+
+############################### FACTURACIÓN
+# Suscripciones por bloque (una transacción y un bulk_create por bloque) en
+# la generación de facturas en lote
+BILLING_BATCH_CHUNK_SIZE = int(os.getenv("BILLING_BATCH_CHUNK_SIZE", "500"))
+# Suscripciones por shard (subtarea Celery) en billing.tasks.generar_facturas_mensuales
+BILLING_SHARD_SIZE = int(os.getenv("BILLING_SHARD_SIZE", "2000"))
+# Segundos tras los que un shard en PROCESSING (worker caído) puede volver a
+# tomarse al reanudar la corrida
+BILLING_SHARD_STALE_SECONDS = int(os.getenv("BILLING_SHARD_STALE_SECONDS", "3600"))
+# Segundos que se reutiliza un término de pago compilado (vencimientos) por
+# proceso antes de releerlo de la BD; 0 = sin cache
+BILLING_PAYMENT_TERM_CACHE_TTL = int(os.getenv("BILLING_PAYMENT_TERM_CACHE_TTL", "300"))
+# Filas por vuelta del cursor del servidor al exportar reportes (CSV/XLSX)
+BILLING_REPORT_CHUNK_SIZE = int(os.getenv("BILLING_REPORT_CHUNK_SIZE", "2000"))
+# Filas por INSERT/COPY en la carga masiva de los comandos populate_* (--scale)
+BILLING_SEED_BATCH_SIZE = int(os.getenv("BILLING_SEED_BATCH_SIZE", "5000"))
+# Facturas por bloque al exportar PDFs (ZIP / PDF combinado): una consulta al
+# índice del DocumentStore por bloque y serie
+BILLING_EXPORT_CHUNK_SIZE = int(os.getenv("BILLING_EXPORT_CHUNK_SIZE", "500"))
+# Máximo de facturas en un PDF combinado (se arma completo antes de enviarse);
+# para más, usar el formato zip
+BILLING_EXPORT_MERGE_LIMIT = int(os.getenv("BILLING_EXPORT_MERGE_LIMIT", "500"))
 
 ############################### PDF CONFIG
 # Configuración de empresa
@@ -270,12 +324,41 @@ PDF_TEMPLATES = {
     "quote": "billing/cotizacion.html",  # Crear después
 }
 
+# Pool de procesos para renderizar PDFs en lote (shared.utils.pdf.batch_renderer):
+# workers (0 = uno por CPU), facturas en vuelo como máximo (0 = 2 por worker)
+# y método de arranque de los procesos
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "0"))
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", "0"))
+PDF_RENDER_START_METHOD = os.getenv("PDF_RENDER_START_METHOD", "spawn")
+
+# Calentar el motor PDF (templates, CSS, fuentes) al iniciar cada proceso
+# worker de Celery
+PDF_ENGINE_WARM_UP = os.getenv("PDF_ENGINE_WARM_UP", "true").lower() == "true"
+
+# Códigos QR (SVG) en cache por proceso, por cadena_para_codigo_qr, y máscara
+# fija 0-7 (vacío = la elige qrcode; fijarla acelera cada QR ~5x)
+PDF_QR_CACHE_SIZE = int(os.getenv("PDF_QR_CACHE_SIZE", "4096"))
+PDF_QR_MASK_PATTERN = (
+    int(os.getenv("PDF_QR_MASK_PATTERN")) if os.getenv("PDF_QR_MASK_PATTERN") else None
+)
+
+# Cache de facturas renderizadas (shared.utils.pdf.render_cache): LRU en
+# memoria por proceso y en disco compartido, ambos acotados en MB
+PDF_RENDER_CACHE_ENABLED = (
+    os.getenv("PDF_RENDER_CACHE_ENABLED", "true").lower() == "true"
+)
+PDF_RENDER_CACHE_MEMORY_MB = int(os.getenv("PDF_RENDER_CACHE_MEMORY_MB", "64"))
+PDF_RENDER_CACHE_DISK_MB = int(os.getenv("PDF_RENDER_CACHE_DISK_MB", "1024"))
+PDF_RENDER_CACHE_DIR = os.path.join(BASE_DIR, "file_store", "render_cache")
+
 # Opcional: Configuración de rutas base
 PDF_BASE_TEMPLATE = "shared/utils/pdf/templates/base_pdf.html"
 
 # Configuración de almacenamiento de documentos
 DOCUMENT_STORAGE = {
     "BASE_DIR": os.path.join(BASE_DIR, "file_store"),
+    # Índice SQLite del almacén de documentos (shared.utils.document_store)
+    "INDEX_PATH": os.path.join(BASE_DIR, "file_store", "document_index.sqlite3"),
     "STRUCTURE": {
         "invoices": "billing/invoices/{year}/{month}/",
         "receipts": "billing/receipts/{year}/{month}/",
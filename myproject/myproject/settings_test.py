@@ -25,3 +25,11 @@ PASSWORD_HASHERS = [
 
 # ---------- EMAIL ----------
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+# ---------- API CALL LOG ----------
+# Escribir cada ApiCallLog en el momento (los tests cuentan filas al instante)
+API_CALL_LOG_BUFFERED = False
+
+# ---------- REGISTRO DE SERVICIOS ----------
+# Sin cache de ApiService/ApiEndpoint: cada test ve su propia BD (rollback)
+API_SERVICE_REGISTRY_TTL = 0
@@ -0,0 +1,485 @@
+# shared/utils/document_store.py
+"""
+Almacén de documentos direccionado por contenido con índice SQLite.
+
+- Los PDFs se guardan una sola vez por contenido en
+  `<BASE_DIR>/blobs/ab/cd/<sha256>.pdf`. El hash se calcula mientras se
+  escribe (una pasada, sin releer el archivo) y un re-render idéntico no
+  ocupa espacio extra.
+- Los metadatos van a una tabla `documents` en un SQLite embebido
+  (`DOCUMENT_STORAGE["INDEX_PATH"]`), con índices por serie/número, documento
+  del cliente, fecha de emisión y fecha de creación. Reemplaza los
+  `_metadata.json` sueltos y el recorrido de `{year}/{month}/`. La fecha de
+  emisión se guarda como YYYY-MM-DD (llega también como DD-MM-YYYY o
+  DD/MM/YYYY) para que los rangos se puedan comparar como texto.
+- `purge(document_type, cutoff)` borra del índice los documentos creados
+  antes de `cutoff` y elimina los blobs que ya nadie referencia.
+
+Una conexión SQLite por hilo, en modo WAL: varios procesos (workers Celery,
+web) pueden leer mientras otro escribe. Las escrituras toman el lock de
+escritura de SQLite desde el inicio (BEGIN IMMEDIATE) y los blobs se borran
+dentro de esa misma transacción, así que un blob no desaparece entre que se
+comprueba que nadie lo referencia y que se registra un documento que lo usa:
+`put` coloca el blob y registra el documento bajo ese lock, y `record`
+verifica bajo el lock que el blob sigue en disco.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    document_type TEXT NOT NULL,
+    serie TEXT NOT NULL,
+    numero TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    client_document_type TEXT,
+    client_document TEXT,
+    client_name TEXT,
+    issue_date TEXT,
+    total TEXT,
+    currency TEXT,
+    unique_code TEXT,
+    template TEXT,
+    sha256 TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    mime_type TEXT NOT NULL DEFAULT 'application/pdf',
+    created_at TEXT NOT NULL,
+    UNIQUE (document_type, serie, numero)
+);
+CREATE INDEX IF NOT EXISTS documents_client_idx
+    ON documents (client_document, issue_date);
+CREATE INDEX IF NOT EXISTS documents_issue_date_idx
+    ON documents (document_type, issue_date);
+CREATE INDEX IF NOT EXISTS documents_created_at_idx
+    ON documents (document_type, created_at);
+CREATE INDEX IF NOT EXISTS documents_sha256_idx ON documents (sha256);
+"""
+
+# Columnas que se pueden asignar desde `record`
+RECORD_FIELDS = (
+    "filename",
+    "client_document_type",
+    "client_document",
+    "client_name",
+    "issue_date",
+    "total",
+    "currency",
+    "unique_code",
+    "template",
+    "mime_type",
+)
+
+CHUNK_SIZE = 64 * 1024
+
+# Formatos de fecha de emisión que llegan en invoice_data (Nubefact usa
+# DD-MM-YYYY); en el índice se guardan como YYYY-MM-DD para comparar rangos
+ISSUE_DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y")
+
+# Parámetros por consulta IN (SQLite antiguo admite 999 por sentencia)
+QUERY_BATCH_SIZE = 900
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _iso_date(value):
+    """Fecha en YYYY-MM-DD; si no se reconoce el formato se deja como llegó"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    for fmt in ISSUE_DATE_FORMATS:
+        try:
+            return datetime.strptime(text[:10], fmt).date().isoformat()
+        except ValueError:
+            continue
+    logger.warning("Fecha de emisión no reconocida en el índice: %r", value)
+    return text
+
+
+class DocumentStore:
+    """
+    Uso:
+        store = DocumentStore()
+        store.put("invoices", "F001", 123, pdf_bytes, filename="F001-123.pdf")
+        store.find("invoices", "F001", 123)
+    """
+
+    def __init__(self, base_dir=None, index_path=None):
+        storage = settings.DOCUMENT_STORAGE
+        self.base_dir = base_dir or storage["BASE_DIR"]
+        self.blobs_dir = os.path.join(self.base_dir, "blobs")
+        self.index_path = index_path or storage.get(
+            "INDEX_PATH", os.path.join(self.base_dir, "document_index.sqlite3")
+        )
+        self._local = threading.local()
+        self._known_dirs = set()
+
+    # ===== ÍNDICE =====
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Transacción con el lock de escritura tomado desde el inicio"""
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            yield self.db
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ===== BLOBS =====
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blobs_dir, sha256[:2], sha256[2:4], f"{sha256}.pdf")
+
+    def _ensure_dir(self, path):
+        if path not in self._known_dirs:
+            os.makedirs(path, exist_ok=True)
+            self._known_dirs.add(path)
+
+    def _write_tmp(self, content):
+        """
+        Escribe `content` (bytes o iterable de bytes) en un temporal y
+        devuelve (sha256, tamaño, ruta temporal).
+        """
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            content = (content,)
+
+        tmp_dir = os.path.join(self.blobs_dir, "tmp")
+        self._ensure_dir(tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in content:
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+        return digest.hexdigest(), size, tmp_path
+
+    def _install_blob(self, sha256, tmp_path):
+        """Mueve el temporal a su ruta final, o lo descarta si el blob ya existe"""
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+        else:
+            self._ensure_dir(os.path.dirname(path))
+            os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _discard(tmp_path):
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    def put_blob(self, content):
+        """
+        Guarda `content` (bytes o iterable de bytes) y devuelve
+        (sha256, tamaño, ruta). Si el blob ya existe no se reescribe.
+
+        Un `purge` concurrente puede borrar el blob antes de registrarlo; para
+        guardar y registrar un documento usar `put`.
+        """
+        sha256, size, tmp_path = self._write_tmp(content)
+        try:
+            path = self._install_blob(sha256, tmp_path)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+        return sha256, size, path
+
+    def open_blob(self, sha256):
+        return open(self.blob_path(sha256), "rb")
+
+    def iter_blob(self, sha256, chunk_size=CHUNK_SIZE):
+        with self.open_blob(sha256) as blob:
+            for chunk in iter(lambda: blob.read(chunk_size), b""):
+                yield chunk
+
+    def _release_blobs(self, hashes):
+        """
+        Borra del disco los blobs de `hashes` que ya no están en el índice.
+        Se llama dentro de `_write()`: con el lock tomado nadie puede
+        registrar un documento que use el blob mientras se borra.
+        """
+        removed = 0
+        for sha256 in set(hashes):
+            in_use = self.db.execute(
+                "SELECT 1 FROM documents WHERE sha256 = ? LIMIT 1", (sha256,)
+            ).fetchone()
+            if in_use:
+                continue
+            try:
+                os.unlink(self.blob_path(sha256))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    # ===== REGISTRO =====
+
+    def put(self, document_type, serie, numero, content, **fields):
+        """
+        Guarda `content` y registra (document_type, serie, numero) en una
+        sola transacción de escritura. Si un `purge` borró el blob mientras
+        se escribía el temporal, se vuelve a crear.
+        """
+        self._check_fields(fields)
+        sha256, size, tmp_path = self._write_tmp(content)
+        try:
+            with self._write():
+                self._install_blob(sha256, tmp_path)
+                self._upsert(document_type, serie, numero, sha256, size, fields)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+        return self.find(document_type, serie, numero)
+
+    def record(self, document_type, serie, numero, sha256, size_bytes, **fields):
+        """
+        Inserta o reemplaza la entrada (document_type, serie, numero) para un
+        blob ya guardado con `put_blob`. Si el documento ya apuntaba a otro
+        blob sin más referencias, se borra.
+        """
+        self._check_fields(fields)
+        with self._write():
+            # Con el lock tomado ningún purge puede borrarlo hasta el commit
+            if not os.path.exists(self.blob_path(sha256)):
+                raise FileNotFoundError(
+                    f"El blob {sha256} ya no existe (purgado tras put_blob)"
+                )
+            self._upsert(document_type, serie, numero, sha256, size_bytes, fields)
+        return self.find(document_type, serie, numero)
+
+    @staticmethod
+    def _check_fields(fields):
+        unknown = set(fields) - set(RECORD_FIELDS)
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+
+    def _upsert(self, document_type, serie, numero, sha256, size_bytes, fields):
+        """INSERT ... ON CONFLICT dentro de `_write()`; libera el blob anterior"""
+        values = {name: _text(fields.get(name)) for name in RECORD_FIELDS}
+        values["issue_date"] = _iso_date(fields.get("issue_date"))
+        values["filename"] = values["filename"] or f"{serie}-{numero}.pdf"
+        values["mime_type"] = values["mime_type"] or "application/pdf"
+        row = {
+            "document_type": document_type,
+            "serie": str(serie),
+            "numero": str(numero),
+            "sha256": sha256,
+            "size_bytes": size_bytes,
+            "created_at": datetime.now().isoformat(),
+            **values,
+        }
+
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{name}" for name in row)
+        updates = ", ".join(
+            f"{name} = excluded.{name}"
+            for name in row
+            if name not in ("document_type", "serie", "numero", "created_at")
+        )
+        previous = self.db.execute(
+            "SELECT sha256 FROM documents "
+            "WHERE document_type = ? AND serie = ? AND numero = ?",
+            (document_type, row["serie"], row["numero"]),
+        ).fetchone()
+        self.db.execute(
+            f"INSERT INTO documents ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (document_type, serie, numero) DO UPDATE SET {updates}",
+            row,
+        )
+        if previous and previous["sha256"] != sha256:
+            self._release_blobs([previous["sha256"]])
+
+    # ===== CONSULTAS =====
+
+    def _rows(self, sql, params):
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def find(self, document_type, serie, numero) -> Optional[dict]:
+        row = self.db.execute(
+            "SELECT * FROM documents "
+            "WHERE document_type = ? AND serie = ? AND numero = ?",
+            (document_type, str(serie), str(numero)),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_many(self, document_type, keys):
+        """
+        {(serie, numero): documento} para los pares (serie, numero) de `keys`
+        que estén indexados. Una consulta por serie (y por cada
+        `QUERY_BATCH_SIZE` números), en lugar de una por documento.
+        """
+        numeros_por_serie = {}
+        for serie, numero in keys:
+            numeros_por_serie.setdefault(str(serie), set()).add(str(numero))
+
+        found = {}
+        for serie, numeros in numeros_por_serie.items():
+            numeros = sorted(numeros)
+            for start in range(0, len(numeros), QUERY_BATCH_SIZE):
+                batch = numeros[start : start + QUERY_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self.db.execute(
+                    "SELECT * FROM documents WHERE document_type = ? AND serie = ? "
+                    f"AND numero IN ({placeholders})",
+                    (document_type, serie, *batch),
+                )
+                for row in rows:
+                    found[(row["serie"], row["numero"])] = dict(row)
+        return found
+
+    def by_client(self, client_document, date_from=None, date_to=None):
+        """Documentos de un cliente, opcionalmente por rango de emisión"""
+        sql = "SELECT * FROM documents WHERE client_document = ?"
+        params = [str(client_document)]
+        sql, params = self._date_range(sql, params, date_from, date_to)
+        return self._rows(sql + " ORDER BY issue_date, serie, numero", params)
+
+    def by_issue_date(self, document_type, date_from=None, date_to=None):
+        """Documentos de un tipo emitidos entre `date_from` y `date_to`"""
+        sql = "SELECT * FROM documents WHERE document_type = ?"
+        params = [document_type]
+        sql, params = self._date_range(sql, params, date_from, date_to)
+        return self._rows(sql + " ORDER BY issue_date, serie, numero", params)
+
+    @staticmethod
+    def _date_range(sql, params, date_from, date_to):
+        if date_from:
+            sql += " AND issue_date >= ?"
+            params.append(_iso_date(date_from))
+        if date_to:
+            sql += " AND issue_date <= ?"
+            params.append(_iso_date(date_to))
+        return sql, params
+
+    # ===== RETENCIÓN =====
+
+    def purge(self, document_type, cutoff):
+        """
+        Quita del índice los documentos de `document_type` creados antes de
+        `cutoff` y borra sus blobs si no los usa otro documento.
+        Devuelve (documentos, blobs) eliminados.
+        """
+        cutoff = _text(cutoff)
+        with self._write():
+            hashes = [
+                row["sha256"]
+                for row in self.db.execute(
+                    "SELECT sha256 FROM documents "
+                    "WHERE document_type = ? AND created_at < ?",
+                    (document_type, cutoff),
+                )
+            ]
+            self.db.execute(
+                "DELETE FROM documents WHERE document_type = ? AND created_at < ?",
+                (document_type, cutoff),
+            )
+            blobs = self._release_blobs(hashes)
+        logger.info(
+            "Retención %s: %s documentos y %s blobs eliminados (antes de %s)",
+            document_type,
+            len(hashes),
+            blobs,
+            cutoff,
+        )
+        return len(hashes), blobs
+
+    def normalize_issue_dates(self):
+        """
+        Pasa a YYYY-MM-DD las fechas de emisión guardadas en otro formato
+        (entradas indexadas antes de normalizarlas). Devuelve cuántas cambió.
+        """
+        with self._write():
+            rows = self.db.execute(
+                "SELECT id, issue_date FROM documents WHERE issue_date NOT GLOB "
+                "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+            ).fetchall()
+            updates = [
+                (iso, row["id"])
+                for row in rows
+                if (iso := _iso_date(row["issue_date"])) != row["issue_date"]
+            ]
+            self.db.executemany(
+                "UPDATE documents SET issue_date = ? WHERE id = ?", updates
+            )
+        return len(updates)
+
+    # ===== IMPORTACIÓN =====
+
+    def import_legacy_metadata(self, metadata_path):
+        """
+        Indexa un PDF guardado con el esquema anterior a partir de su
+        `_metadata.json`. Devuelve la entrada o None si falta el PDF.
+        """
+        with open(metadata_path, encoding="utf-8") as meta_file:
+            metadata = json.load(meta_file)
+
+        document = metadata.get("document_info", {})
+        client = metadata.get("client_info", {})
+        file_info = metadata.get("file_info", {})
+        pdf_path = file_info.get("path")
+        if not pdf_path or not os.path.exists(pdf_path):
+            return None
+
+        with open(pdf_path, "rb") as pdf_file:
+            return self.put(
+                document.get("type") or "invoices",
+                document.get("serie"),
+                document.get("numero"),
+                iter(lambda: pdf_file.read(CHUNK_SIZE), b""),
+                filename=file_info.get("filename"),
+                client_document_type=client.get("document_type"),
+                client_document=client.get("document_number"),
+                client_name=client.get("name"),
+                issue_date=document.get("issue_date"),
+                total=document.get("total"),
+                currency=document.get("currency"),
+                unique_code=document.get("unique_code"),
+                template=metadata.get("system_info", {}).get("template_used"),
+            )
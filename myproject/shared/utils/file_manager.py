@@ -2,18 +2,23 @@
 import os
 from datetime import datetime, timedelta
 from django.conf import settings
-import json
-import hashlib
-from pathlib import Path
+
+from .document_store import DocumentStore
 
 
 class DocumentFileManager:
-    """Gestor de archivos para documentos"""
+    """
+    Gestor de archivos para documentos.
+
+    Los PDFs se guardan en el DocumentStore (blobs por hash + índice SQLite);
+    las consultas y la limpieza por retención usan el índice.
+    """
 
-    def __init__(self, document_type="invoices"):
+    def __init__(self, document_type="invoices", store=None):
         self.document_type = document_type
         self.base_dir = settings.DOCUMENT_STORAGE["BASE_DIR"]
         self.structure = settings.DOCUMENT_STORAGE["STRUCTURE"]
+        self.store = store or DocumentStore(base_dir=self.base_dir)
 
     def get_storage_path(self, filename=None, subfolder="", create_if_not_exists=True):
         """Obtiene la ruta de almacenamiento para un documento"""
@@ -48,27 +53,38 @@ class DocumentFileManager:
         return full_path
 
     def save_pdf(self, pdf_content, invoice_data, filename=None):
-        """Guarda un PDF y sus metadatos"""
+        """
+        Guarda un PDF (bytes o iterable de bytes) y lo registra en el índice.
+        El hash se calcula al escribir; un PDF idéntico ya guardado se reutiliza.
+        """
         try:
             # Generar nombre de archivo si no se proporciona
+            serie = invoice_data.get("serie", "F001")
+            numero = invoice_data.get("numero", "000000")
             if not filename:
-                serie = invoice_data.get("serie", "F001")
-                numero = invoice_data.get("numero", "000000")
                 filename = f"{serie}-{numero}.pdf"
 
-            # Obtener ruta de almacenamiento
-            pdf_path = self.get_storage_path(filename)
-
-            # Guardar PDF
-            with open(pdf_path, "wb") as pdf_file:
-                pdf_file.write(pdf_content)
-
-            # Guardar metadatos
-            metadata = self._generate_metadata(invoice_data, pdf_path)
-            self.save_metadata(metadata, filename)
+            document = self.store.put(
+                self.document_type,
+                serie,
+                numero,
+                pdf_content,
+                filename=filename,
+                client_document_type=invoice_data.get("cliente_tipo_de_documento"),
+                client_document=invoice_data.get("cliente_numero_de_documento"),
+                client_name=invoice_data.get("cliente_denominacion"),
+                issue_date=invoice_data.get("fecha_de_emision"),
+                total=invoice_data.get("total"),
+                currency=invoice_data.get("moneda"),
+                unique_code=invoice_data.get("codigo_unico", ""),
+                template=invoice_data.get("template", "default"),
+            )
 
-            # Guardar registro en base de datos si es necesario
-            self._save_to_database(invoice_data, pdf_path)
+            sha256, size = document["sha256"], document["size_bytes"]
+            pdf_path = self.store.blob_path(sha256)
+            metadata = self._generate_metadata(
+                invoice_data, pdf_path, filename, sha256, size
+            )
 
             return {
                 "success": True,
@@ -80,21 +96,28 @@ class DocumentFileManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def save_metadata(self, metadata, filename):
-        """Guarda metadatos en JSON"""
-        metadata_filename = f"{os.path.splitext(filename)[0]}_metadata.json"
-        metadata_path = self.get_storage_path(metadata_filename, subfolder="metadata")
+    def find_document(self, serie, numero):
+        """Entrada del índice de un documento, o None"""
+        return self.store.find(self.document_type, serie, numero)
 
-        with open(metadata_path, "w", encoding="utf-8") as meta_file:
-            json.dump(metadata, meta_file, indent=2, ensure_ascii=False)
+    def find_by_client(self, client_document, date_from=None, date_to=None):
+        """Documentos de un cliente (RUC/DNI), opcionalmente por fecha de emisión"""
+        return self.store.by_client(client_document, date_from, date_to)
 
-        return metadata_path
+    def find_by_date_range(self, date_from=None, date_to=None):
+        """Documentos de este tipo emitidos en el rango"""
+        return self.store.by_issue_date(self.document_type, date_from, date_to)
 
-    def _generate_metadata(self, invoice_data, pdf_path):
-        """Genera metadatos del documento"""
-        # Calcular hash del archivo
-        file_hash = self._calculate_file_hash(pdf_path)
+    def read_pdf(self, serie, numero):
+        """Contenido del PDF de un documento, o None si no está indexado"""
+        document = self.find_document(serie, numero)
+        if document is None:
+            return None
+        with self.store.open_blob(document["sha256"]) as pdf_file:
+            return pdf_file.read()
 
+    def _generate_metadata(self, invoice_data, pdf_path, filename, file_hash, size):
+        """Genera metadatos del documento"""
         metadata = {
             "document_info": {
                 "type": self.document_type,
@@ -111,9 +134,9 @@ class DocumentFileManager:
                 "name": invoice_data.get("cliente_denominacion"),
             },
             "file_info": {
-                "filename": os.path.basename(pdf_path),
+                "filename": filename,
                 "path": pdf_path,
-                "size_bytes": os.path.getsize(pdf_path),
+                "size_bytes": size,
                 "created_at": datetime.now().isoformat(),
                 "file_hash": file_hash,
                 "mime_type": "application/pdf",
@@ -127,35 +150,6 @@ class DocumentFileManager:
 
         return metadata
 
-    def _calculate_file_hash(self, file_path):
-        """Calcula hash SHA-256 del archivo"""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-
-    def _save_to_database(self, invoice_data, pdf_path):
-        """Guarda referencia en base de datos (si tienes modelos)"""
-        # Esto es opcional - depende si tienes modelos para documentos
-        try:
-            from .models import (
-                InvoiceDocument,
-            )  # Importar aquí para evitar circular imports
-
-            InvoiceDocument.objects.create(
-                serie=invoice_data.get("serie"),
-                numero=invoice_data.get("numero"),
-                file_path=pdf_path,
-                client_document=invoice_data.get("cliente_numero_de_documento"),
-                total_amount=invoice_data.get("total"),
-                issue_date=invoice_data.get("fecha_de_emision"),
-                storage_type=self.document_type,
-            )
-        except ImportError:
-            # No hay modelos definidos aún
-            pass
-
     def get_document_url(self, file_path):
         """Genera URL para acceder al documento (si sirves archivos estáticos)"""
         # Convertir path absoluto a relativo para URL
@@ -163,12 +157,20 @@ class DocumentFileManager:
         return f"{settings.MEDIA_URL}{relative_path}"
 
     def cleanup_old_files(self, document_type=None):
-        """Limpia archivos antiguos según política de retención"""
+        """
+        Limpia archivos antiguos según política de retención.
+        Usa el índice (fecha de creación); no recorre directorios.
+        (Cuidado: Esto borra archivos permanentemente)
+        """
         doc_type = document_type or self.document_type
         retention_days = settings.DOCUMENT_STORAGE["RETENTION_DAYS"].get(doc_type, 365)
 
         cutoff_date = datetime.now() - timedelta(days=retention_days)
 
-        # Implementar lógica para borrar archivos antiguos
-        # (Cuidado: Esto borra archivos permanentemente)
-        pass
+        documents, blobs = self.store.purge(doc_type, cutoff_date)
+        return {
+            "document_type": doc_type,
+            "cutoff_date": cutoff_date.isoformat(),
+            "documents_removed": documents,
+            "files_removed": blobs,
+        }
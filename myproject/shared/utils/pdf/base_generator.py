@@ -1,18 +1,34 @@
 # apps/shared/utils/pdf/base_generator.py
 from abc import ABC, abstractmethod
-from django.template.loader import render_to_string
 from io import BytesIO
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+from .engine import get_pdf_engine
+
+# Un solo executor para todas las llamadas a generate_async
+_executor = ThreadPoolExecutor(thread_name_prefix="pdf-generator")
+
 
 class BasePDFGenerator(ABC):
-    """Clase base abstracta para todos los generadores de PDF"""
+    """
+    Clase base abstracta para todos los generadores de PDF.
+
+    Los templates, el CSS de `css_files` y las fuentes salen del motor
+    compartido por el proceso (ver engine.PDFEngine).
+    """
+
+    # Rutas de las hojas de estilo que usa write_pdf
+    css_files = ()
 
     def __init__(self, template_name, context=None):
         self.template_name = template_name
         self.context = context or {}
 
+    @property
+    def engine(self):
+        return get_pdf_engine()
+
     @abstractmethod
     def get_template_context(self):
         """Método abstracto para obtener contexto específico"""
@@ -21,7 +37,11 @@ class BasePDFGenerator(ABC):
     def render_html(self):
         """Renderiza el template HTML con el contexto"""
         context = {**self.context, **self.get_template_context()}
-        return render_to_string(self.template_name, context)
+        return self.engine.render_template(self.template_name, context)
+
+    def write_pdf(self, html_content):
+        """PDF con el motor compartido y las hojas de estilo de `css_files`"""
+        return self.engine.write_pdf(html_content, self.css_files)
 
     @abstractmethod
     def generate_pdf(self, html_content):
@@ -36,10 +56,5 @@ class BasePDFGenerator(ABC):
     async def generate_async(self):
         """Genera PDF de manera asíncrona con weasyprint en un hilo separado"""
         html = self.render_html()
-        loop = asyncio.get_event_loop()
-
-        with ThreadPoolExecutor() as pool:
-            pdf_bytes = await loop.run_in_executor(
-                pool, lambda: self.generate_pdf(html)
-            )
-        return pdf_bytes
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, self.generate_pdf, html)
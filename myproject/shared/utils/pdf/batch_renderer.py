@@ -0,0 +1,303 @@
+# shared/utils/pdf/batch_renderer.py
+"""
+Renderizado de PDFs en lote con un pool de procesos persistente.
+
+WeasyPrint es CPU y retiene el GIL casi todo el tiempo: varios hilos no
+renderizan en paralelo. Aquí se mantiene un `ProcessPoolExecutor` de vida
+larga; cada worker configura Django y calienta su motor PDF (templates,
+`factura.css` y `FontConfiguration`, ver engine.py) una sola vez al arrancar
+y lo reutiliza en todas las facturas que renderiza.
+
+- `render_many(invoice_datas)` recibe cualquier iterable (lista, generador
+  sobre un queryset...) y devuelve los PDFs a medida que terminan. Nunca hay
+  más de `max_pending` facturas en vuelo: si el consumidor se detiene, no se
+  leen ni se envían más datos (backpressure para los cierres de mes).
+  Los QR de cada tramo leído se generan en el proceso principal con una
+  sola llamada a `QRCodeRenderer.render_many` (cadenas repetidas una vez,
+  LRU compartido entre corridas) y viajan al worker ya listos.
+- `submit_html(html)` convierte un HTML ya renderizado; lo usa
+  `InvoicePDFGenerator.generate_async`.
+
+Configuración: `PDF_RENDER_WORKERS` (0 = un worker por CPU),
+`PDF_RENDER_MAX_PENDING` (0 = 2 por worker) y `PDF_RENDER_START_METHOD`.
+
+Uso:
+    renderer = get_batch_renderer()
+    for result in renderer.render_many(invoice_datas):
+        if result.ok:
+            file_manager.save_pdf(result.pdf, result.invoice_data)
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Optional
+
+from django.conf import settings
+
+from .qr import get_qr_renderer
+from .render_cache import get_render_cache, render_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class RenderResult(
+    namedtuple("RenderResult", "index invoice_data pdf error cached", defaults=(False,))
+):
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# ===== LADO DEL WORKER =====
+
+
+def _init_worker(settings_module):
+    """Inicializador del worker: Django y motor PDF (templates, CSS, fuentes)"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+    from .engine import get_pdf_engine
+
+    get_pdf_engine().warm_up()
+
+
+def _write_pdf(html):
+    from .invoice_generator import write_invoice_pdf
+
+    return write_invoice_pdf(html)
+
+
+def _render_invoice(invoice_data, template_name, qr_image_base64=None):
+    """
+    Contexto + template + WeasyPrint dentro del worker. El QR llega ya
+    generado; sin él (factura sin cadena QR) lo genera el worker.
+    """
+    from .invoice_generator import InvoicePDFGenerator
+
+    # El cache lo consulta y actualiza el proceso principal
+    generator = InvoicePDFGenerator(
+        invoice_data, template_name, use_cache=False, qr_image_base64=qr_image_base64
+    )
+    return _write_pdf(generator.render_html())
+
+
+def _qr_images(invoice_datas):
+    """
+    QR de un tramo de facturas en una sola llamada: {cadena: base64}. Si
+    falla, cada worker genera el suyo y el error queda en esa factura.
+    """
+    if not invoice_datas:
+        return {}
+    try:
+        return get_qr_renderer().render_many(
+            [
+                invoice_data.get("cadena_para_codigo_qr")
+                for invoice_data in invoice_datas
+            ]
+        )
+    except Exception as e:
+        logger.warning("No se pudieron generar los QR del tramo: %s", e)
+        return {}
+
+
+def _ping():
+    return os.getpid()
+
+
+# ===== LADO DEL PROCESO PRINCIPAL =====
+
+
+class BatchPDFRenderer:
+    """Pool de procesos WeasyPrint con CSS y fuentes precargados"""
+
+    def __init__(self, workers=None, max_pending=None, start_method=None):
+        workers = (
+            getattr(settings, "PDF_RENDER_WORKERS", 0) if workers is None else workers
+        )
+        self.workers = workers or os.cpu_count() or 1
+        max_pending = (
+            getattr(settings, "PDF_RENDER_MAX_PENDING", 0)
+            if max_pending is None
+            else max_pending
+        )
+        self.max_pending = max_pending or self.workers * 2
+        self.start_method = start_method or getattr(
+            settings, "PDF_RENDER_START_METHOD", "spawn"
+        )
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=_init_worker,
+                        initargs=(
+                            os.environ.get(
+                                "DJANGO_SETTINGS_MODULE", "myproject.settings"
+                            ),
+                        ),
+                    )
+                    logger.info(
+                        "Pool de PDFs iniciado: %s workers (%s)",
+                        self.workers,
+                        self.start_method,
+                    )
+        return self._executor
+
+    def warm_up(self):
+        """Arranca todos los workers (Django + CSS) antes del primer lote"""
+        futures = [self.executor.submit(_ping) for _ in range(self.workers)]
+        return sorted({future.result() for future in futures})
+
+    def submit_html(self, html):
+        """Future con los bytes del PDF de un HTML ya renderizado"""
+        return self.executor.submit(_write_pdf, html)
+
+    def render_many(
+        self, invoice_datas, template_name=None, max_pending=None, use_cache=True
+    ):
+        """
+        Genera un `RenderResult` por factura, en orden de finalización.
+        `index` es la posición de la factura en `invoice_datas`.
+        Un error en una factura se devuelve en `error` y no corta el lote.
+        Las facturas ya presentes en el cache de renderizado no van al pool;
+        las demás se leen en tramos de hasta `max_pending` y sus QR se
+        generan juntos antes de enviarlas.
+        """
+        if template_name is None:
+            template_name = settings.PDF_TEMPLATES.get(
+                "invoice", "billing/factura_electronica.html"
+            )
+        max_pending = max_pending or self.max_pending
+        cache = get_render_cache() if use_cache else None
+        source = enumerate(invoice_datas)
+        pending = {}
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    free = max_pending - len(pending)
+                    chunk = list(islice(source, free))
+                    exhausted = len(chunk) < free
+
+                    hits, misses = self._split_cached(chunk, cache, template_name)
+                    # QR de todo el tramo en una sola llamada
+                    qr_images = _qr_images([data for _, data, _ in misses])
+                    for index, invoice_data, key in misses:
+                        future = self.executor.submit(
+                            _render_invoice,
+                            invoice_data,
+                            template_name,
+                            qr_images.get(invoice_data.get("cadena_para_codigo_qr")),
+                        )
+                        pending[future] = (index, invoice_data, key)
+
+                    yield from hits
+
+                if not pending:
+                    return
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, invoice_data, key = pending.pop(future)
+                    result = self._result(future, index, invoice_data)
+                    if key is not None and result.ok:
+                        cache.set(key, "pdf", result.pdf)
+                    yield result
+        finally:
+            # El consumidor abandonó el generador: no renderizar lo pendiente
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _split_cached(chunk, cache, template_name):
+        """
+        Separa un tramo en resultados del cache de renderizado y facturas
+        por renderizar: (index, invoice_data, clave del cache)
+        """
+        hits = []
+        misses = []
+        for index, invoice_data in chunk:
+            key = None
+            if cache is not None:
+                key = render_cache_key(invoice_data, template_name)
+                pdf_bytes = cache.get(key, "pdf")
+                if pdf_bytes is not None:
+                    hits.append(
+                        RenderResult(index, invoice_data, pdf_bytes, None, cached=True)
+                    )
+                    continue
+            misses.append((index, invoice_data, key))
+        return hits, misses
+
+    def _result(self, future, index, invoice_data):
+        try:
+            return RenderResult(index, invoice_data, future.result(), None)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self.shutdown(wait=False)
+                raise
+            logger.error(
+                "Error renderizando %s-%s: %s",
+                invoice_data.get("serie"),
+                invoice_data.get("numero"),
+                e,
+            )
+            return RenderResult(index, invoice_data, None, str(e))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_renderer: Optional[BatchPDFRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_batch_renderer() -> BatchPDFRenderer:
+    """Renderer compartido por el proceso"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = BatchPDFRenderer()
+                atexit.register(close_batch_renderer)
+    return _renderer
+
+
+def close_batch_renderer(**kwargs) -> None:
+    """Detiene los workers. Conectado a atexit y al shutdown de Celery."""
+    if _renderer is not None:
+        _renderer.shutdown()
+
+
+try:
+    from celery.signals import worker_process_shutdown, worker_shutdown
+
+    worker_process_shutdown.connect(close_batch_renderer, weak=False)
+    worker_shutdown.connect(close_batch_renderer, weak=False)
+except ImportError:  # pragma: no cover - Celery es opcional para este módulo
+    pass
@@ -0,0 +1,252 @@
+# shared/utils/pdf/engine.py
+"""
+Motor de PDF compartido por el proceso.
+
+Sin él, cada generador resolvía y compilaba su template (sin el loader
+cacheado cuando DEBUG=True), parseaba factura.css con `CSS(filename=...)` y
+dejaba que WeasyPrint descubriera las fuentes en cada documento. Las
+primeras facturas de cada worker Celery pagaban además la inicialización de
+Pango/fontconfig.
+
+`PDFEngine` guarda por proceso:
+- los templates Django compilados (se recompilan si cambia el archivo);
+- las hojas de estilo parseadas (se vuelven a parsear si cambia su mtime);
+- una `FontConfiguration` de WeasyPrint común a todos los documentos.
+
+`warm_up()` carga los templates de `PDF_TEMPLATES`, el CSS y renderiza un
+documento mínimo para inicializar las fuentes. Se llama al arrancar cada
+proceso worker de Celery (`worker_process_init`, ver myproject/celery_app.py)
+y en los workers de batch_renderer.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_CSS = "@page { size: A4; margin: 1.5cm; }"
+
+WARM_UP_HTML = "<html><body><p>Warm-up 0123456789 ÁÉÍÓÚÑ</p></body></html>"
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return 0
+
+
+def _template_dependencies(template):
+    """Nombres de los templates que `template` extiende o incluye (constantes)"""
+    from django.template import Context
+    from django.template.loader_tags import ExtendsNode, IncludeNode
+
+    nodelist = getattr(getattr(template, "template", template), "nodelist", None)
+    if nodelist is None:
+        return []
+    names = []
+    for node in nodelist.get_nodes_by_type((ExtendsNode, IncludeNode)):
+        expression = (
+            node.parent_name if isinstance(node, ExtendsNode) else node.template
+        )
+        name = expression.resolve(Context())
+        # Los nombres que dependen del contexto no se pueden resolver aquí
+        if isinstance(name, str) and name:
+            names.append(name)
+    return names
+
+
+class PDFEngine:
+    """
+    Uso:
+        engine = get_pdf_engine()
+        html = engine.render_template("billing/factura_electronica.html", context)
+        pdf = engine.write_pdf(html, css_files=[invoice_css_path()])
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # nombre -> (template, ruta de origen, mtime, templates extendidos/incluidos)
+        self._templates = {}
+        # ruta -> (CSS, mtime)
+        self._stylesheets = {}
+        self._font_config = None
+        self.warmed_up = False
+
+    # ===== FUENTES =====
+
+    @property
+    def font_config(self):
+        if self._font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            with self._lock:
+                if self._font_config is None:
+                    self._font_config = FontConfiguration()
+        return self._font_config
+
+    # ===== TEMPLATES =====
+
+    def get_template(self, template_name):
+        """Template compilado; se recompila si el archivo cambió"""
+        entry = self._templates.get(template_name)
+        if entry is not None:
+            template, origin, mtime, _ = entry
+            if _mtime(origin) == mtime:
+                return template
+
+        from django.template.loader import get_template
+
+        template = get_template(template_name)
+        origin = getattr(getattr(template, "origin", None), "name", None)
+        self._templates[template_name] = (
+            template,
+            origin,
+            _mtime(origin),
+            _template_dependencies(template),
+        )
+        return template
+
+    def template_mtime(self, template_name):
+        """mtime del archivo del template (0 si no se puede resolver)"""
+        try:
+            self.get_template(template_name)
+        except Exception:
+            return 0
+        return self._templates[template_name][2]
+
+    def template_mtimes(self, template_name):
+        """
+        {nombre: mtime} del template y de todos los que extiende o incluye,
+        directa o indirectamente (0 para los que no se pueden resolver)
+        """
+        mtimes = {}
+        pending = [template_name]
+        while pending:
+            name = pending.pop()
+            if name in mtimes:
+                continue
+            mtimes[name] = self.template_mtime(name)
+            if mtimes[name]:
+                pending.extend(self._templates[name][3])
+        return mtimes
+
+    def render_template(self, template_name, context):
+        return self.get_template(template_name).render(context)
+
+    # ===== CSS =====
+
+    def stylesheet(self, path):
+        """CSS parseado de `path`, o None si el archivo no existe"""
+        mtime = _mtime(path)
+        if not mtime:
+            return None
+
+        entry = self._stylesheets.get(path)
+        if entry is not None and entry[1] == mtime:
+            return entry[0]
+
+        from weasyprint import CSS
+
+        css = CSS(filename=path, font_config=self.font_config)
+        self._stylesheets[path] = (css, mtime)
+        logger.debug("CSS cargado desde: %s", path)
+        return css
+
+    def stylesheets(self, css_files, fallback_css=DEFAULT_PAGE_CSS):
+        """Hojas de estilo de `css_files`; `fallback_css` si no existe ninguna"""
+        sheets = [css for css in map(self.stylesheet, css_files) if css is not None]
+        if not sheets and fallback_css:
+            entry = self._stylesheets.get(fallback_css)
+            if entry is None:
+                from weasyprint import CSS
+
+                logger.warning("CSS no encontrado (%s); usando CSS mínimo", css_files)
+                entry = (CSS(string=fallback_css, font_config=self.font_config), 0)
+                self._stylesheets[fallback_css] = entry
+            sheets = [entry[0]]
+        return sheets
+
+    # ===== PDF =====
+
+    def write_pdf(self, html, css_files=(), stylesheets=None):
+        """Convierte HTML a PDF con las hojas de estilo y fuentes compartidas"""
+        from weasyprint import HTML
+
+        if stylesheets is None:
+            stylesheets = self.stylesheets(css_files)
+        return HTML(string=html).write_pdf(
+            stylesheets=stylesheets, font_config=self.font_config
+        )
+
+    def warm_up(self, template_names=None, css_files=None):
+        """
+        Precarga templates, CSS y fuentes. Devuelve los segundos empleados.
+        Los errores se registran pero no interrumpen el arranque del worker.
+        """
+        from .invoice_generator import invoice_css_path
+
+        started = time.perf_counter()
+        if template_names is None:
+            template_names = [
+                name for name in getattr(settings, "PDF_TEMPLATES", {}).values() if name
+            ]
+        if css_files is None:
+            css_files = [invoice_css_path()]
+
+        for template_name in template_names:
+            try:
+                self.get_template(template_name)
+            except Exception as e:
+                # Hay templates configurados que aún no existen
+                logger.debug("Template %s no disponible: %s", template_name, e)
+
+        try:
+            self.write_pdf(WARM_UP_HTML, css_files)
+        except Exception as e:
+            logger.error("Error en warm-up del motor PDF: %s", e)
+            return time.perf_counter() - started
+
+        self.warmed_up = True
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Motor PDF listo en %.2fs (%s templates, %s CSS)",
+            elapsed,
+            len(self._templates),
+            len(self._stylesheets),
+        )
+        return elapsed
+
+    def reset(self):
+        """Descarta templates, CSS y fuentes (siguiente uso en frío)"""
+        with self._lock:
+            self._templates = {}
+            self._stylesheets = {}
+            self._font_config = None
+            self.warmed_up = False
+
+
+_engine: Optional[PDFEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_pdf_engine() -> PDFEngine:
+    """Motor compartido por el proceso"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PDFEngine()
+    return _engine
+
+
+def warm_up_pdf_engine(**kwargs):
+    """Handler de worker_process_init: calienta el motor si está habilitado"""
+    if not getattr(settings, "PDF_ENGINE_WARM_UP", True):
+        return None
+    return get_pdf_engine().warm_up()
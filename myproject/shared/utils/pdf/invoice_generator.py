@@ -14,11 +14,25 @@ import json
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+from .engine import get_pdf_engine
+from .qr import SVG_MIME, get_qr_renderer
+from .render_cache import get_render_cache, render_cache_key
 
-class InvoicePDFGenerator(BasePDFGenerator):
-    """Generador especializado para facturas electrónicas"""
 
-    def __init__(self, invoice_data, template_name=None):
+class InvoicePDFGenerator(BasePDFGenerator):
+    """
+    Generador especializado para facturas electrónicas.
+
+    Con `use_cache` (por defecto) el HTML y el PDF se buscan primero en el
+    cache de renderizado (ver render_cache); solo se renderiza si los datos,
+    el template o el CSS cambiaron. `qr_image_base64` es el QR ya generado
+    (el renderer en lote los genera por tramo); si falta se genera aquí.
+    """
+
+    def __init__(
+        self, invoice_data, template_name=None, use_cache=True, qr_image_base64=None
+    ):
+        self.css_files = (invoice_css_path(),)
         # Si no se proporciona template_name, usar el de settings
         if template_name is None:
             from django.conf import settings
@@ -30,8 +44,28 @@ class InvoicePDFGenerator(BasePDFGenerator):
         super().__init__(template_name, {"invoice_data": invoice_data})
         self.invoice_data = invoice_data
         self.qr_data = None
+        self.qr_image_base64 = qr_image_base64
+        self.cache = get_render_cache() if use_cache else None
+        self._cache_key = None
+
+    def cache_key(self):
+        """Clave del cache de renderizado (se guarda en AccountMove.hash_code)"""
+        if self._cache_key is None:
+            self._cache_key = render_cache_key(self.invoice_data, self.template_name)
+        return self._cache_key
 
     def render_html(self):
+        """HTML de la factura, desde el cache si ya se renderizó"""
+        if self.cache is None:
+            return self._render_html()
+
+        html = self.cache.get_html(self.cache_key())
+        if html is None:
+            html = self._render_html()
+            self.cache.set(self.cache_key(), "html", html)
+        return html
+
+    def _render_html(self):
         """Sobreescribir para asegurar que el contexto tenga company_info"""
         context = {**self.context, **self.get_template_context()}
 
@@ -47,7 +81,7 @@ class InvoicePDFGenerator(BasePDFGenerator):
                 "email": getattr(settings, "COMPANY_EMAIL", ""),
             }
 
-        return render_to_string(self.template_name, context)
+        return self.engine.render_template(self.template_name, context)
 
     def get_template_context(self):
         """Prepara el contexto específico para facturas"""
@@ -94,34 +128,22 @@ class InvoicePDFGenerator(BasePDFGenerator):
             "qr_data": self.qr_data,
             "codigo_hash": codigo_hash,
             "qr_image_base64": qr_image_base64,
+            "qr_image_mime": SVG_MIME,
             "company_info": self._get_company_info(),
         }
 
     def _generate_qr_data(self):
-        """Genera datos para el código QR"""
+        """Genera el código QR (SVG en base64, cacheado por cadena)"""
+        if self.qr_image_base64:
+            return self.qr_image_base64
+
         # Datos para el QR según SUNAT
         cadena_qr = self.invoice_data.get("cadena_para_codigo_qr", "")
 
         if cadena_qr:
-            # Generar QR como imagen
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=6,  # Tamaño de los cuadrados del QR
-                border=2,  # Borde del QR
+            return get_qr_renderer().base64_svg(
+                cadena_qr, qrcode.constants.ERROR_CORRECT_L
             )
-            qr.add_data(cadena_qr)
-            qr.make(fit=True)
-
-            # Crear imagen del QR
-            img = qr.make_image(fill_color="black", back_color="white")
-
-            # Convertir a base64 para incluir en HTML
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            qr_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-            return qr_base64  # Devuelve la imagen en base64
         else:
             # Si no hay cadena, usar placeholder o generar con datos básicos
             return self._generate_qr_fallback()
@@ -150,14 +172,7 @@ class InvoicePDFGenerator(BasePDFGenerator):
             {qr_info['cliente_tipo_de_documento']}|{qr_info['ruc_receptor']}"""
         print(f"[DEBUG] Generando QR con datos: {cadena}")
 
-        qr = qrcode.QRCode(version=1, box_size=6, border=2)
-        qr.add_data(cadena)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+        return get_qr_renderer().base64_svg(cadena, qrcode.constants.ERROR_CORRECT_M)
 
     def _get_moneda_display(self):
         """Convierte código de moneda a texto"""
@@ -176,31 +191,60 @@ class InvoicePDFGenerator(BasePDFGenerator):
 
     def generate_pdf(self, html_content):
         """Implementación con WeasyPrint"""
-        # 1. Crear objeto HTML con codificación UTF-8
-        html_obj = HTML(string=html_content)
-
-        # 2. Opcional: Añadir CSS específico para impresión/paginación
-        # Ruta a un archivo CSS estático en tu proyecto Django
-        base_dir = os.path.dirname(
-            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        )
-        css_path = os.path.join(base_dir, "static", "css", "factura.css")
-        # css_path = os.path.join(settings.BASE_DIR, 'static', 'css', 'factura.css')
-        if not os.path.exists(css_path):
-            print(f"[DEBUG] CSS no encontrado en: {css_path}")
-            # Usar CSS por defecto si no existe
-            css = CSS(string="@page { size: A4; margin: 1.5cm; }")
-        else:
-            print(f"[DEBUG] CSS cargado desde: {css_path}")
-            css = CSS(filename=css_path)
+        return write_invoice_pdf(html_content)
+
+    def cached_pdf(self):
+        """PDF ya renderizado para estos datos, o None"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_key(), "pdf")
+
+    def _store_pdf(self, pdf_bytes):
+        if self.cache is not None and pdf_bytes:
+            self.cache.set(self.cache_key(), "pdf", pdf_bytes)
+        return pdf_bytes
+
+    def generate_sync(self):
+        """Genera PDF de manera síncrona (o lo devuelve del cache)"""
+        pdf_bytes = self.cached_pdf()
+        if pdf_bytes is not None:
+            return pdf_bytes
+        return self._store_pdf(self.generate_pdf(self.render_html()))
 
-        # También puedes combinar múltiples archivos CSS:
-        # css2 = CSS(filename=os.path.join(settings.BASE_DIR, 'static', 'css', 'print.css'))
+    async def generate_async(self):
+        """
+        Genera el PDF en el pool de procesos compartido: el HTML se renderiza
+        aquí y WeasyPrint corre en un worker con el CSS ya cargado
+        """
+        from .batch_renderer import get_batch_renderer
 
-        # 3. Generar PDF
-        try:
-            pdf_bytes = html_obj.write_pdf(stylesheets=[css])  # , css2
+        pdf_bytes = self.cached_pdf()
+        if pdf_bytes is not None:
             return pdf_bytes
-        except Exception as e:
-            print(f"[DEBUG] Primeros 500 chars del HTML: {html_content[:500]}...")
-            raise Exception(f"Error al generar PDF con WeasyPrint: {str(e)}")
+
+        html = self.render_html()
+        future = get_batch_renderer().submit_html(html)
+        return self._store_pdf(await asyncio.wrap_future(future))
+
+
+def invoice_css_path():
+    """Ruta de static/css/factura.css"""
+    base_dir = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+    # css_path = os.path.join(settings.BASE_DIR, 'static', 'css', 'factura.css')
+    return os.path.join(base_dir, "static", "css", "factura.css")
+
+
+def write_invoice_pdf(html_content, stylesheets=None):
+    """
+    Convierte el HTML de una factura a PDF con el motor compartido
+    (factura.css ya parseado y fuentes ya cargadas)
+    """
+    try:
+        return get_pdf_engine().write_pdf(
+            html_content, (invoice_css_path(),), stylesheets=stylesheets
+        )
+    except Exception as e:
+        print(f"[DEBUG] Primeros 500 chars del HTML: {html_content[:500]}...")
+        raise Exception(f"Error al generar PDF con WeasyPrint: {str(e)}")
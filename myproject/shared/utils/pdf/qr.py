@@ -0,0 +1,159 @@
+# shared/utils/pdf/qr.py
+"""
+Códigos QR de comprobantes en SVG.
+
+`qrcode` + PIL armaba una imagen, la codificaba en PNG y luego en base64 en
+cada PDF. Aquí solo se usa `qrcode` para calcular la matriz de módulos y se
+emite directamente un SVG con un único `<path>` (un rectángulo por tramo
+horizontal de módulos oscuros): sin PIL, sin PNG, y WeasyPrint lo dibuja
+como vector.
+
+Los SVG se guardan en un LRU por proceso indexado por la cadena del QR
+(`cadena_para_codigo_qr`), de modo que las reimpresiones y los reintentos no
+vuelven a calcular el QR. `render_many` genera los QR de varias facturas
+en una llamada (deduplicando cadenas); `BatchPDFRenderer.render_many` la
+usa por cada tramo que envía al pool de PDFs.
+
+Configuración: `PDF_QR_CACHE_SIZE` (QR en cache por proceso, 0 = sin cache)
+y `PDF_QR_MASK_PATTERN`: elegir la máscara (la más legible de 8) es la mayor
+parte del costo de un QR; fijarla (0-7) lo reduce a una fracción a cambio de
+un QR algo menos óptimo para los lectores. Vacío = elección automática.
+"""
+
+import base64
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import qrcode
+from django.conf import settings
+
+SVG_MIME = "image/svg+xml"
+
+
+def qr_matrix(
+    data, error_correction=qrcode.constants.ERROR_CORRECT_L, border=2, mask_pattern=None
+):
+    """
+    Matriz de módulos (lista de filas de bool), con el borde incluido.
+    Con `mask_pattern` (0-7) no se evalúan las 8 máscaras.
+    """
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=error_correction,
+        border=border,
+        mask_pattern=mask_pattern,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def matrix_to_svg(matrix):
+    """SVG mínimo: un path con un rectángulo por tramo de módulos oscuros"""
+    size = len(matrix)
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            parts.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(parts)}" fill="#000"/></svg>'
+    )
+
+
+class QRCodeRenderer:
+    """
+    Uso:
+        qr = get_qr_renderer()
+        qr.base64_svg(cadena)      # para <img src="data:image/svg+xml;base64,...">
+        qr.render_many(cadenas)    # precalcula una corrida completa
+    """
+
+    def __init__(self, cache_size=None, mask_pattern=None):
+        self.cache_size = (
+            getattr(settings, "PDF_QR_CACHE_SIZE", 4096)
+            if cache_size is None
+            else cache_size
+        )
+        self.mask_pattern = (
+            getattr(settings, "PDF_QR_MASK_PATTERN", None)
+            if mask_pattern is None
+            else mask_pattern
+        )
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _cached(self, key) -> Optional[str]:
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+            return value
+
+    def _store(self, key, value):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def base64_svg(self, data, error_correction=qrcode.constants.ERROR_CORRECT_L):
+        """SVG del QR en base64 (lo que se guarda en el cache)"""
+        key = (data, error_correction)
+        value = self._cached(key)
+        if value is None:
+            svg = matrix_to_svg(
+                qr_matrix(data, error_correction, mask_pattern=self.mask_pattern)
+            )
+            value = base64.b64encode(svg.encode("ascii")).decode("ascii")
+            self._store(key, value)
+        return value
+
+    def data_uri(self, data, error_correction=qrcode.constants.ERROR_CORRECT_L):
+        return f"data:{SVG_MIME};base64,{self.base64_svg(data, error_correction)}"
+
+    def render_many(self, cadenas, error_correction=qrcode.constants.ERROR_CORRECT_L):
+        """
+        Genera (o toma del cache) los QR de todas las cadenas, una vez por
+        cadena distinta. Devuelve {cadena: base64 del SVG}.
+        """
+        return {
+            data: self.base64_svg(data, error_correction)
+            for data in dict.fromkeys(cadenas)
+            if data
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_renderer: Optional[QRCodeRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_qr_renderer() -> QRCodeRenderer:
+    """Generador de QR compartido por el proceso"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = QRCodeRenderer()
+    return _renderer
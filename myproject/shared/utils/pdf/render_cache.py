@@ -0,0 +1,260 @@
+# shared/utils/pdf/render_cache.py
+"""
+Cache de facturas renderizadas (HTML y PDF).
+
+La clave es el SHA-256 de (invoice_data canónico, nombre del template,
+mtime del template y de cada template que extiende o incluye, mtime de
+factura.css): una reimpresión con los mismos datos devuelve el PDF guardado
+sin volver a renderizar el template, generar el QR ni ejecutar WeasyPrint.
+Cambiar el template, su base (base_pdf.html), un include o el CSS invalida
+todo.
+
+Dos niveles:
+- memoria: LRU por proceso acotado en bytes (`PDF_RENDER_CACHE_MEMORY_MB`);
+- disco: `<PDF_RENDER_CACHE_DIR>/ab/<clave>.<tipo>`, compartido entre
+  procesos y acotado en bytes (`PDF_RENDER_CACHE_DISK_MB`); al pasarse del
+  límite se borran los archivos usados hace más tiempo (mtime, que se
+  actualiza en cada acierto).
+
+`AccountMove.hash_code` guarda la clave del último render de la factura.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Claves de invoice_data que no afectan al documento impreso
+VOLATILE_KEYS = ("sunat_response",)
+
+KINDS = ("html", "pdf")
+
+
+def _canonical_payload(invoice_data):
+    payload = {
+        key: value
+        for key, value in invoice_data.items()
+        if not key.startswith("_") and key not in VOLATILE_KEYS
+    }
+    return json.dumps(
+        payload, sort_keys=True, default=str, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+def _template_mtimes(template_name):
+    from .engine import get_pdf_engine
+
+    mtimes = get_pdf_engine().template_mtimes(template_name)
+    return ",".join(f"{name}={mtime}" for name, mtime in sorted(mtimes.items()))
+
+
+def _css_mtime():
+    from .invoice_generator import invoice_css_path
+
+    try:
+        return os.stat(invoice_css_path()).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def render_cache_key(invoice_data, template_name):
+    """Clave hex de 64 caracteres (cabe en AccountMove.hash_code)"""
+    digest = hashlib.sha256()
+    digest.update(_canonical_payload(invoice_data).encode("utf-8"))
+    digest.update(
+        f"\0{template_name}\0{_template_mtimes(template_name)}\0{_css_mtime()}".encode()
+    )
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Uso:
+        cache = get_render_cache()
+        pdf = cache.get(key, "pdf")
+        if pdf is None:
+            pdf = render(...)
+            cache.set(key, "pdf", pdf)
+    """
+
+    def __init__(self, memory_bytes=None, disk_bytes=None, directory=None):
+        mb = 1024 * 1024
+        self.memory_bytes = (
+            getattr(settings, "PDF_RENDER_CACHE_MEMORY_MB", 64) * mb
+            if memory_bytes is None
+            else memory_bytes
+        )
+        self.disk_bytes = (
+            getattr(settings, "PDF_RENDER_CACHE_DISK_MB", 1024) * mb
+            if disk_bytes is None
+            else disk_bytes
+        )
+        self.directory = directory or getattr(
+            settings,
+            "PDF_RENDER_CACHE_DIR",
+            os.path.join(settings.DOCUMENT_STORAGE["BASE_DIR"], "render_cache"),
+        )
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        # Tamaño en disco estimado; se recalcula al podar
+        self._disk_size = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    # ===== MEMORIA =====
+
+    def _memory_get(self, entry):
+        with self._lock:
+            data = self._memory.get(entry)
+            if data is not None:
+                self._memory.move_to_end(entry)
+            return data
+
+    def _memory_set(self, entry, data):
+        if len(data) > self.memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(entry, None)
+            if previous is not None:
+                self._memory_size -= len(previous)
+            self._memory[entry] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    # ===== DISCO =====
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, key[:2], f"{key}.{kind}")
+
+    def _disk_get(self, key, kind):
+        path = self._path(key, kind)
+        try:
+            with open(path, "rb") as cached:
+                data = cached.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _disk_set(self, key, kind, data):
+        if not self.disk_bytes or len(data) > self.disk_bytes:
+            return
+        path = self._path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("No se pudo guardar %s en el cache de render: %s", path, e)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(data)
+            over_limit = self._disk_size is None or self._disk_size > self.disk_bytes
+        if over_limit:
+            self.prune()
+
+    def prune(self):
+        """Deja el nivel de disco por debajo del límite (los más viejos primero)"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        if total > self.disk_bytes:
+            # Se poda hasta el 90% para no volver a recorrer en cada escritura
+            target = self.disk_bytes * 0.9
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+        with self._lock:
+            self._disk_size = total
+        if removed:
+            logger.info("Cache de render: %s archivos eliminados del disco", removed)
+        return removed
+
+    # ===== API =====
+
+    def get(self, key, kind="pdf") -> Optional[bytes]:
+        if not key:
+            return None
+        entry = (key, kind)
+        data = self._memory_get(entry)
+        if data is not None:
+            self.stats["memory_hits"] += 1
+            return data
+
+        data = self._disk_get(key, kind)
+        if data is not None:
+            self.stats["disk_hits"] += 1
+            self._memory_set(entry, data)
+            return data
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key, kind, data):
+        if kind not in KINDS:
+            raise ValueError(f"Tipo no soportado: {kind}")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._memory_set((key, kind), data)
+        self._disk_set(key, kind, data)
+
+    def get_html(self, key) -> Optional[str]:
+        data = self.get(key, "html")
+        return data.decode("utf-8") if data is not None else None
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+
+_cache: Optional[RenderCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> Optional[RenderCache]:
+    """Cache compartido por el proceso, o None si está deshabilitado"""
+    global _cache
+    if not getattr(settings, "PDF_RENDER_CACHE_ENABLED", True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache()
+    return _cache
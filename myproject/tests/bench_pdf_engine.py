@@ -0,0 +1,102 @@
+# bench_pdf_engine.py
+"""
+Micro-benchmark del motor PDF: latencia en frío vs. en caliente por número
+de páginas.
+
+Cada medición corre en un proceso nuevo (como un worker Celery recién
+arrancado):
+- "frio": primera factura del proceso sin warm-up (resuelve el template,
+  parsea factura.css e inicializa las fuentes dentro de la medición).
+- "caliente": primera factura después de `get_pdf_engine().warm_up()`.
+- "estable": mediana de las siguientes --repeat facturas del mismo proceso.
+- Las páginas se controlan con el número de ítems (10 ítems por página).
+- El cache de renderizado se desactiva para medir siempre el render real.
+- Guarda el resumen en `bench_pdf_engine_results.json`.
+
+USO:
+    python tests/bench_pdf_engine.py
+    python tests/bench_pdf_engine.py --pages 1 3 10 --repeat 10
+"""
+
+import os
+import sys
+import django
+import json
+import argparse
+import multiprocessing
+import statistics
+import time
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from shared.utils.pdf.engine import get_pdf_engine
+from shared.utils.pdf.invoice_generator import InvoicePDFGenerator
+from tests.bench_pdf_render import sample_invoice_data
+
+ITEMS_PER_PAGE = 10
+
+
+def _render(invoice_data):
+    started = time.perf_counter()
+    InvoicePDFGenerator(invoice_data, use_cache=False).generate_sync()
+    return time.perf_counter() - started
+
+
+def measure(pages, warm, repeat):
+    """Se ejecuta en un proceso nuevo; devuelve tiempos en milisegundos"""
+    warm_up_ms = None
+    if warm:
+        warm_up_ms = get_pdf_engine().warm_up() * 1000
+
+    items = max(1, pages * ITEMS_PER_PAGE)
+    first = _render(sample_invoice_data(1, items)) * 1000
+    steady = [
+        _render(sample_invoice_data(n, items)) * 1000 for n in range(2, repeat + 2)
+    ]
+    return {
+        "warm_up_ms": round(warm_up_ms, 1) if warm_up_ms is not None else None,
+        "first_ms": round(first, 1),
+        "steady_ms": round(statistics.median(steady), 1) if steady else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia del motor PDF")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_pdf_engine_results.json")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for pages in args.pages:
+        row = {}
+        for name, warm in (("frio", False), ("caliente", True)):
+            with context.Pool(1) as pool:
+                row[name] = pool.apply(measure, (pages, warm, args.repeat))
+        results[pages] = row
+
+    print(
+        f"\n{'páginas':>7} {'frío ms':>9} {'warm-up ms':>11} "
+        f"{'caliente ms':>12} {'estable ms':>11}"
+    )
+    print("-" * 56)
+    for pages, row in results.items():
+        print(
+            f"{pages:>7} {row['frio']['first_ms']:>9.1f} "
+            f"{row['caliente']['warm_up_ms']:>11.1f} "
+            f"{row['caliente']['first_ms']:>12.1f} "
+            f"{row['caliente']['steady_ms'] or 0:>11.1f}"
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# bench_pdf_render.py
+"""
+Benchmark de renderizado de PDFs de facturas: PDFs/seg según número de
+workers.
+
+- "secuencial": `InvoicePDFGenerator.generate_sync()` en el proceso actual
+  (template + QR + parseo de factura.css + WeasyPrint por factura).
+- "pool N": `BatchPDFRenderer(workers=N).render_many(...)`, con el pool ya
+  caliente (Django y CSS cargados en cada worker antes de medir).
+- Prueba 1, 2, 4, ... workers hasta el número de CPUs (o --workers).
+- Guarda el resumen en `bench_pdf_render_results.json`.
+
+USO:
+    python tests/bench_pdf_render.py
+    python tests/bench_pdf_render.py --invoices 200 --items 25 --workers 1 2 4 8
+
+Nota: no toca la BD ni Nubefact; las facturas son datos sintéticos.
+"""
+
+import os
+import sys
+import django
+import json
+import argparse
+import time
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+from shared.utils.pdf.batch_renderer import BatchPDFRenderer
+from shared.utils.pdf.invoice_generator import InvoicePDFGenerator
+
+
+def sample_invoice_data(numero, items=5):
+    """Factura sintética con `items` líneas"""
+    lines = [
+        {
+            "unidad_de_medida": "ZZ",
+            "codigo": f"SRV{i:03d}",
+            "descripcion": f"SERVICIO DE PRUEBA {i}",
+            "cantidad": 1.0,
+            "valor_unitario": 100.0,
+            "precio_unitario": 118.0,
+            "subtotal": 100.0,
+            "total": 118.0,
+            "codigo_producto_sunat": "81112101",
+        }
+        for i in range(1, items + 1)
+    ]
+    return {
+        "serie": "F001",
+        "numero": numero,
+        "tipo_de_comprobante": "1",
+        "cliente_tipo_de_documento": "6",
+        "cliente_denominacion": "CLIENTE DE PRUEBA S.A.C.",
+        "cliente_numero_de_documento": "20123456789",
+        "cliente_direccion": "AV. PRUEBA 123, LIMA",
+        "fecha_de_emision": "2024-01-31",
+        "fecha_de_vencimiento": "2024-02-28",
+        "moneda": "1",
+        "total_gravada": 100.0 * items,
+        "total_descuento": 0,
+        "total_igv": f"{18.0 * items:.2f}",
+        "total": f"{118.0 * items:.2f}",
+        "condiciones_de_pago": "CONTADO",
+        "cadena_para_codigo_qr": (
+            f"20123456789|01|F001|{numero}|{18.0 * items:.2f}|"
+            f"{118.0 * items:.2f}|31/01/2024|6|20123456789|"
+        ),
+        "items": lines,
+    }
+
+
+def run_sequential(invoices):
+    started = time.perf_counter()
+    for invoice_data in invoices:
+        InvoicePDFGenerator(invoice_data).generate_sync()
+    return time.perf_counter() - started
+
+
+def run_pool(invoices, workers):
+    renderer = BatchPDFRenderer(workers=workers)
+    try:
+        renderer.warm_up()
+        started = time.perf_counter()
+        errors = sum(1 for r in renderer.render_many(invoices) if not r.ok)
+        return time.perf_counter() - started, errors
+    finally:
+        renderer.shutdown()
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = [n for n in (1, 2, 4, 8, 16, 32) if n < cpus] + [cpus]
+
+    parser = argparse.ArgumentParser(description="PDFs/seg según workers")
+    parser.add_argument("--invoices", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5, help="Líneas por factura")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--output", default="bench_pdf_render_results.json")
+    args = parser.parse_args()
+
+    invoices = [sample_invoice_data(n, args.items) for n in range(1, args.invoices + 1)]
+    results = {"cpus": cpus, "invoices": args.invoices, "items": args.items}
+
+    # Primer render fuera de la medición (carga de templates/fuentes)
+    InvoicePDFGenerator(invoices[0]).generate_sync()
+    elapsed = run_sequential(invoices)
+    results["secuencial"] = {
+        "workers": 1,
+        "seconds": round(elapsed, 3),
+        "pdfs_per_sec": round(args.invoices / elapsed, 2),
+    }
+
+    for workers in args.workers:
+        elapsed, errors = run_pool(invoices, workers)
+        results[f"pool {workers}"] = {
+            "workers": workers,
+            "seconds": round(elapsed, 3),
+            "pdfs_per_sec": round(args.invoices / elapsed, 2),
+            "errors": errors,
+        }
+
+    base = results["secuencial"]["pdfs_per_sec"]
+    print(f"\n{'escenario':<12} {'workers':>7} {'seg':>8} {'PDFs/s':>8} {'x':>6}")
+    print("-" * 46)
+    for name, r in results.items():
+        if not isinstance(r, dict):
+            continue
+        print(
+            f"{name:<12} {r['workers']:>7} {r['seconds']:>8.2f} "
+            f"{r['pdfs_per_sec']:>8.2f} {r['pdfs_per_sec'] / base:>6.2f}"
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
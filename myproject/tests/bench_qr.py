@@ -0,0 +1,124 @@
+# bench_qr.py
+"""
+Benchmark de generación de QR por factura en un cierre de mes.
+
+- "png": el camino anterior (qrcode con fit=True -> imagen PIL -> PNG ->
+  base64) para cada factura.
+- "svg": `matrix_to_svg(qr_matrix(...))` sin cache, máscara automática.
+- "svg mascara fija": igual, con `mask_pattern` fijo (PDF_QR_MASK_PATTERN).
+- "svg cache": `QRCodeRenderer.render_many` sobre la corrida, con una
+  fracción de reimpresiones (--reprints) que repiten cadenas ya vistas.
+- Reporta ms por factura y el ahorro total estimado para --invoices.
+- Guarda el resumen en `bench_qr_results.json`.
+
+USO:
+    python tests/bench_qr.py
+    python tests/bench_qr.py --invoices 20000 --sample 500 --reprints 0.2
+"""
+
+import os
+import sys
+import django
+import json
+import argparse
+import base64
+import random
+import time
+from io import BytesIO
+
+# Configurar Django
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+django.setup()
+
+import qrcode
+
+from shared.utils.pdf.qr import QRCodeRenderer, matrix_to_svg, qr_matrix
+
+
+def cadena(numero):
+    """Cadena SUNAT sintética (mismo largo que las de Nubefact)"""
+    return (
+        f"20607403903|01|F001|{numero:08d}|73.08|479.08|02/08/2023|6|"
+        f"20503682118|pbvmKKKJ8w20nJ7uLrSoD6PvfM0ZU321WKoI5x{numero % 9973:05d}=|"
+    )
+
+
+def legacy_png(data):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=6,
+        border=2,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def timed(fn, cadenas):
+    started = time.perf_counter()
+    for data in cadenas:
+        fn(data)
+    return (time.perf_counter() - started) * 1000 / len(cadenas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de QR por factura")
+    parser.add_argument("--invoices", type=int, default=10000, help="Volumen del mes")
+    parser.add_argument("--sample", type=int, default=300, help="Facturas medidas")
+    parser.add_argument("--reprints", type=float, default=0.1)
+    parser.add_argument("--mask", type=int, default=0, help="Máscara fija (0-7)")
+    parser.add_argument("--output", default="bench_qr_results.json")
+    args = parser.parse_args()
+
+    random.seed(42)
+    cadenas = [cadena(n) for n in range(1, args.sample + 1)]
+    reprints = [random.choice(cadenas) for _ in range(int(args.sample * args.reprints))]
+
+    results = {
+        "png": timed(legacy_png, cadenas),
+        "svg": timed(lambda data: matrix_to_svg(qr_matrix(data)), cadenas),
+        "svg mascara fija": timed(
+            lambda data: matrix_to_svg(qr_matrix(data, mask_pattern=args.mask)),
+            cadenas,
+        ),
+    }
+
+    renderer = QRCodeRenderer(cache_size=len(cadenas))
+    run = cadenas + reprints
+    started = time.perf_counter()
+    renderer.render_many(cadenas)
+    for data in reprints:
+        renderer.base64_svg(data)
+    results["svg cache"] = (time.perf_counter() - started) * 1000 / len(run)
+
+    base = results["png"]
+    summary = {}
+    print(f"\n{'escenario':<18} {'ms/factura':>11} {'ahorro mes (s)':>15}")
+    print("-" * 46)
+    for name, ms in results.items():
+        saved = (base - ms) * args.invoices / 1000
+        summary[name] = {
+            "ms_per_invoice": round(ms, 3),
+            "saved_seconds": round(saved, 1),
+        }
+        print(f"{name:<18} {ms:>11.3f} {saved:>15.1f}")
+
+    output = {
+        "invoices": args.invoices,
+        "sample": args.sample,
+        "reprints": args.reprints,
+        "results": summary,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\n📄 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# tests/shared/conftest.py
+import pytest
+
+from shared.utils.document_store import DocumentStore
+from shared.utils.pdf.render_cache import RenderCache
+
+
+@pytest.fixture
+def render_cache(tmp_path):
+    """Cache de render aislado en un directorio temporal"""
+    return RenderCache(
+        memory_bytes=1024 * 1024, disk_bytes=1024 * 1024, directory=str(tmp_path)
+    )
+
+
+@pytest.fixture
+def document_store(tmp_path):
+    """Almacén de documentos aislado en un directorio temporal"""
+    store = DocumentStore(
+        base_dir=str(tmp_path), index_path=str(tmp_path / "index.sqlite3")
+    )
+    yield store
+    store.close()
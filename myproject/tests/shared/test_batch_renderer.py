@@ -0,0 +1,216 @@
+# tests/shared/test_batch_renderer.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shared.utils.pdf import batch_renderer
+from shared.utils.pdf.batch_renderer import BatchPDFRenderer
+
+try:
+    from shared.utils.pdf import invoice_generator
+except (ImportError, OSError):  # WeasyPrint sin sus librerías nativas
+    invoice_generator = None
+
+TEMPLATE = "billing/factura_electronica.html"
+
+
+def invoice_datas(count, pulled=None):
+    """Generador de facturas que anota cuántas se leyeron"""
+    for numero in range(1, count + 1):
+        if pulled is not None:
+            pulled.append(numero)
+        yield {
+            "serie": "F001",
+            "numero": numero,
+            "cadena_para_codigo_qr": f"20123456789|01|F001|{numero}",
+        }
+
+
+def fake_render(invoice_data, template_name, qr_image_base64=None):
+    return f"%PDF {invoice_data['numero']}".encode()
+
+
+@pytest.fixture
+def renderer():
+    # Hilos en lugar del pool de procesos: el render sustituido se ve igual
+    renderer = BatchPDFRenderer(workers=2, max_pending=3)
+    renderer._executor = ThreadPoolExecutor(max_workers=2)
+    yield renderer
+    renderer.shutdown()
+
+
+@pytest.fixture
+def stub_render():
+    with patch.object(
+        batch_renderer, "_render_invoice", side_effect=fake_render
+    ) as stub:
+        yield stub
+
+
+@pytest.fixture
+def cache(render_cache):
+    with patch.object(
+        batch_renderer, "get_render_cache", return_value=render_cache
+    ), patch.object(
+        batch_renderer,
+        "render_cache_key",
+        side_effect=lambda data, template: f"{data['serie']}{data['numero']:062d}",
+    ):
+        yield render_cache
+
+
+@pytest.fixture
+def qr_renderer():
+    """QR sustituido: devuelve "qr:<cadena>" y registra cada tramo"""
+    qr = MagicMock()
+    qr.render_many.side_effect = lambda cadenas: {
+        cadena: f"qr:{cadena}" for cadena in cadenas if cadena
+    }
+    with patch.object(batch_renderer, "get_qr_renderer", return_value=qr):
+        yield qr
+
+
+class TestRenderMany:
+
+    def test_renders_every_invoice(self, renderer, stub_render):
+        results = list(
+            renderer.render_many(invoice_datas(10), TEMPLATE, use_cache=False)
+        )
+
+        assert sorted(result.index for result in results) == list(range(10))
+        assert all(result.ok and not result.cached for result in results)
+        assert {result.pdf for result in results} == {
+            f"%PDF {n}".encode() for n in range(1, 11)
+        }
+
+    def test_pending_is_bounded(self, renderer, stub_render):
+        pulled = []
+        results = renderer.render_many(
+            invoice_datas(50, pulled), TEMPLATE, use_cache=False
+        )
+
+        consumed = 0
+        for _ in results:
+            consumed += 1
+            # Nunca hay más de max_pending facturas leídas sin entregar
+            assert len(pulled) - consumed < renderer.max_pending
+        assert consumed == 50
+
+    def test_backpressure_when_consumer_stops(self, renderer, stub_render):
+        pulled = []
+        results = renderer.render_many(
+            invoice_datas(50, pulled), TEMPLATE, use_cache=False
+        )
+
+        next(results)
+        # El consumidor se detiene: no se leen más facturas de la fuente
+        assert len(pulled) == renderer.max_pending
+        assert stub_render.call_count <= renderer.max_pending
+        results.close()
+
+    def test_error_is_isolated(self, renderer, stub_render, cache):
+        def fail_on_three(invoice_data, template_name, qr_image_base64=None):
+            if invoice_data["numero"] == 3:
+                raise RuntimeError("template roto")
+            return fake_render(invoice_data, template_name)
+
+        stub_render.side_effect = fail_on_three
+        results = {r.index: r for r in renderer.render_many(invoice_datas(5), TEMPLATE)}
+
+        assert results[2].error == "template roto" and results[2].pdf is None
+        assert [i for i, r in sorted(results.items()) if r.ok] == [0, 1, 3, 4]
+        # Un error no se guarda en el cache
+        assert cache.get(f"F001{3:062d}", "pdf") is None
+        assert cache.get(f"F001{4:062d}", "pdf") == b"%PDF 4"
+
+    def test_cache_short_circuits_pool(self, renderer, stub_render, cache):
+        cache.set(f"F001{2:062d}", "pdf", b"%PDF guardado")
+
+        results = {r.index: r for r in renderer.render_many(invoice_datas(3), TEMPLATE)}
+
+        assert results[1].cached and results[1].pdf == b"%PDF guardado"
+        assert stub_render.call_count == 2
+        # Lo renderizado queda en el cache para el siguiente lote
+        again = list(renderer.render_many(invoice_datas(3), TEMPLATE))
+        assert all(result.cached for result in again)
+        assert stub_render.call_count == 2
+
+    def test_close_cancels_pending(self, stub_render):
+        renderer = BatchPDFRenderer(workers=1, max_pending=4)
+        renderer._executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+
+        def block_after_first(invoice_data, template_name, qr_image_base64=None):
+            if invoice_data["numero"] > 1:
+                release.wait(5)
+            return fake_render(invoice_data, template_name)
+
+        stub_render.side_effect = block_after_first
+        results = renderer.render_many(invoice_datas(10), TEMPLATE, use_cache=False)
+        first = next(results)
+        results.close()
+        release.set()
+        renderer.shutdown()
+
+        assert first.index == 0
+        # Solo la que ya estaba en el worker termina; el resto se canceló
+        rendered = [call.args[0]["numero"] for call in stub_render.call_args_list]
+        assert rendered[0] == 1 and set(rendered) <= {1, 2}
+
+
+class TestBatchQR:
+
+    @staticmethod
+    def chunks(qr_renderer):
+        return [list(call.args[0]) for call in qr_renderer.render_many.call_args_list]
+
+    def test_qr_generated_once_per_chunk(self, renderer, stub_render, qr_renderer):
+        list(renderer.render_many(invoice_datas(10), TEMPLATE, use_cache=False))
+
+        chunks = self.chunks(qr_renderer)
+        # Un tramo por ventana del pool, no una llamada por factura
+        assert len(chunks[0]) == renderer.max_pending
+        assert all(len(chunk) <= renderer.max_pending for chunk in chunks)
+        assert sorted(cadena for chunk in chunks for cadena in chunk) == sorted(
+            f"20123456789|01|F001|{n}" for n in range(1, 11)
+        )
+        # Cada worker recibe el QR de su factura
+        for call in stub_render.call_args_list:
+            invoice_data, _, qr_image = call.args
+            assert qr_image == f"qr:{invoice_data['cadena_para_codigo_qr']}"
+
+    def test_cached_invoices_skip_qr(self, renderer, stub_render, qr_renderer, cache):
+        cache.set(f"F001{2:062d}", "pdf", b"%PDF guardado")
+
+        list(renderer.render_many(invoice_datas(3), TEMPLATE))
+
+        assert self.chunks(qr_renderer) == [
+            ["20123456789|01|F001|1", "20123456789|01|F001|3"]
+        ]
+
+    def test_qr_failure_falls_back_to_worker(self, renderer, stub_render, qr_renderer):
+        qr_renderer.render_many.side_effect = ValueError("cadena demasiado larga")
+
+        results = list(
+            renderer.render_many(invoice_datas(4), TEMPLATE, use_cache=False)
+        )
+
+        assert all(result.ok for result in results)
+        assert {call.args[2] for call in stub_render.call_args_list} == {None}
+
+    @pytest.mark.skipif(invoice_generator is None, reason="WeasyPrint no disponible")
+    def test_generator_uses_given_qr(self):
+        invoice_data = next(invoice_datas(1))
+        generator_class = invoice_generator.InvoicePDFGenerator
+
+        given = generator_class(
+            invoice_data, TEMPLATE, use_cache=False, qr_image_base64="QR"
+        )
+        own = generator_class(invoice_data, TEMPLATE, use_cache=False)
+
+        assert given._generate_qr_data() == "QR"
+        assert own._generate_qr_data() == batch_renderer.get_qr_renderer().base64_svg(
+            invoice_data["cadena_para_codigo_qr"]
+        )
@@ -0,0 +1,280 @@
+# tests/shared/test_document_store.py
+import hashlib
+import os
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from shared.utils import document_store as document_store_module
+from shared.utils.file_manager import DocumentFileManager
+
+PDF_A = b"%PDF-1.4 factura A"
+PDF_B = b"%PDF-1.4 factura B"
+
+
+def blob_count(store):
+    return sum(
+        len(files)
+        for root, _, files in os.walk(store.blobs_dir)
+        if not root.endswith("tmp")
+    )
+
+
+def age(store, document_type, serie, numero, days):
+    """Retrocede la fecha de creación de un documento"""
+    created_at = (datetime.now() - timedelta(days=days)).isoformat()
+    with store.db:
+        store.db.execute(
+            "UPDATE documents SET created_at = ? "
+            "WHERE document_type = ? AND serie = ? AND numero = ?",
+            (created_at, document_type, serie, str(numero)),
+        )
+
+
+class TestPut:
+
+    def test_stores_blob_and_entry(self, document_store):
+        document = document_store.put(
+            "invoices",
+            "F001",
+            1,
+            iter([PDF_A[:5], PDF_A[5:]]),
+            client_document="20123456789",
+            issue_date=date(2025, 3, 1),
+            total="118.00",
+        )
+
+        assert document["sha256"] == hashlib.sha256(PDF_A).hexdigest()
+        assert document["size_bytes"] == len(PDF_A)
+        assert document["filename"] == "F001-1.pdf"
+        assert document["issue_date"] == "2025-03-01"
+        assert b"".join(document_store.iter_blob(document["sha256"])) == PDF_A
+        # No quedan temporales
+        assert os.listdir(os.path.join(document_store.blobs_dir, "tmp")) == []
+
+    def test_unknown_field_is_rejected(self, document_store):
+        with pytest.raises(ValueError, match="desconocidos"):
+            document_store.put("invoices", "F001", 1, PDF_A, colour="red")
+        assert document_store.find("invoices", "F001", 1) is None
+
+    def test_identical_content_shares_blob(self, document_store):
+        first = document_store.put("invoices", "F001", 1, PDF_A)
+        second = document_store.put("receipts", "B001", 1, PDF_A)
+
+        assert first["sha256"] == second["sha256"]
+        assert blob_count(document_store) == 1
+
+    def test_replacing_content_releases_unused_blob(self, document_store):
+        old = document_store.put("invoices", "F001", 1, PDF_A)
+        document_store.put("invoices", "F001", 2, PDF_A)
+
+        document_store.put("invoices", "F001", 1, PDF_B)
+        # F001-2 sigue usando el blob de A
+        assert os.path.exists(document_store.blob_path(old["sha256"]))
+
+        document_store.put("invoices", "F001", 2, PDF_B)
+        assert not os.path.exists(document_store.blob_path(old["sha256"]))
+        assert blob_count(document_store) == 1
+
+
+class TestConcurrentPurge:
+
+    def test_record_fails_if_blob_was_purged(self, document_store):
+        document_store.put("invoices", "F001", 1, PDF_A)
+        sha256, size, _ = document_store.put_blob(PDF_A)
+        # Otro proceso purga entre put_blob y record
+        document_store.purge("invoices", datetime.now() + timedelta(seconds=1))
+
+        with pytest.raises(FileNotFoundError):
+            document_store.record("invoices", "F001", 2, sha256, size)
+        assert document_store.find("invoices", "F001", 2) is None
+
+    def test_put_recreates_blob_purged_while_writing(self, document_store):
+        document_store.put("invoices", "F001", 1, PDF_A)
+        write_tmp = document_store._write_tmp
+
+        def write_then_purge(content):
+            written = write_tmp(content)
+            document_store.purge("invoices", datetime.now() + timedelta(seconds=1))
+            return written
+
+        with patch.object(document_store, "_write_tmp", side_effect=write_then_purge):
+            document = document_store.put("invoices", "F001", 2, PDF_A)
+
+        assert document_store.find("invoices", "F001", 1) is None
+        assert b"".join(document_store.iter_blob(document["sha256"])) == PDF_A
+
+    def test_release_happens_under_write_lock(self, document_store):
+        document_store.put("invoices", "F001", 1, PDF_A)
+        release_blobs = document_store._release_blobs
+        in_transaction = []
+
+        def spy(hashes):
+            in_transaction.append(document_store.db.in_transaction)
+            return release_blobs(hashes)
+
+        with patch.object(document_store, "_release_blobs", side_effect=spy):
+            document_store.put("invoices", "F001", 1, PDF_B)
+            document_store.purge("invoices", datetime.now() + timedelta(seconds=1))
+
+        assert in_transaction == [True, True]
+
+
+class TestQueries:
+
+    @pytest.fixture
+    def documents(self, document_store):
+        rows = [
+            ("F001", 1, "20123456789", "2025-01-15"),
+            ("F001", 2, "20123456789", "2025-02-15"),
+            ("F001", 3, "10456789012", "2025-02-20"),
+            ("F002", 1, "20123456789", "2025-03-15"),
+        ]
+        for serie, numero, client, issue_date in rows:
+            document_store.put(
+                "invoices",
+                serie,
+                numero,
+                f"%PDF {serie}-{numero}".encode(),
+                client_document=client,
+                issue_date=issue_date,
+            )
+        return document_store
+
+    def test_find_many(self, documents):
+        keys = [("F001", 1), ("F001", "3"), ("F002", 1), ("F001", 99), ("F003", 1)]
+
+        with patch.object(document_store_module, "QUERY_BATCH_SIZE", 1):
+            found = documents.find_many("invoices", keys)
+
+        assert sorted(found) == [("F001", "1"), ("F001", "3"), ("F002", "1")]
+        assert found[("F001", "3")]["client_document"] == "10456789012"
+        assert documents.find_many("receipts", keys) == {}
+
+    def test_by_client(self, documents):
+        all_documents = documents.by_client("20123456789")
+        in_range = documents.by_client(
+            "20123456789", date(2025, 2, 1), date(2025, 3, 31)
+        )
+
+        assert [(d["serie"], d["numero"]) for d in all_documents] == [
+            ("F001", "1"),
+            ("F001", "2"),
+            ("F002", "1"),
+        ]
+        assert [(d["serie"], d["numero"]) for d in in_range] == [
+            ("F001", "2"),
+            ("F002", "1"),
+        ]
+        assert documents.by_client("99999999") == []
+
+
+class TestIssueDate:
+
+    @pytest.mark.parametrize(
+        "fecha_de_emision",
+        ["15-02-2025", "15/02/2025", "2025-02-15", date(2025, 2, 15)],
+    )
+    def test_is_stored_as_iso(self, document_store, fecha_de_emision):
+        document = document_store.put(
+            "invoices",
+            "F001",
+            1,
+            PDF_A,
+            client_document="20123456789",
+            issue_date=fecha_de_emision,
+        )
+
+        assert document["issue_date"] == "2025-02-15"
+
+    def test_range_query_finds_nubefact_dates(self, document_store):
+        # Nubefact envía fecha_de_emision como DD-MM-YYYY
+        for numero, fecha in enumerate(["28-01-2025", "15-02-2025", "03-03-2025"]):
+            document_store.put(
+                "invoices",
+                "F001",
+                numero,
+                f"%PDF {numero}".encode(),
+                client_document="20123456789",
+                issue_date=fecha,
+            )
+
+        in_february = document_store.by_client(
+            "20123456789", date(2025, 2, 1), "2025-02-28"
+        )
+        by_issue_date = document_store.by_issue_date(
+            "invoices", "01-02-2025", date(2025, 3, 31)
+        )
+
+        assert [d["numero"] for d in in_february] == ["1"]
+        assert [d["numero"] for d in by_issue_date] == ["1", "2"]
+
+    def test_unparseable_date_is_kept_and_logged(self, document_store, caplog):
+        with caplog.at_level("WARNING", logger=document_store_module.__name__):
+            document = document_store.put(
+                "invoices", "F001", 1, PDF_A, issue_date="mañana"
+            )
+
+        assert document["issue_date"] == "mañana"
+        assert "mañana" in caplog.text
+
+    def test_normalize_existing_entries(self, document_store):
+        document_store.put("invoices", "F001", 1, PDF_A, issue_date="2025-02-15")
+        document_store.put("invoices", "F001", 2, PDF_B, issue_date="2025-02-16")
+        # Entrada indexada antes de normalizar las fechas
+        with document_store.db:
+            document_store.db.execute(
+                "UPDATE documents SET issue_date = '16-02-2025' WHERE numero = '2'"
+            )
+
+        assert document_store.normalize_issue_dates() == 1
+        assert document_store.find("invoices", "F001", 2)["issue_date"] == "2025-02-16"
+        assert document_store.normalize_issue_dates() == 0
+
+
+class TestPurge:
+
+    def test_removes_old_documents_and_unused_blobs(self, document_store):
+        old = document_store.put("invoices", "F001", 1, PDF_A)
+        document_store.put("invoices", "F001", 2, PDF_B)
+        # Un recibo reciente comparte el contenido de F001-2
+        shared = document_store.put("receipts", "B001", 1, PDF_B)
+        age(document_store, "invoices", "F001", 1, 400)
+        age(document_store, "invoices", "F001", 2, 400)
+
+        removed = document_store.purge("invoices", datetime.now() - timedelta(days=365))
+
+        assert removed == (2, 1)
+        assert document_store.by_issue_date("invoices") == []
+        assert not os.path.exists(document_store.blob_path(old["sha256"]))
+        assert os.path.exists(document_store.blob_path(shared["sha256"]))
+        assert document_store.find("receipts", "B001", 1) is not None
+
+    def test_keeps_recent_documents(self, document_store):
+        document_store.put("invoices", "F001", 1, PDF_A)
+
+        assert document_store.purge("invoices", datetime.now() - timedelta(days=1)) == (
+            0,
+            0,
+        )
+        assert document_store.find("invoices", "F001", 1) is not None
+
+
+def test_file_manager_saves_and_reads(document_store):
+    manager = DocumentFileManager(store=document_store)
+    invoice_data = {
+        "serie": "F001",
+        "numero": 7,
+        "cliente_numero_de_documento": "20123456789",
+        "fecha_de_emision": "2025-03-01",
+    }
+
+    result = manager.save_pdf(PDF_A, invoice_data)
+
+    assert result["success"]
+    assert result["pdf_path"] == document_store.blob_path(
+        result["metadata"]["file_info"]["file_hash"]
+    )
+    assert manager.read_pdf("F001", 7) == PDF_A
+    assert [d["numero"] for d in manager.find_by_client("20123456789")] == ["7"]
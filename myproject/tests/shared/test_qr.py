@@ -0,0 +1,135 @@
+# tests/shared/test_qr.py
+import base64
+import re
+from unittest.mock import patch
+
+import pytest
+import qrcode
+
+from shared.utils.pdf import qr
+from shared.utils.pdf.qr import QRCodeRenderer, matrix_to_svg, qr_matrix
+
+CADENA = "20123456789|01|F001|00000001|18.00|118.00|2025-03-01|6|20987654321|hash="
+
+RUN = re.compile(r"M(\d+) (\d+)h(\d+)v1h-(\d+)z")
+
+
+def svg_to_matrix(svg):
+    """Reconstruye la matriz de módulos a partir del path del SVG"""
+    size = int(re.search(r'viewBox="0 0 (\d+) \1"', svg).group(1))
+    path = re.search(r'<path d="([^"]*)"', svg).group(1)
+    matrix = [[False] * size for _ in range(size)]
+    consumed = 0
+    for match in RUN.finditer(path):
+        x, y, width, back = map(int, match.groups())
+        assert width == back
+        for column in range(x, x + width):
+            matrix[y][column] = True
+        consumed += len(match.group(0))
+    # El path no tiene nada que no sean tramos
+    assert consumed == len(path)
+    return matrix
+
+
+@pytest.fixture
+def renderer():
+    return QRCodeRenderer(cache_size=2, mask_pattern=None)
+
+
+class TestMatrixToSvg:
+
+    @pytest.mark.parametrize(
+        "data, error_correction",
+        [
+            (CADENA, qrcode.constants.ERROR_CORRECT_L),
+            (CADENA, qrcode.constants.ERROR_CORRECT_H),
+            ("B001|1", qrcode.constants.ERROR_CORRECT_M),
+        ],
+    )
+    def test_round_trip(self, data, error_correction):
+        matrix = qr_matrix(data, error_correction)
+
+        assert svg_to_matrix(matrix_to_svg(matrix)) == matrix
+
+    def test_runs_are_maximal(self):
+        matrix = [
+            [True, True, False, True],
+            [False, False, False, False],
+            [True, True, True, True],
+            [False, True, True, False],
+        ]
+        svg = matrix_to_svg(matrix)
+
+        assert RUN.findall(svg) == [
+            ("0", "0", "2", "2"),
+            ("3", "0", "1", "1"),
+            ("0", "2", "4", "4"),
+            ("1", "3", "2", "2"),
+        ]
+        assert svg_to_matrix(svg) == matrix
+
+    def test_renderer_output_decodes_to_matrix(self):
+        renderer = QRCodeRenderer(cache_size=0, mask_pattern=3)
+
+        svg = base64.b64decode(renderer.base64_svg(CADENA)).decode("ascii")
+
+        assert svg_to_matrix(svg) == qr_matrix(CADENA, mask_pattern=3)
+        assert renderer.data_uri(CADENA).startswith("data:image/svg+xml;base64,")
+
+
+class TestCache:
+
+    def test_key_includes_error_correction(self, renderer):
+        low = renderer.base64_svg(CADENA, qrcode.constants.ERROR_CORRECT_L)
+        high = renderer.base64_svg(CADENA, qrcode.constants.ERROR_CORRECT_H)
+
+        assert low != high
+        assert renderer.base64_svg(CADENA, qrcode.constants.ERROR_CORRECT_L) == low
+        assert renderer.stats == {"hits": 1, "misses": 2}
+
+    def test_key_includes_data(self, renderer):
+        first = renderer.base64_svg(CADENA)
+        second = renderer.base64_svg(CADENA.replace("F001", "F002"))
+
+        assert first != second
+        assert renderer.stats == {"hits": 0, "misses": 2}
+
+    def test_evicts_least_recently_used(self, renderer):
+        for data in ("a", "b", "a", "c"):
+            renderer.base64_svg(data)
+
+        assert list(renderer._cache) == [
+            ("a", qrcode.constants.ERROR_CORRECT_L),
+            ("c", qrcode.constants.ERROR_CORRECT_L),
+        ]
+
+    def test_zero_size_disables_cache(self):
+        renderer = QRCodeRenderer(cache_size=0)
+        renderer.base64_svg(CADENA)
+        renderer.base64_svg(CADENA)
+
+        assert renderer._cache == {}
+        assert renderer.stats == {"hits": 0, "misses": 2}
+
+
+class TestRenderMany:
+
+    def test_generates_each_distinct_cadena_once(self):
+        renderer = QRCodeRenderer(cache_size=10)
+        cadenas = ["F001|1", "F001|2", "F001|1", "", None, "F001|2", "F001|3"]
+
+        with patch.object(qr, "qr_matrix", wraps=qr_matrix) as matrix:
+            result = renderer.render_many(cadenas)
+
+        assert list(result) == ["F001|1", "F001|2", "F001|3"]
+        assert matrix.call_count == 3
+        assert result["F001|2"] == renderer.base64_svg("F001|2")
+
+    def test_reuses_cache_from_previous_run(self):
+        renderer = QRCodeRenderer(cache_size=10)
+        renderer.render_many(["F001|1", "F001|2"])
+
+        with patch.object(qr, "qr_matrix", wraps=qr_matrix) as matrix:
+            renderer.render_many(["F001|2", "F001|3"])
+
+        assert [call.args[0] for call in matrix.call_args_list] == ["F001|3"]
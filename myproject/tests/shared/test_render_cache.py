@@ -0,0 +1,185 @@
+# tests/shared/test_render_cache.py
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from shared.utils.pdf import engine as engine_module
+from shared.utils.pdf import render_cache as render_cache_module
+from shared.utils.pdf.engine import PDFEngine
+from shared.utils.pdf.render_cache import RenderCache, render_cache_key
+
+TEMPLATE = "billing/factura_electronica.html"
+
+INVOICE_DATA = {
+    "serie": "F001",
+    "numero": 1,
+    "total": "118.00",
+    "items": [{"descripcion": "Plan mensual", "total": "118.00"}],
+}
+
+
+@pytest.fixture
+def mtimes():
+    """mtime del template y del CSS, modificables desde el test"""
+    values = {"template": 1000, "css": 2000}
+    with patch.object(
+        render_cache_module,
+        "_template_mtimes",
+        side_effect=lambda template_name: f"{template_name}={values['template']}",
+    ), patch.object(
+        render_cache_module, "_css_mtime", side_effect=lambda: values["css"]
+    ):
+        yield values
+
+
+def key_for(data=INVOICE_DATA, template=TEMPLATE):
+    return render_cache_key(data, template)
+
+
+class TestRenderCacheKey:
+
+    def test_is_stable(self, mtimes):
+        reordered = dict(reversed(list(INVOICE_DATA.items())))
+
+        assert len(key_for()) == 64
+        assert key_for() == key_for(reordered)
+
+    def test_changes_with_data(self, mtimes):
+        changed = {**INVOICE_DATA, "total": "119.00"}
+        changed_item = {**INVOICE_DATA, "items": [{"descripcion": "Plan anual"}]}
+
+        assert len({key_for(), key_for(changed), key_for(changed_item)}) == 3
+
+    def test_ignores_volatile_and_private_keys(self, mtimes):
+        noisy = {**INVOICE_DATA, "sunat_response": {"ok": True}, "_attempt": 3}
+
+        assert key_for(noisy) == key_for()
+
+    def test_changes_with_template(self, mtimes):
+        before = key_for()
+        mtimes["template"] += 1
+
+        assert key_for() != before
+        assert key_for(template="billing/boleta.html") != key_for()
+
+    def test_changes_with_css(self, mtimes):
+        before = key_for()
+        mtimes["css"] += 1
+
+        assert key_for() != before
+
+
+class TestTemplateChain:
+    """La clave sigue los mtimes reales de la cadena extends/include"""
+
+    @pytest.fixture
+    def templates(self, tmp_path, settings):
+        files = {
+            "base_pdf.html": "<html>{% block body %}{% endblock %}</html>",
+            "totales.html": "<p>{{ total }}</p>",
+            "factura.html": (
+                '{% extends "base_pdf.html" %}'
+                '{% block body %}{% include "totales.html" %}{% endblock %}'
+            ),
+        }
+        for name, content in files.items():
+            (tmp_path / name).write_text(content)
+        settings.TEMPLATES = [
+            {
+                "BACKEND": "django.template.backends.django.DjangoTemplates",
+                "DIRS": [str(tmp_path)],
+            }
+        ]
+        with patch.object(
+            engine_module, "get_pdf_engine", return_value=PDFEngine()
+        ), patch.object(render_cache_module, "_css_mtime", return_value=1):
+            yield tmp_path
+
+    @staticmethod
+    def touch(path):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_chain_is_resolved(self, templates):
+        mtimes = engine_module.get_pdf_engine().template_mtimes("factura.html")
+
+        assert sorted(mtimes) == ["base_pdf.html", "factura.html", "totales.html"]
+        assert all(mtimes.values())
+
+    @pytest.mark.parametrize("edited", ["base_pdf.html", "totales.html"])
+    def test_editing_parent_or_include_misses(self, templates, edited):
+        before = key_for(template="factura.html")
+        assert key_for(template="factura.html") == before
+
+        self.touch(templates / edited)
+
+        assert key_for(template="factura.html") != before
+
+
+class TestMemoryLevel:
+
+    def test_evicts_least_recently_used_by_bytes(self, tmp_path):
+        cache = RenderCache(memory_bytes=25, disk_bytes=0, directory=str(tmp_path))
+        cache.set("a" * 64, "pdf", b"x" * 10)
+        cache.set("b" * 64, "pdf", b"y" * 10)
+        # Acceder a "a" la deja como la más reciente
+        assert cache.get("a" * 64) == b"x" * 10
+
+        cache.set("c" * 64, "pdf", b"z" * 10)
+
+        assert cache.get("b" * 64) is None
+        assert cache.get("a" * 64) == b"x" * 10
+        assert cache.get("c" * 64) == b"z" * 10
+        assert cache._memory_size == 20
+
+    def test_skips_entries_larger_than_limit(self, tmp_path):
+        cache = RenderCache(memory_bytes=5, disk_bytes=0, directory=str(tmp_path))
+        cache.set("a" * 64, "pdf", b"x" * 10)
+
+        assert cache.get("a" * 64) is None
+        assert cache._memory_size == 0
+
+    def test_falls_back_to_disk(self, render_cache):
+        render_cache.set("a" * 64, "html", "<p>factura</p>")
+        render_cache.clear_memory()
+
+        assert render_cache.get_html("a" * 64) == "<p>factura</p>"
+        assert render_cache.get_html("a" * 64) == "<p>factura</p>"
+        assert render_cache.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 0}
+
+
+class TestDiskLevel:
+
+    def test_prunes_oldest_files_over_limit(self, tmp_path):
+        cache = RenderCache(memory_bytes=0, disk_bytes=100, directory=str(tmp_path))
+        keys = [letter * 64 for letter in "abcd"]
+        for age, key in enumerate(keys[:3]):
+            cache.set(key, "pdf", b"x" * 30)
+            # mtimes escalonados: "a" es la más vieja
+            stamp = time.time() - 100 + age
+            os.utime(cache._path(key, "pdf"), (stamp, stamp))
+        # Un acierto renueva el mtime de "a"
+        assert cache.get(keys[0]) == b"x" * 30
+
+        cache.set(keys[3], "pdf", b"x" * 30)
+
+        assert not os.path.exists(cache._path(keys[1], "pdf"))
+        assert [os.path.exists(cache._path(key, "pdf")) for key in keys] == [
+            True,
+            False,
+            True,
+            True,
+        ]
+        assert cache._disk_size == 90
+
+    def test_prune_is_noop_under_limit(self, render_cache):
+        render_cache.set("a" * 64, "pdf", b"x" * 10)
+
+        assert render_cache.prune() == 0
+        assert os.path.exists(render_cache._path("a" * 64, "pdf"))
+
+    def test_rejects_unknown_kind(self, render_cache):
+        with pytest.raises(ValueError):
+            render_cache.set("a" * 64, "png", b"x")